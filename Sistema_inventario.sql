@@ -7,9 +7,17 @@
 -- \c sistema_inventario;
 
 -- Eliminar tablas si existen (para recrear limpio)
+DROP MATERIALIZED VIEW IF EXISTS valorizacion_inventario;
+DROP TABLE IF EXISTS valorizacion_inventario_diaria CASCADE;
 DROP TABLE IF EXISTS logs_sistema CASCADE;
+DROP TABLE IF EXISTS estadisticas_empleados_mes CASCADE;
+DROP TABLE IF EXISTS estadisticas_empleados CASCADE;
+DROP TABLE IF EXISTS estadisticas_proveedores_mes CASCADE;
+DROP TABLE IF EXISTS estadisticas_proveedores CASCADE;
 DROP TABLE IF EXISTS movimientos_caja CASCADE;
 DROP TABLE IF EXISTS detalle_ventas CASCADE;
+DROP TABLE IF EXISTS ventas_clave_idempotencia CASCADE;
+DROP TABLE IF EXISTS ventas_numero_factura CASCADE;
 DROP TABLE IF EXISTS ventas CASCADE;
 DROP TABLE IF EXISTS detalle_compras CASCADE;
 DROP TABLE IF EXISTS compras CASCADE;
@@ -39,12 +47,15 @@ CREATE TABLE personas (
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     estado BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Transacción del último cambio copiado por las terminales (ver marcar_version_catalogo)
+    version_catalogo BIGINT DEFAULT txid_current()
 );
 
 CREATE INDEX idx_personas_nombre_apellido ON personas(nombre, apellido);
 CREATE INDEX idx_personas_email ON personas(email);
 CREATE INDEX idx_personas_dpi ON personas(dpi_nit);
+CREATE INDEX idx_personas_version_catalogo ON personas(version_catalogo);
 
 COMMENT ON TABLE personas IS 'Tabla centralizada para evitar duplicación de datos personales';
 
@@ -74,15 +85,25 @@ CREATE TABLE clientes (
     descuento_habitual DECIMAL(5,2) DEFAULT 0,
     fecha_primera_compra DATE,
     total_compras DECIMAL(12,2) DEFAULT 0,
+    cantidad_compras INT NOT NULL DEFAULT 0,
+    fecha_ultima_compra TIMESTAMP,
+    ticket_promedio DECIMAL(12,2) GENERATED ALWAYS AS (
+        CASE WHEN cantidad_compras > 0 THEN ROUND(total_compras / cantidad_compras, 2) ELSE 0 END
+    ) STORED,
     estado BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version_catalogo BIGINT DEFAULT txid_current()
 );
 
 CREATE INDEX idx_clientes_persona ON clientes(id_persona);
 CREATE INDEX idx_clientes_tipo ON clientes(tipo_cliente);
+CREATE INDEX idx_clientes_version_catalogo ON clientes(version_catalogo);
 
 COMMENT ON TABLE clientes IS 'Contiene solo datos específicos del rol de cliente';
+COMMENT ON COLUMN clientes.total_compras IS 'Monto total de ventas completadas (lo mantiene VentaRepository)';
+COMMENT ON COLUMN clientes.cantidad_compras IS 'Ventas completadas del cliente (lo mantiene VentaRepository)';
+COMMENT ON COLUMN clientes.fecha_ultima_compra IS 'Fecha de la venta completada más reciente';
 
 -- ========================================
 -- TABLA: EMPLEADOS
@@ -177,10 +198,12 @@ CREATE TABLE categorias (
     descripcion TEXT,
     estado BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version_catalogo BIGINT DEFAULT txid_current()
 );
 
 CREATE INDEX idx_categorias_nombre ON categorias(nombre);
+CREATE INDEX idx_categorias_version_catalogo ON categorias(version_catalogo);
 
 -- ========================================
 -- TABLA: PRODUCTOS
@@ -188,6 +211,8 @@ CREATE INDEX idx_categorias_nombre ON categorias(nombre);
 CREATE TABLE productos (
     id_producto SERIAL PRIMARY KEY,
     codigo VARCHAR(50) UNIQUE NOT NULL,
+    -- Código sin espacios y en minúsculas: búsquedas sin distinguir mayúsculas
+    codigo_normalizado VARCHAR(50) GENERATED ALWAYS AS (LOWER(TRIM(codigo))) STORED,
     nombre VARCHAR(150) NOT NULL,
     descripcion TEXT,
     id_categoria INT REFERENCES categorias(id_categoria) ON DELETE SET NULL,
@@ -203,13 +228,19 @@ CREATE TABLE productos (
     estado BOOLEAN DEFAULT true,
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version_catalogo BIGINT DEFAULT txid_current()
 );
 
-CREATE INDEX idx_productos_codigo ON productos(codigo);
+-- Único sin distinguir mayúsculas. Sin INCLUDE: stock_actual y precio_venta en
+-- un índice impedirían que el descuento de stock de cada venta sea HOT
+CREATE UNIQUE INDEX idx_productos_codigo_normalizado ON productos(codigo_normalizado);
 CREATE INDEX idx_productos_nombre ON productos(nombre);
 CREATE INDEX idx_productos_categoria ON productos(id_categoria);
 CREATE INDEX idx_productos_estado ON productos(estado);
+-- Cambios del catálogo para las copias locales de las terminales. No por
+-- updated_at: cambia con cada venta y el descuento de stock dejaría de ser HOT
+CREATE INDEX idx_productos_version_catalogo ON productos(version_catalogo);
 
 -- ========================================
 -- TABLA: HISTORIAL_PRECIOS
@@ -249,11 +280,15 @@ CREATE TABLE cajas (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_cajas_apertura ON cajas(fecha_apertura);
+-- Historial paginado por cursor: ORDER BY fecha_apertura DESC, id_caja DESC
+CREATE INDEX idx_cajas_historial ON cajas(fecha_apertura, id_caja);
 CREATE INDEX idx_cajas_cierre ON cajas(fecha_cierre);
-CREATE INDEX idx_cajas_empleado ON cajas(id_empleado);
+CREATE INDEX idx_cajas_empleado_historial ON cajas(id_empleado, fecha_apertura, id_caja);
 CREATE INDEX idx_cajas_estado ON cajas(estado);
 
+COMMENT ON COLUMN cajas.total_ingresos IS 'Suma de movimientos_caja de tipo ingreso (incluye el monto inicial)';
+COMMENT ON COLUMN cajas.total_egresos IS 'Suma de movimientos_caja de tipo egreso';
+
 -- ========================================
 -- TABLA: COMPRAS
 -- ========================================
@@ -271,7 +306,8 @@ CREATE TABLE compras (
 );
 
 CREATE INDEX idx_compras_fecha ON compras(fecha_compra);
-CREATE INDEX idx_compras_proveedor ON compras(id_proveedor);
+-- Última compra de un proveedor (anulaciones y verificación de estadísticas)
+CREATE INDEX idx_compras_proveedor_fecha ON compras(id_proveedor, fecha_compra);
 CREATE INDEX idx_compras_factura ON compras(numero_factura);
 
 -- ========================================
@@ -291,15 +327,16 @@ CREATE INDEX idx_detalle_compras_compra ON detalle_compras(id_compra);
 CREATE INDEX idx_detalle_compras_producto ON detalle_compras(id_producto);
 
 -- ========================================
--- TABLA: VENTAS
+-- TABLA: VENTAS (particionada por mes)
 -- ========================================
+-- La llave de partición debe formar parte de la llave primaria y de los índices únicos
 CREATE TABLE ventas (
-    id_venta SERIAL PRIMARY KEY,
-    numero_factura VARCHAR(50) UNIQUE NOT NULL,
+    id_venta SERIAL,
+    numero_factura VARCHAR(50) NOT NULL,
     id_cliente INT REFERENCES clientes(id_cliente) ON DELETE SET NULL,
     id_empleado INT NOT NULL REFERENCES empleados(id_empleado),
     id_caja INT REFERENCES cajas(id_caja),
-    fecha_venta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_venta TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     subtotal DECIMAL(10,2) NOT NULL,
     descuento DECIMAL(10,2) DEFAULT 0,
     total DECIMAL(10,2) NOT NULL,
@@ -307,71 +344,183 @@ CREATE TABLE ventas (
     estado VARCHAR(20) DEFAULT 'completada',
     observaciones TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_venta, fecha_venta)
+) PARTITION BY RANGE (fecha_venta);
 
-CREATE INDEX idx_ventas_fecha ON ventas(fecha_venta);
+-- Cubriente: cierres y listados por rango de fecha se resuelven con index-only scans
+CREATE INDEX idx_ventas_fecha_cubriente ON ventas(fecha_venta, id_venta) INCLUDE (total, metodo_pago, estado);
 CREATE INDEX idx_ventas_factura ON ventas(numero_factura);
-CREATE INDEX idx_ventas_cliente ON ventas(id_cliente);
-CREATE INDEX idx_ventas_empleado ON ventas(id_empleado);
+-- Última compra de un cliente (anulaciones y verificación de estadísticas)
+CREATE INDEX idx_ventas_cliente_fecha ON ventas(id_cliente, fecha_venta);
+CREATE INDEX idx_ventas_empleado_fecha ON ventas(id_empleado, fecha_venta);
 CREATE INDEX idx_ventas_caja ON ventas(id_caja);
 
+-- Unicidad global del número de factura (un UNIQUE en la tabla particionada
+-- tendría que incluir fecha_venta). Se mantiene con trigger_ventas_numero_factura.
+CREATE TABLE ventas_numero_factura (
+    numero_factura VARCHAR(50) PRIMARY KEY,
+    id_venta INT NOT NULL,
+    fecha_venta TIMESTAMP NOT NULL
+);
+
+-- Clave de idempotencia de cada venta (UUID generado por la terminal). Tabla
+-- aparte por el mismo motivo que ventas_numero_factura. La fila se inserta al
+-- inicio del checkout (un reintento concurrente espera a que termine) y se
+-- completa con la venta antes del COMMIT.
+CREATE TABLE ventas_clave_idempotencia (
+    clave UUID PRIMARY KEY,
+    id_venta INT,
+    fecha_venta TIMESTAMP,
+    numero_factura VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ========================================
--- TABLA: DETALLE_VENTAS
+-- TABLA: DETALLE_VENTAS (particionada por mes)
 -- ========================================
+-- fecha_venta se copia de la venta para que el detalle caiga en el mismo mes
 CREATE TABLE detalle_ventas (
-    id_detalle_venta SERIAL PRIMARY KEY,
-    id_venta INT NOT NULL REFERENCES ventas(id_venta) ON DELETE CASCADE,
+    id_detalle_venta SERIAL,
+    id_venta INT NOT NULL,
+    fecha_venta TIMESTAMP NOT NULL,
     id_producto INT NOT NULL REFERENCES productos(id_producto),
     cantidad INT NOT NULL CHECK (cantidad > 0),
     precio_unitario DECIMAL(10,2) NOT NULL,
     subtotal DECIMAL(10,2) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_detalle_venta, fecha_venta),
+    FOREIGN KEY (id_venta, fecha_venta) REFERENCES ventas(id_venta, fecha_venta) ON DELETE CASCADE
+) PARTITION BY RANGE (fecha_venta);
 
 CREATE INDEX idx_detalle_ventas_venta ON detalle_ventas(id_venta);
 CREATE INDEX idx_detalle_ventas_producto ON detalle_ventas(id_producto);
 
 -- ========================================
--- TABLA: MOVIMIENTOS_CAJA
+-- TABLA: MOVIMIENTOS_CAJA (particionada por mes)
 -- ========================================
 CREATE TABLE movimientos_caja (
-    id_movimiento SERIAL PRIMARY KEY,
+    id_movimiento SERIAL,
     id_caja INT NOT NULL REFERENCES cajas(id_caja) ON DELETE CASCADE,
     tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('ingreso', 'egreso')),
     concepto VARCHAR(100) NOT NULL,
     monto DECIMAL(10,2) NOT NULL,
-    fecha_movimiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_movimiento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     id_empleado INT NOT NULL REFERENCES empleados(id_empleado),
     observaciones TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_movimiento, fecha_movimiento)
+) PARTITION BY RANGE (fecha_movimiento);
 
-CREATE INDEX idx_movimientos_caja ON movimientos_caja(id_caja);
-CREATE INDEX idx_movimientos_tipo ON movimientos_caja(tipo);
-CREATE INDEX idx_movimientos_fecha ON movimientos_caja(fecha_movimiento);
+CREATE INDEX idx_movimientos_caja_fecha ON movimientos_caja(id_caja, fecha_movimiento);
+-- Conciliación de cajas: SUM(monto) por tipo de una caja con index-only scan
+CREATE INDEX idx_movimientos_caja_tipo ON movimientos_caja(id_caja, tipo) INCLUDE (monto);
+-- Solo se inserta en orden cronológico: BRIN ocupa una fracción del btree
+CREATE INDEX idx_movimientos_fecha_brin ON movimientos_caja USING brin(fecha_movimiento);
 
 -- ========================================
--- TABLA: LOGS_SISTEMA
+-- TABLA: LOGS_SISTEMA (particionada por mes)
 -- ========================================
 CREATE TABLE logs_sistema (
-    id_log SERIAL PRIMARY KEY,
+    id_log SERIAL,
     id_empleado INT REFERENCES empleados(id_empleado) ON DELETE SET NULL,
     accion VARCHAR(50) NOT NULL,
     tabla_afectada VARCHAR(50),
     id_registro INT,
     descripcion TEXT,
     ip_address VARCHAR(45),
-    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_log, fecha)
+) PARTITION BY RANGE (fecha);
 
 CREATE INDEX idx_logs_empleado ON logs_sistema(id_empleado);
 CREATE INDEX idx_logs_accion ON logs_sistema(accion);
-CREATE INDEX idx_logs_fecha ON logs_sistema(fecha);
+CREATE INDEX idx_logs_fecha_brin ON logs_sistema USING brin(fecha);
 CREATE INDEX idx_logs_tabla ON logs_sistema(tabla_afectada);
 
 COMMENT ON TABLE logs_sistema IS 'Auditoría de acciones realizadas en el sistema';
 
+-- ========================================
+-- TABLAS: ESTADÍSTICAS DE PROVEEDORES Y EMPLEADOS
+-- ========================================
+-- Agregados que CompraRepository y VentaRepository mantienen en la misma
+-- transacción que cada compra, venta o anulación: los reportes de cartera leen
+-- una fila por proveedor/empleado sin recorrer compras ni ventas.
+-- Solo cuentan compras no canceladas y ventas completadas.
+CREATE TABLE estadisticas_proveedores (
+    id_proveedor INT PRIMARY KEY REFERENCES proveedores(id_proveedor) ON DELETE CASCADE,
+    cantidad_compras INT NOT NULL DEFAULT 0,
+    total_comprado DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ultima_compra TIMESTAMP
+);
+
+CREATE TABLE estadisticas_proveedores_mes (
+    id_proveedor INT NOT NULL REFERENCES proveedores(id_proveedor) ON DELETE CASCADE,
+    mes DATE NOT NULL,
+    cantidad_compras INT NOT NULL DEFAULT 0,
+    total_comprado DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_proveedor, mes)
+);
+
+CREATE TABLE estadisticas_empleados (
+    id_empleado INT PRIMARY KEY REFERENCES empleados(id_empleado) ON DELETE CASCADE,
+    cantidad_ventas INT NOT NULL DEFAULT 0,
+    total_vendido DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ultima_venta TIMESTAMP
+);
+
+CREATE TABLE estadisticas_empleados_mes (
+    id_empleado INT NOT NULL REFERENCES empleados(id_empleado) ON DELETE CASCADE,
+    mes DATE NOT NULL,
+    cantidad_ventas INT NOT NULL DEFAULT 0,
+    total_vendido DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_empleado, mes)
+);
+
+COMMENT ON TABLE estadisticas_proveedores IS 'Compras no canceladas por proveedor (incremental)';
+COMMENT ON TABLE estadisticas_empleados IS 'Ventas completadas por empleado (incremental)';
+
+-- ========================================
+-- VALORIZACIÓN DE INVENTARIO
+-- ========================================
+-- Valor del inventario activo por categoría, al costo y a precio de venta.
+-- ValorizacionService la refresca con REFRESH ... CONCURRENTLY (las lecturas
+-- no se bloquean) cada VALORIZACION_INTERVALO segundos o a pedido; el índice
+-- único es el que exige CONCURRENTLY. Los productos sin categoría van a la 0.
+CREATE MATERIALIZED VIEW valorizacion_inventario AS
+SELECT
+    COALESCE(p.id_categoria, 0) AS id_categoria,
+    COALESCE(c.nombre, 'Sin categoría') AS categoria,
+    COUNT(*) AS productos,
+    COUNT(*) FILTER (WHERE p.stock_actual = 0) AS sin_stock,
+    COUNT(*) FILTER (WHERE p.stock_actual > 0 AND p.stock_actual <= p.stock_minimo) AS bajo_stock,
+    COALESCE(SUM(p.stock_actual), 0) AS unidades,
+    COALESCE(SUM(p.stock_actual * p.precio_costo), 0) AS valor_costo,
+    COALESCE(SUM(p.stock_actual * p.precio_venta), 0) AS valor_venta
+FROM productos p
+LEFT JOIN categorias c ON c.id_categoria = p.id_categoria
+WHERE p.estado = true
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX idx_valorizacion_inventario_categoria ON valorizacion_inventario(id_categoria);
+
+-- Una foto por día y categoría (la última actualización del día): la tendencia
+-- de la valorización se consulta sin recalcular sobre productos
+CREATE TABLE valorizacion_inventario_diaria (
+    fecha DATE NOT NULL,
+    id_categoria INT NOT NULL,
+    categoria VARCHAR(50) NOT NULL,
+    productos INT NOT NULL,
+    unidades BIGINT NOT NULL,
+    valor_costo DECIMAL(16,2) NOT NULL,
+    valor_venta DECIMAL(16,2) NOT NULL,
+    actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (fecha, id_categoria)
+);
+
+COMMENT ON MATERIALIZED VIEW valorizacion_inventario IS 'Valor del inventario por categoría (la refresca ValorizacionService)';
+COMMENT ON TABLE valorizacion_inventario_diaria IS 'Historial diario de valorizacion_inventario';
+
 -- ========================================
 -- DATOS INICIALES: ROLES
 -- ========================================
@@ -536,6 +685,50 @@ CREATE TRIGGER trigger_productos_updated_at
     BEFORE UPDATE ON productos
     FOR EACH ROW EXECUTE FUNCTION actualizar_updated_at();
 
+CREATE TRIGGER trigger_categorias_updated_at
+    BEFORE UPDATE ON categorias
+    FOR EACH ROW EXECUTE FUNCTION actualizar_updated_at();
+
+-- Función para marcar los cambios que copian las terminales
+-- version_catalogo = id de la transacción; los triggers solo la llaman cuando
+-- cambian columnas de la copia local, no stock_actual ni las estadísticas de
+-- clientes (la venta no escribe en idx_*_version_catalogo)
+CREATE OR REPLACE FUNCTION marcar_version_catalogo()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version_catalogo = txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_productos_version_catalogo
+    BEFORE UPDATE ON productos
+    FOR EACH ROW
+    WHEN ((OLD.codigo, OLD.nombre, OLD.id_categoria, OLD.precio_venta, OLD.stock_minimo, OLD.unidad_medida, OLD.estado)
+          IS DISTINCT FROM
+          (NEW.codigo, NEW.nombre, NEW.id_categoria, NEW.precio_venta, NEW.stock_minimo, NEW.unidad_medida, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+CREATE TRIGGER trigger_categorias_version_catalogo
+    BEFORE UPDATE ON categorias
+    FOR EACH ROW
+    WHEN ((OLD.nombre, OLD.estado) IS DISTINCT FROM (NEW.nombre, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+CREATE TRIGGER trigger_clientes_version_catalogo
+    BEFORE UPDATE ON clientes
+    FOR EACH ROW
+    WHEN ((OLD.id_persona, OLD.tipo_cliente, OLD.descuento_habitual, OLD.estado)
+          IS DISTINCT FROM
+          (NEW.id_persona, NEW.tipo_cliente, NEW.descuento_habitual, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+CREATE TRIGGER trigger_personas_version_catalogo
+    BEFORE UPDATE ON personas
+    FOR EACH ROW
+    WHEN ((OLD.nombre, OLD.apellido, OLD.dpi_nit) IS DISTINCT FROM (NEW.nombre, NEW.apellido, NEW.dpi_nit))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
 -- Función para calcular margen de ganancia automáticamente
 CREATE OR REPLACE FUNCTION calcular_margen_ganancia()
 RETURNS TRIGGER AS $$
@@ -554,31 +747,293 @@ CREATE TRIGGER trigger_calcular_margen
     FOR EACH ROW EXECUTE FUNCTION calcular_margen_ganancia();
 
 -- Función para registrar cambios de precio
+-- Trigger por fila solo para UPDATE que asignan precio_costo o precio_venta y
+-- solo si alguno cambió: el checkout (que descuenta stock_actual) no lo
+-- evalúa. El cambio masivo de precios escribe su historial con un solo
+-- INSERT y fija app.historial_precios = 'lote' para que el trigger no lo
+-- repita. El empleado responsable se toma de la variable de sesión
+-- app.id_empleado si la aplicación la fijó (SET LOCAL).
 CREATE OR REPLACE FUNCTION registrar_cambio_precio()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (OLD.precio_costo != NEW.precio_costo OR OLD.precio_venta != NEW.precio_venta) THEN
-        INSERT INTO historial_precios (
-            id_producto, 
-            precio_costo_anterior, 
-            precio_venta_anterior,
-            precio_costo_nuevo,
-            precio_venta_nuevo
-        ) VALUES (
-            NEW.id_producto,
-            OLD.precio_costo,
-            OLD.precio_venta,
-            NEW.precio_costo,
-            NEW.precio_venta
-        );
-    END IF;
-    RETURN NEW;
+    INSERT INTO historial_precios (
+        id_producto,
+        precio_costo_anterior,
+        precio_venta_anterior,
+        precio_costo_nuevo,
+        precio_venta_nuevo,
+        id_empleado
+    )
+    VALUES (
+        NEW.id_producto,
+        OLD.precio_costo,
+        OLD.precio_venta,
+        NEW.precio_costo,
+        NEW.precio_venta,
+        NULLIF(current_setting('app.id_empleado', true), '')::INT
+    );
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trigger_historial_precios
-    AFTER UPDATE ON productos
-    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_precio();
+    AFTER UPDATE OF precio_costo, precio_venta ON productos
+    FOR EACH ROW
+    WHEN ((OLD.precio_costo, OLD.precio_venta) IS DISTINCT FROM (NEW.precio_costo, NEW.precio_venta)
+          AND current_setting('app.historial_precios', true) IS DISTINCT FROM 'lote')
+    EXECUTE FUNCTION registrar_cambio_precio();
+
+-- Función para mantener la unicidad global del número de factura
+CREATE OR REPLACE FUNCTION registrar_numero_factura()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ventas_numero_factura (numero_factura, id_venta, fecha_venta)
+        VALUES (NEW.numero_factura, NEW.id_venta, NEW.fecha_venta);
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM ventas_numero_factura WHERE numero_factura = OLD.numero_factura;
+    ELSE
+        UPDATE ventas_numero_factura
+        SET numero_factura = NEW.numero_factura,
+            id_venta = NEW.id_venta,
+            fecha_venta = NEW.fecha_venta
+        WHERE numero_factura = OLD.numero_factura;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_ventas_numero_factura
+    AFTER INSERT OR DELETE OR UPDATE OF numero_factura, fecha_venta ON ventas
+    FOR EACH ROW EXECUTE FUNCTION registrar_numero_factura();
+
+-- Checkout completo en una sola llamada (VentaRepository en modo 'funcion'):
+-- sobre un enlace WAN cada viaje de ida y vuelta cuesta decenas de ms y el
+-- camino por sentencias hace uno por línea. Bloquea las tablas en el mismo
+-- orden que VentaRepository.crear (productos, caja, cliente, vendedor), los
+-- productos por id. Los errores de negocio se lanzan con SQLSTATE P0001 y el
+-- mensaje para el usuario.
+--
+-- p_venta: numero_factura, id_cliente, id_empleado, id_caja, fecha_venta
+-- (opcional), subtotal, descuento, total, metodo_pago, estado, observaciones,
+-- clave_idempotencia (opcional) y detalles: [{id_producto, cantidad,
+-- precio_unitario, subtotal}, ...]. Si la clave ya tiene una venta, retorna
+-- esa venta con 'repetida': true sin registrar nada.
+CREATE OR REPLACE FUNCTION registrar_venta(p_venta JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_id_venta INT;
+    v_fecha TIMESTAMP;
+    v_factura VARCHAR(50) := p_venta->>'numero_factura';
+    v_id_caja INT := (p_venta->>'id_caja')::INT;
+    v_id_cliente INT := (p_venta->>'id_cliente')::INT;
+    v_id_empleado INT := (p_venta->>'id_empleado')::INT;
+    v_total DECIMAL(10,2) := (p_venta->>'total')::DECIMAL;
+    v_metodo VARCHAR(20) := COALESCE(p_venta->>'metodo_pago', 'efectivo');
+    v_clave UUID := (p_venta->>'clave_idempotencia')::UUID;
+    v_previa RECORD;
+    v_productos INT[];
+    v_cantidades INT[];
+    v_faltante RECORD;
+BEGIN
+    -- 0. Reservar la clave de idempotencia (un intento concurrente con la
+    --    misma clave espera aquí a que el primero termine)
+    IF v_clave IS NOT NULL THEN
+        INSERT INTO ventas_clave_idempotencia (clave)
+        VALUES (v_clave)
+        ON CONFLICT (clave) DO NOTHING;
+
+        IF NOT FOUND THEN
+            SELECT id_venta, numero_factura, fecha_venta INTO v_previa
+            FROM ventas_clave_idempotencia
+            WHERE clave = v_clave;
+
+            RETURN jsonb_build_object(
+                'id_venta', v_previa.id_venta,
+                'numero_factura', v_previa.numero_factura,
+                'fecha_venta', v_previa.fecha_venta,
+                'repetida', true
+            );
+        END IF;
+    END IF;
+
+    -- 1. Bloquear los productos en orden de id y validar el stock (las líneas
+    --    de un mismo producto se suman)
+    SELECT array_agg(d.id_producto ORDER BY d.id_producto), array_agg(d.cantidad ORDER BY d.id_producto)
+    INTO v_productos, v_cantidades
+    FROM (
+        SELECT id_producto, SUM(cantidad)::INT AS cantidad
+        FROM jsonb_to_recordset(p_venta->'detalles') AS x(id_producto INT, cantidad INT)
+        GROUP BY id_producto
+    ) d;
+
+    PERFORM 1
+    FROM productos p
+    WHERE p.id_producto = ANY (v_productos)
+    ORDER BY p.id_producto
+    FOR UPDATE;
+
+    SELECT l.id_producto, l.cantidad, p.nombre, p.stock_actual
+    INTO v_faltante
+    FROM unnest(v_productos, v_cantidades) AS l(id_producto, cantidad)
+    LEFT JOIN productos p ON p.id_producto = l.id_producto AND p.estado = true
+    WHERE p.id_producto IS NULL OR p.stock_actual < l.cantidad
+    ORDER BY l.id_producto
+    LIMIT 1;
+
+    IF FOUND THEN
+        IF v_faltante.nombre IS NULL THEN
+            RAISE EXCEPTION 'El producto con ID % no existe o está inactivo', v_faltante.id_producto;
+        END IF;
+        RAISE EXCEPTION 'Stock insuficiente para %. Disponible: %, Solicitado: %',
+            v_faltante.nombre, v_faltante.stock_actual, v_faltante.cantidad;
+    END IF;
+
+    -- 2. Venta
+    INSERT INTO ventas (
+        numero_factura, id_cliente, id_empleado, id_caja,
+        fecha_venta, subtotal, descuento, total,
+        metodo_pago, estado, observaciones
+    ) VALUES (
+        v_factura, v_id_cliente, v_id_empleado, v_id_caja,
+        COALESCE((p_venta->>'fecha_venta')::TIMESTAMP, LOCALTIMESTAMP),
+        (p_venta->>'subtotal')::DECIMAL, COALESCE((p_venta->>'descuento')::DECIMAL, 0), v_total,
+        v_metodo, COALESCE(p_venta->>'estado', 'completada'), p_venta->>'observaciones'
+    )
+    RETURNING id_venta, fecha_venta INTO v_id_venta, v_fecha;
+
+    -- 3. Detalles y stock
+    INSERT INTO detalle_ventas (id_venta, fecha_venta, id_producto, cantidad, precio_unitario, subtotal)
+    SELECT v_id_venta, v_fecha, d.id_producto, d.cantidad, d.precio_unitario, d.subtotal
+    FROM jsonb_to_recordset(p_venta->'detalles')
+        AS d(id_producto INT, cantidad INT, precio_unitario DECIMAL(10,2), subtotal DECIMAL(10,2));
+
+    UPDATE productos p
+    SET stock_actual = p.stock_actual - l.cantidad,
+        updated_at = CURRENT_TIMESTAMP
+    FROM unnest(v_productos, v_cantidades) AS l(id_producto, cantidad)
+    WHERE p.id_producto = l.id_producto;
+
+    -- 4. Caja: movimiento y totales (solo si sigue abierta)
+    INSERT INTO movimientos_caja (
+        id_caja, tipo, concepto, monto, fecha_movimiento, id_empleado, observaciones
+    ) VALUES (
+        v_id_caja, 'ingreso', 'Venta - Factura ' || v_factura, v_total,
+        LOCALTIMESTAMP, v_id_empleado, 'Método de pago: ' || v_metodo
+    );
+
+    UPDATE cajas
+    SET total_ventas = total_ventas + v_total,
+        total_ingresos = total_ingresos + v_total
+    WHERE id_caja = v_id_caja AND estado = 'abierta';
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'La caja fue cerrada. Abra una caja para continuar vendiendo.';
+    END IF;
+
+    -- 5. Estadísticas del cliente y del vendedor
+    IF v_id_cliente IS NOT NULL THEN
+        UPDATE clientes
+        SET cantidad_compras = cantidad_compras + 1,
+            total_compras = total_compras + v_total,
+            fecha_primera_compra = COALESCE(fecha_primera_compra, v_fecha::DATE),
+            fecha_ultima_compra = GREATEST(fecha_ultima_compra, v_fecha),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id_cliente = v_id_cliente;
+    END IF;
+
+    INSERT INTO estadisticas_empleados AS e (id_empleado, cantidad_ventas, total_vendido, ultima_venta)
+    VALUES (v_id_empleado, 1, v_total, v_fecha)
+    ON CONFLICT (id_empleado) DO UPDATE
+    SET cantidad_ventas = e.cantidad_ventas + 1,
+        total_vendido = e.total_vendido + EXCLUDED.total_vendido,
+        ultima_venta = GREATEST(e.ultima_venta, EXCLUDED.ultima_venta);
+
+    INSERT INTO estadisticas_empleados_mes AS m (id_empleado, mes, cantidad_ventas, total_vendido)
+    VALUES (v_id_empleado, date_trunc('month', v_fecha)::DATE, 1, v_total)
+    ON CONFLICT (id_empleado, mes) DO UPDATE
+    SET cantidad_ventas = m.cantidad_ventas + 1,
+        total_vendido = m.total_vendido + EXCLUDED.total_vendido;
+
+    IF v_clave IS NOT NULL THEN
+        UPDATE ventas_clave_idempotencia
+        SET id_venta = v_id_venta, fecha_venta = v_fecha, numero_factura = v_factura
+        WHERE clave = v_clave;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'id_venta', v_id_venta,
+        'numero_factura', v_factura,
+        'fecha_venta', v_fecha
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ========================================
+-- PARTICIONES MENSUALES
+-- ========================================
+
+-- Crea la partición <tabla>_AAAA_MM que cubre el mes de p_mes (si no existe)
+CREATE OR REPLACE FUNCTION crear_particion_mensual(p_tabla TEXT, p_mes DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_desde DATE := date_trunc('month', p_mes)::DATE;
+    v_hasta DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::DATE;
+    v_nombre TEXT := p_tabla || '_' || to_char(p_mes, 'YYYY_MM');
+BEGIN
+    IF to_regclass(v_nombre) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        v_nombre, p_tabla, v_desde, v_hasta
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Asegura las particiones del mes actual y de los próximos p_meses_adelante.
+-- Se ejecuta al iniciar la aplicación y, si está instalado pg_cron, cada noche.
+CREATE OR REPLACE FUNCTION mantener_particiones(p_meses_adelante INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    v_tabla TEXT;
+    v_mes DATE;
+    v_creadas INT := 0;
+BEGIN
+    FOREACH v_tabla IN ARRAY ARRAY['ventas', 'detalle_ventas', 'movimientos_caja', 'logs_sistema'] LOOP
+        FOR i IN 0..p_meses_adelante LOOP
+            v_mes := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+            BEGIN
+                IF crear_particion_mensual(v_tabla, v_mes) THEN
+                    v_creadas := v_creadas + 1;
+                END IF;
+            EXCEPTION WHEN check_violation THEN
+                -- La partición DEFAULT ya tiene filas de ese mes: requiere intervención manual
+                RAISE WARNING 'No se pudo crear la partición de % para %: %', v_tabla, v_mes, SQLERRM;
+            END;
+        END LOOP;
+    END LOOP;
+    RETURN v_creadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Red de seguridad: si el mantenimiento se atrasa las filas caen aquí en vez de fallar
+CREATE TABLE ventas_default PARTITION OF ventas DEFAULT;
+CREATE TABLE detalle_ventas_default PARTITION OF detalle_ventas DEFAULT;
+CREATE TABLE movimientos_caja_default PARTITION OF movimientos_caja DEFAULT;
+CREATE TABLE logs_sistema_default PARTITION OF logs_sistema DEFAULT;
+
+SELECT mantener_particiones();
+
+-- Programar el mantenimiento nocturno si pg_cron está disponible
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('mantener_particiones', '0 3 * * *', 'SELECT mantener_particiones()');
+    END IF;
+END $$;
 
 -- ========================================
 -- VISTAS ÚTILES
@@ -634,7 +1089,8 @@ LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
 LEFT JOIN personas pe ON c.id_persona = pe.id_persona
 LEFT JOIN empleados e ON v.id_empleado = e.id_empleado
 LEFT JOIN personas emp ON e.id_persona = emp.id_persona
-WHERE DATE(v.fecha_venta) = CURRENT_DATE
+WHERE v.fecha_venta >= CURRENT_DATE
+AND v.fecha_venta < CURRENT_DATE + 1
 ORDER BY v.fecha_venta DESC;
 
 -- ========================================
@@ -0,0 +1,155 @@
+"""
+Tiempo de arranque de la aplicación
+Cada medición corre en un proceso nuevo:
+- importar_main: importar src/main.py (lo que carga el arranque antes del login)
+- importar_vistas: main más todas las vistas, como el arranque anterior a la
+  importación diferida (referencia)
+- primer_cuadro: desde antes de importar main hasta el primer page.update()
+  con el login en pantalla, con SistemaInventarioApp sobre una página de Flet
+  mínima
+Los casos *.proceso miden el proceso completo (incluye iniciar el intérprete).
+
+En frío no hay bytecode en caché (PYTHONPYCACHEPREFIX nuevo en cada corrida:
+todo se compila, como la primera ejecución tras instalar); en caliente se
+reutiliza. No requiere PostgreSQL: el login se muestra antes de conectar.
+
+Uso:
+    python benchmarks/arranque.py
+    python benchmarks/arranque.py --repeticiones 10 --limite-ms 1500
+    python benchmarks/arranque.py --comparar benchmarks/resultados/arranque_<version>.json --umbral 0.20
+
+Termina con código 1 si primer_cuadro en caliente supera --limite-ms o si algún
+caso empeora más que el umbral respecto de --comparar (para CI).
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from comun import RAIZ_PROYECTO, comparar, guardar_resultados, imprimir_tabla, resumir
+
+# Vistas que views/__init__.py importaba al arrancar
+VISTAS = (
+    'login_view', 'dashboard_view', 'compras_view', 'proveedores_view', 'ventas_view',
+    'cajas_view', 'reportes_view', 'configuracion_view', 'productos_view', 'clientes_view',
+    'empleados_view', 'roles_view'
+)
+
+CASOS = ('importar_main', 'importar_vistas', 'primer_cuadro')
+
+
+class PaginaMedida:
+    """Página de Flet mínima: registra cuándo se pinta el primer contenido"""
+
+    def __init__(self):
+        self.controls = []
+        self.overlay = []
+        self.primer_cuadro = None
+
+    def clean(self):
+        self.controls.clear()
+
+    def add(self, *controles):
+        self.controls.extend(controles)
+
+    def update(self, *_):
+        if self.controls and self.primer_cuadro is None:
+            self.primer_cuadro = time.perf_counter()
+
+
+def medir_en_proceso(caso: str) -> float:
+    """Segundos del caso dentro del proceso actual (desde antes de importar main)"""
+    inicio = time.perf_counter()
+    import main
+
+    if caso == 'importar_vistas':
+        for vista in VISTAS:
+            importlib.import_module(f'views.{vista}')
+    elif caso == 'primer_cuadro':
+        pagina = PaginaMedida()
+        main.SistemaInventarioApp(pagina)
+        if pagina.primer_cuadro is None:
+            raise RuntimeError('La aplicación no mostró nada en la página')
+        return pagina.primer_cuadro - inicio
+    return time.perf_counter() - inicio
+
+
+def correr(caso: str, cache: str) -> dict:
+    """Ejecuta un caso en un proceso nuevo con el bytecode en `cache`"""
+    entorno = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+    inicio = time.perf_counter()
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--hijo', caso],
+        cwd=RAIZ_PROYECTO, env=entorno, capture_output=True, text=True
+    )
+    proceso = time.perf_counter() - inicio
+    if salida.returncode != 0:
+        error = salida.stderr.strip().splitlines()
+        raise RuntimeError(f"{caso}: {error[-1] if error else f'código {salida.returncode}'}")
+    # La última línea es la medición; lo anterior, la salida de la aplicación
+    medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+    return {'segundos': medicion['segundos'], 'proceso': proceso}
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de la aplicación')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Procesos por caso y modo')
+    parser.add_argument('--limite-ms', type=float, help='Máximo para primer_cuadro en caliente (mediana)')
+    parser.add_argument('--comparar', help='JSON de resultados previo')
+    parser.add_argument('--umbral', type=float, default=0.20, help='Regresión relativa tolerada')
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    parser.add_argument('--hijo', choices=CASOS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+
+    if args.hijo:
+        segundos = medir_en_proceso(args.hijo)
+        print(json.dumps({'segundos': segundos}), flush=True)
+        # Sin esperar al hilo de arranque (conexión y servicios de fondo)
+        os._exit(0)
+
+    print("=" * 60)
+    print("TIEMPO DE ARRANQUE")
+    print("=" * 60)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as temporal:
+        caliente = os.path.join(temporal, 'caliente')
+        correr('importar_vistas', caliente)  # llena la caché de bytecode
+
+        for caso in CASOS:
+            for modo in ('frio', 'caliente'):
+                medidas = []
+                for i in range(args.repeticiones):
+                    cache = os.path.join(temporal, f'frio_{caso}_{i}') if modo == 'frio' else caliente
+                    medidas.append(correr(caso, cache))
+                resultados[f'{caso}.{modo}'] = resumir([m['segundos'] for m in medidas])
+                resultados[f'{caso}.{modo}.proceso'] = resumir([m['proceso'] for m in medidas])
+
+    imprimir_tabla(resultados)
+
+    fallas = []
+    primer_cuadro = resultados['primer_cuadro.caliente']['mediana'] * 1000
+    if args.limite_ms and primer_cuadro > args.limite_ms:
+        fallas.append(f'primer_cuadro.caliente: {primer_cuadro:.0f} ms > {args.limite_ms:g} ms')
+    if args.comparar:
+        fallas += comparar(resultados, args.comparar, args.umbral)
+
+    ruta = guardar_resultados('arranque', resultados, args.salida, {'parametros': vars(args)})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+    if fallas:
+        print(f"\n[ERROR] Arranque fuera de presupuesto: {', '.join(fallas)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
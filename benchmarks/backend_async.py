@@ -0,0 +1,107 @@
+"""
+Backend sincrónico (psycopg2) contra asíncrono (psycopg 3 con pipeline mode)
+Mide los contadores del dashboard (4 consultas) con red simulada (el proxy de
+checkout_latencia.py), y la carga de varios dashboards: uno tras otro con el pool sincrónico (como los carga la
+interfaz) contra corrutinas concurrentes con el asíncrono.
+
+Uso:
+    python benchmarks/backend_async.py --base-datos inventario_bench
+    python benchmarks/backend_async.py --base-datos inventario_bench --rtt-ms 0,5,20 --repeticiones 30
+
+Requiere psycopg 3 (pip install "psycopg[binary,pool]").
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from checkout_latencia import ProxyLatencia
+from comun import configurar_base_datos, guardar_resultados, medir, resumir
+
+
+def medir_concurrencia(funcion, concurrencia: int, repeticiones: int) -> Dict[str, Any]:
+    """Tiempo hasta completar `concurrencia` cargas del dashboard"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(concurrencia)
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir(tiempos)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Backend sincrónico contra asíncrono (pipeline)')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--rtt-ms', default='0,5,20', help='Tiempos de ida y vuelta a simular, separados por coma')
+    parser.add_argument('--repeticiones', type=int, default=20, help='Mediciones por caso')
+    parser.add_argument('--concurrencia', type=int, default=8, help='Dashboards por medición')
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    # Importar el módulo carga .env; los pools se crean después, ya apuntando al proxy
+    from database.connection import DatabaseConnection
+    from database.conexion_async import AsyncDatabaseConnection, psycopg
+    from repositories.dashboard_repository import DashboardRepository
+
+    if psycopg is None:
+        print('[ERROR] Requiere psycopg 3: pip install "psycopg[binary,pool]"')
+        return 1
+
+    proxy = ProxyLatencia((os.getenv('DB_HOST', 'localhost'), int(os.getenv('DB_PORT', '5432'))))
+    proxy.iniciar()
+    os.environ['DB_HOST'] = '127.0.0.1'
+    os.environ['DB_PORT'] = str(proxy.puerto)
+
+    db = DatabaseConnection()
+    db_async = AsyncDatabaseConnection()
+
+    def dashboards_sync(n):
+        for _ in range(n):
+            DashboardRepository.obtener_contadores_inicio()
+
+    async def _dashboards_async(n):
+        await asyncio.gather(*(DashboardRepository.obtener_contadores_inicio_async() for _ in range(n)))
+
+    casos = {
+        'contadores_inicio.sync': DashboardRepository.obtener_contadores_inicio,
+        'contadores_inicio.async': lambda: db_async.ejecutar(DashboardRepository.obtener_contadores_inicio_async()),
+    }
+    concurrentes = {
+        f'dashboards_x{args.concurrencia}.sync': dashboards_sync,
+        f'dashboards_x{args.concurrencia}.async': lambda n: db_async.ejecutar(_dashboards_async(n)),
+    }
+
+    print("=" * 60)
+    print("BACKEND SINCRÓNICO CONTRA ASÍNCRONO (PIPELINE)")
+    print("=" * 60)
+    print(f"Repeticiones: {args.repeticiones}")
+    print(f"\n{'RTT ms':>8} {'Caso':<32} {'Mediana ms':>11} {'p95 ms':>9}")
+    print('-' * 64)
+
+    resultados = {}
+    for rtt in [float(r) for r in args.rtt_ms.split(',') if r.strip()]:
+        proxy.rtt_ms = rtt
+        medidos = {caso: medir(funcion, args.repeticiones) for caso, funcion in casos.items()}
+        medidos.update({
+            caso: medir_concurrencia(funcion, args.concurrencia, args.repeticiones)
+            for caso, funcion in concurrentes.items()
+        })
+        for caso, stats in medidos.items():
+            resultados[f'rtt_{rtt:g}ms.{caso}'] = stats
+            print(f"{rtt:>8g} {caso:<32} {stats['mediana'] * 1000:>11.2f} {stats['p95'] * 1000:>9.2f}")
+
+    db_async.close_all_connections()
+    db.close_all_connections()
+    ruta = guardar_resultados('backend_async', resultados, args.salida, {'parametros': vars(args)})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,436 @@
+"""
+Suite de benchmarks reproducible
+Mide checkout, compras, importación de facturas, listados, búsquedas, todos
+los reportes de ReporteRepository y todas las exportaciones contra una base generada con generar_datos.py.
+
+Uso:
+    python benchmarks/benchmark.py --base-datos inventario_bench
+    python benchmarks/benchmark.py --base-datos inventario_bench --comparar benchmarks/resultados/<previo>.json
+
+Los resultados se guardan en benchmarks/resultados/ como JSON para comparar versiones.
+NOTA: el caso de checkout registra ventas reales en la base de benchmark.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import uuid
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from comun import (
+    comparar, configurar_base_datos, guardar_resultados, imprimir_tabla, medir
+)
+
+TIPOS_REPORTE = (
+    'cierre_diario', 'cierre_mensual', 'compras_periodo', 'productos_existencias',
+    'cartera_clientes', 'cartera_proveedores', 'cartera_empleados'
+)
+
+
+class SuiteBenchmark:
+    """Define y ejecuta los casos de la suite"""
+
+    def __init__(self, args):
+        from database.connection import DatabaseConnection
+        from repositories import (
+            ClienteRepository, CompraRepository, ProductoRepository, ReporteRepository, VentaRepository
+        )
+        from services.caja_service import CajaService
+        from services.importacion_compra_service import ImportacionCompraService
+        from services.precio_service import PrecioService
+        from services.valorizacion_service import ValorizacionService
+
+        self.args = args
+        self.rng = random.Random(args.semilla)
+        self.db = DatabaseConnection()
+        self.productos = ProductoRepository()
+        self.clientes = ClienteRepository()
+        self.compras = CompraRepository()
+        self.ventas = VentaRepository()
+        self.reportes = ReporteRepository()
+        self.cajas = CajaService()
+        self.importacion = ImportacionCompraService()
+        self.precios = PrecioService()
+        self.valorizacion = ValorizacionService()
+
+        self.fecha_referencia = self._fecha_referencia()
+        self.datos_reportes: Dict[str, Dict[str, Any]] = {}
+        self.temporal = tempfile.TemporaryDirectory()
+
+    # ----------------------------------------
+    # Preparación
+    # ----------------------------------------
+    def _fecha_referencia(self) -> date:
+        """Último día con ventas: los reportes diarios/mensuales se miden sobre datos reales"""
+        result = self.db.execute_query("SELECT MAX(fecha_venta)::date AS fecha FROM ventas", fetch='one')
+        return result['fecha'] if result and result['fecha'] else date.today()
+
+    def tamano_dataset(self) -> Dict[str, int]:
+        tablas = ('productos', 'clientes', 'proveedores', 'ventas', 'detalle_ventas',
+                  'compras', 'detalle_compras', 'movimientos_caja', 'cajas')
+        query = ' UNION ALL '.join(f"SELECT '{t}' AS tabla, COUNT(*) AS filas FROM {t}" for t in tablas)
+        return {r['tabla']: r['filas'] for r in self.db.execute_query(query)}
+
+    def version_postgres(self) -> str:
+        result = self.db.execute_query("SHOW server_version", fetch='one')
+        return result['server_version'] if result else ''
+
+    def _preparar_checkout(self) -> Tuple[int, int, List[Tuple[int, float]]]:
+        """Abre (o reutiliza) una caja para un cajero y elige productos con stock suficiente"""
+        empleado = self.db.execute_query("""
+            SELECT id_empleado FROM empleados
+            WHERE usuario LIKE 'bench_cajero_%' AND estado = TRUE
+            ORDER BY id_empleado LIMIT 1
+        """, fetch='one')
+        if not empleado:
+            empleado = self.db.execute_query(
+                "SELECT id_empleado FROM empleados WHERE estado = TRUE ORDER BY id_empleado LIMIT 1",
+                fetch='one'
+            )
+        id_empleado = empleado['id_empleado']
+
+        caja = self.cajas.obtener_caja_actual(id_empleado)
+        if caja:
+            id_caja = caja['id_caja']
+        else:
+            id_caja = self.cajas.abrir_caja(id_empleado, 500, 'Caja de benchmark')['id_caja']
+
+        candidatos = self.db.execute_query("""
+            SELECT id_producto, precio_venta
+            FROM productos
+            WHERE estado = TRUE AND stock_actual >= 100
+            ORDER BY id_producto
+            LIMIT 5000
+        """)
+        if not candidatos:
+            raise RuntimeError('No hay productos con stock suficiente para medir el checkout')
+        return id_empleado, id_caja, [(c['id_producto'], float(c['precio_venta'])) for c in candidatos]
+
+    # ----------------------------------------
+    # Casos
+    # ----------------------------------------
+    def caso_checkout(self, modo: str = 'sentencias') -> Callable[[], Any]:
+        from models.venta import DetalleVenta, Venta
+        from repositories.venta_repository import VentaRepository
+
+        ventas = VentaRepository(modo)
+
+        id_empleado, id_caja, productos = self._preparar_checkout()
+        ids_clientes = [r['id_cliente'] for r in self.db.execute_query(
+            "SELECT id_cliente FROM clientes ORDER BY id_cliente LIMIT 1000")]
+
+        def checkout():
+            venta = Venta(
+                numero_factura=f"BR-{uuid.uuid4().hex[:16]}",
+                id_cliente=self.rng.choice(ids_clientes) if ids_clientes else None,
+                id_empleado=id_empleado,
+                metodo_pago=self.rng.choice(('efectivo', 'tarjeta', 'transferencia')),
+                clave_idempotencia=str(uuid.uuid4())
+            )
+            for id_producto, precio in self.rng.sample(productos, min(len(productos), self.rng.randint(1, 6))):
+                venta.agregar_detalle(DetalleVenta(
+                    id_producto=id_producto, cantidad=self.rng.randint(1, 3), precio_unitario=precio
+                ))
+            resultado = ventas.crear(venta, id_caja)
+            if not resultado['success']:
+                raise RuntimeError(resultado['message'])
+        return checkout
+
+    def caso_compra(self, lineas: int) -> Callable[[], Any]:
+        """Factura de proveedor con `lineas` productos distintos (CompraRepository.crear)"""
+        from models.compra import Compra, DetalleCompra
+
+        proveedor = self.db.execute_query(
+            "SELECT id_proveedor FROM proveedores ORDER BY id_proveedor LIMIT 1", fetch='one')
+        empleado = self.db.execute_query(
+            "SELECT id_empleado FROM empleados WHERE estado = TRUE ORDER BY id_empleado LIMIT 1", fetch='one')
+        if not proveedor or not empleado:
+            raise RuntimeError('Se necesitan proveedores y empleados para medir compras')
+        productos = [(p['id_producto'], float(p['precio_costo'])) for p in self.db.execute_query("""
+            SELECT id_producto, precio_costo FROM productos
+            WHERE estado = TRUE AND precio_costo > 0
+            ORDER BY id_producto
+            LIMIT 20000
+        """)]
+
+        def compra():
+            # Mismo costo actual: mide el registro sin alterar los precios del dataset
+            detalles = [
+                DetalleCompra(id_producto=id_producto, cantidad=self.rng.randint(1, 50),
+                              precio_unitario=precio, subtotal=0)
+                for id_producto, precio in self.rng.sample(productos, min(lineas, len(productos)))
+            ]
+            for detalle in detalles:
+                detalle.calcular_subtotal()
+            nueva = Compra(
+                numero_factura=f"BC-{uuid.uuid4().hex[:16]}",
+                id_proveedor=proveedor['id_proveedor'],
+                id_empleado=empleado['id_empleado'],
+                detalles=detalles
+            )
+            nueva.calcular_totales()
+            resultado = self.compras.crear(nueva)
+            if not resultado['success']:
+                raise RuntimeError(resultado['message'])
+        return compra
+
+    def _archivo_factura(self, lineas: int, extension: str) -> str:
+        """Escribe una factura de proveedor de `lineas` líneas (códigos repetidos incluidos)"""
+        productos = self.db.execute_query("""
+            SELECT codigo, precio_costo FROM productos
+            WHERE estado = TRUE AND precio_costo > 0
+            ORDER BY id_producto
+            LIMIT 20000
+        """)
+        if not productos:
+            raise RuntimeError('No hay productos activos para generar la factura')
+        filas = [
+            (p['codigo'], self.rng.randint(1, 50), f"{float(p['precio_costo']):.2f}")
+            for p in (self.rng.choice(productos) for _ in range(lineas))
+        ]
+
+        ruta = os.path.join(self.temporal.name, f'factura_{lineas}{extension}')
+        if extension == '.csv':
+            with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                escritor = csv.writer(archivo)
+                escritor.writerow(('codigo', 'cantidad', 'precio_unitario'))
+                escritor.writerows(filas)
+        else:
+            import openpyxl
+            libro = openpyxl.Workbook(write_only=True)
+            hoja = libro.create_sheet('Factura')
+            hoja.append(('Código', 'Cantidad', 'Precio Unitario'))
+            for fila in filas:
+                hoja.append(fila)
+            libro.save(ruta)
+        return ruta
+
+    def caso_importacion(self, lineas: int, extension: str) -> Callable[[], Any]:
+        """Lectura, validación, resolución de códigos y vista previa (sin escribir)"""
+        ruta = self._archivo_factura(lineas, extension)
+
+        def importar():
+            resultado = self.importacion.importar(ruta)
+            if not resultado['success']:
+                raise RuntimeError(resultado['message'])
+            return resultado
+        return importar
+
+    def caso_importacion_registrar(self, lineas: int) -> Callable[[], Any]:
+        """Importación completa: archivo CSV hasta la compra registrada"""
+        importar = self.caso_importacion(lineas, '.csv')
+        proveedor = self.db.execute_query(
+            "SELECT id_proveedor FROM proveedores ORDER BY id_proveedor LIMIT 1", fetch='one')
+        empleado = self.db.execute_query(
+            "SELECT id_empleado FROM empleados WHERE estado = TRUE ORDER BY id_empleado LIMIT 1", fetch='one')
+        if not proveedor or not empleado:
+            raise RuntimeError('Se necesitan proveedores y empleados para medir compras')
+
+        def registrar():
+            resultado = self.importacion.registrar(
+                importar()['lineas'],
+                id_proveedor=proveedor['id_proveedor'],
+                id_empleado=empleado['id_empleado'],
+                numero_factura=f"BI-{uuid.uuid4().hex[:16]}"
+            )
+            if not resultado['success']:
+                raise RuntimeError(resultado['message'])
+        return registrar
+
+    def caso_cambio_precios(self, productos: int) -> Callable[[], Any]:
+        """Cambio masivo de precio (+Q 0.01 / -Q 0.01 alternados: el dataset no se desplaza)"""
+        ids = [r['id_producto'] for r in self.db.execute_query(
+            "SELECT id_producto FROM productos WHERE estado = TRUE ORDER BY id_producto LIMIT %s",
+            (productos,))]
+        empleado = self.db.execute_query(
+            "SELECT id_empleado FROM empleados WHERE estado = TRUE ORDER BY id_empleado LIMIT 1", fetch='one')
+        signo = [1]
+
+        def cambio():
+            resultado = self.precios.aplicar(
+                empleado['id_empleado'] if empleado else None, 'monto', 0.01 * signo[0],
+                aplicar_a='ambos', ids_productos=ids
+            )
+            signo[0] = -signo[0]
+            if not resultado['success']:
+                raise RuntimeError(resultado['message'])
+        return cambio
+
+    def casos(self) -> List[Tuple[str, Callable[[], Any], int]]:
+        """Lista de (nombre, función, repeticiones)"""
+        r = self.args.repeticiones
+        fecha = self.fecha_referencia
+        codigo = self.db.execute_query(
+            "SELECT codigo FROM productos ORDER BY id_producto DESC LIMIT 1", fetch='one')
+        codigo = codigo['codigo'] if codigo else 'X'
+        id_caja = self.db.execute_query("SELECT MAX(id_caja) as id_caja FROM cajas", fetch='one')
+        id_caja = id_caja['id_caja'] if id_caja and id_caja['id_caja'] else 1
+        cursor_cajas = self.db.execute_query(
+            "SELECT fecha_apertura, id_caja FROM cajas ORDER BY fecha_apertura DESC, id_caja DESC OFFSET 1000 LIMIT 1",
+            fetch='one')
+        cursor_cajas = (cursor_cajas['fecha_apertura'], cursor_cajas['id_caja']) if cursor_cajas else None
+
+        casos = [
+            # Listados
+            ('listado.ventas_pagina', lambda: self.ventas.listar(limit=10, offset=0), r),
+            ('listado.ventas_pagina_profunda', lambda: self.ventas.listar(limit=10, offset=1000), r),
+            ('listado.ventas_rango_fechas', lambda: self.ventas.listar(
+                limit=10, fecha_inicio=fecha - timedelta(days=7), fecha_fin=fecha), r),
+            ('listado.productos', lambda: self.productos.listar(), r),
+            ('listado.productos_para_ventas', lambda: self.productos.listar_activos_para_ventas(), r),
+            ('listado.clientes', lambda: self.clientes.listar_todos(), r),
+            ('listado.compras', lambda: self.compras.listar(), r),
+            ('listado.historial_cajas', lambda: self.cajas.obtener_historial_cajas(limit=100), r),
+            ('listado.historial_cajas_cerradas', lambda: self.cajas.listar_historial(estado='cerrada'), r),
+            ('listado.historial_cajas_pagina_profunda', lambda: self.cajas.listar_historial(
+                estado='cerrada', despues_de=cursor_cajas), r),
+            # Cajas (resumen del cierre y conciliación contra movimientos)
+            ('cajas.resumen', lambda: self.cajas.obtener_resumen_caja(id_caja), r * 4),
+            ('cajas.verificar_caja', lambda: self.cajas.verificar_caja(id_caja), r * 4),
+            ('cajas.verificar_abiertas', lambda: self.cajas.verificar_cajas_abiertas(), r),
+            # Valorización (tendencia de 90 días desde las fotos diarias)
+            ('valorizacion.tendencia_90_dias', lambda: self.valorizacion.tendencia(fecha - timedelta(days=90), fecha), r * 4),
+            # Búsquedas
+            ('busqueda.producto_por_codigo', lambda: self.productos.obtener_por_codigo(codigo), r * 4),
+            ('busqueda.producto_escaneo', lambda: self.productos.obtener_para_escaneo(codigo.lower()), r * 4),
+            ('busqueda.producto_por_id', lambda: self.productos.obtener_por_id(1), r * 4),
+            ('busqueda.productos_texto', lambda: self.productos.listar(busqueda='Producto 12'), r),
+            ('busqueda.productos_para_ventas_texto',
+             lambda: self.productos.listar_activos_para_ventas(busqueda='Producto 12'), r),
+            ('busqueda.clientes_texto', lambda: self.clientes.listar(busqueda='López'), r),
+            ('busqueda.ventas_factura', lambda: self.ventas.listar(limit=10, busqueda='V-0000012'), r),
+            # Importación de facturas (lectura + validación + vista previa)
+            ('importacion.csv_10k_lineas', self.caso_importacion(10000, '.csv'), r),
+            ('importacion.xlsx_10k_lineas', self.caso_importacion(10000, '.xlsx'), r),
+            # Reportes
+            ('reporte.cierre_caja_diario', lambda: self._reporte(
+                'cierre_diario', self.reportes.cierre_caja_diario, fecha), r),
+            ('reporte.cierre_caja_mensual', lambda: self._reporte(
+                'cierre_mensual', self.reportes.cierre_caja_mensual, fecha.year, fecha.month), r),
+            ('reporte.compras_por_periodo', lambda: self._reporte(
+                'compras_periodo', self.reportes.compras_por_periodo, fecha - timedelta(days=30), fecha), r),
+            ('reporte.productos_y_existencias', lambda: self._reporte(
+                'productos_existencias', self.reportes.productos_y_existencias), r),
+            ('reporte.cartera_clientes', lambda: self._reporte(
+                'cartera_clientes', self.reportes.cartera_clientes), r),
+            ('reporte.cartera_proveedores', lambda: self._reporte(
+                'cartera_proveedores', self.reportes.cartera_proveedores), r),
+            ('reporte.cartera_empleados', lambda: self._reporte(
+                'cartera_empleados', self.reportes.cartera_empleados), r),
+        ]
+
+        if not self.args.sin_checkout:
+            casos.insert(0, ('checkout.venta', self.caso_checkout(), self.args.repeticiones_checkout))
+            casos.insert(1, ('checkout.venta_funcion', self.caso_checkout('funcion'), self.args.repeticiones_checkout))
+            casos.insert(2, ('compra.factura_500_lineas', self.caso_compra(500), r))
+            casos.insert(3, ('importacion.registrar_10k_lineas', self.caso_importacion_registrar(10000), r))
+            casos.insert(4, ('precios.cambio_50k_productos', self.caso_cambio_precios(50000), r))
+            casos.insert(5, ('valorizacion.actualizar', lambda: self.valorizacion.actualizar(), r))
+
+        return casos
+
+    def _reporte(self, tipo: str, funcion: Callable, *args) -> Dict[str, Any]:
+        resultado = funcion(*args)
+        if not resultado.get('success'):
+            raise RuntimeError(resultado.get('message'))
+        self.datos_reportes[tipo] = resultado
+        return resultado
+
+    def casos_exportacion(self) -> List[Tuple[str, Callable[[], Any], int]]:
+        """Una exportación PDF y una Excel por cada reporte (usa los datos ya medidos)"""
+        from utils.exportar_reportes import ExportadorReportes
+
+        casos = []
+        for tipo in TIPOS_REPORTE:
+            datos = self.datos_reportes.get(tipo)
+            if datos is None:
+                continue
+            casos.append((f'exportacion.pdf.{tipo}',
+                          lambda d=datos, t=tipo: ExportadorReportes.exportar_a_pdf(d, t), self.args.repeticiones_exportacion))
+            casos.append((f'exportacion.excel.{tipo}',
+                          lambda d=datos, t=tipo: ExportadorReportes.exportar_a_excel(d, t), self.args.repeticiones_exportacion))
+        return casos
+
+    # ----------------------------------------
+    # Ejecución
+    # ----------------------------------------
+    def _ejecutar(self, casos, resultados: Dict[str, Any]):
+        for nombre, funcion, repeticiones in casos:
+            if self.args.filtro and self.args.filtro not in nombre:
+                continue
+            print(f"  {nombre} ...", flush=True)
+            try:
+                resultados[nombre] = medir(funcion, repeticiones, self.args.calentamiento)
+            except Exception as e:
+                print(f"  [ERROR] {nombre}: {e}")
+                resultados[nombre] = {'error': str(e)}
+
+    def ejecutar(self) -> Dict[str, Any]:
+        resultados: Dict[str, Any] = {}
+        self._ejecutar(self.casos(), resultados)
+
+        if not self.args.sin_exportaciones:
+            # Las exportaciones escriben en ./reportes: usar un directorio temporal
+            directorio_original = os.getcwd()
+            with tempfile.TemporaryDirectory() as temporal:
+                os.chdir(temporal)
+                try:
+                    self._ejecutar(self.casos_exportacion(), resultados)
+                finally:
+                    os.chdir(directorio_original)
+        self.temporal.cleanup()
+        return resultados
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Suite de benchmarks del sistema de inventario')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--repeticiones-checkout', type=int, default=200)
+    parser.add_argument('--repeticiones-exportacion', type=int, default=1)
+    parser.add_argument('--calentamiento', type=int, default=1)
+    parser.add_argument('--filtro', help='Solo ejecutar casos cuyo nombre contenga este texto')
+    parser.add_argument('--sin-checkout', action='store_true', help='No registrar ventas durante la medición')
+    parser.add_argument('--sin-exportaciones', action='store_true')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para detectar regresiones')
+    parser.add_argument('--umbral', type=float, default=0.10, help='Variación relativa considerada regresión')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    suite = SuiteBenchmark(args)
+    print("=" * 60)
+    print("BENCHMARK - SISTEMA DE INVENTARIO")
+    print("=" * 60)
+    dataset = suite.tamano_dataset()
+    print("Dataset: " + ', '.join(f"{t}={n:,}" for t, n in dataset.items()))
+
+    resultados = suite.ejecutar()
+    imprimir_tabla(resultados)
+
+    ruta = guardar_resultados('repositorios', resultados, args.salida, {
+        'dataset': dataset,
+        'postgres': suite.version_postgres(),
+        'fecha_referencia': suite.fecha_referencia,
+        'parametros': vars(args)
+    })
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+    if args.comparar:
+        validos = {k: v for k, v in resultados.items() if 'error' not in v}
+        regresiones = comparar(validos, args.comparar, args.umbral)
+        if regresiones:
+            print(f"\n[ERROR] {len(regresiones)} caso(s) con regresión mayor a {args.umbral:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
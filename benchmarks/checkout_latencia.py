@@ -0,0 +1,193 @@
+"""
+Latencia del checkout con red simulada
+Mide VentaRepository.crear en modo 'sentencias' (varias sentencias desde
+Python) y 'funcion' (una llamada a registrar_venta) a través de un proxy TCP
+local que retrasa cada paquete, como un enlace WAN hacia el servidor central.
+
+Uso:
+    python benchmarks/checkout_latencia.py --base-datos inventario_bench
+    python benchmarks/checkout_latencia.py --base-datos inventario_bench --rtt-ms 0,10,20,40 --ventas 100
+
+El proxy reemplaza a `tc netem` (que requiere root y Linux): cada bloque leído
+se reenvía `rtt / 2` después de haber llegado, en ambos sentidos, sin limitar
+el ancho de banda. Requiere la migración 010 (registrar_venta).
+"""
+import argparse
+import os
+import queue
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from comun import configurar_base_datos, guardar_resultados, resumir
+
+MODOS = ('sentencias', 'funcion')
+
+
+class ProxyLatencia:
+    """Proxy TCP que agrega `rtt_ms / 2` de retardo en cada sentido"""
+
+    def __init__(self, destino: Tuple[str, int], rtt_ms: float = 0.0):
+        self.destino = destino
+        self.rtt_ms = rtt_ms
+        self._servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._servidor.bind(('127.0.0.1', 0))
+        self._servidor.listen()
+        self.puerto = self._servidor.getsockname()[1]
+
+    def iniciar(self):
+        threading.Thread(target=self._aceptar, daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            cliente, _ = self._servidor.accept()
+            servidor = socket.create_connection(self.destino)
+            for s in (cliente, servidor):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._tunel(cliente, servidor)
+            self._tunel(servidor, cliente)
+
+    def _tunel(self, origen: socket.socket, destino: socket.socket):
+        """Un sentido: un hilo lee y marca la llegada, otro reenvía cuando vence el retardo"""
+        pendientes: queue.Queue = queue.Queue()
+
+        def leer():
+            while True:
+                try:
+                    datos = origen.recv(65536)
+                except OSError:
+                    datos = b''
+                pendientes.put((time.perf_counter(), datos))
+                if not datos:
+                    return
+
+        def reenviar():
+            while True:
+                llegada, datos = pendientes.get()
+                espera = llegada + self.rtt_ms / 2000 - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                try:
+                    if not datos:
+                        destino.shutdown(socket.SHUT_WR)
+                        return
+                    destino.sendall(datos)
+                except OSError:
+                    return
+
+        threading.Thread(target=leer, daemon=True).start()
+        threading.Thread(target=reenviar, daemon=True).start()
+
+
+def preparar(db, cajas) -> Tuple[int, int, List[Tuple[int, float]], List[int]]:
+    """Cajero con caja abierta, productos con stock y clientes (igual que benchmark.py)"""
+    empleado = db.execute_query("""
+        SELECT id_empleado FROM empleados
+        WHERE estado = TRUE
+        ORDER BY (usuario LIKE 'bench_cajero_%') DESC, id_empleado
+        LIMIT 1
+    """, fetch='one')
+    if not empleado:
+        raise RuntimeError('No hay empleados activos')
+    id_empleado = empleado['id_empleado']
+
+    caja = cajas.obtener_caja_actual(id_empleado)
+    id_caja = caja['id_caja'] if caja else cajas.abrir_caja(id_empleado, 500, 'Latencia de checkout')['id_caja']
+
+    productos = [(p['id_producto'], float(p['precio_venta'])) for p in db.execute_query("""
+        SELECT id_producto, precio_venta FROM productos
+        WHERE estado = TRUE AND stock_actual >= 100
+        ORDER BY id_producto
+        LIMIT 5000
+    """)]
+    if not productos:
+        raise RuntimeError('No hay productos con stock suficiente para medir el checkout')
+    clientes = [c['id_cliente'] for c in db.execute_query(
+        "SELECT id_cliente FROM clientes ORDER BY id_cliente LIMIT 1000")]
+    return id_empleado, id_caja, productos, clientes
+
+
+def medir_modo(repo, rng, ventas: int, lineas: int, preparacion) -> Dict[str, Any]:
+    from models.venta import DetalleVenta, Venta
+
+    id_empleado, id_caja, productos, clientes = preparacion
+    tiempos = []
+    for _ in range(ventas):
+        venta = Venta(
+            numero_factura=f"LAT-{uuid.uuid4().hex[:16]}",
+            id_cliente=rng.choice(clientes) if clientes else None,
+            id_empleado=id_empleado,
+            metodo_pago='efectivo',
+            clave_idempotencia=str(uuid.uuid4())
+        )
+        for id_producto, precio in rng.sample(productos, min(len(productos), lineas)):
+            venta.agregar_detalle(DetalleVenta(id_producto=id_producto, cantidad=1, precio_unitario=precio))
+
+        inicio = time.perf_counter()
+        resultado = repo.crear(venta, id_caja)
+        tiempos.append(time.perf_counter() - inicio)
+        if not resultado['success']:
+            raise RuntimeError(resultado['message'])
+    return resumir(tiempos)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Latencia del checkout con red simulada')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--rtt-ms', default='0,10,20,40', help='Tiempos de ida y vuelta a simular, separados por coma')
+    parser.add_argument('--ventas', type=int, default=50, help='Ventas por modo y RTT')
+    parser.add_argument('--lineas', type=int, default=5, help='Líneas por venta')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    # Importar el módulo carga .env; el pool se crea después, ya apuntando al proxy
+    from database.connection import DatabaseConnection
+    from repositories.venta_repository import VentaRepository
+    from services.caja_service import CajaService
+
+    proxy = ProxyLatencia((os.getenv('DB_HOST', 'localhost'), int(os.getenv('DB_PORT', '5432'))))
+    proxy.iniciar()
+    os.environ['DB_HOST'] = '127.0.0.1'
+    os.environ['DB_PORT'] = str(proxy.puerto)
+
+    db = DatabaseConnection()
+    preparacion = preparar(db, CajaService())
+    repos = {modo: VentaRepository(modo) for modo in MODOS}
+    rng = random.Random(args.semilla)
+    rtts = [float(r) for r in args.rtt_ms.split(',') if r.strip()]
+
+    print("=" * 60)
+    print("LATENCIA DE CHECKOUT CON RED SIMULADA")
+    print("=" * 60)
+    print(f"Ventas por caso: {args.ventas}  Líneas por venta: {args.lineas}")
+    print(f"\n{'RTT ms':>8} {'Modo':<12} {'Mediana ms':>11} {'p95 ms':>9} {'Máx ms':>9}")
+    print('-' * 54)
+
+    resultados = {}
+    for rtt in rtts:
+        proxy.rtt_ms = rtt
+        for modo in MODOS:
+            # Una venta de calentamiento (planes, caché de la función PL/pgSQL)
+            medir_modo(repos[modo], rng, 1, args.lineas, preparacion)
+            stats = medir_modo(repos[modo], rng, args.ventas, args.lineas, preparacion)
+            resultados[f'rtt_{rtt:g}ms.{modo}'] = stats
+            print(f"{rtt:>8g} {modo:<12} {stats['mediana'] * 1000:>11.2f} "
+                  f"{stats['p95'] * 1000:>9.2f} {stats['max'] * 1000:>9.2f}")
+
+    db.close_all_connections()
+    ruta = guardar_resultados('checkout_latencia', resultados, args.salida, {'parametros': vars(args)})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Utilidades comunes para los scripts de benchmark
+Medición de tiempos, estadísticas y registro de resultados en JSON
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Los módulos de src/ se importan de forma absoluta (database, repositories, ...)
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ_PROYECTO, 'src'))
+
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ_PROYECTO, 'benchmarks', 'resultados')
+
+
+def configurar_base_datos(nombre: Optional[str]):
+    """
+    Apunta la aplicación a otra base de datos antes de crear el pool.
+    Los benchmarks nunca deberían correr contra la base de producción.
+    """
+    if nombre:
+        os.environ['DB_NAME'] = nombre
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil con interpolación lineal (p entre 0 y 100)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * (p / 100)
+    inferior = math.floor(k)
+    superior = math.ceil(k)
+    if inferior == superior:
+        return ordenados[int(k)]
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+def resumir(tiempos: List[float]) -> Dict[str, Any]:
+    """Estadísticas de una serie de tiempos en segundos"""
+    if not tiempos:
+        return {'n': 0}
+    return {
+        'n': len(tiempos),
+        'min': min(tiempos),
+        'max': max(tiempos),
+        'media': statistics.fmean(tiempos),
+        'mediana': statistics.median(tiempos),
+        'p95': percentil(tiempos, 95),
+        'p99': percentil(tiempos, 99),
+        'desviacion': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0
+    }
+
+
+def medir(funcion: Callable[[], Any], repeticiones: int = 5, calentamiento: int = 1) -> Dict[str, Any]:
+    """
+    Ejecuta una función varias veces y retorna sus estadísticas de tiempo
+
+    Args:
+        funcion: Función sin argumentos a medir
+        repeticiones: Ejecuciones medidas
+        calentamiento: Ejecuciones previas descartadas (caché, planes)
+    """
+    for _ in range(calentamiento):
+        funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir(tiempos)
+
+
+def version_actual() -> str:
+    """Versión del código según git (commit corto, con -dirty si hay cambios)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=RAIZ_PROYECTO,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'desconocida'
+
+
+def entorno() -> Dict[str, Any]:
+    """Datos de la máquina para poder comparar resultados con contexto"""
+    return {
+        'python': platform.python_version(),
+        'sistema': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def guardar_resultados(
+    suite: str,
+    resultados: Dict[str, Any],
+    ruta: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Guarda los resultados de una suite en JSON
+
+    Args:
+        suite: Nombre de la suite (repositorios, carga, arranque, ...)
+        resultados: Dict caso -> estadísticas
+        ruta: Archivo destino (por defecto benchmarks/resultados/<suite>_<version>_<fecha>.json)
+        extra: Metadatos adicionales (tamaño del dataset, parámetros, ...)
+
+    Returns:
+        Ruta del archivo generado
+    """
+    version = version_actual()
+    if not ruta:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+        ruta = os.path.join(DIRECTORIO_RESULTADOS, f'{suite}_{version}_{marca}.json')
+
+    documento = {
+        'suite': suite,
+        'version': version,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': entorno(),
+        'metadatos': extra or {},
+        'resultados': resultados
+    }
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False, default=str)
+    return ruta
+
+
+def comparar(actual: Dict[str, Any], ruta_base: str, umbral: float = 0.10, metrica: str = 'mediana') -> List[str]:
+    """
+    Compara resultados contra un JSON previo e imprime la variación por caso
+
+    Args:
+        actual: Dict caso -> estadísticas de la corrida actual
+        ruta_base: JSON generado por guardar_resultados en otra versión
+        umbral: Variación relativa a partir de la cual se considera regresión
+        metrica: Estadística a comparar
+
+    Returns:
+        Lista de casos con regresión
+    """
+    with open(ruta_base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    print(f"\nComparación contra {base.get('version')} ({base.get('fecha')}), métrica: {metrica}")
+    print(f"{'Caso':<45} {'Base (ms)':>12} {'Actual (ms)':>12} {'Cambio':>9}")
+    print('-' * 82)
+
+    regresiones = []
+    for caso, stats in actual.items():
+        previo = base.get('resultados', {}).get(caso)
+        if not previo or metrica not in previo or metrica not in stats:
+            print(f"{caso:<45} {'-':>12} {stats.get(metrica, 0) * 1000:>12.2f} {'nuevo':>9}")
+            continue
+        antes = previo[metrica]
+        ahora = stats[metrica]
+        cambio = (ahora - antes) / antes if antes else 0.0
+        marca = '  <-- regresión' if cambio > umbral else ''
+        print(f"{caso:<45} {antes * 1000:>12.2f} {ahora * 1000:>12.2f} {cambio:>+8.1%}{marca}")
+        if cambio > umbral:
+            regresiones.append(caso)
+    return regresiones
+
+
+def imprimir_tabla(resultados: Dict[str, Any]):
+    """Imprime un resumen legible de los resultados"""
+    print(f"\n{'Caso':<45} {'n':>4} {'Mediana (ms)':>13} {'p95 (ms)':>10} {'Máx (ms)':>10}")
+    print('-' * 86)
+    for caso, stats in resultados.items():
+        if 'error' in stats:
+            print(f"{caso:<45} ERROR: {stats['error']}")
+            continue
+        print(
+            f"{caso:<45} {stats['n']:>4} {stats['mediana'] * 1000:>13.2f} "
+            f"{stats['p95'] * 1000:>10.2f} {stats['max'] * 1000:>10.2f}"
+        )
@@ -0,0 +1,203 @@
+"""
+EXPLAIN ANALYZE de las consultas reales de reportes, listados y cajas
+Ejecuta los métodos de ReporteRepository, VentaRepository.listar y CajaService,
+captura cada SELECT que envían a PostgreSQL y lo repite con
+EXPLAIN (ANALYZE, BUFFERS). Sirve para medir una migración de índices:
+
+    python benchmarks/explicar_consultas.py --base-datos inventario_bench --salida antes.json
+    psql -d inventario_bench -f migraciones/002_indices_reportes.sql
+    python benchmarks/explicar_consultas.py --base-datos inventario_bench --comparar antes.json
+
+Por consulta guarda el tiempo de ejecución (mediana de --repeticiones), los
+buffers leídos y los nodos del plan (Seq Scan, Index Only Scan using ..., ...).
+"""
+import argparse
+import json
+import sys
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from comun import comparar, configurar_base_datos, guardar_resultados, resumir
+
+
+class _CursorCaptura:
+    """Cursor que anota (consulta, parámetros) antes de ejecutar"""
+
+    def __init__(self, cursor, capturadas: List[Tuple[Any, Any]]):
+        self._cursor = cursor
+        self._capturadas = capturadas
+
+    def execute(self, query, params=None):
+        self._capturadas.append((query, params))
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class _ConexionCaptura:
+    """Conexión cuyo cursor() retorna cursores que capturan las consultas"""
+
+    def __init__(self, connection, capturadas: List[Tuple[Any, Any]]):
+        self.real = connection
+        self._capturadas = capturadas
+
+    def cursor(self, *args, **kwargs):
+        return _CursorCaptura(self.real.cursor(*args, **kwargs), self._capturadas)
+
+    def __getattr__(self, nombre):
+        return getattr(self.real, nombre)
+
+
+def capturar_consultas(db, funcion: Callable[[], Any]) -> List[Tuple[Any, Any]]:
+    """Ejecuta `funcion` y retorna los SELECT que envió a través de DatabaseConnection"""
+    capturadas: List[Tuple[Any, Any]] = []
+    obtener = db.get_connection
+    devolver = db.return_connection
+
+    db.get_connection = lambda: _ConexionCaptura(obtener(), capturadas)
+    db.return_connection = lambda c: devolver(getattr(c, 'real', c))
+    try:
+        funcion()
+    finally:
+        del db.get_connection
+        del db.return_connection
+
+    return [(q, p) for q, p in capturadas if str(q).lstrip().upper().startswith('SELECT')]
+
+
+def _nodos(plan: Dict[str, Any]) -> List[str]:
+    """Aplana el árbol del plan en 'Tipo de nodo [using índice] on relación'"""
+    texto = plan['Node Type']
+    if plan.get('Index Name'):
+        texto += f" using {plan['Index Name']}"
+    if plan.get('Relation Name'):
+        texto += f" on {plan['Relation Name']}"
+    nodos = [texto]
+    for hijo in plan.get('Plans', []):
+        nodos.extend(_nodos(hijo))
+    return nodos
+
+
+def explicar(db, query, params, repeticiones: int) -> Dict[str, Any]:
+    """EXPLAIN (ANALYZE, BUFFERS) repetido de una consulta capturada"""
+    connection = db.get_connection()
+    cursor = connection.cursor()
+    tiempos = []
+    plan = None
+    try:
+        for _ in range(repeticiones):
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            resultado = cursor.fetchone()[0]
+            plan = (json.loads(resultado) if isinstance(resultado, str) else resultado)[0]
+            tiempos.append(plan['Execution Time'] / 1000)
+        connection.rollback()
+    finally:
+        cursor.close()
+        db.return_connection(connection)
+
+    raiz = plan['Plan']
+    estadisticas = resumir(tiempos)
+    estadisticas.update({
+        'planificacion_ms': plan.get('Planning Time'),
+        'buffers_hit': raiz.get('Shared Hit Blocks', 0),
+        'buffers_read': raiz.get('Shared Read Blocks', 0),
+        'nodos': _nodos(raiz),
+        'consulta': ' '.join(str(query).split())[:300]
+    })
+    return estadisticas
+
+
+def casos(db) -> List[Tuple[str, Callable[[], Any]]]:
+    """Métodos de la aplicación cuyas consultas se analizan"""
+    from repositories import ReporteRepository, VentaRepository
+    from services.caja_service import CajaService
+
+    reportes = ReporteRepository()
+    ventas = VentaRepository()
+    cajas = CajaService()
+
+    result = db.execute_query("SELECT MAX(fecha_venta)::date AS fecha FROM ventas", fetch='one')
+    fecha = result['fecha']
+    if not fecha:
+        print("[ERROR] La base no tiene ventas. Genere datos con benchmarks/generar_datos.py")
+        sys.exit(1)
+
+    caja = db.execute_query("""
+        SELECT id_caja, id_empleado FROM cajas
+        WHERE fecha_apertura::date = %s
+        ORDER BY id_caja LIMIT 1
+    """, (fecha,), fetch='one')
+
+    lista = [
+        ('reporte.cierre_diario', lambda: reportes.cierre_caja_diario(fecha)),
+        ('reporte.cierre_mensual', lambda: reportes.cierre_caja_mensual(fecha.year, fecha.month)),
+        ('reporte.compras_periodo', lambda: reportes.compras_por_periodo(fecha - timedelta(days=30), fecha)),
+        ('ventas.listar_pagina', lambda: ventas.listar(limit=10, offset=0)),
+        ('ventas.listar_pagina_profunda', lambda: ventas.listar(limit=10, offset=5000)),
+        ('ventas.listar_rango', lambda: ventas.listar(
+            limit=10, offset=0, fecha_inicio=fecha - timedelta(days=7), fecha_fin=fecha)),
+        ('ventas.listar_anuladas', lambda: ventas.listar(limit=10, offset=0, estado='anulada')),
+    ]
+    if caja:
+        lista += [
+            ('caja.resumen', lambda: cajas.obtener_resumen_caja(caja['id_caja'])),
+            ('caja.movimientos', lambda: cajas.obtener_movimientos_caja(caja['id_caja'])),
+            ('caja.historial_empleado', lambda: cajas.obtener_historial_cajas(caja['id_empleado'])),
+        ]
+    return lista
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN ANALYZE de las consultas de reportes')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--repeticiones', type=int, default=5, help='EXPLAIN ANALYZE por consulta')
+    parser.add_argument('--filtro', help='Solo casos cuyo nombre contenga este texto')
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    parser.add_argument('--comparar', help='JSON previo contra el cual comparar')
+    parser.add_argument('--umbral', type=float, default=0.10, help='Variación considerada regresión')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    from database.connection import DatabaseConnection
+    db = DatabaseConnection()
+
+    print("=" * 60)
+    print("EXPLAIN ANALYZE - CONSULTAS DE REPORTES")
+    print("=" * 60)
+
+    resultados: Dict[str, Any] = {}
+    for nombre, funcion in casos(db):
+        if args.filtro and args.filtro not in nombre:
+            continue
+        consultas = capturar_consultas(db, funcion)
+        for i, (query, params) in enumerate(consultas, 1):
+            caso = f'{nombre}.{i}' if len(consultas) > 1 else nombre
+            try:
+                resultados[caso] = explicar(db, query, params, args.repeticiones)
+            except Exception as e:
+                resultados[caso] = {'error': str(e)}
+                print(f"\n{caso}: ERROR {e}")
+                continue
+            r = resultados[caso]
+            print(f"\n{caso}: {r['mediana'] * 1000:.2f} ms  "
+                  f"(buffers hit {r['buffers_hit']}, read {r['buffers_read']})")
+            for nodo in r['nodos']:
+                print(f"    {nodo}")
+
+    ruta = guardar_resultados('explain', resultados, args.salida)
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+    if args.comparar:
+        regresiones = comparar({k: v for k, v in resultados.items() if 'error' not in v},
+                               args.comparar, args.umbral)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""
+Generador de datos sintéticos para benchmarks
+Puebla una base PostgreSQL LOCAL con volúmenes configurables usando COPY.
+
+Uso (sobre una base recién creada con Sistema_inventario.sql):
+    python benchmarks/generar_datos.py --base-datos inventario_bench
+    python benchmarks/generar_datos.py --base-datos inventario_bench --escala 0.01
+
+Los datos son reproducibles: la misma semilla y los mismos volúmenes generan
+exactamente las mismas filas.
+"""
+import argparse
+import hashlib
+import io
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from comun import configurar_base_datos
+
+METODOS_PAGO = ('efectivo', 'efectivo', 'efectivo', 'tarjeta', 'tarjeta', 'transferencia')
+NOMBRES = ('Ana', 'Luis', 'María', 'José', 'Carlos', 'Lucía', 'Pedro', 'Sofía', 'Jorge', 'Elena',
+           'Miguel', 'Carmen', 'Diego', 'Rosa', 'Andrés', 'Julia', 'Mario', 'Paula', 'Raúl', 'Sara')
+APELLIDOS = ('López', 'García', 'Pérez', 'Hernández', 'Morales', 'Castillo', 'Ramírez', 'Orozco',
+             'Barrios', 'Bravo', 'Méndez', 'Cruz', 'Reyes', 'Gómez', 'Díaz', 'Ruiz')
+UNIDADES = ('unidad', 'unidad', 'unidad', 'caja', 'paquete', 'libra', 'litro')
+
+# Marca de los datos generados (códigos, facturas, usuarios)
+PREFIJO = 'BENCH'
+TAMANO_LOTE = 50000
+
+
+def _valor(v) -> str:
+    """Convierte un valor al formato de texto de COPY"""
+    if v is None:
+        return '\\N'
+    if isinstance(v, bool):
+        return 't' if v else 'f'
+    return str(v).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+
+
+class BufferCopy:
+    """
+    Acumula filas en memoria y las envía con COPY ... FROM STDIN.
+    Con automatico=False el vaciado lo decide el llamador, para que las tablas
+    hijas nunca lleguen a la base antes que sus cabeceras.
+    """
+
+    def __init__(self, cursor, tabla: str, columnas: tuple, automatico: bool = True):
+        self.cursor = cursor
+        self.tabla = tabla
+        self.columnas = columnas
+        self.automatico = automatico
+        self.buffer = io.StringIO()
+        self.filas = 0
+        self.total = 0
+
+    def agregar(self, *valores):
+        self.buffer.write('\t'.join(_valor(v) for v in valores))
+        self.buffer.write('\n')
+        self.filas += 1
+        if self.automatico and self.filas >= TAMANO_LOTE:
+            self.vaciar()
+
+    def vaciar(self):
+        if not self.filas:
+            return
+        self.buffer.seek(0)
+        self.cursor.copy_expert(
+            f"COPY {self.tabla} ({', '.join(self.columnas)}) FROM STDIN",
+            self.buffer
+        )
+        self.total += self.filas
+        self.buffer = io.StringIO()
+        self.filas = 0
+
+
+class GeneradorDatos:
+    """Genera el dataset completo respetando las relaciones del esquema"""
+
+    def __init__(self, connection, args):
+        self.conn = connection
+        self.cursor = connection.cursor()
+        self.args = args
+        self.rng = random.Random(args.semilla)
+        self.fin = datetime.combine(datetime.now().date(), datetime.min.time())
+        self.inicio = self.fin - timedelta(days=args.dias)
+
+        self.ids_categorias = []
+        self.ids_proveedores = []
+        self.ids_empleados = []
+        self.ids_clientes = []
+        self.productos = []  # (id_producto, precio_costo, precio_venta)
+        self.cajas = {}  # (id_empleado, indice_dia) -> id_caja
+
+    # ----------------------------------------
+    # Utilidades
+    # ----------------------------------------
+    def _siguiente_id(self, tabla: str, columna: str) -> int:
+        self.cursor.execute(f"SELECT COALESCE(MAX({columna}), 0) + 1 FROM {tabla}")
+        return self.cursor.fetchone()[0]
+
+    def _sincronizar_secuencia(self, tabla: str, columna: str):
+        self.cursor.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'),
+                          GREATEST((SELECT COALESCE(MAX({columna}), 0) FROM {tabla}), 1))
+        """)
+
+    def _paso(self, mensaje: str, inicio: float):
+        print(f"  [OK] {mensaje} ({time.perf_counter() - inicio:.1f}s)")
+
+    def _persona(self, buffer: BufferCopy, id_persona: int, tipo: str):
+        nombre = self.rng.choice(NOMBRES)
+        apellido = f"{self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}"
+        buffer.agregar(
+            id_persona, nombre, apellido,
+            f"5{self.rng.randint(1000000, 9999999)}",
+            f"{tipo}{id_persona}@bench.local",
+            f"Zona {self.rng.randint(1, 25)}",
+            f"{PREFIJO[0]}{tipo[0].upper()}{id_persona:011d}"
+        )
+
+    # ----------------------------------------
+    # Catálogos
+    # ----------------------------------------
+    def verificar_base_limpia(self):
+        self.cursor.execute("SELECT COUNT(*) FROM productos WHERE codigo LIKE %s", (f'{PREFIJO}-%',))
+        if self.cursor.fetchone()[0] > 0:
+            print("[ERROR] La base ya contiene datos de benchmark.")
+            print("        Recree la base con Sistema_inventario.sql antes de generar de nuevo.")
+            sys.exit(1)
+
+    def generar_catalogos(self):
+        inicio = time.perf_counter()
+        personas = BufferCopy(self.cursor, 'personas',
+                              ('id_persona', 'nombre', 'apellido', 'telefono', 'email', 'direccion', 'dpi_nit'))
+        id_persona = self._siguiente_id('personas', 'id_persona')
+
+        # Categorías
+        id_categoria = self._siguiente_id('categorias', 'id_categoria')
+        categorias = BufferCopy(self.cursor, 'categorias', ('id_categoria', 'nombre', 'descripcion'))
+        for i in range(self.args.categorias):
+            categorias.agregar(id_categoria + i, f"{PREFIJO} Categoría {i + 1}", 'Categoría generada')
+            self.ids_categorias.append(id_categoria + i)
+        categorias.vaciar()
+
+        # Empleados (cajeros)
+        id_empleado = self._siguiente_id('empleados', 'id_empleado')
+        personas_empleados = []
+        for i in range(self.args.empleados):
+            self._persona(personas, id_persona, 'empleado')
+            personas_empleados.append(id_persona)
+            id_persona += 1
+
+        # Proveedores (con persona de contacto)
+        personas_contacto = []
+        for i in range(self.args.proveedores):
+            self._persona(personas, id_persona, 'contacto')
+            personas_contacto.append(id_persona)
+            id_persona += 1
+
+        # Clientes
+        personas_clientes = []
+        for i in range(self.args.clientes):
+            self._persona(personas, id_persona, 'cliente')
+            personas_clientes.append(id_persona)
+            id_persona += 1
+        personas.vaciar()
+
+        password = hashlib.sha256(b'bench123').hexdigest()
+        empleados = BufferCopy(self.cursor, 'empleados',
+                               ('id_empleado', 'id_persona', 'id_rol', 'puesto', 'salario', 'usuario', 'password'))
+        for i, id_p in enumerate(personas_empleados):
+            empleados.agregar(id_empleado + i, id_p, 4, 'Cajero', 3500, f"bench_cajero_{i + 1}", password)
+            self.ids_empleados.append(id_empleado + i)
+        empleados.vaciar()
+
+        id_proveedor = self._siguiente_id('proveedores', 'id_proveedor')
+        proveedores = BufferCopy(self.cursor, 'proveedores',
+                                 ('id_proveedor', 'nombre_empresa', 'id_persona_contacto',
+                                  'telefono_empresa', 'email_empresa', 'nit_empresa'))
+        for i, id_p in enumerate(personas_contacto):
+            proveedores.agregar(id_proveedor + i, f"{PREFIJO} Proveedor {i + 1}", id_p,
+                                f"2{self.rng.randint(1000000, 9999999)}",
+                                f"proveedor{i + 1}@bench.local", f"BP{i + 1:09d}")
+            self.ids_proveedores.append(id_proveedor + i)
+        proveedores.vaciar()
+
+        id_cliente = self._siguiente_id('clientes', 'id_cliente')
+        clientes = BufferCopy(self.cursor, 'clientes', ('id_cliente', 'id_persona', 'tipo_cliente'))
+        for i, id_p in enumerate(personas_clientes):
+            tipo = 'mayorista' if self.rng.random() < 0.1 else 'minorista'
+            clientes.agregar(id_cliente + i, id_p, tipo)
+            self.ids_clientes.append(id_cliente + i)
+        clientes.vaciar()
+
+        # Productos
+        id_producto = self._siguiente_id('productos', 'id_producto')
+        productos = BufferCopy(self.cursor, 'productos',
+                               ('id_producto', 'codigo', 'nombre', 'descripcion', 'id_categoria',
+                                'precio_costo', 'precio_venta', 'stock_actual', 'stock_minimo',
+                                'unidad_medida', 'estado'))
+        for i in range(self.args.productos):
+            costo = round(self.rng.uniform(1, 500), 2)
+            venta = round(costo * self.rng.uniform(1.15, 1.6), 2)
+            stock = self.rng.randint(0, 500)
+            productos.agregar(
+                id_producto + i, f"{PREFIJO}-{i + 1:07d}", f"Producto {i + 1}",
+                f"Producto sintético {i + 1}", self.rng.choice(self.ids_categorias),
+                costo, venta, stock, 10, self.rng.choice(UNIDADES),
+                self.rng.random() > 0.02
+            )
+            self.productos.append((id_producto + i, costo, venta))
+        productos.vaciar()
+
+        for tabla, columna in (('personas', 'id_persona'), ('categorias', 'id_categoria'),
+                               ('empleados', 'id_empleado'), ('proveedores', 'id_proveedor'),
+                               ('clientes', 'id_cliente'), ('productos', 'id_producto')):
+            self._sincronizar_secuencia(tabla, columna)
+        self.conn.commit()
+        self._paso(
+            f"Catálogos: {len(self.productos)} productos, {len(self.ids_clientes)} clientes, "
+            f"{len(self.ids_proveedores)} proveedores, {len(self.ids_empleados)} cajeros",
+            inicio
+        )
+
+    # ----------------------------------------
+    # Particiones
+    # ----------------------------------------
+    def crear_particiones(self):
+        """Crea las particiones mensuales del periodo histórico (si no, todo caería en DEFAULT)"""
+        inicio = time.perf_counter()
+        self.cursor.execute("""
+            SELECT COUNT(*) FILTER (WHERE crear_particion_mensual(t.tabla, m.mes::DATE))
+            FROM generate_series(date_trunc('month', %s::TIMESTAMP), %s::TIMESTAMP, INTERVAL '1 month') AS m(mes)
+            CROSS JOIN unnest(ARRAY['ventas', 'detalle_ventas', 'movimientos_caja', 'logs_sistema']) AS t(tabla)
+        """, (self.inicio, self.fin))
+        creadas = self.cursor.fetchone()[0]
+        self.conn.commit()
+        self._paso(f"Particiones mensuales: {creadas} nuevas", inicio)
+
+    # ----------------------------------------
+    # Cajas
+    # ----------------------------------------
+    def generar_cajas(self):
+        inicio = time.perf_counter()
+        id_caja = self._siguiente_id('cajas', 'id_caja')
+        cajas = BufferCopy(self.cursor, 'cajas',
+                           ('id_caja', 'id_empleado', 'fecha_apertura', 'fecha_cierre',
+                            'monto_inicial', 'monto_final', 'diferencia', 'estado'), automatico=False)
+        movimientos = BufferCopy(self.cursor, 'movimientos_caja',
+                                 ('id_caja', 'tipo', 'concepto', 'monto', 'fecha_movimiento', 'id_empleado'),
+                                 automatico=False)
+        for dia in range(self.args.dias):
+            apertura = self.inicio + timedelta(days=dia, hours=7)
+            for id_empleado in self.ids_empleados:
+                cajas.agregar(id_caja, id_empleado, apertura, apertura + timedelta(hours=13),
+                              500, None, None, 'cerrada')
+                movimientos.agregar(id_caja, 'ingreso', 'Apertura de caja - Monto inicial',
+                                    500, apertura, id_empleado)
+                self.cajas[(id_empleado, dia)] = id_caja
+                id_caja += 1
+            if cajas.filas >= TAMANO_LOTE:
+                cajas.vaciar()
+                movimientos.vaciar()
+        cajas.vaciar()
+        movimientos.vaciar()
+        self._sincronizar_secuencia('cajas', 'id_caja')
+        self.conn.commit()
+        self._paso(f"Cajas: {len(self.cajas)}", inicio)
+
+    # ----------------------------------------
+    # Ventas
+    # ----------------------------------------
+    def generar_ventas(self):
+        inicio = time.perf_counter()
+        total = self.args.ventas
+        if not total:
+            return
+        id_venta = self._siguiente_id('ventas', 'id_venta')
+        ventas = BufferCopy(self.cursor, 'ventas',
+                            ('id_venta', 'numero_factura', 'id_cliente', 'id_empleado', 'id_caja',
+                             'fecha_venta', 'subtotal', 'descuento', 'total', 'metodo_pago', 'estado'),
+                            automatico=False)
+        detalles = BufferCopy(self.cursor, 'detalle_ventas',
+                              ('id_venta', 'fecha_venta', 'id_producto', 'cantidad', 'precio_unitario',
+                               'subtotal', 'created_at'),
+                              automatico=False)
+        movimientos = BufferCopy(self.cursor, 'movimientos_caja',
+                                 ('id_caja', 'tipo', 'concepto', 'monto', 'fecha_movimiento', 'id_empleado', 'observaciones'),
+                                 automatico=False)
+
+        segundos_dia = 12 * 3600
+        max_lineas = max(1, self.args.lineas_venta * 2 - 1)
+        for i in range(total):
+            # Orden cronológico: id_venta y fecha_venta crecen juntos (como en producción)
+            posicion = i / total * self.args.dias
+            dia = int(posicion)
+            fecha = self.inicio + timedelta(days=dia, hours=8, seconds=int((posicion - dia) * segundos_dia))
+            id_empleado = self.ids_empleados[i % len(self.ids_empleados)]
+            id_caja = self.cajas[(id_empleado, dia)]
+            id_cliente = self.rng.choice(self.ids_clientes) if self.ids_clientes and self.rng.random() < 0.7 else None
+            metodo = self.rng.choice(METODOS_PAGO)
+            factura = f"{PREFIJO}-V-{id_venta:09d}"
+
+            subtotal = 0.0
+            for _ in range(self.rng.randint(1, max_lineas)):
+                id_producto, _, precio = self.rng.choice(self.productos)
+                cantidad = self.rng.randint(1, 5)
+                linea = round(precio * cantidad, 2)
+                subtotal += linea
+                detalles.agregar(id_venta, fecha, id_producto, cantidad, precio, linea, fecha)
+            subtotal = round(subtotal, 2)
+
+            anulada = self.rng.random() < 0.01
+            ventas.agregar(id_venta, factura, id_cliente, id_empleado, id_caja, fecha,
+                           subtotal, 0, subtotal, metodo, 'anulada' if anulada else 'completada')
+            movimientos.agregar(id_caja, 'ingreso', f'Venta - Factura {factura}', subtotal, fecha,
+                                id_empleado, f'Método de pago: {metodo}')
+            if anulada:
+                movimientos.agregar(id_caja, 'egreso', f'Anulación de venta - Factura {factura}',
+                                    subtotal, fecha + timedelta(minutes=5), id_empleado,
+                                    'Venta anulada, se revirtió el stock')
+            id_venta += 1
+
+            # Orden de vaciado: primero la cabecera por las llaves foráneas
+            if ventas.filas >= TAMANO_LOTE:
+                ventas.vaciar()
+                detalles.vaciar()
+                movimientos.vaciar()
+            if (i + 1) % 500000 == 0:
+                print(f"    ... {i + 1:,} ventas")
+
+        ventas.vaciar()
+        detalles.vaciar()
+        movimientos.vaciar()
+        self._sincronizar_secuencia('ventas', 'id_venta')
+        self._sincronizar_secuencia('detalle_ventas', 'id_detalle_venta')
+        self._sincronizar_secuencia('movimientos_caja', 'id_movimiento')
+        self.conn.commit()
+        self._paso(f"Ventas: {ventas.total:,} con {detalles.total:,} líneas", inicio)
+
+    # ----------------------------------------
+    # Compras
+    # ----------------------------------------
+    def generar_compras(self):
+        inicio = time.perf_counter()
+        total = self.args.compras
+        if not total:
+            return
+        id_compra = self._siguiente_id('compras', 'id_compra')
+        compras = BufferCopy(self.cursor, 'compras',
+                             ('id_compra', 'numero_factura', 'id_proveedor', 'id_empleado',
+                              'fecha_compra', 'total', 'estado'), automatico=False)
+        detalles = BufferCopy(self.cursor, 'detalle_compras',
+                              ('id_compra', 'id_producto', 'cantidad', 'precio_unitario', 'subtotal', 'created_at'),
+                              automatico=False)
+        max_lineas = max(1, self.args.lineas_compra * 2 - 1)
+        segundos_periodo = self.args.dias * 86400
+        for i in range(total):
+            fecha = self.inicio + timedelta(seconds=int(i / total * segundos_periodo))
+            monto = 0.0
+            for _ in range(self.rng.randint(1, max_lineas)):
+                id_producto, costo, _ = self.rng.choice(self.productos)
+                cantidad = self.rng.randint(10, 200)
+                linea = round(costo * cantidad, 2)
+                monto += linea
+                detalles.agregar(id_compra, id_producto, cantidad, costo, linea, fecha)
+            compras.agregar(id_compra, f"{PREFIJO}-C-{id_compra:09d}",
+                            self.rng.choice(self.ids_proveedores), self.rng.choice(self.ids_empleados),
+                            fecha, round(monto, 2), 'completada')
+            id_compra += 1
+            if compras.filas >= TAMANO_LOTE:
+                compras.vaciar()
+                detalles.vaciar()
+
+        compras.vaciar()
+        detalles.vaciar()
+        self._sincronizar_secuencia('compras', 'id_compra')
+        self._sincronizar_secuencia('detalle_compras', 'id_detalle_compra')
+        self.conn.commit()
+        self._paso(f"Compras: {compras.total:,} con {detalles.total:,} líneas", inicio)
+
+    # ----------------------------------------
+    # Agregados derivados
+    # ----------------------------------------
+    def recalcular_agregados(self):
+        """Deja cajas, estadísticas y valorización consistentes con los datos generados"""
+        inicio = time.perf_counter()
+        self.cursor.execute("""
+            UPDATE cajas c
+            SET total_ventas = m.ventas,
+                total_ingresos = m.ingresos,
+                total_egresos = m.egresos,
+                monto_final = m.ingresos - m.egresos,
+                diferencia = 0
+            FROM (
+                SELECT id_caja,
+                       SUM(CASE WHEN tipo = 'ingreso' AND concepto LIKE 'Venta%' THEN monto ELSE 0 END)
+                     - SUM(CASE WHEN tipo = 'egreso' AND concepto LIKE 'Anulación%' THEN monto ELSE 0 END) AS ventas,
+                       SUM(CASE WHEN tipo = 'ingreso' THEN monto ELSE 0 END) AS ingresos,
+                       SUM(CASE WHEN tipo = 'egreso' THEN monto ELSE 0 END) AS egresos
+                FROM movimientos_caja
+                GROUP BY id_caja
+            ) m
+            WHERE c.id_caja = m.id_caja
+        """)
+        self.cursor.execute("""
+            UPDATE clientes c
+            SET total_compras = v.total,
+                cantidad_compras = v.cantidad,
+                fecha_primera_compra = v.primera,
+                fecha_ultima_compra = v.ultima
+            FROM (
+                SELECT id_cliente, COUNT(*) AS cantidad, SUM(total) AS total,
+                       MIN(fecha_venta)::date AS primera, MAX(fecha_venta) AS ultima
+                FROM ventas
+                WHERE estado = 'completada' AND id_cliente IS NOT NULL
+                GROUP BY id_cliente
+            ) v
+            WHERE c.id_cliente = v.id_cliente
+        """)
+        self.cursor.execute("""
+            INSERT INTO estadisticas_proveedores (id_proveedor, cantidad_compras, total_comprado, ultima_compra)
+            SELECT id_proveedor, COUNT(*), SUM(total), MAX(fecha_compra)
+            FROM compras WHERE estado <> 'cancelada'
+            GROUP BY id_proveedor
+        """)
+        self.cursor.execute("""
+            INSERT INTO estadisticas_proveedores_mes (id_proveedor, mes, cantidad_compras, total_comprado)
+            SELECT id_proveedor, date_trunc('month', fecha_compra)::date, COUNT(*), SUM(total)
+            FROM compras WHERE estado <> 'cancelada'
+            GROUP BY 1, 2
+        """)
+        self.cursor.execute("""
+            INSERT INTO estadisticas_empleados (id_empleado, cantidad_ventas, total_vendido, ultima_venta)
+            SELECT id_empleado, COUNT(*), SUM(total), MAX(fecha_venta)
+            FROM ventas WHERE estado = 'completada'
+            GROUP BY id_empleado
+        """)
+        self.cursor.execute("""
+            INSERT INTO estadisticas_empleados_mes (id_empleado, mes, cantidad_ventas, total_vendido)
+            SELECT id_empleado, date_trunc('month', fecha_venta)::date, COUNT(*), SUM(total)
+            FROM ventas WHERE estado = 'completada'
+            GROUP BY 1, 2
+        """)
+        # Valorización actual y una foto por día del período (mismos valores: volumen realista)
+        self.cursor.execute("REFRESH MATERIALIZED VIEW valorizacion_inventario")
+        self.cursor.execute("""
+            INSERT INTO valorizacion_inventario_diaria
+                (fecha, id_categoria, categoria, productos, unidades, valor_costo, valor_venta)
+            SELECT d::date, v.id_categoria, v.categoria, v.productos, v.unidades, v.valor_costo, v.valor_venta
+            FROM generate_series(%s::date, %s::date, interval '1 day') d
+            CROSS JOIN valorizacion_inventario v
+            ON CONFLICT (fecha, id_categoria) DO NOTHING
+        """, (self.inicio, self.fin))
+        self.conn.commit()
+        self._paso("Totales de cajas, clientes, proveedores, empleados y valorización recalculados", inicio)
+
+    def analizar(self):
+        inicio = time.perf_counter()
+        self.conn.autocommit = True
+        self.cursor.execute("VACUUM ANALYZE")
+        self.conn.autocommit = False
+        self._paso("VACUUM ANALYZE", inicio)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos para benchmarks (usar solo en bases locales)')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--escala', type=float, default=1.0,
+                        help='Factor aplicado a todos los volúmenes (ej. 0.01 para una corrida rápida)')
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--clientes', type=int, default=50000)
+    parser.add_argument('--ventas', type=int, default=5000000)
+    parser.add_argument('--compras', type=int, default=500000)
+    parser.add_argument('--proveedores', type=int, default=500)
+    parser.add_argument('--categorias', type=int, default=50)
+    parser.add_argument('--empleados', type=int, default=20, help='Cajeros generados')
+    parser.add_argument('--dias', type=int, default=730, help='Días de historia hacia atrás desde hoy')
+    parser.add_argument('--lineas-venta', type=int, default=3, help='Promedio de líneas por venta')
+    parser.add_argument('--lineas-compra', type=int, default=5, help='Promedio de líneas por compra')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sin-analyze', action='store_true', help='No ejecutar VACUUM ANALYZE al final')
+    args = parser.parse_args(argv)
+
+    for campo in ('productos', 'clientes', 'ventas', 'compras', 'proveedores', 'categorias'):
+        setattr(args, campo, max(1, int(getattr(args, campo) * args.escala)))
+    return args
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    from database.connection import DatabaseConnection
+
+    print("=" * 60)
+    print("GENERACIÓN DE DATOS SINTÉTICOS")
+    print("=" * 60)
+    print(f"Productos: {args.productos:,}  Clientes: {args.clientes:,}  "
+          f"Ventas: {args.ventas:,}  Compras: {args.compras:,}  Días: {args.dias}")
+
+    db = DatabaseConnection()
+    connection = db.get_connection()
+    inicio = time.perf_counter()
+    try:
+        generador = GeneradorDatos(connection, args)
+        generador.verificar_base_limpia()
+        generador.crear_particiones()
+        generador.generar_catalogos()
+        generador.generar_cajas()
+        generador.generar_ventas()
+        generador.generar_compras()
+        generador.recalcular_agregados()
+        if not args.sin_analyze:
+            generador.analizar()
+    except Exception as e:
+        connection.rollback()
+        print(f"[ERROR] Error generando datos: {e}")
+        raise
+    finally:
+        db.return_connection(connection)
+
+    print(f"\n[OK] Datos generados en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
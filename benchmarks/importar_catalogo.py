@@ -0,0 +1,137 @@
+"""
+Benchmark de la importación masiva del catálogo de productos
+Genera un catálogo de --productos filas y mide ImportacionProductoService en
+sus cuatro situaciones: validar, crear todo, reimportar sin cambios y
+reimportar con precios nuevos (actualiza todo y escribe historial de precios).
+
+Uso:
+    python benchmarks/importar_catalogo.py --base-datos inventario_bench
+    python benchmarks/importar_catalogo.py --base-datos inventario_bench --productos 100000 --formato xlsx
+
+NOTA: deja los productos importados en la base (códigos BCAT-<corrida>-NNNNNN).
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import uuid
+from typing import Any, Dict
+
+from comun import comparar, configurar_base_datos, guardar_resultados, imprimir_tabla, resumir
+
+
+def escribir_catalogo(ruta: str, prefijo: str, productos: int, categorias, rng: random.Random,
+                      factor_precio: float = 1.0):
+    """Catálogo sintético con el formato que acepta importar_productos.py"""
+    encabezado = ('codigo', 'nombre', 'categoria', 'precio_costo', 'precio_venta',
+                  'stock_actual', 'stock_minimo', 'unidad_medida')
+    filas = []
+    for i in range(productos):
+        costo = round(rng.uniform(1, 500) * factor_precio, 2)
+        filas.append((
+            f'{prefijo}-{i:06d}', f'Producto importado {i}', rng.choice(categorias),
+            f'{costo:.2f}', f'{costo * 1.3:.2f}', rng.randint(0, 200), 10, 'unidad'
+        ))
+
+    if ruta.endswith('.csv'):
+        with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(encabezado)
+            escritor.writerows(filas)
+    else:
+        import openpyxl
+        libro = openpyxl.Workbook(write_only=True)
+        hoja = libro.create_sheet('Catalogo')
+        hoja.append(encabezado)
+        for fila in filas:
+            hoja.append(fila)
+        libro.save(ruta)
+
+
+def medir_importacion(servicio, ruta: str, solo_validar: bool = False) -> Dict[str, Any]:
+    resultado = servicio.importar(ruta, solo_validar=solo_validar)
+    if not resultado['success']:
+        raise RuntimeError(resultado['message'])
+    estadisticas = resumir([resultado['segundos']])
+    estadisticas.update({
+        'filas_por_segundo': round(resultado['lineas'] / resultado['segundos']),
+        'insertados': resultado['insertados'],
+        'actualizados': resultado['actualizados'],
+        'sin_cambios': resultado['sin_cambios'],
+        'errores': len(resultado['errores'])
+    })
+    return estadisticas
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de importación del catálogo de productos')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--productos', type=int, default=100000)
+    parser.add_argument('--formato', choices=('csv', 'xlsx'), default='csv')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    parser.add_argument('--comparar', help='JSON previo contra el cual comparar')
+    parser.add_argument('--umbral', type=float, default=0.10, help='Variación considerada regresión')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    from database.connection import DatabaseConnection
+    from services.importacion_producto_service import ImportacionProductoService
+
+    db = DatabaseConnection()
+    servicio = ImportacionProductoService()
+    rng = random.Random(args.semilla)
+
+    categorias = [c['nombre'] for c in db.execute_query(
+        "SELECT nombre FROM categorias WHERE estado = TRUE ORDER BY id_categoria")]
+    if not categorias:
+        print("[ERROR] La base no tiene categorías. Genere datos con benchmarks/generar_datos.py")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"BENCHMARK - IMPORTACIÓN DE {args.productos:,} PRODUCTOS ({args.formato.upper()})")
+    print("=" * 60)
+
+    prefijo = f'BCAT-{uuid.uuid4().hex[:6]}'
+    resultados: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as temporal:
+        catalogo = os.path.join(temporal, f'catalogo.{args.formato}')
+        escribir_catalogo(catalogo, prefijo, args.productos, categorias, rng)
+        precios_nuevos = os.path.join(temporal, f'precios.{args.formato}')
+        escribir_catalogo(precios_nuevos, prefijo, args.productos, categorias, rng, factor_precio=1.1)
+
+        fases = (
+            ('importacion.validar', catalogo, True),
+            ('importacion.crear', catalogo, False),
+            ('importacion.sin_cambios', catalogo, False),
+            ('importacion.actualizar_precios', precios_nuevos, False),
+        )
+        for nombre, ruta, solo_validar in fases:
+            print(f"  {nombre} ...", flush=True)
+            try:
+                resultados[nombre] = medir_importacion(servicio, ruta, solo_validar)
+                print(f"    {resultados[nombre]['filas_por_segundo']:,} filas/s")
+            except Exception as e:
+                print(f"  [ERROR] {nombre}: {e}")
+                resultados[nombre] = {'error': str(e)}
+
+    imprimir_tabla(resultados)
+    ruta = guardar_resultados('importacion_productos', resultados, args.salida,
+                              {'productos': args.productos, 'formato': args.formato})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+    if args.comparar:
+        regresiones = comparar({k: v for k, v in resultados.items() if 'error' not in v},
+                               args.comparar, args.umbral)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
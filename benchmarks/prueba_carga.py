@@ -0,0 +1,292 @@
+"""
+Prueba de carga de checkout concurrente
+Simula N cajeros, cada uno con su propia caja abierta y su propio proceso
+(como una terminal POS real con su propio pool), llamando a VentaRepository.crear
+con carritos realistas contra una base LOCAL.
+
+Uso:
+    python benchmarks/prueba_carga.py --base-datos inventario_bench --cajeros 1,4,8,16,32 --duracion 60
+
+Reporta por nivel de concurrencia: throughput, latencia p50/p95/p99, deadlocks,
+fallas de serialización, conflictos de número de factura y otros errores.
+Requiere cajeros bench_cajero_N creados por generar_datos.py (--empleados >= máximo de cajeros).
+"""
+import argparse
+import multiprocessing
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from comun import configurar_base_datos, guardar_resultados, percentil
+
+
+# Clasificación de los mensajes de error que retorna VentaRepository.crear
+CATEGORIAS_ERROR = (
+    ('deadlock', ('deadlock',)),
+    ('serializacion', ('could not serialize', 'serialization failure')),
+    ('conflicto_factura', ('número de factura ya existe', 'numero_factura')),
+    ('stock_insuficiente', ('stock insuficiente',)),
+    ('timeout', ('statement timeout', 'lock timeout', 'canceling statement')),
+)
+
+
+def clasificar_error(mensaje: str) -> str:
+    texto = (mensaje or '').lower()
+    for categoria, patrones in CATEGORIAS_ERROR:
+        if any(p in texto for p in patrones):
+            return categoria
+    return 'otro'
+
+
+def siguiente_factura_pos(venta_repo) -> str:
+    """
+    Mismo algoritmo que VentasView.generar_numero_factura (última factura + 1).
+    Entre terminales concurrentes produce los mismos conflictos que en tienda.
+    """
+    ultima = venta_repo.obtener_ultima_factura()
+    numero = 1
+    if ultima and ultima.get('numero_factura'):
+        try:
+            numero = int(ultima['numero_factura'].split('-')[-1]) + 1
+        except ValueError:
+            numero = 1
+    return f"FACT-{numero:05d}"
+
+
+def _cajero(indice: int, params: Dict[str, Any], listo, inicio, cola):
+    """Proceso de un cajero: prepara su caja, espera la señal de inicio y vende hasta el plazo"""
+    configurar_base_datos(params['base_datos'])
+
+    from database.connection import DatabaseConnection
+    from models.venta import DetalleVenta, Venta
+    from repositories.venta_repository import VentaRepository
+    from services.caja_service import CajaService
+
+    rng = random.Random(params['semilla'] * 1000 + indice)
+    db = DatabaseConnection()
+    ventas = VentaRepository(params['modo_checkout'])
+    cajas = CajaService()
+
+    empleado = db.execute_query(
+        "SELECT id_empleado FROM empleados WHERE usuario = %s AND estado = TRUE",
+        (f"bench_cajero_{indice + 1}",), fetch='one'
+    )
+    if not empleado:
+        cola.put({'indice': indice, 'error_preparacion': f'No existe bench_cajero_{indice + 1}'})
+        listo.set()
+        return
+    id_empleado = empleado['id_empleado']
+
+    caja = cajas.obtener_caja_actual(id_empleado)
+    id_caja = caja['id_caja'] if caja else cajas.abrir_caja(id_empleado, 500, 'Prueba de carga')['id_caja']
+
+    productos = [(p['id_producto'], float(p['precio_venta'])) for p in db.execute_query("""
+        SELECT id_producto, precio_venta FROM productos
+        WHERE estado = TRUE AND stock_actual > 0
+        ORDER BY id_producto
+        LIMIT %s
+    """, (params['catalogo'],))]
+    ids_clientes = [c['id_cliente'] for c in db.execute_query(
+        "SELECT id_cliente FROM clientes ORDER BY id_cliente LIMIT 5000")]
+
+    # Productos "populares": la mayoría de las líneas caen aquí y generan contención real
+    populares = productos[:max(1, int(len(productos) * params['fraccion_populares']))]
+
+    listo.set()
+    inicio.wait()
+
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+    ejemplos: Dict[str, str] = {}
+    plazo = time.perf_counter() + params['duracion']
+
+    while time.perf_counter() < plazo:
+        if params['facturacion'] == 'pos':
+            factura = siguiente_factura_pos(ventas)
+        else:
+            factura = f"LT-{uuid.uuid4().hex[:20]}"
+
+        venta = Venta(
+            numero_factura=factura,
+            id_cliente=rng.choice(ids_clientes) if ids_clientes and rng.random() < 0.6 else None,
+            id_empleado=id_empleado,
+            metodo_pago=rng.choice(('efectivo', 'efectivo', 'tarjeta', 'transferencia')),
+            clave_idempotencia=str(uuid.uuid4())
+        )
+        elegidos = set()
+        for _ in range(rng.randint(1, params['max_lineas'])):
+            fuente = populares if rng.random() < 0.8 else productos
+            id_producto, precio = rng.choice(fuente)
+            if id_producto in elegidos:
+                continue
+            elegidos.add(id_producto)
+            venta.agregar_detalle(DetalleVenta(
+                id_producto=id_producto, cantidad=rng.randint(1, 3), precio_unitario=precio
+            ))
+
+        t0 = time.perf_counter()
+        resultado = ventas.crear(venta, id_caja)
+        duracion = time.perf_counter() - t0
+
+        if resultado['success']:
+            latencias.append(duracion)
+        else:
+            categoria = clasificar_error(resultado.get('message', ''))
+            errores[categoria] = errores.get(categoria, 0) + 1
+            ejemplos.setdefault(categoria, resultado.get('message', '')[:200])
+
+        if params['pausa']:
+            time.sleep(rng.expovariate(1 / params['pausa']))
+
+    db.close_all_connections()
+    cola.put({'indice': indice, 'latencias': latencias, 'errores': errores, 'ejemplos': ejemplos})
+
+
+def _estadisticas_servidor(db) -> Dict[str, int]:
+    result = db.execute_query("""
+        SELECT deadlocks, xact_commit, xact_rollback
+        FROM pg_stat_database
+        WHERE datname = current_database()
+    """, fetch='one')
+    return {k: int(v) for k, v in result.items()} if result else {}
+
+
+def ejecutar_nivel(cajeros: int, params: Dict[str, Any], db) -> Dict[str, Any]:
+    """Ejecuta una ronda con `cajeros` procesos simultáneos y agrega sus resultados"""
+    contexto = multiprocessing.get_context('spawn')
+    cola = contexto.Queue()
+    inicio = contexto.Event()
+    listos = []
+    procesos = []
+    for i in range(cajeros):
+        listo = contexto.Event()
+        proceso = contexto.Process(target=_cajero, args=(i, params, listo, inicio, cola))
+        proceso.start()
+        listos.append(listo)
+        procesos.append(proceso)
+
+    for listo in listos:
+        listo.wait()
+
+    antes = _estadisticas_servidor(db)
+    t0 = time.perf_counter()
+    inicio.set()
+
+    parciales = [cola.get() for _ in procesos]
+    transcurrido = time.perf_counter() - t0
+    for proceso in procesos:
+        proceso.join()
+    despues = _estadisticas_servidor(db)
+
+    latencias: List[float] = []
+    errores: Dict[str, int] = {}
+    ejemplos: Dict[str, str] = {}
+    for parcial in parciales:
+        if 'error_preparacion' in parcial:
+            raise RuntimeError(parcial['error_preparacion'])
+        latencias.extend(parcial['latencias'])
+        for categoria, cantidad in parcial['errores'].items():
+            errores[categoria] = errores.get(categoria, 0) + cantidad
+        for categoria, mensaje in parcial['ejemplos'].items():
+            ejemplos.setdefault(categoria, mensaje)
+
+    intentos = len(latencias) + sum(errores.values())
+    return {
+        'cajeros': cajeros,
+        'duracion_s': transcurrido,
+        'ventas_exitosas': len(latencias),
+        'intentos': intentos,
+        'throughput_ventas_s': len(latencias) / transcurrido if transcurrido else 0.0,
+        'latencia_p50_ms': percentil(latencias, 50) * 1000,
+        'latencia_p95_ms': percentil(latencias, 95) * 1000,
+        'latencia_p99_ms': percentil(latencias, 99) * 1000,
+        'latencia_max_ms': max(latencias) * 1000 if latencias else 0.0,
+        'errores': errores,
+        'tasa_error': sum(errores.values()) / intentos if intentos else 0.0,
+        'ejemplos_error': ejemplos,
+        'servidor': {k: despues.get(k, 0) - antes.get(k, 0) for k in despues}
+    }
+
+
+def imprimir_nivel(r: Dict[str, Any]):
+    e = r['errores']
+    print(
+        f"{r['cajeros']:>8} {r['throughput_ventas_s']:>10.1f} {r['latencia_p50_ms']:>9.1f} "
+        f"{r['latencia_p95_ms']:>9.1f} {r['latencia_p99_ms']:>9.1f} {e.get('deadlock', 0):>9} "
+        f"{e.get('serializacion', 0):>8} {e.get('conflicto_factura', 0):>9} "
+        f"{sum(v for k, v in e.items() if k not in ('deadlock', 'serializacion', 'conflicto_factura')):>7}"
+    )
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga de checkout concurrente')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--cajeros', default='1,2,4,8,16',
+                        help='Niveles de concurrencia separados por coma (ej. 1,4,8,16,32)')
+    parser.add_argument('--duracion', type=float, default=30, help='Segundos por nivel')
+    parser.add_argument('--pausa', type=float, default=0.0,
+                        help='Pausa media entre ventas por cajero en segundos (0 = máxima carga)')
+    parser.add_argument('--max-lineas', type=int, default=8, help='Máximo de líneas por carrito')
+    parser.add_argument('--catalogo', type=int, default=20000, help='Productos elegibles para los carritos')
+    parser.add_argument('--fraccion-populares', type=float, default=0.01,
+                        help='Fracción del catálogo que concentra el 80%% de las líneas')
+    parser.add_argument('--facturacion', choices=('pos', 'unica'), default='pos',
+                        help="'pos' usa última factura + 1 como VentasView; 'unica' usa UUIDs")
+    parser.add_argument('--modo-checkout', choices=('sentencias', 'funcion'), default='sentencias',
+                        help="'funcion' registra cada venta con registrar_venta(jsonb)")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    from database.connection import DatabaseConnection
+    db = DatabaseConnection()
+
+    params = {
+        'base_datos': args.base_datos,
+        'duracion': args.duracion,
+        'pausa': args.pausa,
+        'max_lineas': args.max_lineas,
+        'catalogo': args.catalogo,
+        'fraccion_populares': args.fraccion_populares,
+        'facturacion': args.facturacion,
+        'modo_checkout': args.modo_checkout,
+        'semilla': args.semilla
+    }
+    niveles = [int(n) for n in args.cajeros.split(',') if n.strip()]
+
+    print("=" * 60)
+    print("PRUEBA DE CARGA - CHECKOUT CONCURRENTE")
+    print("=" * 60)
+    print(f"Niveles: {niveles}  Duración: {args.duracion:g}s  Facturación: {args.facturacion}  "
+          f"Checkout: {args.modo_checkout}")
+    print(f"\n{'Cajeros':>8} {'Ventas/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'Deadlock':>9} {'Serial.':>8} {'Factura':>9} {'Otros':>7}")
+    print('-' * 86)
+
+    resultados = {}
+    for cajeros in niveles:
+        resultado = ejecutar_nivel(cajeros, params, db)
+        resultados[f'cajeros_{cajeros}'] = resultado
+        imprimir_nivel(resultado)
+
+    ejemplos = {}
+    for r in resultados.values():
+        for categoria, mensaje in r['ejemplos_error'].items():
+            ejemplos.setdefault(categoria, mensaje)
+    if ejemplos:
+        print("\nEjemplos de error:")
+        for categoria, mensaje in ejemplos.items():
+            print(f"  {categoria}: {mensaje}")
+
+    ruta = guardar_resultados('carga', resultados, args.salida, {'parametros': vars(args)})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+
+
+if __name__ == '__main__':
+    main()
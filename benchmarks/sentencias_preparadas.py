@@ -0,0 +1,170 @@
+"""
+Sentencias preparadas en el checkout
+Mide, para cada sentencia registrada con DatabaseConnection.registrar_sentencia,
+el tiempo de planificación con el texto SQL contra EXECUTE de la sentencia ya
+preparada (EXPLAIN (SUMMARY), mediana de varias corridas), y lo multiplica por
+las veces que cada una se ejecuta en un checkout de N líneas. Después mide el
+checkout completo (VentaRepository.crear) con y sin sentencias preparadas.
+
+Uso:
+    python benchmarks/sentencias_preparadas.py --base-datos inventario_bench
+    python benchmarks/sentencias_preparadas.py --base-datos inventario_bench --lineas 10 --ventas 200
+
+El tiempo de planificación del texto SQL no incluye el análisis sintáctico,
+que la sentencia preparada también se ahorra: el ahorro real es algo mayor.
+"""
+import argparse
+import random
+import re
+import statistics
+from datetime import datetime
+from typing import Any, Dict
+
+from checkout_latencia import medir_modo, preparar
+from comun import configurar_base_datos, guardar_resultados
+
+_PLANIFICACION = re.compile(r'Planning Time: ([\d.]+) ms')
+
+
+def tiempo_planificacion(cursor, query: str, params) -> float:
+    """Planning Time (ms) que reporta EXPLAIN (SUMMARY) sin ejecutar la sentencia"""
+    cursor.execute(f"EXPLAIN (SUMMARY) {query}", params)
+    for (linea,) in cursor.fetchall():
+        coincidencia = _PLANIFICACION.search(linea)
+        if coincidencia:
+            return float(coincidencia.group(1))
+    return 0.0
+
+
+def parametros_de_ejemplo(db, preparacion) -> Dict[str, tuple]:
+    """Parámetros reales para cada sentencia registrada"""
+    id_empleado, id_caja, productos, clientes = preparacion
+    id_producto, precio = productos[0]
+    codigo = db.execute_query(
+        "SELECT codigo FROM productos WHERE id_producto = %s", (id_producto,), fetch='one')['codigo']
+    ahora = datetime.now()
+    return {
+        'venta_bloquear_productos': ([id_producto],),
+        'venta_insertar': ('PREP-EXPLAIN', clientes[0] if clientes else None, id_empleado, id_caja,
+                           ahora, precio, 0, precio, 'efectivo', 'completada', None),
+        'venta_insertar_detalle': (1, ahora, id_producto, 1, precio, precio),
+        'venta_restar_stock': (1, id_producto),
+        'venta_movimiento_caja': (id_caja, 'ingreso', 'Benchmark', precio, ahora, id_empleado, None),
+        'venta_sumar_caja': (precio, precio, id_caja),
+        'producto_por_id': (id_producto,),
+        'producto_para_escaneo': (codigo,),
+    }
+
+
+def medir_planificacion(db, preparacion, repeticiones: int) -> Dict[str, Dict[str, float]]:
+    """Mediana de Planning Time por sentencia, como texto SQL y como EXECUTE"""
+    from database.connection import DatabaseConnection
+
+    parametros = parametros_de_ejemplo(db, preparacion)
+    connection = db.get_connection()
+    cursor = connection.cursor()
+    try:
+        resultados = {}
+        for nombre, sentencia in DatabaseConnection.sentencias_registradas().items():
+            if nombre not in parametros:
+                continue
+            params = parametros[nombre]
+
+            # Se registra en la conexión para que el pool sepa que ya está preparada
+            if nombre not in connection.preparadas:
+                cursor.execute(sentencia.sql_prepare)
+                connection.preparadas.add(nombre)
+
+            # Las primeras ejecuciones usan planes a medida; luego el plan genérico en caché
+            for _ in range(6):
+                tiempo_planificacion(cursor, sentencia.sql_execute, params)
+
+            texto = [tiempo_planificacion(cursor, sentencia.query, params) for _ in range(repeticiones)]
+            preparada = [tiempo_planificacion(cursor, sentencia.sql_execute, params) for _ in range(repeticiones)]
+            resultados[nombre] = {
+                'texto_ms': statistics.median(texto),
+                'preparada_ms': statistics.median(preparada)
+            }
+        return resultados
+    finally:
+        # EXPLAIN no ejecuta las sentencias; PREPARE sobrevive al ROLLBACK
+        connection.rollback()
+        cursor.close()
+        db.return_connection(connection)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Sentencias preparadas en el checkout')
+    parser.add_argument('--base-datos', help='Nombre de la base (sobrescribe DB_NAME)')
+    parser.add_argument('--lineas', type=int, default=5, help='Líneas por venta')
+    parser.add_argument('--ventas', type=int, default=100, help='Ventas por modo en la medición completa')
+    parser.add_argument('--repeticiones', type=int, default=20, help='EXPLAIN por sentencia y modo')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Ruta del JSON de resultados')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    configurar_base_datos(args.base_datos)
+
+    from database.connection import DatabaseConnection
+    from repositories.producto_repository import ProductoRepository  # noqa: F401 (registra sus sentencias)
+    from repositories.venta_repository import VentaRepository
+    from services.caja_service import CajaService
+
+    db = DatabaseConnection()
+    if not DatabaseConnection.preparadas_activas:
+        print("[ERROR] Sentencias preparadas desactivadas (DB_SENTENCIAS_PREPARADAS=no)")
+        return 1
+    preparacion = preparar(db, CajaService())
+
+    print("=" * 60)
+    print("SENTENCIAS PREPARADAS EN EL CHECKOUT")
+    print("=" * 60)
+
+    planificacion = medir_planificacion(db, preparacion, args.repeticiones)
+    print(f"\n{'Sentencia':<26} {'Texto ms':>10} {'Preparada ms':>13} {'Ahorro ms':>10}")
+    print('-' * 62)
+    for nombre, stats in planificacion.items():
+        print(f"{nombre:<26} {stats['texto_ms']:>10.3f} {stats['preparada_ms']:>13.3f} "
+              f"{stats['texto_ms'] - stats['preparada_ms']:>10.3f}")
+
+    # Ejecuciones por checkout de N líneas (VentaRepository._crear_con_sentencias)
+    por_checkout = {
+        'venta_bloquear_productos': 1,
+        'venta_insertar': 1,
+        'venta_insertar_detalle': args.lineas,
+        'venta_restar_stock': args.lineas,
+        'venta_movimiento_caja': 1,
+        'venta_sumar_caja': 1,
+    }
+    ahorro = sum(
+        veces * (planificacion[nombre]['texto_ms'] - planificacion[nombre]['preparada_ms'])
+        for nombre, veces in por_checkout.items() if nombre in planificacion
+    )
+    print(f"\nPlanificación ahorrada por checkout de {args.lineas} líneas: {ahorro:.3f} ms")
+
+    # Checkout completo, en modo 'sentencias', sin y con sentencias preparadas
+    repo = VentaRepository('sentencias')
+    resultados: Dict[str, Any] = {f'planificacion.{n}': s for n, s in planificacion.items()}
+    resultados['planificacion.ahorro_por_checkout_ms'] = ahorro
+    print(f"\n{'Checkout':<14} {'Mediana ms':>11} {'p95 ms':>9}")
+    print('-' * 36)
+    for activas in (False, True):
+        DatabaseConnection.preparadas_activas = activas
+        rng = random.Random(args.semilla)
+        medir_modo(repo, rng, 1, args.lineas, preparacion)
+        stats = medir_modo(repo, rng, args.ventas, args.lineas, preparacion)
+        caso = 'preparadas' if activas else 'texto'
+        resultados[f'checkout.{caso}'] = stats
+        print(f"{caso:<14} {stats['mediana'] * 1000:>11.2f} {stats['p95'] * 1000:>9.2f}")
+
+    db.close_all_connections()
+    ruta = guardar_resultados('sentencias_preparadas', resultados, args.salida, {'parametros': vars(args)})
+    print(f"\n[OK] Resultados guardados en {ruta}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
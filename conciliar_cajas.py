@@ -0,0 +1,75 @@
+"""
+Conciliación de los totales de cajas contra movimientos_caja
+Verifica que cajas.total_ingresos / total_egresos sean la suma de los
+movimientos de cada caja y, opcionalmente, corrige los descuadres
+
+Uso:
+    python conciliar_cajas.py                    # verificar las cajas abiertas
+    python conciliar_cajas.py --caja 123         # verificar una caja (abierta o cerrada)
+    python conciliar_cajas.py --corregir         # corregir las cajas abiertas descuadradas
+    python conciliar_cajas.py --caja 123 --corregir
+"""
+import argparse
+import os
+import sys
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from services.caja_service import CajaService
+
+
+def imprimir_descuadre(caja):
+    print(f"  Caja {caja['id_caja']} ({caja['estado']}): "
+          f"ingresos {caja['total_ingresos']:.2f} registrados / {caja['ingresos_movimientos']:.2f} en movimientos, "
+          f"egresos {caja['total_egresos']:.2f} / {caja['egresos_movimientos']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Conciliación de cajas')
+    parser.add_argument('--caja', type=int, help='ID de la caja a revisar (por defecto, todas las abiertas)')
+    parser.add_argument('--corregir', action='store_true', help='Corregir los totales descuadrados')
+    args = parser.parse_args()
+
+    servicio = CajaService()
+
+    print("=" * 60)
+    print("CONCILIACIÓN DE CAJAS")
+    print("=" * 60)
+
+    if args.caja:
+        caja = servicio.verificar_caja(args.caja)
+        if not caja:
+            print(f"[ERROR] Caja {args.caja} no encontrada")
+            sys.exit(1)
+        descuadradas = [] if caja['cuadra'] else [caja]
+        print(f"Caja {args.caja}: {caja['movimientos']:,} movimientos")
+    else:
+        resultado = servicio.verificar_cajas_abiertas()
+        if not resultado['success']:
+            print(f"[ERROR] {resultado['message']}")
+            sys.exit(1)
+        descuadradas = resultado['descuadradas']
+        print(f"Cajas abiertas revisadas: {resultado['revisadas']}")
+
+    if not descuadradas:
+        print("[OK] Los totales cuadran con los movimientos")
+        return
+
+    print(f"\n[ADVERTENCIA] {len(descuadradas)} caja(s) descuadrada(s):")
+    for caja in descuadradas:
+        imprimir_descuadre(caja)
+
+    if not args.corregir:
+        sys.exit(2)
+
+    for caja in descuadradas:
+        resultado = servicio.conciliar_caja(caja['id_caja'])
+        if resultado['success']:
+            print(f"[OK] Caja {caja['id_caja']}: {resultado['message']}")
+        else:
+            print(f"[ERROR] Caja {caja['id_caja']}: {resultado['message']}")
+
+
+if __name__ == "__main__":
+    main()
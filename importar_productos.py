@@ -0,0 +1,66 @@
+"""
+Carga masiva del catálogo de productos (alta de tiendas, listas de precios)
+Crea los productos nuevos y actualiza los existentes (por código) desde CSV o XLSX
+
+Uso:
+    python importar_productos.py catalogo.csv --validar      # solo reportar errores
+    python importar_productos.py catalogo.xlsx
+    python importar_productos.py catalogo.csv --reporte errores.csv
+
+Columnas: codigo (obligatoria), nombre, descripcion, categoria (nombre o id),
+precio_costo, precio_venta, stock_actual, stock_minimo, unidad_medida.
+Nombre y precios son obligatorios para productos nuevos; en los existentes una
+columna vacía conserva el valor actual y stock_actual se ignora.
+"""
+import argparse
+import os
+import sys
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from services.importacion_producto_service import ImportacionProductoService
+
+# Errores que se muestran en consola (el reporte completo va al archivo)
+MAX_ERRORES_CONSOLA = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importación masiva de productos')
+    parser.add_argument('archivo', help='Archivo CSV o XLSX')
+    parser.add_argument('--validar', action='store_true', help='Validar sin aplicar cambios')
+    parser.add_argument('--reporte', help='CSV donde guardar las filas con errores')
+    args = parser.parse_args()
+
+    servicio = ImportacionProductoService()
+
+    print("=" * 60)
+    print("IMPORTACIÓN DE PRODUCTOS")
+    print("=" * 60)
+
+    resultado = servicio.importar(args.archivo, solo_validar=args.validar)
+    if not resultado['success']:
+        print(f"[ERROR] {resultado['message']}")
+        sys.exit(1)
+
+    print(f"[OK] {resultado['message']}")
+    print(f"     {resultado['lineas']:,} líneas en {resultado['segundos']:.2f} s")
+    if not args.validar:
+        print(f"     Sin cambios: {resultado['sin_cambios']:,}")
+
+    errores = resultado['errores']
+    if errores:
+        print(f"\n[ADVERTENCIA] {len(errores):,} filas rechazadas:")
+        for e in errores[:MAX_ERRORES_CONSOLA]:
+            print(f"  Línea {e['linea']}: {e['codigo'] or '(sin código)'} - {e['error']}")
+        if len(errores) > MAX_ERRORES_CONSOLA:
+            print(f"  ... y {len(errores) - MAX_ERRORES_CONSOLA:,} más")
+
+        if args.reporte:
+            ruta = servicio.guardar_reporte_errores(errores, args.reporte)
+            print(f"\n[OK] Reporte de errores guardado en {ruta}")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
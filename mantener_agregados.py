@@ -0,0 +1,67 @@
+"""
+Verificación y recálculo de los agregados incrementales
+(estadísticas de clientes, proveedores y empleados, totales y por mes)
+
+Uso:
+    python mantener_agregados.py                          # verificar todos
+    python mantener_agregados.py --verificar clientes proveedores
+    python mantener_agregados.py --recalcular clientes    # corregir (bloquea escrituras en clientes)
+    python mantener_agregados.py --recalcular empleados empleados_mes
+"""
+import argparse
+import os
+import sys
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from services.agregados_service import AgregadosService, AGREGADOS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Agregados incrementales')
+    parser.add_argument('--verificar', nargs='*', choices=list(AGREGADOS), metavar='AGREGADO',
+                        help=f"Agregados a verificar ({', '.join(AGREGADOS)}; por defecto todos)")
+    parser.add_argument('--recalcular', nargs='+', choices=list(AGREGADOS), metavar='AGREGADO',
+                        help='Agregados a recalcular desde las tablas de origen')
+    args = parser.parse_args()
+
+    servicio = AgregadosService()
+
+    print("=" * 60)
+    print("AGREGADOS INCREMENTALES")
+    print("=" * 60)
+
+    if args.recalcular:
+        for nombre in args.recalcular:
+            resultado = servicio.recalcular(nombre)
+            if not resultado['success']:
+                print(f"[ERROR] {resultado['message']}")
+                sys.exit(1)
+            print(f"[OK] {resultado['message']}")
+        return
+
+    con_diferencias = False
+    for nombre in args.verificar or list(AGREGADOS):
+        resultado = servicio.verificar(nombre)
+        if not resultado['success']:
+            print(f"[ERROR] {resultado['message']}")
+            sys.exit(1)
+
+        if not resultado['diferencias']:
+            print(f"[OK] {nombre}: {resultado['revisados']:,} registros sin diferencias")
+            continue
+
+        con_diferencias = True
+        print(f"[ADVERTENCIA] {nombre}: {resultado['diferencias']:,} de "
+              f"{resultado['revisados']:,} registros con diferencias")
+        for fila in resultado['muestra']:
+            print(f"  {fila}")
+
+    if con_diferencias:
+        print("\nCorregir con: python mantener_agregados.py --recalcular <agregado>")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
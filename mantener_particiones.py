@@ -0,0 +1,87 @@
+"""
+Script de mantenimiento de las tablas particionadas por mes
+Crea particiones futuras, lista las existentes y archiva meses antiguos
+
+Uso:
+    python mantener_particiones.py                      # crear particiones faltantes y listar
+    python mantener_particiones.py --meses-adelante 6
+    python mantener_particiones.py --archivar 2023-01   # mover un mes al esquema 'archivo'
+    python mantener_particiones.py --archivar-antes-de 2024-01
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from services.particion_service import ParticionService
+
+
+def parsear_mes(texto: str) -> date:
+    """Convierte 'AAAA-MM' en el primer día de ese mes"""
+    try:
+        año, mes = texto.split('-')
+        return date(int(año), int(mes), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Mes inválido '{texto}', use AAAA-MM")
+
+
+def meses_anteriores(limite: date, particiones) -> list:
+    """Meses con particiones vivas anteriores a `limite` (según el nombre tabla_AAAA_MM)"""
+    meses = set()
+    for p in particiones:
+        partes = p['particion'].rsplit('_', 2)
+        if len(partes) == 3 and partes[1].isdigit() and partes[2].isdigit():
+            mes = date(int(partes[1]), int(partes[2]), 1)
+            if mes < limite:
+                meses.add(mes)
+    return sorted(meses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mantenimiento de particiones mensuales')
+    parser.add_argument('--meses-adelante', type=int, default=3, help='Meses futuros a preparar')
+    parser.add_argument('--archivar', type=parsear_mes, help='Mes a archivar (AAAA-MM)')
+    parser.add_argument('--archivar-antes-de', type=parsear_mes,
+                        help='Archivar todos los meses anteriores a AAAA-MM')
+    args = parser.parse_args()
+
+    servicio = ParticionService()
+
+    print("=" * 60)
+    print("MANTENIMIENTO DE PARTICIONES")
+    print("=" * 60)
+
+    resultado = servicio.asegurar_particiones(args.meses_adelante)
+    if not resultado['success']:
+        print(f"[ERROR] {resultado['message']}")
+        sys.exit(1)
+    print(f"[OK] Particiones nuevas: {resultado['creadas']}")
+
+    meses = []
+    if args.archivar:
+        meses.append(args.archivar)
+    if args.archivar_antes_de:
+        meses.extend(meses_anteriores(args.archivar_antes_de, servicio.listar_particiones()))
+
+    for mes in meses:
+        resultado = servicio.archivar_mes(mes.year, mes.month)
+        estado = "[OK]" if resultado['success'] else "[ERROR]"
+        print(f"{estado} {mes:%Y-%m}: {resultado['message']}")
+
+    print(f"\n{'Partición':<35} {'Filas (est.)':>14} {'Tamaño (MB)':>12}")
+    print('-' * 63)
+    for p in servicio.listar_particiones():
+        print(f"{p['particion']:<35} {p['filas_estimadas']:>14,} {p['bytes'] / 1048576:>12.1f}")
+
+    en_default = {t: n for t, n in servicio.filas_en_default().items() if n}
+    if en_default:
+        print("\n[ADVERTENCIA] Hay filas en particiones DEFAULT (mantenimiento atrasado):")
+        for tabla, filas in en_default.items():
+            print(f"  {tabla}_default: {filas:,}")
+
+
+if __name__ == "__main__":
+    main()
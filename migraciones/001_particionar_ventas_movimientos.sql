@@ -0,0 +1,331 @@
+-- ========================================
+-- MIGRACIÓN 001: PARTICIONES MENSUALES
+-- ventas, detalle_ventas, movimientos_caja y logs_sistema
+-- PostgreSQL 12+
+-- ========================================
+-- Convierte las tablas existentes en tablas particionadas por mes (RANGE).
+-- Las tablas se copian completas: ejecutar en una ventana de mantenimiento.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/001_particionar_ventas_movimientos.sql
+--
+-- Todo corre en una sola transacción: si algo falla la base queda como estaba.
+-- Las bases creadas con el Sistema_inventario.sql actual ya están particionadas.
+
+BEGIN;
+
+-- ========================================
+-- 1. APARTAR LAS TABLAS ACTUALES
+-- ========================================
+-- SET SCHEMA mueve también índices, restricciones y secuencias, así los
+-- nombres quedan libres para las tablas nuevas.
+DROP VIEW IF EXISTS vista_ventas_hoy;
+
+CREATE SCHEMA migracion_001;
+ALTER TABLE logs_sistema SET SCHEMA migracion_001;
+ALTER TABLE movimientos_caja SET SCHEMA migracion_001;
+ALTER TABLE detalle_ventas SET SCHEMA migracion_001;
+ALTER TABLE ventas SET SCHEMA migracion_001;
+
+-- ========================================
+-- 2. TABLAS PARTICIONADAS
+-- ========================================
+CREATE TABLE ventas (
+    id_venta SERIAL,
+    numero_factura VARCHAR(50) NOT NULL,
+    id_cliente INT REFERENCES clientes(id_cliente) ON DELETE SET NULL,
+    id_empleado INT NOT NULL REFERENCES empleados(id_empleado),
+    id_caja INT REFERENCES cajas(id_caja),
+    fecha_venta TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    subtotal DECIMAL(10,2) NOT NULL,
+    descuento DECIMAL(10,2) DEFAULT 0,
+    total DECIMAL(10,2) NOT NULL,
+    metodo_pago VARCHAR(20) DEFAULT 'efectivo',
+    estado VARCHAR(20) DEFAULT 'completada',
+    observaciones TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_venta, fecha_venta)
+) PARTITION BY RANGE (fecha_venta);
+
+CREATE TABLE ventas_numero_factura (
+    numero_factura VARCHAR(50) PRIMARY KEY,
+    id_venta INT NOT NULL,
+    fecha_venta TIMESTAMP NOT NULL
+);
+
+CREATE TABLE detalle_ventas (
+    id_detalle_venta SERIAL,
+    id_venta INT NOT NULL,
+    fecha_venta TIMESTAMP NOT NULL,
+    id_producto INT NOT NULL REFERENCES productos(id_producto),
+    cantidad INT NOT NULL CHECK (cantidad > 0),
+    precio_unitario DECIMAL(10,2) NOT NULL,
+    subtotal DECIMAL(10,2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_detalle_venta, fecha_venta),
+    FOREIGN KEY (id_venta, fecha_venta) REFERENCES ventas(id_venta, fecha_venta) ON DELETE CASCADE
+) PARTITION BY RANGE (fecha_venta);
+
+CREATE TABLE movimientos_caja (
+    id_movimiento SERIAL,
+    id_caja INT NOT NULL REFERENCES cajas(id_caja) ON DELETE CASCADE,
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('ingreso', 'egreso')),
+    concepto VARCHAR(100) NOT NULL,
+    monto DECIMAL(10,2) NOT NULL,
+    fecha_movimiento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    id_empleado INT NOT NULL REFERENCES empleados(id_empleado),
+    observaciones TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_movimiento, fecha_movimiento)
+) PARTITION BY RANGE (fecha_movimiento);
+
+CREATE TABLE logs_sistema (
+    id_log SERIAL,
+    id_empleado INT REFERENCES empleados(id_empleado) ON DELETE SET NULL,
+    accion VARCHAR(50) NOT NULL,
+    tabla_afectada VARCHAR(50),
+    id_registro INT,
+    descripcion TEXT,
+    ip_address VARCHAR(45),
+    fecha TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_log, fecha)
+) PARTITION BY RANGE (fecha);
+
+COMMENT ON TABLE logs_sistema IS 'Auditoría de acciones realizadas en el sistema';
+
+-- ========================================
+-- 3. FUNCIONES DE MANTENIMIENTO
+-- ========================================
+CREATE OR REPLACE FUNCTION crear_particion_mensual(p_tabla TEXT, p_mes DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_desde DATE := date_trunc('month', p_mes)::DATE;
+    v_hasta DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::DATE;
+    v_nombre TEXT := p_tabla || '_' || to_char(p_mes, 'YYYY_MM');
+BEGIN
+    IF to_regclass(v_nombre) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        v_nombre, p_tabla, v_desde, v_hasta
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mantener_particiones(p_meses_adelante INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    v_tabla TEXT;
+    v_mes DATE;
+    v_creadas INT := 0;
+BEGIN
+    FOREACH v_tabla IN ARRAY ARRAY['ventas', 'detalle_ventas', 'movimientos_caja', 'logs_sistema'] LOOP
+        FOR i IN 0..p_meses_adelante LOOP
+            v_mes := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+            BEGIN
+                IF crear_particion_mensual(v_tabla, v_mes) THEN
+                    v_creadas := v_creadas + 1;
+                END IF;
+            EXCEPTION WHEN check_violation THEN
+                RAISE WARNING 'No se pudo crear la partición de % para %: %', v_tabla, v_mes, SQLERRM;
+            END;
+        END LOOP;
+    END LOOP;
+    RETURN v_creadas;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION registrar_numero_factura()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ventas_numero_factura (numero_factura, id_venta, fecha_venta)
+        VALUES (NEW.numero_factura, NEW.id_venta, NEW.fecha_venta);
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM ventas_numero_factura WHERE numero_factura = OLD.numero_factura;
+    ELSE
+        UPDATE ventas_numero_factura
+        SET numero_factura = NEW.numero_factura,
+            id_venta = NEW.id_venta,
+            fecha_venta = NEW.fecha_venta
+        WHERE numero_factura = OLD.numero_factura;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ========================================
+-- 4. PARTICIONES PARA LOS DATOS EXISTENTES
+-- ========================================
+DO $$
+DECLARE
+    v_desde DATE;
+    v_mes DATE;
+    v_tabla TEXT;
+BEGIN
+    SELECT date_trunc('month', LEAST(
+        (SELECT MIN(COALESCE(fecha_venta, created_at)) FROM migracion_001.ventas),
+        (SELECT MIN(COALESCE(fecha_movimiento, created_at)) FROM migracion_001.movimientos_caja),
+        (SELECT MIN(fecha) FROM migracion_001.logs_sistema)
+    ))::DATE INTO v_desde;
+
+    FOR v_mes IN
+        SELECT generate_series(
+            COALESCE(v_desde, date_trunc('month', CURRENT_DATE)::DATE),
+            date_trunc('month', CURRENT_DATE),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        FOREACH v_tabla IN ARRAY ARRAY['ventas', 'detalle_ventas', 'movimientos_caja', 'logs_sistema'] LOOP
+            PERFORM crear_particion_mensual(v_tabla, v_mes);
+        END LOOP;
+    END LOOP;
+END $$;
+
+CREATE TABLE ventas_default PARTITION OF ventas DEFAULT;
+CREATE TABLE detalle_ventas_default PARTITION OF detalle_ventas DEFAULT;
+CREATE TABLE movimientos_caja_default PARTITION OF movimientos_caja DEFAULT;
+CREATE TABLE logs_sistema_default PARTITION OF logs_sistema DEFAULT;
+
+SELECT mantener_particiones();
+
+-- ========================================
+-- 5. COPIA DE DATOS
+-- ========================================
+-- Las columnas de partición pasan a ser NOT NULL; los registros antiguos sin
+-- fecha toman created_at.
+INSERT INTO ventas (
+    id_venta, numero_factura, id_cliente, id_empleado, id_caja,
+    fecha_venta, subtotal, descuento, total, metodo_pago, estado,
+    observaciones, created_at, updated_at
+)
+SELECT
+    id_venta, numero_factura, id_cliente, id_empleado, id_caja,
+    COALESCE(fecha_venta, created_at, CURRENT_TIMESTAMP), subtotal, descuento, total, metodo_pago, estado,
+    observaciones, created_at, updated_at
+FROM migracion_001.ventas;
+
+INSERT INTO ventas_numero_factura (numero_factura, id_venta, fecha_venta)
+SELECT numero_factura, id_venta, fecha_venta FROM ventas;
+
+INSERT INTO detalle_ventas (
+    id_detalle_venta, id_venta, fecha_venta, id_producto,
+    cantidad, precio_unitario, subtotal, created_at
+)
+SELECT
+    dv.id_detalle_venta, dv.id_venta, v.fecha_venta, dv.id_producto,
+    dv.cantidad, dv.precio_unitario, dv.subtotal, dv.created_at
+FROM migracion_001.detalle_ventas dv
+JOIN ventas v ON v.id_venta = dv.id_venta;
+
+INSERT INTO movimientos_caja (
+    id_movimiento, id_caja, tipo, concepto, monto,
+    fecha_movimiento, id_empleado, observaciones, created_at
+)
+SELECT
+    id_movimiento, id_caja, tipo, concepto, monto,
+    COALESCE(fecha_movimiento, created_at, CURRENT_TIMESTAMP), id_empleado, observaciones, created_at
+FROM migracion_001.movimientos_caja;
+
+INSERT INTO logs_sistema (
+    id_log, id_empleado, accion, tabla_afectada, id_registro,
+    descripcion, ip_address, fecha
+)
+SELECT
+    id_log, id_empleado, accion, tabla_afectada, id_registro,
+    descripcion, ip_address, COALESCE(fecha, CURRENT_TIMESTAMP)
+FROM migracion_001.logs_sistema;
+
+-- Verificar que no se perdió ningún registro antes de eliminar las tablas viejas
+DO $$
+DECLARE
+    v_tabla TEXT;
+    v_antes BIGINT;
+    v_despues BIGINT;
+BEGIN
+    FOREACH v_tabla IN ARRAY ARRAY['ventas', 'detalle_ventas', 'movimientos_caja', 'logs_sistema'] LOOP
+        EXECUTE format('SELECT COUNT(*) FROM migracion_001.%I', v_tabla) INTO v_antes;
+        EXECUTE format('SELECT COUNT(*) FROM %I', v_tabla) INTO v_despues;
+        IF v_antes <> v_despues THEN
+            RAISE EXCEPTION 'La copia de % no coincide: % filas antes, % después', v_tabla, v_antes, v_despues;
+        END IF;
+    END LOOP;
+END $$;
+
+-- ========================================
+-- 6. ÍNDICES, TRIGGERS Y SECUENCIAS
+-- ========================================
+-- Se crean después de la copia (más rápido); se propagan a cada partición.
+CREATE INDEX idx_ventas_fecha ON ventas(fecha_venta);
+CREATE INDEX idx_ventas_factura ON ventas(numero_factura);
+CREATE INDEX idx_ventas_cliente ON ventas(id_cliente);
+CREATE INDEX idx_ventas_empleado ON ventas(id_empleado);
+CREATE INDEX idx_ventas_caja ON ventas(id_caja);
+
+CREATE INDEX idx_detalle_ventas_venta ON detalle_ventas(id_venta);
+CREATE INDEX idx_detalle_ventas_producto ON detalle_ventas(id_producto);
+
+CREATE INDEX idx_movimientos_caja ON movimientos_caja(id_caja);
+CREATE INDEX idx_movimientos_tipo ON movimientos_caja(tipo);
+CREATE INDEX idx_movimientos_fecha ON movimientos_caja(fecha_movimiento);
+
+CREATE INDEX idx_logs_empleado ON logs_sistema(id_empleado);
+CREATE INDEX idx_logs_accion ON logs_sistema(accion);
+CREATE INDEX idx_logs_fecha ON logs_sistema(fecha);
+CREATE INDEX idx_logs_tabla ON logs_sistema(tabla_afectada);
+
+CREATE TRIGGER trigger_ventas_numero_factura
+    AFTER INSERT OR DELETE OR UPDATE OF numero_factura, fecha_venta ON ventas
+    FOR EACH ROW EXECUTE FUNCTION registrar_numero_factura();
+
+SELECT setval(pg_get_serial_sequence('ventas', 'id_venta'),
+              COALESCE((SELECT MAX(id_venta) FROM ventas), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('detalle_ventas', 'id_detalle_venta'),
+              COALESCE((SELECT MAX(id_detalle_venta) FROM detalle_ventas), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('movimientos_caja', 'id_movimiento'),
+              COALESCE((SELECT MAX(id_movimiento) FROM movimientos_caja), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('logs_sistema', 'id_log'),
+              COALESCE((SELECT MAX(id_log) FROM logs_sistema), 0) + 1, false);
+
+-- ========================================
+-- 7. VISTAS Y LIMPIEZA
+-- ========================================
+CREATE OR REPLACE VIEW vista_ventas_hoy AS
+SELECT
+    v.id_venta,
+    v.numero_factura,
+    CONCAT(pe.nombre, ' ', pe.apellido) as cliente,
+    CONCAT(emp.nombre, ' ', emp.apellido) as empleado,
+    v.fecha_venta,
+    v.total,
+    v.metodo_pago,
+    v.estado
+FROM ventas v
+LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
+LEFT JOIN personas pe ON c.id_persona = pe.id_persona
+LEFT JOIN empleados e ON v.id_empleado = e.id_empleado
+LEFT JOIN personas emp ON e.id_persona = emp.id_persona
+WHERE v.fecha_venta >= CURRENT_DATE
+AND v.fecha_venta < CURRENT_DATE + 1
+ORDER BY v.fecha_venta DESC;
+
+DROP SCHEMA migracion_001 CASCADE;
+
+-- Programar el mantenimiento nocturno si pg_cron está disponible
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('mantener_particiones', '0 3 * * *', 'SELECT mantener_particiones()');
+    END IF;
+END $$;
+
+COMMIT;
+
+ANALYZE ventas;
+ANALYZE ventas_numero_factura;
+ANALYZE detalle_ventas;
+ANALYZE movimientos_caja;
+ANALYZE logs_sistema;
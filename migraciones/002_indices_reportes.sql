@@ -0,0 +1,53 @@
+-- ========================================
+-- MIGRACIÓN 002: ÍNDICES PARA REPORTES
+-- PostgreSQL 12+ (requiere la migración 001)
+-- ========================================
+-- Ajusta los índices a las consultas reales de ReporteRepository,
+-- VentaRepository.listar y CajaService:
+--
+--   * cierre_caja_diario / cierre_caja_mensual / dashboard: rango sobre
+--     fecha_venta + SUM(total) por metodo_pago -> índice cubriente, index-only scan
+--   * VentaRepository.listar: ORDER BY fecha_venta DESC, id_venta DESC LIMIT n
+--     -> el mismo índice entrega el orden sin Sort
+--   * CajaService: movimientos WHERE id_caja = ? ORDER BY fecha_movimiento
+--     -> compuesto (id_caja, fecha_movimiento)
+--   * movimientos_caja.fecha_movimiento y logs_sistema.fecha solo crecen:
+--     BRIN en lugar de btree (mismo filtrado por rango, una fracción del tamaño
+--     y del costo de escritura)
+--   * movimientos_caja.tipo tiene dos valores posibles: el índice nunca se usa
+--
+-- Los índices sobre tablas particionadas no admiten CONCURRENTLY desde la tabla
+-- padre; ejecutar fuera del horario de ventas:
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/002_indices_reportes.sql
+--
+-- Para medir antes/después con el dataset de benchmark:
+--   python benchmarks/explicar_consultas.py --base-datos inventario_bench
+
+BEGIN;
+
+-- Ventas
+DROP INDEX IF EXISTS idx_ventas_fecha;
+CREATE INDEX idx_ventas_fecha_cubriente ON ventas(fecha_venta, id_venta) INCLUDE (total, metodo_pago, estado);
+
+-- Movimientos de caja
+DROP INDEX IF EXISTS idx_movimientos_caja;
+DROP INDEX IF EXISTS idx_movimientos_tipo;
+DROP INDEX IF EXISTS idx_movimientos_fecha;
+CREATE INDEX idx_movimientos_caja_fecha ON movimientos_caja(id_caja, fecha_movimiento);
+CREATE INDEX idx_movimientos_fecha_brin ON movimientos_caja USING brin(fecha_movimiento);
+
+-- Logs
+DROP INDEX IF EXISTS idx_logs_fecha;
+CREATE INDEX idx_logs_fecha_brin ON logs_sistema USING brin(fecha);
+
+-- Cajas: historial por empleado ordenado por apertura
+DROP INDEX IF EXISTS idx_cajas_empleado;
+CREATE INDEX idx_cajas_empleado_apertura ON cajas(id_empleado, fecha_apertura);
+
+COMMIT;
+
+-- El index-only scan depende del visibility map: VACUUM lo actualiza
+VACUUM ANALYZE ventas;
+VACUUM ANALYZE movimientos_caja;
+VACUUM ANALYZE cajas;
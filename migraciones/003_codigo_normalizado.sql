@@ -0,0 +1,46 @@
+-- ========================================
+-- MIGRACIÓN 003: CÓDIGO DE PRODUCTO NORMALIZADO
+-- PostgreSQL 12+
+-- ========================================
+-- ProductoRepository buscaba con WHERE LOWER(codigo) = LOWER(%s), que el
+-- índice sobre codigo no puede resolver (escaneo secuencial en cada alta,
+-- edición y lectura del escáner). Se agrega la columna generada
+-- codigo_normalizado = LOWER(TRIM(codigo)) con un índice único (sin columnas
+-- incluidas: ver 013).
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/003_codigo_normalizado.sql
+--
+-- Si existen códigos que solo difieren en mayúsculas o espacios la migración
+-- se detiene y los lista: corregirlos antes de volver a ejecutarla.
+
+BEGIN;
+
+DO $$
+DECLARE
+    v_duplicados TEXT;
+BEGIN
+    SELECT string_agg(format('%s (%s)', normalizado, codigos), ', ')
+    INTO v_duplicados
+    FROM (
+        SELECT LOWER(TRIM(codigo)) as normalizado, string_agg(codigo, ' / ') as codigos
+        FROM productos
+        GROUP BY LOWER(TRIM(codigo))
+        HAVING COUNT(*) > 1
+    ) d;
+
+    IF v_duplicados IS NOT NULL THEN
+        RAISE EXCEPTION 'Códigos duplicados sin distinguir mayúsculas: %', v_duplicados;
+    END IF;
+END $$;
+
+ALTER TABLE productos
+    ADD COLUMN codigo_normalizado VARCHAR(50) GENERATED ALWAYS AS (LOWER(TRIM(codigo))) STORED;
+
+CREATE UNIQUE INDEX idx_productos_codigo_normalizado ON productos(codigo_normalizado);
+
+-- Redundante con el índice de la restricción UNIQUE(codigo)
+DROP INDEX IF EXISTS idx_productos_codigo;
+
+COMMIT;
+
+VACUUM ANALYZE productos;
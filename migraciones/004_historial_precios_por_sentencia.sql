@@ -0,0 +1,50 @@
+-- ========================================
+-- MIGRACIÓN 004: HISTORIAL DE PRECIOS POR SENTENCIA
+-- PostgreSQL 12+
+-- ========================================
+-- trigger_historial_precios era FOR EACH ROW: un UPDATE que cambia el precio
+-- de 50k productos ejecutaba 50k veces la función y 50k INSERT individuales.
+-- Pasa a FOR EACH STATEMENT con tablas de transición (OLD/NEW TABLE): un solo
+-- INSERT ... SELECT por sentencia, sin importar cuántas filas cambió.
+--
+-- Además registra el empleado responsable cuando la aplicación fija
+-- app.id_empleado en la transacción (PrecioService lo hace con SET LOCAL).
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/004_historial_precios_por_sentencia.sql
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trigger_historial_precios ON productos;
+
+CREATE OR REPLACE FUNCTION registrar_cambio_precio()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO historial_precios (
+        id_producto,
+        precio_costo_anterior,
+        precio_venta_anterior,
+        precio_costo_nuevo,
+        precio_venta_nuevo,
+        id_empleado
+    )
+    SELECT
+        n.id_producto,
+        o.precio_costo,
+        o.precio_venta,
+        n.precio_costo,
+        n.precio_venta,
+        NULLIF(current_setting('app.id_empleado', true), '')::INT
+    FROM productos_nuevos n
+    JOIN productos_anteriores o ON o.id_producto = n.id_producto
+    WHERE o.precio_costo IS DISTINCT FROM n.precio_costo
+       OR o.precio_venta IS DISTINCT FROM n.precio_venta;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_historial_precios
+    AFTER UPDATE ON productos
+    REFERENCING OLD TABLE AS productos_anteriores NEW TABLE AS productos_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambio_precio();
+
+COMMIT;
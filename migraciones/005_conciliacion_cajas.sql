@@ -0,0 +1,42 @@
+-- ========================================
+-- MIGRACIÓN 005: CONCILIACIÓN DE CAJAS
+-- PostgreSQL 12+ (requiere la migración 001)
+-- ========================================
+-- cajas.total_ingresos / total_egresos son totales acumulados que actualizan
+-- CajaService y VentaRepository en la misma transacción que cada movimiento.
+-- CajaService.conciliar_caja / verificar_cajas_abiertas los comparan contra
+-- movimientos_caja con un solo GROUP BY tipo por caja:
+--
+--   * (id_caja, tipo) INCLUDE (monto) -> la suma por tipo de una caja es un
+--     index-only scan, sin visitar el heap de movimientos_caja
+--
+-- Además recalcula los totales de las cajas existentes con la definición que
+-- usa la conciliación: total_ingresos incluye el monto inicial (movimiento de
+-- apertura) y los movimientos manuales, que antes no se acumulaban.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/005_conciliacion_cajas.sql
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_movimientos_caja_tipo ON movimientos_caja(id_caja, tipo) INCLUDE (monto);
+
+UPDATE cajas c
+SET total_ingresos = t.ingresos,
+    total_egresos = t.egresos
+FROM (
+    SELECT c.id_caja,
+           COALESCE(SUM(m.monto) FILTER (WHERE m.tipo = 'ingreso'), 0) AS ingresos,
+           COALESCE(SUM(m.monto) FILTER (WHERE m.tipo = 'egreso'), 0) AS egresos
+    FROM cajas c
+    LEFT JOIN movimientos_caja m ON m.id_caja = c.id_caja
+    GROUP BY c.id_caja
+) t
+WHERE c.id_caja = t.id_caja
+AND (c.total_ingresos, c.total_egresos) IS DISTINCT FROM (t.ingresos, t.egresos);
+
+COMMENT ON COLUMN cajas.total_ingresos IS 'Suma de movimientos_caja de tipo ingreso (incluye el monto inicial)';
+COMMENT ON COLUMN cajas.total_egresos IS 'Suma de movimientos_caja de tipo egreso';
+
+COMMIT;
+
+ANALYZE movimientos_caja;
@@ -0,0 +1,23 @@
+-- ========================================
+-- MIGRACIÓN 006: HISTORIAL DE CAJAS PAGINADO
+-- PostgreSQL 12+
+-- ========================================
+-- CajaService.listar_historial pagina por cursor sobre
+-- (fecha_apertura, id_caja) descendente, con o sin filtro de empleado:
+--
+--   WHERE [id_empleado = ? AND] (fecha_apertura, id_caja) < (?, ?)
+--   ORDER BY fecha_apertura DESC, id_caja DESC LIMIT n
+--
+-- Con id_caja como desempate en el índice, cada página es un recorrido
+-- hacia atrás de n entradas, sin Sort y sin importar su profundidad.
+--
+-- cajas no está particionada: los índices se crean con CONCURRENTLY (no
+-- bloquea aperturas ni cierres) y por eso el script no usa BEGIN/COMMIT.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/006_historial_cajas.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cajas_historial ON cajas(fecha_apertura, id_caja);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cajas_empleado_historial ON cajas(id_empleado, fecha_apertura, id_caja);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_cajas_apertura;
+DROP INDEX CONCURRENTLY IF EXISTS idx_cajas_empleado_apertura;
@@ -0,0 +1,60 @@
+-- ========================================
+-- MIGRACIÓN 007: ESTADÍSTICAS DE COMPRA DE CLIENTES
+-- PostgreSQL 12+ (requiere la migración 001)
+-- ========================================
+-- ReporteRepository.cartera_clientes agrupaba todas las ventas de cada cliente
+-- para obtener cantidad de compras, monto y última compra. Ahora lee una fila
+-- por cliente: VentaRepository.crear/anular mantienen estas columnas en la
+-- misma transacción que la venta.
+--
+--   * cantidad_compras, fecha_ultima_compra: nuevas
+--   * ticket_promedio: columna generada (total_compras / cantidad_compras)
+--   * (id_cliente, fecha_venta): al anular la compra más reciente se busca la
+--     anterior con un recorrido de índice (reemplaza a idx_ventas_cliente)
+--
+-- Al final recalcula los valores desde ventas; el mismo recálculo está en
+-- `python mantener_agregados.py --recalcular clientes`.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/007_estadisticas_clientes.sql
+
+BEGIN;
+
+ALTER TABLE clientes
+    ADD COLUMN IF NOT EXISTS cantidad_compras INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS fecha_ultima_compra TIMESTAMP;
+
+ALTER TABLE clientes
+    ADD COLUMN IF NOT EXISTS ticket_promedio DECIMAL(12,2) GENERATED ALWAYS AS (
+        CASE WHEN cantidad_compras > 0 THEN ROUND(total_compras / cantidad_compras, 2) ELSE 0 END
+    ) STORED;
+
+COMMENT ON COLUMN clientes.total_compras IS 'Monto total de ventas completadas (lo mantiene VentaRepository)';
+COMMENT ON COLUMN clientes.cantidad_compras IS 'Ventas completadas del cliente (lo mantiene VentaRepository)';
+COMMENT ON COLUMN clientes.fecha_ultima_compra IS 'Fecha de la venta completada más reciente';
+
+DROP INDEX IF EXISTS idx_ventas_cliente;
+CREATE INDEX IF NOT EXISTS idx_ventas_cliente_fecha ON ventas(id_cliente, fecha_venta);
+
+-- Bloquea escrituras en clientes mientras se recalcula (las ventas con cliente esperan)
+LOCK TABLE clientes IN EXCLUSIVE MODE;
+
+UPDATE clientes c
+SET cantidad_compras = t.cantidad,
+    total_compras = t.total,
+    fecha_primera_compra = COALESCE(c.fecha_primera_compra, t.primera::date),
+    fecha_ultima_compra = t.ultima
+FROM (
+    SELECT c.id_cliente,
+           COUNT(v.id_venta) AS cantidad,
+           COALESCE(SUM(v.total), 0) AS total,
+           MIN(v.fecha_venta) AS primera,
+           MAX(v.fecha_venta) AS ultima
+    FROM clientes c
+    LEFT JOIN ventas v ON v.id_cliente = c.id_cliente AND v.estado = 'completada'
+    GROUP BY c.id_cliente
+) t
+WHERE c.id_cliente = t.id_cliente;
+
+COMMIT;
+
+ANALYZE clientes;
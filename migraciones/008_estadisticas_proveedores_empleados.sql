@@ -0,0 +1,92 @@
+-- ========================================
+-- MIGRACIÓN 008: ESTADÍSTICAS DE PROVEEDORES Y EMPLEADOS
+-- PostgreSQL 12+ (requiere la migración 001)
+-- ========================================
+-- ReporteRepository.cartera_proveedores / cartera_empleados agrupaban todas las
+-- compras y ventas en cada consulta. Ahora leen una fila por entidad de estas
+-- tablas, que CompraRepository y VentaRepository mantienen en la misma
+-- transacción que cada compra, venta o anulación (solo compras no canceladas
+-- y ventas completadas):
+--
+--   * estadisticas_proveedores / estadisticas_empleados: totales y última actividad
+--   * *_mes: cantidad y monto por mes calendario
+--   * (id_proveedor, fecha_compra) y (id_empleado, fecha_venta): al anular la
+--     compra/venta más reciente se busca la anterior con un recorrido de índice
+--     (reemplazan a idx_compras_proveedor e idx_ventas_empleado)
+--
+-- Al final calcula los valores desde compras y ventas; el mismo recálculo está en
+-- `python mantener_agregados.py --recalcular proveedores proveedores_mes empleados empleados_mes`.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/008_estadisticas_proveedores_empleados.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS estadisticas_proveedores (
+    id_proveedor INT PRIMARY KEY REFERENCES proveedores(id_proveedor) ON DELETE CASCADE,
+    cantidad_compras INT NOT NULL DEFAULT 0,
+    total_comprado DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ultima_compra TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_proveedores_mes (
+    id_proveedor INT NOT NULL REFERENCES proveedores(id_proveedor) ON DELETE CASCADE,
+    mes DATE NOT NULL,
+    cantidad_compras INT NOT NULL DEFAULT 0,
+    total_comprado DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_proveedor, mes)
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_empleados (
+    id_empleado INT PRIMARY KEY REFERENCES empleados(id_empleado) ON DELETE CASCADE,
+    cantidad_ventas INT NOT NULL DEFAULT 0,
+    total_vendido DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ultima_venta TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS estadisticas_empleados_mes (
+    id_empleado INT NOT NULL REFERENCES empleados(id_empleado) ON DELETE CASCADE,
+    mes DATE NOT NULL,
+    cantidad_ventas INT NOT NULL DEFAULT 0,
+    total_vendido DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_empleado, mes)
+);
+
+COMMENT ON TABLE estadisticas_proveedores IS 'Compras no canceladas por proveedor (incremental)';
+COMMENT ON TABLE estadisticas_empleados IS 'Ventas completadas por empleado (incremental)';
+
+DROP INDEX IF EXISTS idx_compras_proveedor;
+CREATE INDEX IF NOT EXISTS idx_compras_proveedor_fecha ON compras(id_proveedor, fecha_compra);
+DROP INDEX IF EXISTS idx_ventas_empleado;
+CREATE INDEX IF NOT EXISTS idx_ventas_empleado_fecha ON ventas(id_empleado, fecha_venta);
+
+-- Las compras y ventas que lleguen durante el cálculo esperan a que termine
+LOCK TABLE estadisticas_proveedores, estadisticas_proveedores_mes,
+           estadisticas_empleados, estadisticas_empleados_mes IN EXCLUSIVE MODE;
+
+TRUNCATE estadisticas_proveedores, estadisticas_proveedores_mes,
+         estadisticas_empleados, estadisticas_empleados_mes;
+
+INSERT INTO estadisticas_proveedores (id_proveedor, cantidad_compras, total_comprado, ultima_compra)
+SELECT id_proveedor, COUNT(*), SUM(total), MAX(fecha_compra)
+FROM compras WHERE estado <> 'cancelada'
+GROUP BY id_proveedor;
+
+INSERT INTO estadisticas_proveedores_mes (id_proveedor, mes, cantidad_compras, total_comprado)
+SELECT id_proveedor, date_trunc('month', fecha_compra)::date, COUNT(*), SUM(total)
+FROM compras WHERE estado <> 'cancelada'
+GROUP BY 1, 2;
+
+INSERT INTO estadisticas_empleados (id_empleado, cantidad_ventas, total_vendido, ultima_venta)
+SELECT id_empleado, COUNT(*), SUM(total), MAX(fecha_venta)
+FROM ventas WHERE estado = 'completada'
+GROUP BY id_empleado;
+
+INSERT INTO estadisticas_empleados_mes (id_empleado, mes, cantidad_ventas, total_vendido)
+SELECT id_empleado, date_trunc('month', fecha_venta)::date, COUNT(*), SUM(total)
+FROM ventas WHERE estado = 'completada'
+GROUP BY 1, 2;
+
+COMMIT;
+
+ANALYZE estadisticas_proveedores, estadisticas_proveedores_mes,
+        estadisticas_empleados, estadisticas_empleados_mes;
@@ -0,0 +1,56 @@
+-- ========================================
+-- MIGRACIÓN 009: VALORIZACIÓN DE INVENTARIO MATERIALIZADA
+-- PostgreSQL 12+
+-- ========================================
+-- ReporteRepository.productos_y_existencias calculaba el valor del inventario
+-- sobre todo el catálogo en cada consulta. Ahora lo lee de:
+--
+--   * valorizacion_inventario: vista materializada por categoría (al costo y
+--     a precio de venta), refrescada con REFRESH ... CONCURRENTLY por
+--     ValorizacionService (cada VALORIZACION_INTERVALO segundos o con
+--     `python valorizar_inventario.py`)
+--   * valorizacion_inventario_diaria: una foto por día y categoría
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/009_valorizacion_inventario.sql
+
+BEGIN;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS valorizacion_inventario AS
+SELECT
+    COALESCE(p.id_categoria, 0) AS id_categoria,
+    COALESCE(c.nombre, 'Sin categoría') AS categoria,
+    COUNT(*) AS productos,
+    COUNT(*) FILTER (WHERE p.stock_actual = 0) AS sin_stock,
+    COUNT(*) FILTER (WHERE p.stock_actual > 0 AND p.stock_actual <= p.stock_minimo) AS bajo_stock,
+    COALESCE(SUM(p.stock_actual), 0) AS unidades,
+    COALESCE(SUM(p.stock_actual * p.precio_costo), 0) AS valor_costo,
+    COALESCE(SUM(p.stock_actual * p.precio_venta), 0) AS valor_venta
+FROM productos p
+LEFT JOIN categorias c ON c.id_categoria = p.id_categoria
+WHERE p.estado = true
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_valorizacion_inventario_categoria ON valorizacion_inventario(id_categoria);
+
+CREATE TABLE IF NOT EXISTS valorizacion_inventario_diaria (
+    fecha DATE NOT NULL,
+    id_categoria INT NOT NULL,
+    categoria VARCHAR(50) NOT NULL,
+    productos INT NOT NULL,
+    unidades BIGINT NOT NULL,
+    valor_costo DECIMAL(16,2) NOT NULL,
+    valor_venta DECIMAL(16,2) NOT NULL,
+    actualizado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (fecha, id_categoria)
+);
+
+COMMENT ON MATERIALIZED VIEW valorizacion_inventario IS 'Valor del inventario por categoría (la refresca ValorizacionService)';
+COMMENT ON TABLE valorizacion_inventario_diaria IS 'Historial diario de valorizacion_inventario';
+
+-- Foto inicial del día
+INSERT INTO valorizacion_inventario_diaria (fecha, id_categoria, categoria, productos, unidades, valor_costo, valor_venta)
+SELECT CURRENT_DATE, id_categoria, categoria, productos, unidades, valor_costo, valor_venta
+FROM valorizacion_inventario
+ON CONFLICT (fecha, id_categoria) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,142 @@
+-- ========================================
+-- MIGRACIÓN 010: CHECKOUT EN UNA SOLA LLAMADA
+-- PostgreSQL 12+ (requiere las migraciones 007 y 008)
+-- ========================================
+-- registrar_venta(jsonb) hace en el servidor todo lo que VentaRepository.crear
+-- hace con varias sentencias desde Python: validación de stock, venta,
+-- detalles, stock, movimiento y totales de caja, y estadísticas del cliente y
+-- del vendedor. Con VENTAS_MODO_CHECKOUT=funcion el checkout es un único viaje
+-- de ida y vuelta.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/010_registrar_venta.sql
+
+-- Checkout completo en una sola llamada (VentaRepository en modo 'funcion'):
+-- sobre un enlace WAN cada viaje de ida y vuelta cuesta decenas de ms y el
+-- camino por sentencias hace uno por línea. Bloquea las tablas en el mismo
+-- orden que VentaRepository.crear (productos, caja, cliente, vendedor), los
+-- productos por id. Los errores de negocio se lanzan con SQLSTATE P0001 y el
+-- mensaje para el usuario.
+--
+-- p_venta: numero_factura, id_cliente, id_empleado, id_caja, fecha_venta
+-- (opcional), subtotal, descuento, total, metodo_pago, estado, observaciones
+-- y detalles: [{id_producto, cantidad, precio_unitario, subtotal}, ...]
+CREATE OR REPLACE FUNCTION registrar_venta(p_venta JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_id_venta INT;
+    v_fecha TIMESTAMP;
+    v_factura VARCHAR(50) := p_venta->>'numero_factura';
+    v_id_caja INT := (p_venta->>'id_caja')::INT;
+    v_id_cliente INT := (p_venta->>'id_cliente')::INT;
+    v_id_empleado INT := (p_venta->>'id_empleado')::INT;
+    v_total DECIMAL(10,2) := (p_venta->>'total')::DECIMAL;
+    v_metodo VARCHAR(20) := COALESCE(p_venta->>'metodo_pago', 'efectivo');
+    v_productos INT[];
+    v_cantidades INT[];
+    v_faltante RECORD;
+BEGIN
+    -- 1. Bloquear los productos en orden de id y validar el stock (las líneas
+    --    de un mismo producto se suman)
+    SELECT array_agg(d.id_producto ORDER BY d.id_producto), array_agg(d.cantidad ORDER BY d.id_producto)
+    INTO v_productos, v_cantidades
+    FROM (
+        SELECT id_producto, SUM(cantidad)::INT AS cantidad
+        FROM jsonb_to_recordset(p_venta->'detalles') AS x(id_producto INT, cantidad INT)
+        GROUP BY id_producto
+    ) d;
+
+    PERFORM 1
+    FROM productos p
+    WHERE p.id_producto = ANY (v_productos)
+    ORDER BY p.id_producto
+    FOR UPDATE;
+
+    SELECT l.id_producto, l.cantidad, p.nombre, p.stock_actual
+    INTO v_faltante
+    FROM unnest(v_productos, v_cantidades) AS l(id_producto, cantidad)
+    LEFT JOIN productos p ON p.id_producto = l.id_producto AND p.estado = true
+    WHERE p.id_producto IS NULL OR p.stock_actual < l.cantidad
+    ORDER BY l.id_producto
+    LIMIT 1;
+
+    IF FOUND THEN
+        IF v_faltante.nombre IS NULL THEN
+            RAISE EXCEPTION 'El producto con ID % no existe o está inactivo', v_faltante.id_producto;
+        END IF;
+        RAISE EXCEPTION 'Stock insuficiente para %. Disponible: %, Solicitado: %',
+            v_faltante.nombre, v_faltante.stock_actual, v_faltante.cantidad;
+    END IF;
+
+    -- 2. Venta
+    INSERT INTO ventas (
+        numero_factura, id_cliente, id_empleado, id_caja,
+        fecha_venta, subtotal, descuento, total,
+        metodo_pago, estado, observaciones
+    ) VALUES (
+        v_factura, v_id_cliente, v_id_empleado, v_id_caja,
+        COALESCE((p_venta->>'fecha_venta')::TIMESTAMP, LOCALTIMESTAMP),
+        (p_venta->>'subtotal')::DECIMAL, COALESCE((p_venta->>'descuento')::DECIMAL, 0), v_total,
+        v_metodo, COALESCE(p_venta->>'estado', 'completada'), p_venta->>'observaciones'
+    )
+    RETURNING id_venta, fecha_venta INTO v_id_venta, v_fecha;
+
+    -- 3. Detalles y stock
+    INSERT INTO detalle_ventas (id_venta, fecha_venta, id_producto, cantidad, precio_unitario, subtotal)
+    SELECT v_id_venta, v_fecha, d.id_producto, d.cantidad, d.precio_unitario, d.subtotal
+    FROM jsonb_to_recordset(p_venta->'detalles')
+        AS d(id_producto INT, cantidad INT, precio_unitario DECIMAL(10,2), subtotal DECIMAL(10,2));
+
+    UPDATE productos p
+    SET stock_actual = p.stock_actual - l.cantidad,
+        updated_at = CURRENT_TIMESTAMP
+    FROM unnest(v_productos, v_cantidades) AS l(id_producto, cantidad)
+    WHERE p.id_producto = l.id_producto;
+
+    -- 4. Caja: movimiento y totales (solo si sigue abierta)
+    INSERT INTO movimientos_caja (
+        id_caja, tipo, concepto, monto, fecha_movimiento, id_empleado, observaciones
+    ) VALUES (
+        v_id_caja, 'ingreso', 'Venta - Factura ' || v_factura, v_total,
+        LOCALTIMESTAMP, v_id_empleado, 'Método de pago: ' || v_metodo
+    );
+
+    UPDATE cajas
+    SET total_ventas = total_ventas + v_total,
+        total_ingresos = total_ingresos + v_total
+    WHERE id_caja = v_id_caja AND estado = 'abierta';
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'La caja fue cerrada. Abra una caja para continuar vendiendo.';
+    END IF;
+
+    -- 5. Estadísticas del cliente y del vendedor
+    IF v_id_cliente IS NOT NULL THEN
+        UPDATE clientes
+        SET cantidad_compras = cantidad_compras + 1,
+            total_compras = total_compras + v_total,
+            fecha_primera_compra = COALESCE(fecha_primera_compra, v_fecha::DATE),
+            fecha_ultima_compra = GREATEST(fecha_ultima_compra, v_fecha),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id_cliente = v_id_cliente;
+    END IF;
+
+    INSERT INTO estadisticas_empleados AS e (id_empleado, cantidad_ventas, total_vendido, ultima_venta)
+    VALUES (v_id_empleado, 1, v_total, v_fecha)
+    ON CONFLICT (id_empleado) DO UPDATE
+    SET cantidad_ventas = e.cantidad_ventas + 1,
+        total_vendido = e.total_vendido + EXCLUDED.total_vendido,
+        ultima_venta = GREATEST(e.ultima_venta, EXCLUDED.ultima_venta);
+
+    INSERT INTO estadisticas_empleados_mes AS m (id_empleado, mes, cantidad_ventas, total_vendido)
+    VALUES (v_id_empleado, date_trunc('month', v_fecha)::DATE, 1, v_total)
+    ON CONFLICT (id_empleado, mes) DO UPDATE
+    SET cantidad_ventas = m.cantidad_ventas + 1,
+        total_vendido = m.total_vendido + EXCLUDED.total_vendido;
+
+    RETURN jsonb_build_object(
+        'id_venta', v_id_venta,
+        'numero_factura', v_factura,
+        'fecha_venta', v_fecha
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,24 @@
+-- ========================================
+-- MIGRACIÓN 012: CAMBIOS DEL CATÁLOGO POR updated_at
+-- PostgreSQL 12+
+-- ========================================
+-- Las terminales guardan una copia del catálogo (pos_local.db) y al abrir una
+-- venta solo piden lo que cambió desde la última copia:
+--   ProductoRepository.listar_cambios_para_ventas y ClienteRepository.listar_cambios
+--
+-- * categorias no tenía trigger de updated_at: desactivar una categoría debe
+--   llegar a las terminales como cambio de sus productos
+-- * Los índices de la consulta de cambios van por version_catalogo
+--   (migraciones/014_version_catalogo.sql): un índice por updated_at impide
+--   que el descuento de stock de cada venta sea HOT
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/012_cambios_catalogo.sql
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trigger_categorias_updated_at ON categorias;
+CREATE TRIGGER trigger_categorias_updated_at
+    BEFORE UPDATE ON categorias
+    FOR EACH ROW EXECUTE FUNCTION actualizar_updated_at();
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- ========================================
+-- MIGRACIÓN 013: ÍNDICE DE CÓDIGO NORMALIZADO SIN COLUMNAS INCLUIDAS
+-- PostgreSQL 12+
+-- ========================================
+-- La migración 003 creó idx_productos_codigo_normalizado con
+-- INCLUDE (..., precio_venta, stock_actual, estado). Cada línea de venta
+-- descuenta stock_actual; con esa columna en un índice ninguna de esas
+-- actualizaciones puede ser HOT y todas escriben en cada índice de productos.
+-- El index-only scan del escáner tampoco se daba en los productos que más se
+-- venden (sus páginas casi nunca están marcadas all-visible). Queda un índice
+-- único simple: la búsqueda por código sigue siendo un index scan de una fila.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/013_codigo_normalizado_sin_include.sql
+--
+-- CONCURRENTLY no bloquea las ventas mientras se construye; por eso la
+-- migración no va en una transacción.
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_productos_codigo_normalizado_simple
+    ON productos(codigo_normalizado);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_productos_codigo_normalizado;
+
+ALTER INDEX idx_productos_codigo_normalizado_simple RENAME TO idx_productos_codigo_normalizado;
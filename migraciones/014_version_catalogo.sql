@@ -0,0 +1,87 @@
+-- ========================================
+-- MIGRACIÓN 014: CAMBIOS DEL CATÁLOGO POR version_catalogo
+-- PostgreSQL 12+
+-- ========================================
+-- La migración 012 indexó updated_at de productos, clientes y personas para
+-- las copias locales de las terminales. Pero cada venta descuenta
+-- stock_actual (updated_at de productos) y actualiza las estadísticas del
+-- cliente (updated_at de clientes): con updated_at en un índice ninguna de
+-- esas actualizaciones es HOT y todas escriben en cada índice de la tabla.
+--
+-- version_catalogo guarda el id de la transacción que cambió por última vez
+-- las columnas que copian las terminales; el trigger no lo toca cuando solo
+-- cambian stock_actual o las estadísticas, así que la venta no escribe en su
+-- índice. Las terminales piden los cambios con
+-- version_catalogo >= txid_snapshot_xmin(...) de su consulta anterior: toda
+-- transacción que esa consulta no vio tiene un id mayor o igual.
+-- Las existencias se copian aparte (ProductoRepository.listar_existencias).
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/014_version_catalogo.sql
+--
+-- Los índices se crean y borran con CONCURRENTLY para no bloquear las ventas;
+-- esa parte no va en una transacción.
+
+BEGIN;
+
+-- Sin valor para las filas existentes (no reescribe las tablas): las
+-- terminales hacen una copia completa la primera vez que usan esta marca
+ALTER TABLE productos ADD COLUMN IF NOT EXISTS version_catalogo BIGINT;
+ALTER TABLE categorias ADD COLUMN IF NOT EXISTS version_catalogo BIGINT;
+ALTER TABLE clientes ADD COLUMN IF NOT EXISTS version_catalogo BIGINT;
+ALTER TABLE personas ADD COLUMN IF NOT EXISTS version_catalogo BIGINT;
+
+ALTER TABLE productos ALTER COLUMN version_catalogo SET DEFAULT txid_current();
+ALTER TABLE categorias ALTER COLUMN version_catalogo SET DEFAULT txid_current();
+ALTER TABLE clientes ALTER COLUMN version_catalogo SET DEFAULT txid_current();
+ALTER TABLE personas ALTER COLUMN version_catalogo SET DEFAULT txid_current();
+
+CREATE OR REPLACE FUNCTION marcar_version_catalogo()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version_catalogo = txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_productos_version_catalogo ON productos;
+CREATE TRIGGER trigger_productos_version_catalogo
+    BEFORE UPDATE ON productos
+    FOR EACH ROW
+    WHEN ((OLD.codigo, OLD.nombre, OLD.id_categoria, OLD.precio_venta, OLD.stock_minimo, OLD.unidad_medida, OLD.estado)
+          IS DISTINCT FROM
+          (NEW.codigo, NEW.nombre, NEW.id_categoria, NEW.precio_venta, NEW.stock_minimo, NEW.unidad_medida, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+DROP TRIGGER IF EXISTS trigger_categorias_version_catalogo ON categorias;
+CREATE TRIGGER trigger_categorias_version_catalogo
+    BEFORE UPDATE ON categorias
+    FOR EACH ROW
+    WHEN ((OLD.nombre, OLD.estado) IS DISTINCT FROM (NEW.nombre, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+DROP TRIGGER IF EXISTS trigger_clientes_version_catalogo ON clientes;
+CREATE TRIGGER trigger_clientes_version_catalogo
+    BEFORE UPDATE ON clientes
+    FOR EACH ROW
+    WHEN ((OLD.id_persona, OLD.tipo_cliente, OLD.descuento_habitual, OLD.estado)
+          IS DISTINCT FROM
+          (NEW.id_persona, NEW.tipo_cliente, NEW.descuento_habitual, NEW.estado))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+DROP TRIGGER IF EXISTS trigger_personas_version_catalogo ON personas;
+CREATE TRIGGER trigger_personas_version_catalogo
+    BEFORE UPDATE ON personas
+    FOR EACH ROW
+    WHEN ((OLD.nombre, OLD.apellido, OLD.dpi_nit) IS DISTINCT FROM (NEW.nombre, NEW.apellido, NEW.dpi_nit))
+    EXECUTE FUNCTION marcar_version_catalogo();
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_productos_version_catalogo ON productos(version_catalogo);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_categorias_version_catalogo ON categorias(version_catalogo);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_version_catalogo ON clientes(version_catalogo);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personas_version_catalogo ON personas(version_catalogo);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_productos_updated_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_updated_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_personas_updated_at;
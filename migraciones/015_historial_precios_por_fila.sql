@@ -0,0 +1,58 @@
+-- ========================================
+-- MIGRACIÓN 015: HISTORIAL DE PRECIOS SOLO CUANDO CAMBIA EL PRECIO
+-- PostgreSQL 12+
+-- ========================================
+-- La migración 004 dejó trigger_historial_precios FOR EACH STATEMENT con
+-- tablas de transición. Ese trigger se dispara con cualquier UPDATE de
+-- productos: cada línea de venta (venta_restar_stock, que solo descuenta
+-- stock_actual) copiaba la fila vieja y la nueva a las tablas de transición
+-- y ejecutaba el INSERT ... SELECT con su JOIN, para no insertar nada.
+--
+-- Pasa a FOR EACH ROW con UPDATE OF precio_costo, precio_venta y un WHEN: un
+-- UPDATE que no asigna esas columnas (el checkout, las compras anuladas, las
+-- estadísticas) ni siquiera evalúa el trigger, y las filas cuyo precio no
+-- cambió no ejecutan la función. Las tablas de transición no admiten lista
+-- de columnas ni WHEN sobre OLD/NEW; por eso ya no es por sentencia.
+--
+-- El cambio masivo de precios (PrecioService, miles de filas) escribe su
+-- historial él mismo con un solo INSERT ... SELECT y fija
+-- app.historial_precios = 'lote' en la transacción para que el trigger no
+-- repita cada fila.
+--
+--   psql -d sistema_inventario -v ON_ERROR_STOP=1 -f migraciones/015_historial_precios_por_fila.sql
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trigger_historial_precios ON productos;
+
+CREATE OR REPLACE FUNCTION registrar_cambio_precio()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO historial_precios (
+        id_producto,
+        precio_costo_anterior,
+        precio_venta_anterior,
+        precio_costo_nuevo,
+        precio_venta_nuevo,
+        id_empleado
+    )
+    VALUES (
+        NEW.id_producto,
+        OLD.precio_costo,
+        OLD.precio_venta,
+        NEW.precio_costo,
+        NEW.precio_venta,
+        NULLIF(current_setting('app.id_empleado', true), '')::INT
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_historial_precios
+    AFTER UPDATE OF precio_costo, precio_venta ON productos
+    FOR EACH ROW
+    WHEN ((OLD.precio_costo, OLD.precio_venta) IS DISTINCT FROM (NEW.precio_costo, NEW.precio_venta)
+          AND current_setting('app.historial_precios', true) IS DISTINCT FROM 'lote')
+    EXECUTE FUNCTION registrar_cambio_precio();
+
+COMMIT;
@@ -0,0 +1,144 @@
+"""
+Almacén local del punto de venta (SQLite)
+Copia del catálogo y de las sesiones para vender sin conexión, y cola durable
+de ventas pendientes de enviar al servidor
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id_producto INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    codigo_normalizado TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    id_categoria INTEGER,
+    nombre_categoria TEXT,
+    precio_venta REAL NOT NULL,
+    stock_actual INTEGER NOT NULL,
+    stock_minimo INTEGER NOT NULL DEFAULT 0,
+    unidad_medida TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_productos_codigo ON productos(codigo_normalizado);
+
+CREATE TABLE IF NOT EXISTS clientes (
+    id_cliente INTEGER PRIMARY KEY,
+    id_persona INTEGER,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    dpi_nit TEXT,
+    tipo_cliente TEXT NOT NULL,
+    descuento_habitual REAL NOT NULL DEFAULT 0
+);
+
+-- Empleados que iniciaron sesión en esta terminal con el servidor disponible
+CREATE TABLE IF NOT EXISTS sesiones (
+    usuario TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    id_empleado INTEGER NOT NULL,
+    empleado TEXT NOT NULL,
+    permisos TEXT NOT NULL,
+    caja TEXT,
+    actualizado TEXT NOT NULL
+);
+
+-- Sesiones de versiones anteriores, con el hash SHA-256 del servidor en lugar
+-- de bcrypt: se descartan (el empleado vuelve a iniciar sesión con conexión)
+DELETE FROM sesiones WHERE password NOT LIKE '$2%';
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+-- estado: pendiente, sincronizada, conflicto, revisada
+CREATE TABLE IF NOT EXISTS ventas_pendientes (
+    clave TEXT PRIMARY KEY,
+    id_caja INTEGER NOT NULL,
+    numero_factura TEXT NOT NULL,
+    total REAL NOT NULL,
+    venta TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    id_venta INTEGER,
+    mensaje TEXT,
+    creada TEXT NOT NULL,
+    sincronizada TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ventas_pendientes_estado ON ventas_pendientes(estado, creada);
+"""
+
+
+def ruta_almacen_local() -> str:
+    """Ruta del archivo: POS_LOCAL_DB o, por defecto, junto a la configuración del usuario"""
+    ruta = os.getenv('POS_LOCAL_DB')
+    if ruta:
+        return ruta
+    if os.getenv('APPDATA'):
+        return os.path.join(os.getenv('APPDATA'), 'SistemaInventario', 'pos_local.db')
+    return os.path.join(os.path.expanduser('~'), '.sistema_inventario', 'pos_local.db')
+
+
+def mmap_almacen_local() -> int:
+    """Bytes del archivo que SQLite lee por mmap (POS_LOCAL_MMAP_MB, por defecto 256)"""
+    return int(os.getenv('POS_LOCAL_MMAP_MB', '256') or 0) * 1024 * 1024
+
+
+class AlmacenLocal:
+    """
+    Clase Singleton para el archivo SQLite local
+    Cada operación abre su propia conexión (la vista y el hilo de
+    sincronización escriben a la vez); WAL permite leer mientras se escribe.
+    El archivo se lee por mmap: abrir una conexión no carga nada y las
+    páginas del catálogo se leen directamente de la caché del sistema
+    operativo, sin copiarlas a la caché de cada conexión
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instancia = super(AlmacenLocal, cls).__new__(cls)
+                instancia._inicializar()
+                cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        """Crea el archivo y las tablas si no existen"""
+        self.ruta = ruta_almacen_local()
+        self.mmap = mmap_almacen_local()
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        connection = sqlite3.connect(self.ruta)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_ESQUEMA)
+            connection.commit()
+        finally:
+            connection.close()
+
+    @contextmanager
+    def conexion(self):
+        """
+        Conexión en una transacción: COMMIT al salir, ROLLBACK si hay error
+
+        synchronous=FULL: una venta encolada sobrevive a un corte de energía
+        """
+        connection = sqlite3.connect(self.ruta, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute(f"PRAGMA mmap_size={self.mmap}")
+        try:
+            yield connection
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
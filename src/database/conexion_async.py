@@ -0,0 +1,168 @@
+"""
+Conexión asíncrona a PostgreSQL (psycopg 3, opcional)
+Pool asíncrono con pipeline mode: las consultas independientes de los
+contadores del dashboard se envían juntas y sus resultados vuelven en un solo
+viaje de red, en lugar de una ida y vuelta por consulta como con
+DatabaseConnection (psycopg2). Los reportes no lo usan: necesitan el límite
+de tiempo, la cancelación, la réplica y el snapshot de DatabaseConnection.
+
+Se activa con DB_ASYNC=si y requiere:
+    pip install "psycopg[binary,pool]>=3.1"
+"""
+import asyncio
+import os
+import threading
+import time
+
+from utils.metricas import ESPERA_CONEXION
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    psycopg = None
+
+
+_aviso_sin_psycopg = False
+
+
+def backend_async_activo() -> bool:
+    """
+    True si DB_ASYNC está activado y psycopg 3 instalado (las vistas y
+    servicios usan entonces las variantes *_async)
+    """
+    global _aviso_sin_psycopg
+    if os.getenv('DB_ASYNC', 'no').lower() not in ('si', 'sí', '1', 'true'):
+        return False
+    if psycopg is None:
+        if not _aviso_sin_psycopg:
+            print("[ADVERTENCIA] DB_ASYNC activado pero psycopg 3 no está instalado; se usa psycopg2")
+            _aviso_sin_psycopg = True
+        return False
+    return True
+
+
+class AsyncDatabaseConnection:
+    """
+    Clase Singleton para el pool asíncrono
+    El pool vive en un bucle de eventos propio (hilo daemon): la interfaz
+    (Flet) es sincrónica y ejecuta las corrutinas con ejecutar(). Se usa un
+    SelectorEventLoop porque psycopg no funciona con el Proactor por defecto
+    de Windows.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instancia = super(AsyncDatabaseConnection, cls).__new__(cls)
+                instancia._initialize_pool()
+                cls._instance = instancia
+        return cls._instance
+
+    def _initialize_pool(self):
+        """Inicia el bucle de eventos y abre el pool de conexiones"""
+        if psycopg is None:
+            raise RuntimeError('El backend asíncrono requiere psycopg 3: pip install "psycopg[binary,pool]"')
+
+        self._bucle = asyncio.SelectorEventLoop()
+        threading.Thread(target=self._bucle.run_forever, daemon=True).start()
+        try:
+            self._pool = self.ejecutar(self._crear_pool())
+            print("[OK] Pool de conexiones asíncrono creado exitosamente")
+        except Exception as e:
+            self._bucle.call_soon_threadsafe(self._bucle.stop)
+            print(f"[ERROR] Error al crear pool asíncrono: {e}")
+            raise
+
+    async def _crear_pool(self):
+        # Se crea dentro del bucle: las primitivas de asyncio del pool quedan asociadas a él
+        timeout = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+        pool = AsyncConnectionPool(
+            min_size=1,
+            max_size=10,
+            open=False,
+            kwargs={
+                'host': os.getenv('DB_HOST', 'localhost'),
+                'port': os.getenv('DB_PORT', '5432'),
+                'dbname': os.getenv('DB_NAME', 'sistema_inventario'),
+                'user': os.getenv('DB_USER', 'postgres'),
+                'password': os.getenv('DB_PASSWORD', ''),
+                'connect_timeout': timeout,
+                'row_factory': dict_row
+            }
+        )
+        await pool.open(wait=True, timeout=timeout)
+        return pool
+
+    def ejecutar(self, corrutina):
+        """Ejecuta una corrutina en el bucle del pool y espera su resultado (desde código sincrónico)"""
+        return asyncio.run_coroutine_threadsafe(corrutina, self._bucle).result()
+
+    async def execute_query(self, query, params=None, fetch=True):
+        """
+        Ejecuta una consulta SQL (mismos argumentos y resultados que
+        DatabaseConnection.execute_query)
+        """
+        resultados = await self.execute_pipeline([(query, params, fetch)])
+        return resultados[0]
+
+    async def execute_pipeline(self, consultas):
+        """
+        Ejecuta varias consultas independientes en pipeline mode: se envían
+        todas sin esperar respuesta y los resultados llegan en un solo viaje.
+        Corren en la misma conexión y transacción (un error revierte todas).
+
+        Args:
+            consultas: Lista de (query, params, fetch) con fetch como en execute_query
+
+        Returns:
+            Lista con el resultado de cada consulta, en el mismo orden
+        """
+        query = None
+        try:
+            inicio = time.perf_counter()
+            async with self._pool.connection() as connection:
+                ESPERA_CONEXION.observe(time.perf_counter() - inicio)
+
+                cursores = []
+                async with connection.pipeline():
+                    for query, params, _ in consultas:
+                        cursor = connection.cursor()
+                        await cursor.execute(query, params)
+                        cursores.append(cursor)
+
+                # Al salir del bloque pipeline ya llegaron todos los resultados
+                resultados = []
+                for cursor, (_, _, fetch) in zip(cursores, consultas):
+                    if fetch == 'one':
+                        resultados.append(await cursor.fetchone())
+                    elif fetch == 'all' or fetch is True:
+                        resultados.append(await cursor.fetchall())
+                    else:
+                        resultados.append(cursor.rowcount)
+                    await cursor.close()
+                return resultados
+
+        except Exception as e:
+            print(f"[ERROR] Error ejecutando pipeline: {e}")
+            print(f"Query: {query}")
+            raise
+
+    def close_all_connections(self):
+        """Cierra el pool y detiene el bucle de eventos"""
+        try:
+            self.ejecutar(self._pool.close())
+            self._bucle.call_soon_threadsafe(self._bucle.stop)
+            AsyncDatabaseConnection._instance = None
+            print("[OK] Pool de conexiones asíncrono cerrado")
+        except Exception as e:
+            print(f"[ERROR] Error al cerrar pool asíncrono: {e}")
+
+
+# Función helper para obtener la instancia
+def get_db_async():
+    """Retorna la instancia singleton de AsyncDatabaseConnection"""
+    return AsyncDatabaseConnection()
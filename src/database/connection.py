@@ -2,11 +2,18 @@
 Conexión a la base de datos PostgreSQL usando patrón Singleton
 """
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import errors, extensions, pool
 from psycopg2.extras import RealDictCursor
+from contextlib import contextmanager
+import functools
 import os
+import threading
 from dotenv import load_dotenv
 import json
+import time
+from utils.metricas import (
+    CONEXIONES_EN_USO, CONEXIONES_LECTURA, CONEXIONES_LIBRES, ESPERA_CONEXION, RETRASO_REPLICA
+)
 
 # Intentar cargar desde diferentes ubicaciones
 def cargar_configuracion():
@@ -42,50 +49,476 @@ def cargar_configuracion():
 cargar_configuracion()
 
 
+class SentenciaPreparadaPerdida(psycopg2.OperationalError):
+    """
+    El servidor no tiene (o ya tenía) la sentencia preparada que esperaba la
+    conexión: la sesión no es estable, típico de PgBouncer en modo
+    transaction/statement. Se desactivan las sentencias preparadas y, como
+    OperationalError, los llamadores que reintentan lo hacen con el texto SQL.
+    """
+
+
+class ConsultaCancelada(extensions.QueryCanceledError):
+    """La operación se canceló con TokenCancelacion.cancelar()"""
+
+
+class TokenCancelacion:
+    """
+    Permite cancelar desde otro hilo (p. ej. un botón de la interfaz) las
+    consultas de una operación iniciada con DatabaseConnection.limitar().
+    cancelar() interrumpe en el servidor la consulta en curso de cada conexión
+    vinculada (connection.cancel()) y las siguientes fallan sin ejecutarse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conexiones = set()
+        self.cancelado = False
+        self.tiempo_agotado = False  # alguna consulta superó statement_timeout
+
+    def cancelar(self):
+        # Bajo el lock: ninguna conexión vuelve al pool (y a otra operación)
+        # mientras se le envía la cancelación
+        with self._lock:
+            self.cancelado = True
+            for connection in self._conexiones:
+                try:
+                    connection.cancel()
+                except Exception as e:
+                    print(f"[ADVERTENCIA] No se pudo cancelar la consulta: {e}")
+
+    def verificar(self):
+        """Lanza ConsultaCancelada si ya se pidió la cancelación"""
+        if self.cancelado:
+            raise ConsultaCancelada('Operación cancelada por el usuario')
+
+    def _vincular(self, connection):
+        with self._lock:
+            self.verificar()
+            self._conexiones.add(connection)
+
+    def _desvincular(self, connection):
+        with self._lock:
+            self._conexiones.discard(connection)
+
+
+class SentenciaPreparada:
+    """
+    Consulta frecuente que cada conexión prepara (PREPARE) la primera vez y
+    luego solo ejecuta (EXECUTE): PostgreSQL no vuelve a analizarla ni a
+    planificarla en cada llamada. Se crea con DatabaseConnection.registrar_sentencia.
+    """
+
+    def __init__(self, nombre: str, query: str):
+        if '%(' in query:
+            raise ValueError(f"La sentencia {nombre} debe usar parámetros posicionales (%s)")
+        self.nombre = nombre
+        self.query = query
+
+        # %s -> $1, $2, ... para PREPARE; EXECUTE recibe los valores con %s
+        partes = query.split('%s')
+        self.parametros = len(partes) - 1
+        self.sql_prepare = f"PREPARE {nombre} AS " + partes[0] + ''.join(
+            f'${i}{parte}' for i, parte in enumerate(partes[1:], start=1)
+        )
+        self.sql_execute = f"EXECUTE {nombre}" + (
+            f" ({', '.join(['%s'] * self.parametros)})" if self.parametros else ''
+        )
+
+    def __str__(self):
+        return self.query
+
+
+class _ConexionPreparada(extensions.connection):
+    """Conexión del pool que recuerda qué sentencias ya preparó en su sesión"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+        self.replica = False  # True si salió del pool de la réplica
+        self.token = None  # TokenCancelacion de la operación que la usa
+        self.limitada = False  # statement_timeout de sesión pendiente de restablecer
+
+
+class _PoolConexiones(pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool que conserva las conexiones devueltas
+
+    psycopg2 cierra toda conexión devuelta si ya hay `minconn` libres: con
+    varios hilos usando el pool a la vez, las conexiones de más se cerraban
+    y con ellas sus sentencias preparadas. Aquí minconn son solo las que se
+    abren al crear el pool (inicio rápido); las que se abran después quedan
+    libres para reutilizarse, hasta maxconn.
+    """
+
+    def _putconn(self, conn, key=None, close=False):
+        # putconn ya tiene el lock del pool: psycopg2 conserva la conexión
+        # mientras haya menos de minconn libres
+        minconn = self.minconn
+        self.minconn = self.maxconn
+        try:
+            super()._putconn(conn, key, close)
+        finally:
+            self.minconn = minconn
+
+
+# Métodos de solo lectura en curso en este hilo (ver solo_lectura)
+_contexto = threading.local()
+
+
+def solo_lectura(metodo):
+    """
+    Marca un método de repositorio que solo lee (reportes): las conexiones
+    que pida mientras se ejecuta salen de la réplica si hay una configurada
+    (DB_REPLICA_HOST) y su retraso está dentro del límite; si no, del primario.
+    El método no debe escribir: la réplica es de solo lectura.
+    """
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        anterior = getattr(_contexto, 'lectura', False)
+        _contexto.lectura = True
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            _contexto.lectura = anterior
+    return envoltura
+
+
+# Retraso de la réplica en segundos: 0 si está al día o si no es un standby
+# (p. ej. un segundo PostgreSQL local para pruebas)
+_RETRASO_REPLICA = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def sentencias_preparadas_configuradas() -> bool:
+    """DB_SENTENCIAS_PREPARADAS=no las desactiva (PgBouncer en modo transaction/statement)"""
+    return os.getenv('DB_SENTENCIAS_PREPARADAS', 'si').lower() not in ('no', '0', 'false')
+
+
 class DatabaseConnection:
     """
     Clase Singleton para manejar la conexión a PostgreSQL
-    Utiliza connection pooling para mejor rendimiento
+    Utiliza connection pooling para mejor rendimiento. El pool se comparte
+    entre la interfaz y los hilos de fondo (arranque, auditoría de cajas,
+    valorización, sincronización, trabajadores de reportes): es un
+    ThreadedConnectionPool, que protege getconn/putconn con un lock, y
+    conserva las conexiones devueltas (ver _PoolConexiones).
     """
     _instance = None
+    _lock = threading.Lock()
     _connection_pool = None
+    _replica_pool = None
+    
+    # Sentencias registradas (nombre -> SentenciaPreparada) y si se preparan
+    _sentencias = {}
+    _sentencias_lock = threading.Lock()
+    preparadas_activas = sentencias_preparadas_configuradas()
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(DatabaseConnection, cls).__new__(cls)
-            cls._instance._initialize_pool()
+        with cls._lock:
+            if cls._instance is None:
+                instancia = super(DatabaseConnection, cls).__new__(cls)
+                # Si el servidor no responde no queda una instancia sin pool: el
+                # siguiente intento vuelve a conectar
+                instancia._initialize_pool()
+                instancia._initialize_replica()
+                cls._instance = instancia
         return cls._instance
 
     def _initialize_pool(self):
         """Inicializa el pool de conexiones"""
         try:
-            self._connection_pool = psycopg2.pool.SimpleConnectionPool(
-                minconn=1,
+            self._connection_pool = _PoolConexiones(
+                minconn=int(os.getenv('DB_POOL_MIN', '1') or 1),
                 maxconn=10,
                 host=os.getenv('DB_HOST', 'localhost'),
                 port=os.getenv('DB_PORT', '5432'),
                 database=os.getenv('DB_NAME', 'sistema_inventario'),
                 user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', '')
+                password=os.getenv('DB_PASSWORD', ''),
+                connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+                connection_factory=_ConexionPreparada
             )
             print("[OK] Pool de conexiones creado exitosamente")
+            
+            # Exponer el uso del pool en las métricas
+            CONEXIONES_EN_USO.set_funcion(lambda: len(self._connection_pool._used))
+            CONEXIONES_LIBRES.set_funcion(lambda: len(self._connection_pool._pool))
         except Exception as e:
             print(f"[ERROR] Error al crear pool de conexiones: {e}")
             raise
 
-    def get_connection(self):
-        """Obtiene una conexión del pool"""
+    def _initialize_replica(self):
+        """
+        Configura la réplica de lectura (DB_REPLICA_HOST); su pool se crea con
+        la primera verificación para que una réplica caída no demore el inicio
+        
+        Variables:
+            DB_REPLICA_HOST, DB_REPLICA_PORT, DB_REPLICA_NAME, DB_REPLICA_USER,
+            DB_REPLICA_PASSWORD: conexión (las que falten, iguales al primario)
+            DB_REPLICA_RETRASO_MAX: segundos de retraso tolerados (por defecto 30)
+            DB_REPLICA_INTERVALO: segundos entre verificaciones del retraso (por defecto 5)
+            DB_REPLICA_ESPERA_MAX: máximo de segundos entre verificaciones
+                mientras la réplica no responde (por defecto 300)
+        """
+        self.replica_host = os.getenv('DB_REPLICA_HOST')
+        self.replica_retraso_max = float(os.getenv('DB_REPLICA_RETRASO_MAX', '30') or 30)
+        self.replica_intervalo = float(os.getenv('DB_REPLICA_INTERVALO', '5') or 5)
+        self.replica_espera_max = float(os.getenv('DB_REPLICA_ESPERA_MAX', '300') or 300)
+        self.replica_retraso = None
+        self._replica_ok = False
+        self._replica_proxima = 0.0  # time.monotonic() de la siguiente verificación
+        self._replica_fallos = 0
+        self._replica_verificando = False
+        self._replica_lock = threading.Lock()
+    
+    def _crear_pool_replica(self):
+        return _PoolConexiones(
+            minconn=1,
+            maxconn=int(os.getenv('DB_REPLICA_MAXCONN', '5') or 5),
+            host=self.replica_host,
+            port=os.getenv('DB_REPLICA_PORT') or os.getenv('DB_PORT', '5432'),
+            database=os.getenv('DB_REPLICA_NAME') or os.getenv('DB_NAME', 'sistema_inventario'),
+            user=os.getenv('DB_REPLICA_USER') or os.getenv('DB_USER', 'postgres'),
+            password=os.getenv('DB_REPLICA_PASSWORD') or os.getenv('DB_PASSWORD', ''),
+            connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+            connection_factory=_ConexionPreparada
+        )
+    
+    def replica_disponible(self) -> bool:
+        """
+        True si las lecturas pueden ir a la réplica: configurada, accesible y
+        con un retraso de replicación dentro de DB_REPLICA_RETRASO_MAX.
+        
+        Responde con el resultado de la última verificación sin esperar: cada
+        DB_REPLICA_INTERVALO segundos se lanza una nueva en un hilo aparte (el
+        primer reporte va al primario). Si la réplica no responde, el
+        intervalo se duplica en cada fallo hasta DB_REPLICA_ESPERA_MAX.
+        """
+        if not self.replica_host:
+            return False
+        
+        with self._replica_lock:
+            if not self._replica_verificando and time.monotonic() >= self._replica_proxima:
+                self._replica_verificando = True
+                threading.Thread(target=self._verificar_replica, name='verificar-replica', daemon=True).start()
+            return self._replica_ok
+    
+    def _verificar_replica(self):
+        """Mide el retraso de la réplica (crea su pool la primera vez) y programa la siguiente verificación"""
+        connection = None
         try:
-            connection = self._connection_pool.getconn()
+            if self._replica_pool is None:
+                self._replica_pool = self._crear_pool_replica()
+                print(f"[OK] Pool de la réplica de lectura creado ({self.replica_host})")
+            connection = self._replica_pool.getconn()
+            with connection.cursor() as cursor:
+                cursor.execute(_RETRASO_REPLICA)
+                self.replica_retraso = float(cursor.fetchone()[0])
+            connection.rollback()
+            RETRASO_REPLICA.set(self.replica_retraso)
+            
+            disponible = self.replica_retraso <= self.replica_retraso_max
+            if not disponible and self._replica_ok:
+                print(f"[ADVERTENCIA] Réplica con {self.replica_retraso:.0f}s de retraso; lecturas al primario")
+            self._replica_ok = disponible
+            self._replica_fallos = 0
+        except Exception as e:
+            if self._replica_ok or self.replica_retraso is None:
+                print(f"[ADVERTENCIA] Réplica de lectura no disponible; lecturas al primario: {e}")
+            self.replica_retraso = None
+            self._replica_ok = False
+            self._replica_fallos += 1
+            if connection is not None:
+                # Conexión rota: se descarta en lugar de devolverla al pool
+                self._replica_pool.putconn(connection, close=True)
+                connection = None
+        finally:
+            if connection is not None:
+                self._replica_pool.putconn(connection)
+            espera = min(self.replica_intervalo * 2 ** min(self._replica_fallos, 16), self.replica_espera_max)
+            with self._replica_lock:
+                self._replica_proxima = time.monotonic() + espera
+                self._replica_verificando = False
+    
+    @classmethod
+    def registrar_sentencia(cls, nombre: str, query: str) -> SentenciaPreparada:
+        """
+        Registra una consulta frecuente para ejecutarla como sentencia preparada
+        
+        Args:
+            nombre: Identificador SQL único (nombre del PREPARE)
+            query: Consulta con parámetros posicionales %s
+        
+        Returns:
+            SentenciaPreparada para pasar a execute_query o ejecutar en lugar del texto
+        """
+        with cls._sentencias_lock:
+            existente = cls._sentencias.get(nombre)
+            if existente and existente.query != query:
+                raise ValueError(f"Ya hay otra sentencia registrada como {nombre}")
+            if not existente:
+                cls._sentencias[nombre] = SentenciaPreparada(nombre, query)
+            return cls._sentencias[nombre]
+    
+    @classmethod
+    def sentencias_registradas(cls):
+        """Sentencias registradas por nombre"""
+        return dict(cls._sentencias)
+    
+    def ejecutar(self, cursor, query, params=None):
+        """
+        cursor.execute de un texto SQL o de una SentenciaPreparada
+        
+        La sentencia se prepara en la sesión del servidor la primera vez que
+        la usa cada conexión; la conexión lo recuerda mientras siga en el pool.
+        Si las sentencias preparadas están desactivadas se ejecuta el texto SQL.
+        
+        Raises:
+            SentenciaPreparadaPerdida: la sesión del servidor no es la que
+                preparó la sentencia (la transacción queda abortada)
+        """
+        token = getattr(cursor.connection, 'token', None)
+        if token is not None:
+            token.verificar()
+        
+        try:
+            self._ejecutar(cursor, query, params)
+        except extensions.QueryCanceledError:
+            # Sin cancelación pedida, la consulta la detuvo statement_timeout
+            if token is not None and not token.cancelado:
+                token.tiempo_agotado = True
+            raise
+    
+    def _ejecutar(self, cursor, query, params):
+        if not isinstance(query, SentenciaPreparada):
+            cursor.execute(query, params)
+            return
+        
+        preparadas = getattr(cursor.connection, 'preparadas', None)
+        if not DatabaseConnection.preparadas_activas or preparadas is None:
+            cursor.execute(query.query, params)
+            return
+        
+        try:
+            if query.nombre not in preparadas:
+                cursor.execute(query.sql_prepare)
+                preparadas.add(query.nombre)
+            cursor.execute(query.sql_execute, params)
+        except (errors.InvalidSqlStatementName, errors.DuplicatePreparedStatement) as e:
+            preparadas.clear()
+            DatabaseConnection.preparadas_activas = False
+            print(f"[ADVERTENCIA] Sentencias preparadas desactivadas (¿PgBouncer en modo transaction?): {e}")
+            raise SentenciaPreparadaPerdida(str(e)) from e
+    
+    @contextmanager
+    def limitar(self, token: TokenCancelacion = None, segundos: float = None):
+        """
+        Limita las consultas que haga este hilo dentro del bloque: cada
+        conexión obtenida queda vinculada al token (cancelable) y con
+        statement_timeout de `segundos` (None o 0: sin límite). Las consultas
+        cortadas fallan con QueryCanceledError y la conexión se restablece
+        al devolverla al pool.
+        
+        Ejemplo:
+            with db.limitar(token, segundos=60):
+                resultado = repositorio.cierre_caja_mensual(año, mes)
+        """
+        anterior = getattr(_contexto, 'limite', None)
+        _contexto.limite = (token, segundos)
+        try:
+            yield token
+        finally:
+            _contexto.limite = anterior
+    
+    def _aplicar_limite(self, connection):
+        """Vincula la conexión al token y fija statement_timeout del bloque limitar() en curso"""
+        limite = getattr(_contexto, 'limite', None)
+        if limite is None:
             return connection
+        
+        token, segundos = limite
+        try:
+            if token is not None:
+                token._vincular(connection)
+                connection.token = token
+            if segundos:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET statement_timeout = %s", (int(segundos * 1000),))
+                connection.commit()
+                connection.limitada = True
+        except Exception:
+            self.return_connection(connection)
+            raise
+        return connection
+    
+    def _quitar_limite(self, connection) -> bool:
+        """Desvincula el token y restablece statement_timeout; False si la conexión quedó inservible"""
+        if connection.token is not None:
+            connection.token._desvincular(connection)
+            connection.token = None
+        if not connection.limitada:
+            return True
+        try:
+            connection.rollback()
+            with connection.cursor() as cursor:
+                cursor.execute("RESET statement_timeout")
+            connection.commit()
+            connection.limitada = False
+            return True
+        except Exception as e:
+            print(f"[ADVERTENCIA] Conexión descartada al restablecer statement_timeout: {e}")
+            return False
+    
+    def get_connection(self, replica: bool = None):
+        """
+        Obtiene una conexión del pool (de la réplica dentro de un método
+        marcado con @solo_lectura, si está disponible)
+        
+        Args:
+            replica: True o False fuerzan el servidor (p. ej. para conectarse
+                     al mismo que otra conexión); None decide según el contexto
+        """
+        if replica:
+            connection = self._replica_pool.getconn()
+            connection.replica = True
+            return self._aplicar_limite(connection)
+        
+        if replica is None and getattr(_contexto, 'lectura', False):
+            connection = None
+            if self.replica_disponible():
+                try:
+                    connection = self._replica_pool.getconn()
+                    connection.replica = True
+                except Exception as e:
+                    print(f"[ADVERTENCIA] Sin conexiones en la réplica; se usa el primario: {e}")
+            CONEXIONES_LECTURA.inc(destino='replica' if connection is not None else 'primario')
+            if connection is not None:
+                return self._aplicar_limite(connection)
+        
+        try:
+            inicio = time.perf_counter()
+            connection = self._connection_pool.getconn()
+            ESPERA_CONEXION.observe(time.perf_counter() - inicio)
         except Exception as e:
             print(f"[ERROR] Error al obtener conexion: {e}")
             raise
+        return self._aplicar_limite(connection)
 
     def return_connection(self, connection):
-        """Devuelve una conexión al pool"""
+        """Devuelve una conexión al pool del que salió"""
         try:
-            self._connection_pool.putconn(connection)
+            # Conexiones con token o statement_timeout de un bloque limitar()
+            cerrar = not self._quitar_limite(connection) if hasattr(connection, 'limitada') else False
+            if getattr(connection, 'replica', False):
+                self._replica_pool.putconn(connection, close=cerrar)
+            else:
+                self._connection_pool.putconn(connection, close=cerrar)
         except Exception as e:
             print(f"[ERROR] Error al devolver conexion: {e}")
 
@@ -94,7 +527,7 @@ class DatabaseConnection:
         Ejecuta una consulta SQL
         
         Args:
-            query: Consulta SQL a ejecutar
+            query: Consulta SQL a ejecutar (texto o SentenciaPreparada)
             params: Parámetros para la consulta
             fetch: Si True o 'all', retorna todos los resultados (SELECT)
                    Si 'one', retorna solo el primer resultado
@@ -111,7 +544,12 @@ class DatabaseConnection:
             connection = self.get_connection()
             cursor = connection.cursor(cursor_factory=RealDictCursor)
             
-            cursor.execute(query, params)
+            try:
+                self.ejecutar(cursor, query, params)
+            except SentenciaPreparadaPerdida:
+                # Ya desactivadas: se repite con el texto SQL en una transacción nueva
+                connection.rollback()
+                self.ejecutar(cursor, query, params)
             
             if fetch == 'one':
                 result = cursor.fetchone()
@@ -183,9 +621,60 @@ class DatabaseConnection:
             print(f"[ERROR] Error de conexion: {e}")
             return False
 
+    def conexiones_libres(self, replica: bool = False) -> int:
+        """Conexiones que aún se pueden pedir al pool (principal o réplica) sin agotarlo"""
+        pool_ = self._replica_pool if replica else self._connection_pool
+        if pool_ is None:
+            return 0
+        return pool_.maxconn - len(pool_._used)
+
+    def precalentar(self) -> int:
+        """
+        Abre y deja listas DB_POOL_PRECALENTAR conexiones (por defecto 4: la
+        interfaz y los hilos de fondo), probadas y con las sentencias
+        registradas ya preparadas, para que las primeras operaciones (login,
+        primera venta) no paguen ese costo. El pool las conserva al devolverlas.
+        
+        Returns:
+            Número de conexiones precalentadas
+        """
+        cantidad = min(max(int(os.getenv('DB_POOL_PRECALENTAR', '4') or 0), self._connection_pool.minconn),
+                       self._connection_pool.maxconn)
+        conexiones = []
+        listas = 0
+        try:
+            for _ in range(cantidad):
+                try:
+                    conexiones.append(self._connection_pool.getconn())
+                except pool.PoolError:
+                    # Pool en uso por la interfaz o los hilos de fondo: se
+                    # precalientan las que se obtuvieron
+                    break
+            
+            for connection in conexiones:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                        if DatabaseConnection.preparadas_activas:
+                            for nombre, sentencia in self.sentencias_registradas().items():
+                                if nombre not in connection.preparadas:
+                                    cursor.execute(sentencia.sql_prepare)
+                                    connection.preparadas.add(nombre)
+                    connection.commit()
+                    listas += 1
+                except Exception as e:
+                    connection.rollback()
+                    print(f"[ADVERTENCIA] No se pudo precalentar una conexión: {e}")
+            return listas
+        finally:
+            for connection in conexiones:
+                self._connection_pool.putconn(connection)
+
     def close_all_connections(self):
         """Cierra todas las conexiones del pool"""
         try:
+            if self._replica_pool:
+                self._replica_pool.closeall()
             if self._connection_pool:
                 self._connection_pool.closeall()
                 print("[OK] Pool de conexiones cerrado")
@@ -0,0 +1,168 @@
+"""
+Sesión de reporte con snapshot compartido
+Todas las consultas de un reporte leen la misma foto de la base: la conexión
+principal abre una transacción REPEATABLE READ READ ONLY y exporta su snapshot
+(pg_export_snapshot); las conexiones de trabajo importan ese snapshot (SET
+TRANSACTION SNAPSHOT) y ejecutan consultas en paralelo, cada una en su propio
+proceso del servidor. El detalle y el resumen de un reporte cuadran aunque
+haya ventas registrándose mientras se genera.
+"""
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Tuple
+
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor
+
+_INICIAR = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"
+
+# Conexiones del pool que un reporte deja libres para ventas y demás
+# operaciones: las de trabajo solo se piden mientras sobren más que estas
+_RESERVA_POOL = 3
+
+
+def trabajadores_reporte() -> int:
+    """Conexiones de trabajo por reporte además de la principal (REPORTES_TRABAJADORES, por defecto 2)"""
+    try:
+        return max(int(os.getenv('REPORTES_TRABAJADORES', '2')), 0)
+    except ValueError:
+        return 2
+
+
+class SesionReporte:
+    """
+    Transacción de solo lectura cuyo snapshot comparten varias conexiones
+
+    Las conexiones se piden a DatabaseConnection en el hilo que abre la
+    sesión, así que respetan @solo_lectura (réplica) y los límites de
+    DatabaseConnection.limitar() (token de cancelación y statement_timeout).
+    Todas salen del mismo servidor que la principal: un snapshot solo se
+    puede importar donde se exportó.
+
+    Ejemplo:
+        with SesionReporte(db) as sesion:
+            detalle, resumen = sesion.en_paralelo([
+                (query_detalle, params, True),
+                (query_resumen, params, 'one')
+            ])
+    """
+
+    def __init__(self, db, trabajadores: int = None):
+        # Cada reporte ocupa 1 + trabajadores conexiones del pool mientras corre
+        self.db = db
+        self.trabajadores = trabajadores_reporte() if trabajadores is None else trabajadores
+        self.snapshot = None
+        self._principal = None
+        self._conexiones = []
+
+    def __enter__(self):
+        try:
+            try:
+                self._principal = self.db.get_connection()
+            except pool.PoolError as e:
+                raise pool.PoolError('No hay conexiones libres para generar el reporte; intente de nuevo') from e
+            self._conexiones.append(self._principal)
+            with self._principal.cursor() as cursor:
+                cursor.execute(_INICIAR)
+                cursor.execute("SELECT pg_export_snapshot()")
+                self.snapshot = cursor.fetchone()[0]
+
+            for _ in range(self.trabajadores):
+                connection = self._conexion_de_trabajo()
+                if connection is None:
+                    break
+                self._conexiones.append(connection)
+            return self
+        except Exception:
+            self._cerrar()
+            raise
+
+    def __exit__(self, tipo, valor, traza):
+        self._cerrar()
+        return False
+
+    @property
+    def paralelismo(self) -> int:
+        """Consultas que pueden ejecutarse a la vez (conexiones abiertas)"""
+        return len(self._conexiones)
+
+    def _conexion_de_trabajo(self):
+        """Conexión del mismo servidor que la principal, con el snapshot importado (None si no hay)"""
+        replica = self._principal.replica
+        if self.db.conexiones_libres(replica) <= _RESERVA_POOL:
+            return None
+        try:
+            connection = self.db.get_connection(replica=replica)
+        except pool.PoolError as e:
+            # Pool agotado entre la verificación y el pedido: el reporte
+            # sigue con las conexiones que ya tiene
+            print(f"[ADVERTENCIA] Reporte con menos conexiones de trabajo: {e}")
+            return None
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_INICIAR)
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", (self.snapshot,))
+            return connection
+        except Exception:
+            connection.rollback()
+            self.db.return_connection(connection)
+            raise
+
+    def _cerrar(self):
+        # Solo lectura: ROLLBACK termina la transacción sin nada que deshacer
+        for connection in self._conexiones:
+            try:
+                connection.rollback()
+            except Exception as e:
+                print(f"[ADVERTENCIA] Error al cerrar transacción de reporte: {e}")
+            self.db.return_connection(connection)
+        self._conexiones = []
+        self._principal = None
+
+    def _consultar_en(self, connection, query, params=None, fetch=True):
+        cursor = connection.cursor(cursor_factory=RealDictCursor)
+        try:
+            self.db.ejecutar(cursor, query, params)
+            if fetch == 'one':
+                fila = cursor.fetchone()
+                return dict(fila) if fila else None
+            return [dict(fila) for fila in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def consultar(self, query, params=None, fetch=True):
+        """
+        Ejecuta una consulta en la conexión principal (mismos argumentos que
+        DatabaseConnection.execute_query, solo lecturas)
+        """
+        return self._consultar_en(self._principal, query, params, fetch)
+
+    def en_paralelo(self, consultas: List[Tuple[Any, Any, Any]]) -> List[Any]:
+        """
+        Ejecuta consultas independientes repartidas entre las conexiones de la
+        sesión, todas sobre el mismo snapshot
+
+        Args:
+            consultas: Lista de (query, params, fetch) con fetch como en execute_query
+
+        Returns:
+            Lista con el resultado de cada consulta, en el mismo orden
+        """
+        if len(self._conexiones) == 1 or len(consultas) == 1:
+            return [self.consultar(*consulta) for consulta in consultas]
+
+        libres = queue.Queue()
+        for connection in self._conexiones:
+            libres.put(connection)
+
+        def ejecutar(consulta):
+            # Cada conexión la usa un solo hilo a la vez
+            connection = libres.get()
+            try:
+                return self._consultar_en(connection, *consulta)
+            finally:
+                libres.put(connection)
+
+        with ThreadPoolExecutor(max_workers=min(len(self._conexiones), len(consultas))) as ejecutor:
+            return list(ejecutor.map(ejecutar, consultas))
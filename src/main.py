@@ -4,9 +4,13 @@ Punto de entrada principal de la aplicación
 """
 import flet as ft
 import os
-from database import DatabaseConnection
-from services import AuthService
-from views import LoginView, DashboardView
+import threading
+import time
+from services.auth_service import AuthService, dias_sesion_local
+from services.sincronizacion_service import modo_local
+from repositories.local_repository import CatalogoLocalRepository
+from views.login_view import LoginView
+from utils.metricas import TIEMPO_ARRANQUE, iniciar_exportador_desde_entorno
 
 
 class SistemaInventarioApp:
@@ -27,21 +31,128 @@ class SistemaInventarioApp:
         if os.path.exists(icon_path):
             self.page.window_icon = icon_path
         
-        # Inicializar servicios
+        # El login se muestra de inmediato; la conexión al servidor, el
+        # precalentamiento del pool y los servicios de fondo siguen en otro
+        # hilo. Un login antes de que terminen espera a la conexión.
+        self.sin_conexion = False
+        self.db = None
+        self.auth_service = AuthService(None)
+        self.arranque = threading.Event()
+        self.inicio_arranque = time.perf_counter()
+        self.mostrar_login()
+        TIEMPO_ARRANQUE.observe(time.perf_counter() - self.inicio_arranque, etapa='login')
+        threading.Thread(target=self.conectar, daemon=True).start()
+
+    def conectar(self):
+        """Conecta con el servidor e inicia los servicios (hilo de arranque)"""
         try:
-            self.db = DatabaseConnection()
-            if not self.db.test_connection():
-                self.mostrar_error_conexion()
-                return
-            
-            self.auth_service = AuthService(self.db)
+            # Envío de las ventas guardadas en la terminal (POS_MODO_LOCAL)
+            if not getattr(self, 'sincronizador_ventas', None):
+                from services.sincronizacion_service import iniciar_sincronizacion_desde_entorno
+                self.sincronizador_ventas = iniciar_sincronizacion_desde_entorno()
             
-            # Mostrar login
-            self.mostrar_login()
+            from database.connection import DatabaseConnection
+            db = DatabaseConnection()
+            if not db.test_connection():
+                if not self.iniciar_sin_conexion():
+                    self.mostrar_error_conexion()
+                return
             
+            self.db = db
+            self.auth_service.db = db
+            TIEMPO_ARRANQUE.observe(time.perf_counter() - self.inicio_arranque, etapa='conexion')
         except Exception as e:
             print(f"❌ Error iniciando aplicación: {e}")
-            self.mostrar_error_conexion()
+            if not self.iniciar_sin_conexion():
+                self.mostrar_error_conexion()
+            return
+        finally:
+            # Desde aquí el login ya puede validar contra el servidor
+            self.arranque.set()
+        
+        try:
+            self.preparar_servicios()
+        except Exception as e:
+            print(f"[ERROR] Error preparando servicios en segundo plano: {e}")
+        TIEMPO_ARRANQUE.observe(time.perf_counter() - self.inicio_arranque, etapa='servicios')
+
+    def preparar_servicios(self):
+        """
+        Tareas de arranque que no hacen falta para iniciar sesión: particiones,
+        servicios periódicos, precalentamiento del pool y datos de referencia
+        """
+        from services.particion_service import ParticionService
+        from services.caja_service import iniciar_auditor_desde_entorno
+        from services.valorizacion_service import iniciar_valorizacion_desde_entorno
+        from services.sincronizacion_service import SincronizacionService, catalogo_local_activo
+        # Registran las sentencias preparadas del checkout y de las búsquedas
+        import repositories.producto_repository  # noqa: F401
+        import repositories.venta_repository  # noqa: F401
+        
+        # Crear las particiones mensuales de los próximos meses si faltan
+        particiones = ParticionService().asegurar_particiones()
+        if not particiones['success']:
+            print(f"[ADVERTENCIA] {particiones['message']}")
+        
+        # Verificación periódica de los totales de las cajas abiertas
+        if not getattr(self, 'auditor_cajas', None):
+            self.auditor_cajas = iniciar_auditor_desde_entorno()
+        
+        # Valorización del inventario (vista materializada y foto diaria)
+        if not getattr(self, 'actualizador_valorizacion', None):
+            self.actualizador_valorizacion = iniciar_valorizacion_desde_entorno()
+        
+        # Conexiones mínimas abiertas y con las sentencias preparadas
+        print(f"[OK] Pool precalentado: {self.db.precalentar()} conexiones")
+        
+        # Catálogo de la vista de ventas al día antes de abrirla (con punto de
+        # venta local ya lo hace el sincronizador)
+        if catalogo_local_activo() and not self.sincronizador_ventas:
+            catalogo = SincronizacionService().actualizar_catalogo()
+            if not catalogo['success']:
+                print(f"[ADVERTENCIA] {catalogo['message']}")
+        
+        # El dashboard se muestra apenas se inicia sesión
+        import views.dashboard_view  # noqa: F401
+
+    def esperar_arranque(self) -> bool:
+        """
+        Espera a que termine la conexión inicial (si el login se envía antes)
+        
+        Returns:
+            True si el login puede continuar (servidor o modo local)
+        """
+        if not self.arranque.is_set():
+            self.login_view.loading.visible = True
+            self.login_view.btn_login.disabled = True
+            self.page.update()
+            self.arranque.wait()
+            self.login_view.loading.visible = False
+            self.login_view.btn_login.disabled = False
+            self.page.update()
+        return self.db is not None or self.sin_conexion
+
+    def iniciar_sin_conexion(self) -> bool:
+        """
+        Sin servidor y con el punto de venta local activo, muestra el login
+        contra las sesiones guardadas en la terminal
+
+        Returns:
+            False si el modo local está desactivado o nadie inició sesión aquí
+        """
+        try:
+            if modo_local() == 'no' or not CatalogoLocalRepository().hay_sesiones(dias_sesion_local()):
+                return False
+        except Exception as e:
+            print(f"[ERROR] Almacén local no disponible: {e}")
+            return False
+        
+        print("[ADVERTENCIA] Servidor no disponible: punto de venta en modo local")
+        self.sin_conexion = True
+        self.auth_service = AuthService(None, sin_conexion=True)
+        # El login ya está en pantalla: solo cambia contra qué valida
+        self.login_view.auth_service = self.auth_service
+        return True
 
     def mostrar_login(self):
         """Muestra la pantalla de login"""
@@ -50,16 +161,19 @@ class SistemaInventarioApp:
             auth_service=self.auth_service,
             on_login_success=self.on_login_exitoso
         )
+        self.login_view = login_view
         
         # Crear funciones lambda que pasen page
         def on_submit_usuario(e):
             login_view.txt_password.focus()
         
         def on_submit_password(e):
-            login_view.iniciar_sesion(e, self.page)
+            if self.esperar_arranque():
+                login_view.iniciar_sesion(e, self.page)
         
         def on_click_login(e):
-            login_view.iniciar_sesion(e, self.page)
+            if self.esperar_arranque():
+                login_view.iniciar_sesion(e, self.page)
         
         # Construir la vista
         login_container = login_view.build()
@@ -82,13 +196,15 @@ class SistemaInventarioApp:
 
     def mostrar_dashboard(self, empleado):
         """Muestra el dashboard principal"""
+        from views.dashboard_view import DashboardView
         self.page.clean()
         
         dashboard = DashboardView(
             page=self.page,
             auth_service=self.auth_service,
             empleado=empleado,
-            on_logout=self.cerrar_sesion
+            on_logout=self.cerrar_sesion,
+            sin_conexion=self.sin_conexion
         )
         
         dashboard_container = dashboard.build()
@@ -99,6 +215,10 @@ class SistemaInventarioApp:
     def cerrar_sesion(self):
         """Cierra la sesión actual"""
         self.auth_service.logout()
+        if self.sin_conexion:
+            # Al cerrar sesión en modo local se vuelve a intentar con el servidor
+            self.__init__(self.page)
+            return
         self.mostrar_login()
 
     def mostrar_error_conexion(self):
@@ -160,4 +280,6 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # Exportador de métricas (solo si METRICS_PORT o METRICS_TEXTFILE están definidos)
+    iniciar_exportador_desde_entorno()
     ft.app(target=main)
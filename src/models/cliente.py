@@ -18,6 +18,8 @@ class Cliente:
     descuento_habitual: float = 0.0
     fecha_primera_compra: Optional[date] = None
     total_compras: float = 0.0
+    cantidad_compras: int = 0
+    fecha_ultima_compra: Optional[datetime] = None
     estado: bool = True
     fecha_creacion: Optional[datetime] = None
     fecha_actualizacion: Optional[datetime] = None
@@ -72,6 +74,8 @@ class Cliente:
             'descuento_habitual': self.descuento_habitual,
             'fecha_primera_compra': self.fecha_primera_compra.isoformat() if self.fecha_primera_compra else None,
             'total_compras': self.total_compras,
+            'cantidad_compras': self.cantidad_compras,
+            'fecha_ultima_compra': self.fecha_ultima_compra.isoformat() if self.fecha_ultima_compra else None,
             'estado': self.estado,
             'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
             'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
@@ -120,6 +124,14 @@ class Cliente:
                 from datetime import datetime as dt
                 fecha_primera_compra = dt.fromisoformat(data['fecha_primera_compra']).date()
         
+        fecha_ultima_compra = None
+        if data.get('fecha_ultima_compra'):
+            val = data['fecha_ultima_compra']
+            if isinstance(val, datetime):
+                fecha_ultima_compra = val
+            elif isinstance(val, str):
+                fecha_ultima_compra = datetime.fromisoformat(val.replace('Z', '+00:00'))
+        
         fecha_creacion = None
         if data.get('created_at') or data.get('fecha_creacion'):
             val = data.get('created_at') or data.get('fecha_creacion')
@@ -144,6 +156,8 @@ class Cliente:
             descuento_habitual=float(data.get('descuento_habitual', 0)),
             fecha_primera_compra=fecha_primera_compra,
             total_compras=float(data.get('total_compras', 0)),
+            cantidad_compras=int(data.get('cantidad_compras') or 0),
+            fecha_ultima_compra=fecha_ultima_compra,
             estado=bool(data.get('estado', True)),
             fecha_creacion=fecha_creacion,
             fecha_actualizacion=fecha_actualizacion,
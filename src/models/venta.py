@@ -94,6 +94,9 @@ class Venta:
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
+    # UUID generado por la terminal al iniciar la venta (reintentos sin duplicar)
+    clave_idempotencia: Optional[str] = None
+    
     # Datos relacionados (denormalizados para display)
     cliente_nombre: Optional[str] = None
     empleado_nombre: Optional[str] = None
@@ -164,6 +167,7 @@ class Venta:
             'metodo_pago': self.metodo_pago,
             'estado': self.estado,
             'observaciones': self.observaciones,
+            'clave_idempotencia': self.clave_idempotencia,
             'created_at': self.created_at,
             'updated_at': self.updated_at,
             'cliente_nombre': self.cliente_nombre,
@@ -191,6 +195,7 @@ class Venta:
             metodo_pago=data.get('metodo_pago', 'efectivo'),
             estado=data.get('estado', 'completada'),
             observaciones=data.get('observaciones'),
+            clave_idempotencia=data.get('clave_idempotencia'),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at'),
             cliente_nombre=data.get('cliente_nombre'),
@@ -1,15 +1,21 @@
 """
 Repositorios para acceso a datos
+Cada repositorio se importa al pedirlo (from repositories import X o
+repositories.x_repository): importar el paquete no carga los demás
 """
-from repositories.categoria_repository import CategoriaRepository
-from repositories.producto_repository import ProductoRepository
-from repositories.cliente_repository import ClienteRepository
-from repositories.proveedor_repository import ProveedorRepository
-from repositories.compra_repository import CompraRepository
-from repositories.venta_repository import VentaRepository
-from repositories.reporte_repository import ReporteRepository
-from repositories.configuracion_repository import ConfiguracionRepository
-from repositories.dashboard_repository import DashboardRepository
+import importlib
+
+_MODULOS = {
+    'CategoriaRepository': 'repositories.categoria_repository',
+    'ProductoRepository': 'repositories.producto_repository',
+    'ClienteRepository': 'repositories.cliente_repository',
+    'ProveedorRepository': 'repositories.proveedor_repository',
+    'CompraRepository': 'repositories.compra_repository',
+    'VentaRepository': 'repositories.venta_repository',
+    'ReporteRepository': 'repositories.reporte_repository',
+    'ConfiguracionRepository': 'repositories.configuracion_repository',
+    'DashboardRepository': 'repositories.dashboard_repository',
+}
 
 __all__ = [
     'CategoriaRepository',
@@ -22,3 +28,9 @@ __all__ = [
     'ConfiguracionRepository',
     'DashboardRepository'
 ]
+
+
+def __getattr__(nombre):
+    if nombre in _MODULOS:
+        return getattr(importlib.import_module(_MODULOS[nombre]), nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
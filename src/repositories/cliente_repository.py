@@ -90,6 +90,8 @@ class ClienteRepository:
                 c.descuento_habitual,
                 c.fecha_primera_compra,
                 c.total_compras,
+                c.cantidad_compras,
+                c.fecha_ultima_compra,
                 c.estado,
                 c.created_at,
                 c.updated_at,
@@ -119,6 +121,7 @@ class ClienteRepository:
                 c.id_cliente, c.id_persona, c.tipo_cliente,
                 c.limite_credito, c.descuento_habitual,
                 c.fecha_primera_compra, c.total_compras,
+                c.cantidad_compras, c.fecha_ultima_compra,
                 c.estado, c.created_at, c.updated_at,
                 p.nombre, p.apellido, p.telefono, p.email,
                 p.direccion, p.dpi_nit, p.fecha_registro, p.estado as persona_estado
@@ -152,6 +155,7 @@ class ClienteRepository:
                 c.id_cliente, c.id_persona, c.tipo_cliente,
                 c.limite_credito, c.descuento_habitual,
                 c.fecha_primera_compra, c.total_compras,
+                c.cantidad_compras, c.fecha_ultima_compra,
                 c.estado, c.created_at, c.updated_at,
                 p.nombre, p.apellido, p.telefono, p.email,
                 p.direccion, p.dpi_nit, p.fecha_registro, p.estado as persona_estado
@@ -194,6 +198,27 @@ class ClienteRepository:
         """
         return self.listar(solo_activos=True)
     
+    def listar_cambios(self, desde: int) -> List[Cliente]:
+        """
+        Clientes cuyos datos de la copia local cambiaron desde la marca `desde`
+        (ProductoRepository.marca_cambios), en el cliente o su persona, activos
+        o no. Las estadísticas que actualiza cada venta no cambian
+        version_catalogo.
+        """
+        seleccion = """
+                c.id_cliente, c.id_persona, c.tipo_cliente,
+                c.descuento_habitual, c.estado,
+                GREATEST(c.updated_at, p.updated_at) as updated_at,
+                p.nombre, p.apellido, p.dpi_nit
+            FROM clientes c
+            INNER JOIN personas p ON c.id_persona = p.id_persona
+        """
+        # Una consulta por tabla (UNION) para usar sus índices por version_catalogo
+        query = f"SELECT {seleccion} WHERE c.version_catalogo >= %s UNION SELECT {seleccion} WHERE p.version_catalogo >= %s"
+        
+        result = self.db.execute_query(query, (desde, desde), fetch='all')
+        return [Cliente.from_dict(row) for row in result] if result else []
+    
     def actualizar(self, cliente: Cliente) -> Dict[str, Any]:
         """
         Actualiza un cliente existente (persona + cliente)
@@ -2,10 +2,53 @@
 Repository para gestión de compras
 """
 from typing import List, Optional, Dict, Any
+from psycopg2.extras import execute_values
 from database.connection import DatabaseConnection
 from models.compra import Compra, DetalleCompra
 
 
+# Estadísticas del proveedor (total y del mes de la compra) para una compra nueva
+_SUMAR_COMPRA_PROVEEDOR = """
+    WITH total AS (
+        INSERT INTO estadisticas_proveedores AS e (id_proveedor, cantidad_compras, total_comprado, ultima_compra)
+        VALUES (%(id_proveedor)s, 1, %(total)s, %(fecha)s)
+        ON CONFLICT (id_proveedor) DO UPDATE
+        SET cantidad_compras = e.cantidad_compras + 1,
+            total_comprado = e.total_comprado + EXCLUDED.total_comprado,
+            ultima_compra = GREATEST(e.ultima_compra, EXCLUDED.ultima_compra)
+    )
+    INSERT INTO estadisticas_proveedores_mes AS m (id_proveedor, mes, cantidad_compras, total_comprado)
+    VALUES (%(id_proveedor)s, date_trunc('month', %(fecha)s::timestamp)::date, 1, %(total)s)
+    ON CONFLICT (id_proveedor, mes) DO UPDATE
+    SET cantidad_compras = m.cantidad_compras + 1,
+        total_comprado = m.total_comprado + EXCLUDED.total_comprado
+"""
+
+# Lo inverso al cancelar; la última compra solo se busca de nuevo si la cancelada era la más reciente
+_RESTAR_COMPRA_PROVEEDOR = """
+    WITH total AS (
+        UPDATE estadisticas_proveedores
+        SET cantidad_compras = GREATEST(cantidad_compras - 1, 0),
+            total_comprado = total_comprado - %(total)s,
+            ultima_compra = CASE
+                WHEN ultima_compra > %(fecha)s THEN ultima_compra
+                ELSE (
+                    SELECT MAX(c.fecha_compra)
+                    FROM compras c
+                    WHERE c.id_proveedor = %(id_proveedor)s
+                    AND c.estado <> 'cancelada'
+                )
+            END
+        WHERE id_proveedor = %(id_proveedor)s
+    )
+    UPDATE estadisticas_proveedores_mes
+    SET cantidad_compras = GREATEST(cantidad_compras - 1, 0),
+        total_comprado = total_comprado - %(total)s
+    WHERE id_proveedor = %(id_proveedor)s
+    AND mes = date_trunc('month', %(fecha)s::timestamp)::date
+"""
+
+
 class CompraRepository:
     """Repository para operaciones CRUD de compras"""
     
@@ -16,83 +59,103 @@ class CompraRepository:
         """
         Crea una nueva compra con sus detalles
         IMPORTANTE: También actualiza el stock y precios de los productos
+        
+        Todo ocurre en una sola transacción con sentencias por lote:
+        1. Bloquear los productos con SELECT ... ORDER BY id_producto FOR UPDATE, el
+           mismo orden que el checkout: si comparten productos, una espera a la otra
+        2. Insertar la compra
+        3. Insertar todos los detalles con execute_values
+        4. Sumar stock y actualizar costo con un solo UPDATE ... FROM (VALUES ...)
+        5. Sumar la compra a las estadísticas del proveedor
         """
+        connection = None
+        cursor = None
+        
         try:
             # Validar compra
             es_valido, mensaje = compra.validar()
             if not es_valido:
                 return {'success': False, 'message': mensaje}
             
-            # Iniciar transacción
-            # 1. Insertar compra
-            query_compra = """
+            # Consolidar líneas por producto: se suman las cantidades y
+            # prevalece el último precio, igual que al aplicar línea por línea
+            por_producto: Dict[int, List] = {}
+            for detalle in compra.detalles:
+                if detalle.id_producto in por_producto:
+                    por_producto[detalle.id_producto][0] += detalle.cantidad
+                    por_producto[detalle.id_producto][1] = detalle.precio_unitario
+                else:
+                    por_producto[detalle.id_producto] = [detalle.cantidad, detalle.precio_unitario]
+            ids_productos = sorted(por_producto)
+            
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+            
+            # 1. Bloquear productos y verificar que existan
+            cursor.execute("""
+                SELECT id_producto
+                FROM productos
+                WHERE id_producto = ANY(%s)
+                ORDER BY id_producto
+                FOR UPDATE
+            """, (ids_productos,))
+            
+            encontrados = {row[0] for row in cursor.fetchall()}
+            faltantes = [i for i in ids_productos if i not in encontrados]
+            if faltantes:
+                connection.rollback()
+                return {
+                    'success': False,
+                    'message': f'Productos inexistentes: {", ".join(str(i) for i in faltantes)}'
+                }
+            
+            # 2. Insertar compra
+            cursor.execute("""
                 INSERT INTO compras (
                     numero_factura, id_proveedor, id_empleado,
                     fecha_compra, total, estado, observaciones
                 )
                 VALUES (%s, %s, %s, CURRENT_TIMESTAMP, %s, %s, %s)
                 RETURNING id_compra, fecha_compra
-            """
-            
-            result = self.db.execute_query(
-                query_compra,
-                (compra.numero_factura, compra.id_proveedor, compra.id_empleado,
-                 compra.total, compra.estado, compra.observaciones),
-                fetch='one'
-            )
+            """, (compra.numero_factura, compra.id_proveedor, compra.id_empleado,
+                  compra.total, compra.estado, compra.observaciones))
             
-            if not result:
-                return {'success': False, 'message': 'Error al crear la compra'}
+            id_compra, fecha_compra = cursor.fetchone()
             
-            id_compra = result['id_compra']
-            
-            # 2. Insertar detalles de compra y actualizar productos
-            query_detalle = """
+            # 3. Insertar detalles de compra en lote
+            execute_values(cursor, """
                 INSERT INTO detalle_compras (
                     id_compra, id_producto, cantidad,
                     precio_unitario, subtotal
                 )
-                VALUES (%s, %s, %s, %s, %s)
-            """
+                VALUES %s
+            """, [
+                (id_compra, d.id_producto, d.cantidad, d.precio_unitario, d.subtotal)
+                for d in compra.detalles
+            ], page_size=1000)
             
-            for detalle in compra.detalles:
-                # Insertar detalle
-                self.db.execute_query(
-                    query_detalle,
-                    (id_compra, detalle.id_producto, detalle.cantidad,
-                     detalle.precio_unitario, detalle.subtotal),
-                    fetch=False
-                )
-                
-                # 3. Actualizar stock del producto (SUMAR)
-                query_stock = """
-                    UPDATE productos
-                    SET stock_actual = stock_actual + %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id_producto = %s
-                """
-                
-                self.db.execute_query(
-                    query_stock,
-                    (detalle.cantidad, detalle.id_producto),
-                    fetch=False
-                )
-                
-                # 4. Actualizar precio de costo del producto
-                # El precio de venta se calcula automáticamente por el trigger de margen
-                query_precio = """
-                    UPDATE productos
-                    SET precio_costo = %s,
-                        precio_venta = %s * (1 + (margen_ganancia / 100)),
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id_producto = %s
-                """
-                
-                self.db.execute_query(
-                    query_precio,
-                    (detalle.precio_unitario, detalle.precio_unitario, detalle.id_producto),
-                    fetch=False
-                )
+            # 4. Sumar stock y actualizar precio de costo en una sola sentencia
+            # El precio de venta conserva el margen actual (el trigger lo recalcula)
+            execute_values(cursor, """
+                UPDATE productos p
+                SET stock_actual = p.stock_actual + v.cantidad,
+                    precio_costo = v.precio,
+                    precio_venta = v.precio * (1 + (p.margen_ganancia / 100)),
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(id_producto, cantidad, precio)
+                WHERE p.id_producto = v.id_producto
+            """, [
+                (id_producto, por_producto[id_producto][0], por_producto[id_producto][1])
+                for id_producto in ids_productos
+            ], template='(%s::int, %s::int, %s::numeric)', page_size=1000)
+            
+            # 5. Estadísticas del proveedor
+            if compra.estado != 'cancelada':
+                cursor.execute(_SUMAR_COMPRA_PROVEEDOR, {
+                    'id_proveedor': compra.id_proveedor, 'total': compra.total, 'fecha': fecha_compra
+                })
+            
+            connection.commit()
             
             return {
                 'success': True,
@@ -101,7 +164,15 @@ class CompraRepository:
             }
             
         except Exception as e:
+            if connection:
+                connection.rollback()
             return {'success': False, 'message': f'Error: {str(e)}'}
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
     
     def obtener_por_id(self, id_compra: int) -> Optional[Compra]:
         """Obtiene una compra por su ID con sus detalles"""
@@ -210,46 +281,86 @@ class CompraRepository:
         """
         Anula una compra (marca como cancelada)
         IMPORTANTE: También revierte el stock de los productos
+        
+        Stock, estado y estadísticas del proveedor cambian en una sola transacción;
+        los productos se bloquean en orden de id antes de revertir el stock
         """
+        connection = None
+        cursor = None
+        
         try:
-            # Obtener detalles de la compra para revertir stock
-            compra = self.obtener_por_id(id_compra)
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+            
+            # Bloquear la compra: dos anulaciones simultáneas revertirían dos veces
+            cursor.execute("""
+                SELECT estado, id_proveedor, total, fecha_compra
+                FROM compras
+                WHERE id_compra = %s
+                FOR UPDATE
+            """, (id_compra,))
             
-            if not compra:
+            compra_data = cursor.fetchone()
+            if not compra_data:
+                connection.rollback()
                 return {'success': False, 'message': 'Compra no encontrada'}
             
-            if compra.estado == 'cancelada':
+            estado, id_proveedor, total, fecha_compra = compra_data
+            if estado == 'cancelada':
+                connection.rollback()
                 return {'success': False, 'message': 'La compra ya está cancelada'}
             
-            # Revertir stock de cada producto
-            for detalle in compra.detalles:
-                query_stock = """
-                    UPDATE productos
-                    SET stock_actual = stock_actual - %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id_producto = %s
-                """
-                
-                self.db.execute_query(
-                    query_stock,
-                    (detalle.cantidad, detalle.id_producto),
-                    fetch=False
+            # Bloquear los productos en orden de id, como el checkout: el
+            # UPDATE ... FROM los bloquearía en el orden que elija el plan
+            cursor.execute("""
+                SELECT id_producto
+                FROM productos
+                WHERE id_producto IN (
+                    SELECT id_producto FROM detalle_compras WHERE id_compra = %s
                 )
+                ORDER BY id_producto
+                FOR UPDATE
+            """, (id_compra,))
+            
+            # Revertir stock de todos los productos en una sentencia
+            cursor.execute("""
+                UPDATE productos p
+                SET stock_actual = p.stock_actual - d.cantidad,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT id_producto, SUM(cantidad) AS cantidad
+                    FROM detalle_compras
+                    WHERE id_compra = %s
+                    GROUP BY id_producto
+                ) d
+                WHERE p.id_producto = d.id_producto
+            """, (id_compra,))
             
             # Marcar compra como cancelada
-            query = """
+            cursor.execute("""
                 UPDATE compras
                 SET estado = 'cancelada',
                     updated_at = CURRENT_TIMESTAMP
                 WHERE id_compra = %s
-            """
+            """, (id_compra,))
             
-            self.db.execute_query(query, (id_compra,), fetch=False)
+            cursor.execute(_RESTAR_COMPRA_PROVEEDOR, {
+                'id_proveedor': id_proveedor, 'total': total, 'fecha': fecha_compra
+            })
             
+            connection.commit()
             return {'success': True, 'message': 'Compra anulada exitosamente'}
             
         except Exception as e:
+            if connection:
+                connection.rollback()
             return {'success': False, 'message': f'Error: {str(e)}'}
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
     
     def contar_total(self, estado: Optional[str] = None) -> int:
         """Cuenta el total de compras"""
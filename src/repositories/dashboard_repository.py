@@ -1,14 +1,80 @@
 """
 Repositorio para estadísticas del Dashboard
 """
-from database.connection import get_connection
-from typing import Dict, Any
-from datetime import datetime, date
+from database.connection import get_connection, get_db
+from database.conexion_async import get_db_async
+from typing import Dict, Any, Tuple, List
+from datetime import datetime, date, timedelta
+
+
+# Contadores de la pantalla de inicio, en el orden de _consultas_contadores_inicio
+_CONTADORES_INICIO = ('total_productos', 'ventas_hoy', 'total_clientes', 'stock_bajo')
 
 
 class DashboardRepository:
     """Repositorio para obtener estadísticas del dashboard"""
     
+    @staticmethod
+    def _consultas_contadores_inicio() -> List[Tuple[str, Any, str]]:
+        """Consultas independientes (query, params, fetch) de las tarjetas de inicio"""
+        hoy = date.today()
+        return [
+            ("SELECT COUNT(*) as valor FROM productos WHERE estado = TRUE", None, 'one'),
+            ("""
+                SELECT COALESCE(SUM(total), 0) as valor
+                FROM ventas
+                WHERE fecha_venta >= %s AND fecha_venta < %s
+            """, (hoy, hoy + timedelta(days=1)), 'one'),
+            ("SELECT COUNT(*) as valor FROM clientes WHERE estado = TRUE", None, 'one'),
+            ("""
+                SELECT COUNT(*) as valor
+                FROM productos
+                WHERE stock_actual <= stock_minimo AND estado = TRUE
+            """, None, 'one')
+        ]
+    
+    @staticmethod
+    def _contadores_inicio(resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+        contadores = {
+            clave: (resultado['valor'] if resultado else 0)
+            for clave, resultado in zip(_CONTADORES_INICIO, resultados)
+        }
+        return {'success': True, **contadores}
+    
+    @staticmethod
+    def obtener_contadores_inicio() -> Dict[str, Any]:
+        """
+        Total de productos y clientes activos, ventas de hoy y productos con
+        stock bajo (una consulta tras otra)
+        """
+        try:
+            db = get_db()
+            return DashboardRepository._contadores_inicio([
+                db.execute_query(query, params, fetch=fetch)
+                for query, params, fetch in DashboardRepository._consultas_contadores_inicio()
+            ])
+        except Exception as e:
+            print(f"[ERROR] Error en obtener_contadores_inicio: {e}")
+            return {'success': False, 'message': f'Error: {str(e)}', **dict.fromkeys(_CONTADORES_INICIO, 0)}
+    
+    @staticmethod
+    async def obtener_contadores_inicio_async() -> Dict[str, Any]:
+        """obtener_contadores_inicio con las cuatro consultas en pipeline (backend asíncrono)"""
+        try:
+            return DashboardRepository._contadores_inicio(
+                await get_db_async().execute_pipeline(DashboardRepository._consultas_contadores_inicio())
+            )
+        except Exception as e:
+            print(f"[ERROR] Error en obtener_contadores_inicio_async: {e}")
+            return {'success': False, 'message': f'Error: {str(e)}', **dict.fromkeys(_CONTADORES_INICIO, 0)}
+    
+    @staticmethod
+    def _rango_mes_actual() -> Tuple[date, date]:
+        """Primer día del mes actual y del siguiente (rango semiabierto sobre fecha_venta)"""
+        inicio = date.today().replace(day=1)
+        fin = (inicio + timedelta(days=32)).replace(day=1)
+        return inicio, fin
+    
     @staticmethod
     def obtener_estadisticas_ventas_hoy() -> Dict[str, Any]:
         """Obtiene estadísticas de ventas del día actual"""
@@ -25,8 +91,8 @@ class DashboardRepository:
                     COALESCE(SUM(total), 0) as ingresos_totales,
                     COALESCE(AVG(total), 0) as ticket_promedio
                 FROM ventas
-                WHERE DATE(fecha_venta) = %s
-            """, (hoy,))
+                WHERE fecha_venta >= %s AND fecha_venta < %s
+            """, (hoy, hoy + timedelta(days=1)))
             
             row = cursor.fetchone()
             cursor.close()
@@ -59,16 +125,15 @@ class DashboardRepository:
             conn = get_connection()
             cursor = conn.cursor()
             
-            hoy = date.today()
+            inicio_mes, fin_mes = DashboardRepository._rango_mes_actual()
             
             cursor.execute("""
                 SELECT 
                     COUNT(*) as total_ventas,
                     COALESCE(SUM(total), 0) as ingresos_totales
                 FROM ventas
-                WHERE EXTRACT(MONTH FROM fecha_venta) = %s
-                AND EXTRACT(YEAR FROM fecha_venta) = %s
-            """, (hoy.month, hoy.year))
+                WHERE fecha_venta >= %s AND fecha_venta < %s
+            """, (inicio_mes, fin_mes))
             
             row = cursor.fetchone()
             cursor.close()
@@ -162,7 +227,7 @@ class DashboardRepository:
             conn = get_connection()
             cursor = conn.cursor()
             
-            hoy = date.today()
+            inicio_mes, fin_mes = DashboardRepository._rango_mes_actual()
             
             # Verificar si existe la tabla detalle_ventas
             cursor.execute("""
@@ -184,13 +249,13 @@ class DashboardRepository:
                     COALESCE(SUM(dv.subtotal), 0) as ingresos
                 FROM detalle_ventas dv
                 JOIN productos p ON dv.id_producto = p.id_producto
-                JOIN ventas v ON dv.id_venta = v.id_venta
-                WHERE EXTRACT(MONTH FROM v.fecha_venta) = %s
-                AND EXTRACT(YEAR FROM v.fecha_venta) = %s
+                JOIN ventas v ON dv.id_venta = v.id_venta AND dv.fecha_venta = v.fecha_venta
+                WHERE dv.fecha_venta >= %s AND dv.fecha_venta < %s
+                AND v.fecha_venta >= %s AND v.fecha_venta < %s
                 GROUP BY p.id_producto, p.nombre, p.codigo
                 ORDER BY total_vendido DESC
                 LIMIT 5
-            """, (hoy.month, hoy.year))
+            """, (inicio_mes, fin_mes, inicio_mes, fin_mes))
             
             productos = []
             for row in cursor.fetchall():
@@ -0,0 +1,488 @@
+"""
+Repositorios del almacén local del punto de venta (SQLite): catálogo para
+vender sin conexión y cola de ventas pendientes de enviar al servidor
+"""
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime, date, timedelta
+from typing import List, Optional, Dict, Any, Tuple
+
+import bcrypt
+
+from database.almacen_local import AlmacenLocal
+from models.cliente import Cliente
+from models.producto import Producto
+from models.venta import Venta
+
+
+def _json(valor) -> str:
+    """JSON con fechas en ISO (Decimal y demás tipos como texto)"""
+    return json.dumps(valor, default=lambda v: v.isoformat() if isinstance(v, (datetime, date)) else str(v))
+
+
+def numero_factura_local(clave: str) -> str:
+    """
+    Número de factura de una venta hecha en la terminal: no puede seguir la
+    numeración del servidor, así que se deriva de la clave de idempotencia
+    """
+    return f"LOC-{datetime.now():%y%m%d}-{clave[:8].upper()}"
+
+
+def _fila_producto(p: Producto) -> tuple:
+    return (p.id_producto, p.codigo, p.codigo.strip().lower(), p.nombre, p.id_categoria,
+            p.nombre_categoria, float(p.precio_venta), p.stock_actual, p.stock_minimo, p.unidad_medida)
+
+
+def _fila_cliente(c: Cliente) -> tuple:
+    return (c.id_cliente, c.id_persona, c.persona.nombre, c.persona.apellido,
+            c.persona.dpi_nit, c.tipo_cliente, float(c.descuento_habitual or 0))
+
+
+_INSERTAR_PRODUCTO = """
+    INSERT OR REPLACE INTO productos (
+        id_producto, codigo, codigo_normalizado, nombre, id_categoria,
+        nombre_categoria, precio_venta, stock_actual, stock_minimo, unidad_medida
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERTAR_CLIENTE = """
+    INSERT OR REPLACE INTO clientes (
+        id_cliente, id_persona, nombre, apellido, dpi_nit, tipo_cliente, descuento_habitual
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _clave_sesion(password: str) -> bytes:
+    """
+    Entrada de bcrypt para la contraseña: SHA-256 en base64 (44 bytes), porque
+    bcrypt solo usa los primeros 72 bytes de lo que recibe
+    """
+    return base64.b64encode(hashlib.sha256(password.encode()).digest())
+
+
+def _vigente_desde(dias: int) -> str:
+    """Fecha (ISO, como `sesiones.actualizado`) desde la que una sesión guardada sigue vigente"""
+    return (datetime.now() - timedelta(days=dias)).isoformat()
+
+
+def _version(valor) -> Optional[int]:
+    """Marca de cambios guardada (None si no hay o es una fecha de copias anteriores)"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogoLocalRepository:
+    """
+    Copia local de productos, clientes y sesiones
+
+    La copia es el propio archivo SQLite: la vista de ventas la lee al abrir
+    una venta sin pedir el catálogo al servidor. Se mantiene con los cambios
+    por version_catalogo (aplicar_cambios) desde las marcas guardadas en
+    `meta` y con las existencias del servidor.
+    """
+
+    def __init__(self):
+        self.almacen = AlmacenLocal()
+
+    def guardar_catalogo(self, productos: List[Producto], clientes: Optional[List[Cliente]] = None,
+                         marca: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reemplaza la copia local de productos (y de clientes, si se indican)
+
+        Args:
+            productos: Productos activos, con o sin stock (listar_activos_para_ventas)
+            clientes: Clientes activos (listar_todos); None conserva los actuales
+            marca: ProductoRepository.marca_cambios tomada antes de leerlos
+
+        Returns:
+            Dict con 'success', 'productos' y 'clientes'
+        """
+        try:
+            ahora = datetime.now().isoformat()
+            with self.almacen.conexion() as conn:
+                conn.execute("DELETE FROM productos")
+                conn.executemany(_INSERTAR_PRODUCTO, [_fila_producto(p) for p in productos])
+                self._guardar_meta(conn, 'marca_productos', marca)
+
+                if clientes is not None:
+                    conn.execute("DELETE FROM clientes")
+                    conn.executemany(_INSERTAR_CLIENTE, [_fila_cliente(c) for c in clientes])
+                    self._guardar_meta(conn, 'marca_clientes', marca)
+
+                self._guardar_meta(conn, 'catalogo_completo', ahora)
+                self._guardar_meta(conn, 'catalogo_actualizado', ahora)
+
+            return {
+                'success': True,
+                'productos': len(productos),
+                'clientes': len(clientes) if clientes is not None else None
+            }
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error al guardar el catálogo local: {str(e)}'}
+
+    def aplicar_cambios(self, productos: List[Producto], clientes: List[Cliente],
+                        existencias: List[Dict[str, Any]], marca: int) -> Dict[str, Any]:
+        """
+        Aplica a la copia local los cambios desde la última marca
+
+        Los productos 'activo' y clientes activos se insertan o reemplazan;
+        los demás (desactivados, categoría inactiva) se borran de la copia.
+        Luego se copia el stock de los productos que ya están en la copia.
+
+        Args:
+            productos: ProductoRepository.listar_cambios_para_ventas
+            clientes: ClienteRepository.listar_cambios
+            existencias: ProductoRepository.listar_existencias
+            marca: ProductoRepository.marca_cambios tomada antes de leer los
+                cambios; es la marca desde la que se piden los siguientes
+
+        Returns:
+            Dict con 'success', 'productos' y 'clientes' (cambios aplicados)
+        """
+        try:
+            with self.almacen.conexion() as conn:
+                conn.executemany(_INSERTAR_PRODUCTO, [_fila_producto(p) for p in productos if p.estado == 'activo'])
+                conn.executemany("DELETE FROM productos WHERE id_producto = ?",
+                                 [(p.id_producto,) for p in productos if p.estado != 'activo'])
+                conn.executemany("UPDATE productos SET stock_actual = ? WHERE id_producto = ?",
+                                 [(e['stock_actual'], e['id_producto']) for e in existencias])
+                conn.executemany(_INSERTAR_CLIENTE, [_fila_cliente(c) for c in clientes if c.estado])
+                conn.executemany("DELETE FROM clientes WHERE id_cliente = ?",
+                                 [(c.id_cliente,) for c in clientes if not c.estado])
+
+                self._guardar_meta(conn, 'marca_productos', marca)
+                self._guardar_meta(conn, 'marca_clientes', marca)
+                self._guardar_meta(conn, 'catalogo_actualizado', datetime.now().isoformat())
+
+            return {'success': True, 'productos': len(productos), 'clientes': len(clientes)}
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error al actualizar el catálogo local: {str(e)}'}
+
+    def _guardar_meta(self, conn, clave: str, valor):
+        if isinstance(valor, datetime):
+            valor = valor.isoformat()
+        conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor))
+
+    def marcas(self) -> Dict[str, Any]:
+        """
+        Marcas guardadas en `meta` (None si no hay):
+            productos, clientes: marca de cambios del servidor (marca_cambios)
+            completo: fecha de la última copia completa
+            actualizado: fecha de la última copia o aplicación de cambios
+        """
+        with self.almacen.conexion() as conn:
+            filas = dict(conn.execute("SELECT clave, valor FROM meta").fetchall())
+        fechas = {'completo': 'catalogo_completo', 'actualizado': 'catalogo_actualizado'}
+        return {
+            'productos': _version(filas.get('marca_productos')),
+            'clientes': _version(filas.get('marca_clientes')),
+            **{
+                nombre: datetime.fromisoformat(filas[clave]) if filas.get(clave) else None
+                for nombre, clave in fechas.items()
+            }
+        }
+
+    def catalogo_actualizado(self) -> Optional[datetime]:
+        """Fecha de la última copia del catálogo (None si nunca se copió)"""
+        return self.marcas()['actualizado']
+
+    def listar_activos_para_ventas(self) -> List[Producto]:
+        """Productos con stock según la copia local (mismo orden que ProductoRepository)"""
+        with self.almacen.conexion() as conn:
+            filas = conn.execute("""
+                SELECT id_producto, codigo, nombre, id_categoria, nombre_categoria,
+                       precio_venta, stock_actual, stock_minimo, unidad_medida
+                FROM productos
+                WHERE stock_actual > 0
+                ORDER BY nombre
+            """).fetchall()
+        return [Producto.from_dict(dict(f)) for f in filas]
+
+    def obtener_para_escaneo(self, codigo: str) -> Optional[Producto]:
+        """Busca un producto por código (sin distinguir mayúsculas ni espacios)"""
+        with self.almacen.conexion() as conn:
+            fila = conn.execute("""
+                SELECT id_producto, codigo, nombre, precio_venta, stock_actual
+                FROM productos
+                WHERE codigo_normalizado = ?
+            """, (codigo.strip().lower(),)).fetchone()
+        return Producto.from_dict(dict(fila)) if fila else None
+
+    def listar_clientes(self) -> List[Cliente]:
+        """Clientes activos según la copia local"""
+        with self.almacen.conexion() as conn:
+            filas = conn.execute("""
+                SELECT id_cliente, id_persona, nombre, apellido, dpi_nit, tipo_cliente, descuento_habitual
+                FROM clientes
+                ORDER BY nombre, apellido
+            """).fetchall()
+        return [Cliente.from_dict(dict(f)) for f in filas]
+
+    def resumen(self) -> Dict[str, Any]:
+        """Totales para el inicio sin conexión (las ventas de hoy son las encoladas en esta terminal)"""
+        with self.almacen.conexion() as conn:
+            productos, stock_bajo = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(stock_actual <= stock_minimo), 0) FROM productos
+            """).fetchone()
+            clientes = conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+            ventas_hoy = conn.execute("""
+                SELECT COALESCE(SUM(total), 0) FROM ventas_pendientes
+                WHERE creada >= ? AND estado <> 'conflicto'
+            """, (date.today().isoformat(),)).fetchone()[0]
+        return {
+            'total_productos': productos,
+            'stock_bajo': stock_bajo,
+            'total_clientes': clientes,
+            'ventas_hoy': ventas_hoy
+        }
+
+    # ---- Sesiones ----
+
+    def guardar_sesion(self, usuario: str, password: str, empleado: Dict[str, Any],
+                       permisos: List[Tuple[str, str]]):
+        """
+        Guarda los datos de un login exitoso para poder iniciar sesión sin conexión
+
+        La contraseña se guarda con bcrypt (sal propia y costo alto), nunca el
+        hash del servidor: quien copie pos_local.db no puede probar contraseñas
+        a la velocidad de SHA-256.
+        """
+        password_hash = bcrypt.hashpw(_clave_sesion(password), bcrypt.gensalt()).decode()
+        with self.almacen.conexion() as conn:
+            conn.execute("""
+                INSERT INTO sesiones (usuario, password, id_empleado, empleado, permisos, actualizado)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (usuario) DO UPDATE
+                SET password = excluded.password,
+                    id_empleado = excluded.id_empleado,
+                    empleado = excluded.empleado,
+                    permisos = excluded.permisos,
+                    actualizado = excluded.actualizado
+            """, (usuario, password_hash, empleado['id_empleado'], _json(empleado),
+                  _json([list(p) for p in permisos]), datetime.now().isoformat()))
+
+    def obtener_sesion(self, usuario: str, password: str, dias: int) -> Optional[Dict[str, Any]]:
+        """
+        Sesión guardada del usuario si la contraseña coincide y su último login
+        con conexión fue hace menos de `dias` días; la vencida se borra
+
+        Returns:
+            Dict con 'empleado' y 'permisos' (set de (modulo, accion)), o None
+        """
+        with self.almacen.conexion() as conn:
+            conn.execute(
+                "DELETE FROM sesiones WHERE usuario = ? AND actualizado < ?",
+                (usuario, _vigente_desde(dias))
+            )
+            fila = conn.execute(
+                "SELECT password, empleado, permisos FROM sesiones WHERE usuario = ?",
+                (usuario,)
+            ).fetchone()
+        if not fila or not bcrypt.checkpw(_clave_sesion(password), fila['password'].encode()):
+            return None
+        return {
+            'empleado': json.loads(fila['empleado']),
+            'permisos': {tuple(p) for p in json.loads(fila['permisos'])}
+        }
+
+    def borrar_sesion(self, usuario: str):
+        """Olvida la sesión guardada del usuario (ya no podrá entrar sin conexión)"""
+        with self.almacen.conexion() as conn:
+            conn.execute("DELETE FROM sesiones WHERE usuario = ?", (usuario,))
+
+    def hay_sesiones(self, dias: int) -> bool:
+        """True si algún empleado puede iniciar sesión sin conexión en esta terminal (sesión de menos de `dias` días)"""
+        with self.almacen.conexion() as conn:
+            return conn.execute(
+                "SELECT 1 FROM sesiones WHERE actualizado >= ? LIMIT 1", (_vigente_desde(dias),)
+            ).fetchone() is not None
+
+    def guardar_caja(self, id_empleado: int, caja: Optional[Dict[str, Any]]):
+        """Recuerda la caja abierta del empleado (None si ya no tiene)"""
+        with self.almacen.conexion() as conn:
+            conn.execute(
+                "UPDATE sesiones SET caja = ? WHERE id_empleado = ?",
+                (_json(caja) if caja else None, id_empleado)
+            )
+
+    def obtener_caja(self, id_empleado: int) -> Optional[Dict[str, Any]]:
+        """Última caja abierta conocida del empleado"""
+        with self.almacen.conexion() as conn:
+            fila = conn.execute(
+                "SELECT caja FROM sesiones WHERE id_empleado = ? AND caja IS NOT NULL LIMIT 1",
+                (id_empleado,)
+            ).fetchone()
+        return json.loads(fila['caja']) if fila else None
+
+
+class ColaVentasRepository:
+    """Cola durable de ventas registradas en la terminal y pendientes de enviar"""
+
+    def __init__(self):
+        self.almacen = AlmacenLocal()
+
+    def encolar(self, venta: Venta, id_caja: int) -> Dict[str, Any]:
+        """
+        Guarda la venta en la cola y descuenta el stock de la copia local en la
+        misma transacción. El servidor la registra después (SincronizacionService)
+        con la misma clave de idempotencia.
+
+        Args:
+            venta: Venta con detalles; se le asignan clave y fecha si no las tiene
+            id_caja: Caja abierta del empleado
+
+        Returns:
+            Dict con 'success', 'clave' y 'message'
+        """
+        try:
+            es_valido, mensaje = venta.validar()
+            if not es_valido:
+                return {'success': False, 'message': mensaje}
+
+            venta.clave_idempotencia = venta.clave_idempotencia or str(uuid.uuid4())
+            venta.fecha_venta = venta.fecha_venta or datetime.now()
+            venta.id_caja = id_caja
+
+            with self.almacen.conexion() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO ventas_pendientes (clave, id_caja, numero_factura, total, venta, creada)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (clave) DO NOTHING
+                """, (venta.clave_idempotencia, id_caja, venta.numero_factura, venta.total,
+                      _json(venta.to_dict()), venta.fecha_venta.isoformat()))
+
+                # Un segundo clic con la misma clave no descuenta dos veces
+                if cursor.rowcount:
+                    conn.executemany("""
+                        UPDATE productos SET stock_actual = MAX(stock_actual - ?, 0)
+                        WHERE id_producto = ?
+                    """, [(d.cantidad, d.id_producto) for d in venta.detalles])
+
+            return {
+                'success': True,
+                'clave': venta.clave_idempotencia,
+                'message': 'Venta guardada en la terminal; se enviará al servidor'
+            }
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error al guardar la venta en la terminal: {str(e)}'}
+
+    def pendientes(self, limite: int = 50) -> List[Tuple[str, int, Venta]]:
+        """Ventas pendientes, las más antiguas primero: (clave, id_caja, venta)"""
+        with self.almacen.conexion() as conn:
+            filas = conn.execute("""
+                SELECT clave, id_caja, venta FROM ventas_pendientes
+                WHERE estado = 'pendiente'
+                ORDER BY creada
+                LIMIT ?
+            """, (limite,)).fetchall()
+
+        resultado = []
+        for fila in filas:
+            venta = Venta.from_dict(json.loads(fila['venta']))
+            venta.fecha_venta = datetime.fromisoformat(venta.fecha_venta) if venta.fecha_venta else None
+            resultado.append((fila['clave'], fila['id_caja'], venta))
+        return resultado
+
+    def listar(self, estados=('pendiente',), limite: int = 100) -> List[Venta]:
+        """Ventas de la cola para mostrarlas en la vista (las más recientes primero)"""
+        marcadores = ', '.join('?' for _ in estados)
+        with self.almacen.conexion() as conn:
+            filas = conn.execute(f"""
+                SELECT venta FROM ventas_pendientes
+                WHERE estado IN ({marcadores})
+                ORDER BY creada DESC
+                LIMIT ?
+            """, (*estados, limite)).fetchall()
+
+        ventas = []
+        for fila in filas:
+            venta = Venta.from_dict(json.loads(fila['venta']))
+            venta.fecha_venta = datetime.fromisoformat(venta.fecha_venta) if venta.fecha_venta else None
+            ventas.append(venta)
+        return ventas
+
+    def conflictos(self) -> List[Dict[str, Any]]:
+        """
+        Ventas para revisar: las que el servidor rechazó (stock insuficiente,
+        caja cerrada, ...) y las registradas con otro número que el del
+        comprobante impreso ('renumerada')
+        """
+        with self.almacen.conexion() as conn:
+            filas = conn.execute("""
+                SELECT clave, numero_factura, total, creada, mensaje, intentos
+                FROM ventas_pendientes
+                WHERE estado IN ('conflicto', 'renumerada')
+                ORDER BY creada
+            """).fetchall()
+        return [dict(f) for f in filas]
+
+    def resumen(self) -> Dict[str, int]:
+        """Cantidad de ventas 'pendientes' y para revisar ('conflictos', ver conflictos())"""
+        with self.almacen.conexion() as conn:
+            pendientes, conflictos = conn.execute("""
+                SELECT COALESCE(SUM(estado = 'pendiente'), 0),
+                       COALESCE(SUM(estado IN ('conflicto', 'renumerada')), 0)
+                FROM ventas_pendientes
+            """).fetchone()
+        return {'pendientes': pendientes, 'conflictos': conflictos}
+
+    def marcar_sincronizada(self, clave: str, id_venta: int):
+        with self.almacen.conexion() as conn:
+            conn.execute("""
+                UPDATE ventas_pendientes
+                SET estado = 'sincronizada', id_venta = ?, mensaje = NULL,
+                    intentos = intentos + 1, sincronizada = ?
+                WHERE clave = ?
+            """, (id_venta, datetime.now().isoformat(), clave))
+
+    def marcar_renumerada(self, clave: str, id_venta: int, numero_factura: str, mensaje: str):
+        """Sincronizada con otro número que el del comprobante: queda para revisar"""
+        with self.almacen.conexion() as conn:
+            conn.execute("""
+                UPDATE ventas_pendientes
+                SET estado = 'renumerada', id_venta = ?, numero_factura = ?,
+                    venta = json_set(venta, '$.numero_factura', ?), mensaje = ?,
+                    intentos = intentos + 1, sincronizada = ?
+                WHERE clave = ?
+            """, (id_venta, numero_factura, numero_factura, mensaje, datetime.now().isoformat(), clave))
+
+    def marcar_conflicto(self, clave: str, mensaje: str):
+        with self.almacen.conexion() as conn:
+            conn.execute("""
+                UPDATE ventas_pendientes
+                SET estado = 'conflicto', mensaje = ?, intentos = intentos + 1
+                WHERE clave = ?
+            """, (mensaje, clave))
+
+    def registrar_intento(self, clave: str, mensaje: str):
+        """Intento fallido por conexión: la venta sigue pendiente"""
+        with self.almacen.conexion() as conn:
+            conn.execute("""
+                UPDATE ventas_pendientes SET mensaje = ?, intentos = intentos + 1
+                WHERE clave = ?
+            """, (mensaje, clave))
+
+    def marcar_revisada(self, clave: str):
+        """El encargado ya atendió el conflicto (la venta no se reenvía) o corrigió el comprobante"""
+        with self.almacen.conexion() as conn:
+            conn.execute(
+                "UPDATE ventas_pendientes SET estado = 'revisada' WHERE clave = ? AND estado IN ('conflicto', 'renumerada')",
+                (clave,)
+            )
+
+    def depurar(self, dias: int = 30) -> int:
+        """Borra las ventas ya sincronizadas o revisadas hace más de `dias` días"""
+        with self.almacen.conexion() as conn:
+            cursor = conn.execute("""
+                DELETE FROM ventas_pendientes
+                WHERE estado IN ('sincronizada', 'revisada')
+                AND creada < date('now', 'localtime', ?)
+            """, (f'-{dias} days',))
+            return cursor.rowcount
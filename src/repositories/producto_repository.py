@@ -1,11 +1,52 @@
 """
 Repositorio para operaciones CRUD de Productos
 """
-from typing import List, Optional, Dict, Any
+from typing import IO, List, Optional, Dict, Any
 from database.connection import DatabaseConnection
 from models.producto import Producto
 
 
+# Columnas (en orden) del CSV que recibe importar_catalogo
+COLUMNAS_IMPORTACION = (
+    'linea', 'codigo', 'nombre', 'descripcion', 'categoria',
+    'precio_costo', 'precio_venta', 'stock_actual', 'stock_minimo', 'unidad_medida'
+)
+
+
+# Consultas por producto de la pantalla de ventas: sentencias preparadas
+_PRODUCTO_POR_ID = DatabaseConnection.registrar_sentencia('producto_por_id', """
+    SELECT 
+        p.id_producto,
+        p.codigo,
+        p.nombre,
+        p.descripcion,
+        p.id_categoria,
+        p.precio_costo as precio_compra,
+        p.precio_venta,
+        p.stock_actual,
+        p.stock_minimo,
+        p.unidad_medida,
+        p.lote,
+        p.fecha_vencimiento,
+        p.ubicacion,
+        CASE WHEN p.estado THEN 'activo' ELSE 'inactivo' END as estado,
+        p.created_at as fecha_creacion,
+        p.updated_at as fecha_actualizacion,
+        c.nombre as nombre_categoria
+    FROM productos p
+    LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
+    WHERE p.id_producto = %s
+""")
+
+# Index scan de una fila por idx_productos_codigo_normalizado
+_PRODUCTO_PARA_ESCANEO = DatabaseConnection.registrar_sentencia('producto_para_escaneo', """
+    SELECT id_producto, codigo, nombre, precio_venta, stock_actual
+    FROM productos
+    WHERE codigo_normalizado = LOWER(TRIM(%s))
+    AND estado = true
+""")
+
+
 class ProductoRepository:
     """Repositorio para gestión de productos"""
     
@@ -69,38 +110,14 @@ class ProductoRepository:
     
     def obtener_por_id(self, id_producto: int) -> Optional[Producto]:
         """Obtiene un producto por su ID con información de categoría"""
-        query = """
-            SELECT 
-                p.id_producto,
-                p.codigo,
-                p.nombre,
-                p.descripcion,
-                p.id_categoria,
-                p.precio_costo as precio_compra,
-                p.precio_venta,
-                p.stock_actual,
-                p.stock_minimo,
-                p.unidad_medida,
-                p.lote,
-                p.fecha_vencimiento,
-                p.ubicacion,
-                CASE WHEN p.estado THEN 'activo' ELSE 'inactivo' END as estado,
-                p.created_at as fecha_creacion,
-                p.updated_at as fecha_actualizacion,
-                c.nombre as nombre_categoria
-            FROM productos p
-            LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
-            WHERE p.id_producto = %s
-        """
-        
-        result = self.db.execute_query(query, (id_producto,), fetch='one')
+        result = self.db.execute_query(_PRODUCTO_POR_ID, (id_producto,), fetch='one')
         
         if result:
             return Producto.from_dict(result)
         return None
     
     def obtener_por_codigo(self, codigo: str) -> Optional[Producto]:
-        """Obtiene un producto por su código"""
+        """Obtiene un producto por su código (sin distinguir mayúsculas ni espacios)"""
         query = """
             SELECT 
                 p.id_producto,
@@ -121,7 +138,7 @@ class ProductoRepository:
                 c.nombre as nombre_categoria
             FROM productos p
             LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
-            WHERE LOWER(p.codigo) = LOWER(%s)
+            WHERE p.codigo_normalizado = LOWER(TRIM(%s))
         """
         
         result = self.db.execute_query(query, (codigo,), fetch='one')
@@ -130,6 +147,24 @@ class ProductoRepository:
             return Producto.from_dict(result)
         return None
     
+    def obtener_para_escaneo(self, codigo: str) -> Optional[Producto]:
+        """
+        Busca un producto activo por código para el escáner de ventas
+        (una fila por idx_productos_codigo_normalizado; solo las columnas
+        que usa la venta).
+        
+        Args:
+            codigo: Código leído (sin distinguir mayúsculas ni espacios)
+            
+        Returns:
+            Producto con id, código, nombre, precio y stock, o None
+        """
+        result = self.db.execute_query(_PRODUCTO_PARA_ESCANEO, (codigo,), fetch='one')
+        
+        if result:
+            return Producto.from_dict(result)
+        return None
+    
     def listar(
         self, 
         solo_activos: bool = True,
@@ -179,7 +214,7 @@ class ProductoRepository:
             params.append(id_categoria)
         
         if busqueda:
-            query += " AND (LOWER(p.codigo) LIKE LOWER(%s) OR LOWER(p.nombre) LIKE LOWER(%s) OR LOWER(p.descripcion) LIKE LOWER(%s))"
+            query += " AND (p.codigo_normalizado LIKE LOWER(%s) OR LOWER(p.nombre) LIKE LOWER(%s) OR LOWER(p.descripcion) LIKE LOWER(%s))"
             params.extend([f'%{busqueda}%', f'%{busqueda}%', f'%{busqueda}%'])
         
         if solo_bajo_stock:
@@ -215,7 +250,7 @@ class ProductoRepository:
             
             # Verificar código duplicado
             existe = self.db.execute_query(
-                "SELECT id_producto FROM productos WHERE LOWER(codigo) = LOWER(%s) AND id_producto != %s",
+                "SELECT id_producto FROM productos WHERE codigo_normalizado = LOWER(TRIM(%s)) AND id_producto != %s",
                 (producto.codigo, producto.id_producto),
                 fetch='one'
             )
@@ -332,16 +367,51 @@ class ProductoRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    def obtener_por_codigos(self, codigos: List[str]) -> List[Dict[str, Any]]:
+        """
+        Resuelve muchos códigos en una sola consulta (importación de facturas)
+
+        Cada código se compara igual que en obtener_por_codigo (sin distinguir
+        mayúsculas ni espacios) y usa el índice de codigo_normalizado.
+
+        Args:
+            codigos: Códigos tal como vienen en el archivo
+
+        Returns:
+            Lista de dicts con 'codigo_buscado' y los datos del producto;
+            los códigos inexistentes no aparecen
+        """
+        if not codigos:
+            return []
+
+        query = """
+            SELECT
+                b.codigo as codigo_buscado,
+                p.id_producto,
+                p.codigo,
+                p.nombre,
+                p.precio_costo,
+                p.precio_venta,
+                p.margen_ganancia,
+                p.stock_actual,
+                p.estado
+            FROM unnest(%s::text[]) AS b(codigo)
+            JOIN productos p ON p.codigo_normalizado = LOWER(TRIM(b.codigo))
+        """
+        return self.db.execute_query(query, (list(codigos),)) or []
+
     def obtener_productos_bajo_stock(self) -> List[Producto]:
         """Obtiene productos con stock igual o menor al mínimo"""
         return self.listar(solo_bajo_stock=True)
     
-    def listar_activos_para_ventas(self, busqueda: Optional[str] = None) -> List[Producto]:
+    def listar_activos_para_ventas(self, busqueda: Optional[str] = None, con_stock: bool = True) -> List[Producto]:
         """
         Lista solo productos activos disponibles para ventas (con stock > 0)
         
         Args:
             busqueda: Término de búsqueda opcional
+            con_stock: False incluye también los que no tienen stock (copia
+                local: listar_existencias los repone cuando vuelven a tenerlo)
             
         Returns:
             Lista de productos activos con stock disponible
@@ -363,17 +433,19 @@ class ProductoRepository:
                 p.ubicacion,
                 'activo' as estado,
                 p.created_at as fecha_creacion,
+                p.updated_at as fecha_actualizacion,
                 c.nombre as nombre_categoria
             FROM productos p
             LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
             WHERE p.estado = TRUE 
-              AND p.stock_actual > 0
               AND c.estado = TRUE
         """
         
         params = []
+        if con_stock:
+            query += " AND p.stock_actual > 0"
         if busqueda:
-            query += " AND (LOWER(p.codigo) LIKE LOWER(%s) OR LOWER(p.nombre) LIKE LOWER(%s))"
+            query += " AND (p.codigo_normalizado LIKE LOWER(%s) OR LOWER(p.nombre) LIKE LOWER(%s))"
             params.extend([f'%{busqueda}%', f'%{busqueda}%'])
         
         query += " ORDER BY p.nombre ASC"
@@ -384,6 +456,77 @@ class ProductoRepository:
             return [Producto.from_dict(row) for row in result]
         return []
     
+    def marca_cambios(self) -> int:
+        """
+        Marca desde la que pedir los próximos cambios del catálogo: la menor
+        transacción que todavía puede confirmarse después de esta consulta
+        
+        Se toma antes de leer el catálogo: lo que esa lectura no vea tiene
+        version_catalogo mayor o igual (migraciones/014_version_catalogo.sql).
+        """
+        result = self.db.execute_query(
+            "SELECT txid_snapshot_xmin(txid_current_snapshot()) as marca", fetch='one'
+        )
+        return result['marca']
+    
+    def listar_cambios_para_ventas(self, desde: int) -> List[Producto]:
+        """
+        Productos cuyo catálogo cambió desde la marca `desde` (ellos o su
+        categoría), para actualizar la copia local sin volver a traerlo completo
+        
+        Incluye los que dejaron de venderse: estado 'activo' solo si el
+        producto y su categoría están activos. version_catalogo no cambia con
+        el stock (ver listar_existencias). Una consulta por tabla (UNION) para
+        usar los índices por version_catalogo.
+        """
+        query = """
+            SELECT 
+                p.id_producto,
+                p.codigo,
+                p.nombre,
+                p.id_categoria,
+                p.precio_venta,
+                p.stock_actual,
+                p.stock_minimo,
+                p.unidad_medida,
+                CASE WHEN p.estado AND c.estado IS TRUE THEN 'activo' ELSE 'inactivo' END as estado,
+                p.updated_at as fecha_actualizacion,
+                c.nombre as nombre_categoria
+            FROM productos p
+            LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
+            WHERE p.version_catalogo >= %s
+            UNION
+            SELECT 
+                p.id_producto,
+                p.codigo,
+                p.nombre,
+                p.id_categoria,
+                p.precio_venta,
+                p.stock_actual,
+                p.stock_minimo,
+                p.unidad_medida,
+                CASE WHEN p.estado AND c.estado IS TRUE THEN 'activo' ELSE 'inactivo' END as estado,
+                p.updated_at as fecha_actualizacion,
+                c.nombre as nombre_categoria
+            FROM categorias c
+            INNER JOIN productos p ON p.id_categoria = c.id_categoria
+            WHERE c.version_catalogo >= %s
+        """
+        
+        result = self.db.execute_query(query, (desde, desde), fetch='all')
+        return [Producto.from_dict(row) for row in result] if result else []
+    
+    def listar_existencias(self) -> List[Dict[str, Any]]:
+        """
+        Stock actual de los productos activos (id_producto, stock_actual)
+        
+        Las ventas no cambian version_catalogo, así que la copia local repone
+        el stock con esta lectura: solo dos columnas, sin índice que la venta
+        tenga que mantener.
+        """
+        query = "SELECT id_producto, stock_actual FROM productos WHERE estado = TRUE"
+        return self.db.execute_query(query, fetch='all') or []
+    
     def contar_total(self, solo_activos: bool = True) -> int:
         """Cuenta el total de productos"""
         query = "SELECT COUNT(*) as total FROM productos"
@@ -392,3 +535,249 @@ class ProductoRepository:
         
         result = self.db.execute_query(query, fetch='one')
         return result['total'] if result else 0
+    
+    def importar_catalogo(self, archivo_csv: IO[str], solo_validar: bool = False) -> Dict[str, Any]:
+        """
+        Carga masiva de productos: crea los nuevos y actualiza los existentes
+        
+        El archivo se copia con COPY a una tabla temporal de texto (ninguna
+        fila puede hacer fallar la carga), se valida con sentencias por
+        conjunto y las filas válidas se aplican con un único
+        INSERT ... ON CONFLICT DO UPDATE. Todo en una sola transacción.
+        
+        - Los productos existentes se reconocen por código sin distinguir
+          mayúsculas ni espacios (codigo_normalizado)
+        - Una columna vacía conserva el valor actual del producto (o el valor
+          por defecto si es nuevo)
+        - stock_actual solo se usa al crear: el stock de un producto existente
+          cambia con compras y ventas, no con el catálogo
+        - Las filas sin cambios no se actualizan (ni generan historial de precios)
+        
+        Args:
+            archivo_csv: CSV sin encabezados con las columnas de COLUMNAS_IMPORTACION
+            solo_validar: Validar y reportar sin aplicar cambios
+            
+        Returns:
+            Dict con 'success', 'message', 'insertados', 'actualizados',
+            'sin_cambios' y 'errores' (lista de dicts linea, codigo, error)
+        """
+        connection = None
+        cursor = None
+        
+        try:
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+            
+            # 1. Tabla temporal de texto y COPY del archivo
+            cursor.execute("""
+                CREATE TEMP TABLE productos_importacion (
+                    linea INT,
+                    codigo TEXT,
+                    nombre TEXT,
+                    descripcion TEXT,
+                    categoria TEXT,
+                    precio_costo TEXT,
+                    precio_venta TEXT,
+                    stock_actual TEXT,
+                    stock_minimo TEXT,
+                    unidad_medida TEXT,
+                    id_categoria INT,
+                    id_producto INT,
+                    error TEXT
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(
+                f"COPY productos_importacion ({', '.join(COLUMNAS_IMPORTACION)}) FROM STDIN WITH (FORMAT csv)",
+                archivo_csv
+            )
+            
+            cursor.execute("""
+                UPDATE productos_importacion
+                SET codigo = TRIM(COALESCE(codigo, '')),
+                    nombre = TRIM(COALESCE(nombre, '')),
+                    descripcion = NULLIF(TRIM(descripcion), ''),
+                    categoria = TRIM(COALESCE(categoria, '')),
+                    precio_costo = REPLACE(TRIM(COALESCE(precio_costo, '')), ',', '.'),
+                    precio_venta = REPLACE(TRIM(COALESCE(precio_venta, '')), ',', '.'),
+                    stock_actual = TRIM(COALESCE(stock_actual, '')),
+                    stock_minimo = TRIM(COALESCE(stock_minimo, '')),
+                    unidad_medida = NULLIF(TRIM(unidad_medida), '')
+            """)
+            
+            # 2. Resolver categorías (por id o por nombre) y productos existentes
+            cursor.execute("ANALYZE productos_importacion")
+            cursor.execute("""
+                UPDATE productos_importacion s
+                SET id_categoria = c.id_categoria
+                FROM categorias c
+                WHERE c.estado = TRUE
+                AND LOWER(c.nombre) = LOWER(s.categoria)
+            """)
+            cursor.execute("""
+                UPDATE productos_importacion s
+                SET id_categoria = c.id_categoria
+                FROM categorias c
+                WHERE c.estado = TRUE
+                AND s.id_categoria IS NULL
+                AND c.id_categoria = CASE WHEN s.categoria ~ '^\\d{1,9}$' THEN s.categoria::int END
+            """)
+            cursor.execute("""
+                UPDATE productos_importacion s
+                SET id_producto = p.id_producto
+                FROM productos p
+                WHERE p.codigo_normalizado = LOWER(s.codigo)
+            """)
+            
+            # 3. Validar: el primer error de cada fila
+            # (el orden del CASE garantiza que solo se convierten valores con formato válido)
+            cursor.execute("""
+                UPDATE productos_importacion
+                SET error = CASE
+                    WHEN codigo = '' THEN 'El código es obligatorio'
+                    WHEN LENGTH(codigo) > 50 THEN 'El código excede 50 caracteres'
+                    WHEN nombre = '' AND id_producto IS NULL THEN 'El nombre es obligatorio'
+                    WHEN nombre <> '' AND LENGTH(nombre) < 3 THEN 'El nombre debe tener al menos 3 caracteres'
+                    WHEN LENGTH(nombre) > 150 THEN 'El nombre excede 150 caracteres'
+                    WHEN LENGTH(unidad_medida) > 20 THEN 'La unidad de medida excede 20 caracteres'
+                    WHEN categoria <> '' AND id_categoria IS NULL THEN 'La categoría no existe o está inactiva'
+                    WHEN precio_costo = '' AND id_producto IS NULL THEN 'El precio de costo es obligatorio'
+                    WHEN precio_costo <> '' AND precio_costo !~ '^\\d{1,8}(\\.\\d{1,2})?$' THEN 'Precio de costo inválido'
+                    WHEN precio_venta = '' AND id_producto IS NULL THEN 'El precio de venta es obligatorio'
+                    WHEN precio_venta <> '' AND precio_venta !~ '^\\d{1,8}(\\.\\d{1,2})?$' THEN 'Precio de venta inválido'
+                    WHEN stock_actual <> '' AND stock_actual !~ '^\\d{1,9}$' THEN 'Stock actual inválido'
+                    WHEN stock_minimo <> '' AND stock_minimo !~ '^\\d{1,9}$' THEN 'Stock mínimo inválido'
+                END
+            """)
+            
+            # Códigos repetidos en el archivo: vale la primera aparición
+            cursor.execute("""
+                UPDATE productos_importacion s
+                SET error = 'Código repetido en el archivo (línea ' || d.primera || ')'
+                FROM (
+                    SELECT linea, MIN(linea) OVER (PARTITION BY LOWER(codigo)) as primera
+                    FROM productos_importacion
+                    WHERE error IS NULL
+                ) d
+                WHERE s.linea = d.linea
+                AND d.linea <> d.primera
+            """)
+            
+            # Precio de venta >= costo, con los valores actuales para las columnas vacías
+            # (el CASE evita convertir filas inválidas si el planificador reordena los filtros)
+            cursor.execute("""
+                UPDATE productos_importacion s
+                SET error = 'El precio de venta debe ser mayor o igual al precio de costo'
+                FROM (
+                    SELECT i.linea,
+                           COALESCE(CASE WHEN i.error IS NULL AND i.precio_costo <> ''
+                                         THEN i.precio_costo::numeric END, p.precio_costo) as costo,
+                           COALESCE(CASE WHEN i.error IS NULL AND i.precio_venta <> ''
+                                         THEN i.precio_venta::numeric END, p.precio_venta) as venta
+                    FROM productos_importacion i
+                    LEFT JOIN productos p ON p.id_producto = i.id_producto
+                    WHERE i.error IS NULL
+                ) v
+                WHERE s.linea = v.linea
+                AND v.venta < v.costo
+            """)
+            
+            cursor.execute("""
+                SELECT linea, codigo, error
+                FROM productos_importacion
+                WHERE error IS NOT NULL
+                ORDER BY linea
+            """)
+            errores = [
+                {'linea': linea, 'codigo': codigo, 'error': error}
+                for linea, codigo, error in cursor.fetchall()
+            ]
+            
+            cursor.execute("""
+                SELECT COUNT(*) FILTER (WHERE id_producto IS NULL),
+                       COUNT(*) FILTER (WHERE id_producto IS NOT NULL)
+                FROM productos_importacion
+                WHERE error IS NULL
+            """)
+            nuevos, existentes = cursor.fetchone()
+            
+            if solo_validar:
+                connection.rollback()
+                return {
+                    'success': True,
+                    'message': f'Validación: {nuevos} productos nuevos, {existentes} existentes, '
+                               f'{len(errores)} filas con errores',
+                    'insertados': nuevos,
+                    'actualizados': existentes,
+                    'sin_cambios': 0,
+                    'errores': errores
+                }
+            
+            # 4. Aplicar las filas válidas en una sola sentencia
+            # (ordenadas por código: mismo orden de bloqueo entre importaciones concurrentes)
+            cursor.execute("""
+                WITH aplicados AS (
+                    INSERT INTO productos (
+                        codigo, nombre, descripcion, id_categoria,
+                        precio_costo, precio_venta,
+                        stock_actual, stock_minimo, unidad_medida
+                    )
+                    SELECT
+                        COALESCE(p.codigo, s.codigo),
+                        COALESCE(NULLIF(s.nombre, ''), p.nombre),
+                        COALESCE(s.descripcion, p.descripcion),
+                        COALESCE(s.id_categoria, p.id_categoria),
+                        COALESCE(NULLIF(s.precio_costo, '')::numeric, p.precio_costo),
+                        COALESCE(NULLIF(s.precio_venta, '')::numeric, p.precio_venta),
+                        COALESCE(p.stock_actual, NULLIF(s.stock_actual, '')::int, 0),
+                        COALESCE(NULLIF(s.stock_minimo, '')::int, p.stock_minimo, 10),
+                        COALESCE(s.unidad_medida, p.unidad_medida, 'unidad')
+                    FROM productos_importacion s
+                    LEFT JOIN productos p ON p.id_producto = s.id_producto
+                    WHERE s.error IS NULL
+                    ORDER BY LOWER(s.codigo)
+                    ON CONFLICT (codigo_normalizado) DO UPDATE
+                    SET nombre = EXCLUDED.nombre,
+                        descripcion = EXCLUDED.descripcion,
+                        id_categoria = EXCLUDED.id_categoria,
+                        precio_costo = EXCLUDED.precio_costo,
+                        precio_venta = EXCLUDED.precio_venta,
+                        stock_minimo = EXCLUDED.stock_minimo,
+                        unidad_medida = EXCLUDED.unidad_medida,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (productos.nombre, productos.descripcion, productos.id_categoria,
+                           productos.precio_costo, productos.precio_venta,
+                           productos.stock_minimo, productos.unidad_medida)
+                        IS DISTINCT FROM
+                          (EXCLUDED.nombre, EXCLUDED.descripcion, EXCLUDED.id_categoria,
+                           EXCLUDED.precio_costo, EXCLUDED.precio_venta,
+                           EXCLUDED.stock_minimo, EXCLUDED.unidad_medida)
+                    RETURNING (xmax = 0) as insertado
+                )
+                SELECT COUNT(*) FILTER (WHERE insertado),
+                       COUNT(*) FILTER (WHERE NOT insertado)
+                FROM aplicados
+            """)
+            insertados, actualizados = cursor.fetchone()
+            
+            connection.commit()
+            
+            return {
+                'success': True,
+                'message': f'{insertados} productos creados, {actualizados} actualizados, '
+                           f'{len(errores)} filas con errores',
+                'insertados': insertados,
+                'actualizados': actualizados,
+                'sin_cambios': nuevos + existentes - insertados - actualizados,
+                'errores': errores
+            }
+            
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {'success': False, 'message': f'Error al importar el catálogo: {str(e)}', 'errores': []}
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
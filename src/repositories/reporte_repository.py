@@ -2,9 +2,41 @@
 Repositorio para Reportes
 Maneja todas las consultas SQL para generación de reportes
 """
-from typing import List, Dict, Any
-from datetime import datetime, date
-from database.connection import DatabaseConnection
+from typing import List, Dict, Any, Tuple
+from datetime import datetime, date, timedelta
+from database.connection import DatabaseConnection, solo_lectura
+from database.sesion_reporte import SesionReporte
+
+
+# Cierre de caja diario: ventas del día y resumen por método de pago
+_CIERRE_DIARIO_VENTAS = """
+    SELECT 
+        v.id_venta,
+        v.numero_factura,
+        v.fecha_venta,
+        v.total,
+        v.metodo_pago,
+        c.nombre || ' ' || c.apellido as cliente,
+        e.nombre || ' ' || e.apellido as empleado
+    FROM ventas v
+    JOIN clientes cl ON v.id_cliente = cl.id_cliente
+    JOIN personas c ON cl.id_persona = c.id_persona
+    JOIN empleados emp ON v.id_empleado = emp.id_empleado
+    JOIN personas e ON emp.id_persona = e.id_persona
+    WHERE v.fecha_venta >= %s AND v.fecha_venta < %s
+    ORDER BY v.fecha_venta DESC
+"""
+
+_CIERRE_DIARIO_RESUMEN = """
+    SELECT 
+        COUNT(*) as total_ventas,
+        COALESCE(SUM(total), 0) as total_ingresos,
+        COALESCE(SUM(CASE WHEN metodo_pago = 'efectivo' THEN total ELSE 0 END), 0) as efectivo,
+        COALESCE(SUM(CASE WHEN metodo_pago = 'tarjeta' THEN total ELSE 0 END), 0) as tarjeta,
+        COALESCE(SUM(CASE WHEN metodo_pago = 'transferencia' THEN total ELSE 0 END), 0) as transferencia
+    FROM ventas
+    WHERE fecha_venta >= %s AND fecha_venta < %s
+"""
 
 
 class ReporteRepository:
@@ -13,6 +45,29 @@ class ReporteRepository:
     def __init__(self):
         self.db = DatabaseConnection()
     
+    @staticmethod
+    def _rango_mes(año: int, mes: int) -> Tuple[date, date]:
+        """Primer día del mes y primer día del mes siguiente (rango semiabierto)"""
+        inicio = date(año, mes, 1)
+        fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+        return inicio, fin
+    
+    @staticmethod
+    def _tramos(inicio: date, fin: date, partes: int) -> List[Tuple[date, date]]:
+        """
+        Divide el rango semiabierto [inicio, fin) en hasta `partes` tramos de
+        días completos, del más reciente al más antiguo (para consultas
+        ORDER BY fecha DESC que se concatenan)
+        """
+        dias = (fin - inicio).days
+        partes = max(1, min(partes, dias))
+        tramos = [
+            (inicio + timedelta(days=dias * i // partes), inicio + timedelta(days=dias * (i + 1) // partes))
+            for i in range(partes)
+        ]
+        return tramos[::-1]
+    
+    @solo_lectura
     def cierre_caja_diario(self, fecha: date) -> Dict[str, Any]:
         """
         Genera reporte de cierre de caja para un día específico
@@ -24,40 +79,15 @@ class ReporteRepository:
             Dict con ventas, ingresos, egresos y totales del día
         """
         try:
-            # Ventas del día
-            query_ventas = """
-                SELECT 
-                    v.id_venta,
-                    v.numero_factura,
-                    v.fecha_venta,
-                    v.total,
-                    v.metodo_pago,
-                    c.nombre || ' ' || c.apellido as cliente,
-                    e.nombre || ' ' || e.apellido as empleado
-                FROM ventas v
-                JOIN clientes cl ON v.id_cliente = cl.id_cliente
-                JOIN personas c ON cl.id_persona = c.id_persona
-                JOIN empleados emp ON v.id_empleado = emp.id_empleado
-                JOIN personas e ON emp.id_persona = e.id_persona
-                WHERE DATE(v.fecha_venta) = %s
-                ORDER BY v.fecha_venta DESC
-            """
-            
-            ventas = self.db.execute_query(query_ventas, (fecha,))
-            
-            # Resumen del día
-            query_resumen = """
-                SELECT 
-                    COUNT(*) as total_ventas,
-                    COALESCE(SUM(total), 0) as total_ingresos,
-                    COALESCE(SUM(CASE WHEN metodo_pago = 'efectivo' THEN total ELSE 0 END), 0) as efectivo,
-                    COALESCE(SUM(CASE WHEN metodo_pago = 'tarjeta' THEN total ELSE 0 END), 0) as tarjeta,
-                    COALESCE(SUM(CASE WHEN metodo_pago = 'transferencia' THEN total ELSE 0 END), 0) as transferencia
-                FROM ventas
-                WHERE DATE(fecha_venta) = %s
-            """
+            # Rango semiabierto sobre fecha_venta: usa el índice y descarta particiones
+            rango = (fecha, fecha + timedelta(days=1))
             
-            resumen = self.db.execute_query(query_resumen, (fecha,), fetch='one')
+            # Ventas y resumen del día sobre el mismo snapshot: cuadran entre sí
+            with SesionReporte(self.db) as sesion:
+                ventas, resumen = sesion.en_paralelo([
+                    (_CIERRE_DIARIO_VENTAS, rango, True),
+                    (_CIERRE_DIARIO_RESUMEN, rango, 'one')
+                ])
             
             return {
                 'success': True,
@@ -69,6 +99,7 @@ class ReporteRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def cierre_caja_mensual(self, año: int, mes: int) -> Dict[str, Any]:
         """
         Genera reporte de cierre de caja mensual
@@ -90,13 +121,12 @@ class ReporteRepository:
                     COALESCE(SUM(CASE WHEN metodo_pago = 'tarjeta' THEN total ELSE 0 END), 0) as tarjeta,
                     COALESCE(SUM(CASE WHEN metodo_pago = 'transferencia' THEN total ELSE 0 END), 0) as transferencia
                 FROM ventas
-                WHERE EXTRACT(YEAR FROM fecha_venta) = %s
-                AND EXTRACT(MONTH FROM fecha_venta) = %s
+                WHERE fecha_venta >= %s AND fecha_venta < %s
                 GROUP BY DATE(fecha_venta)
                 ORDER BY fecha DESC
             """
             
-            datos_diarios = self.db.execute_query(query, (año, mes))
+            rango = self._rango_mes(año, mes)
             
             # Resumen total del mes
             query_resumen = """
@@ -105,11 +135,18 @@ class ReporteRepository:
                     COALESCE(SUM(total), 0) as total_ingresos,
                     COALESCE(AVG(total), 0) as promedio_venta
                 FROM ventas
-                WHERE EXTRACT(YEAR FROM fecha_venta) = %s
-                AND EXTRACT(MONTH FROM fecha_venta) = %s
+                WHERE fecha_venta >= %s AND fecha_venta < %s
             """
             
-            resumen = self.db.execute_query(query_resumen, (año, mes), fetch='one')
+            # Días del mes repartidos en tramos entre las conexiones de la
+            # sesión, más el resumen; todo sobre el mismo snapshot
+            with SesionReporte(self.db) as sesion:
+                tramos = self._tramos(*rango, sesion.paralelismo)
+                resultados = sesion.en_paralelo(
+                    [(query, tramo, True) for tramo in tramos] + [(query_resumen, rango, 'one')]
+                )
+            datos_diarios = [fila for parte in resultados[:-1] for fila in parte]
+            resumen = resultados[-1]
             
             return {
                 'success': True,
@@ -122,6 +159,7 @@ class ReporteRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def compras_por_periodo(self, fecha_inicio: date, fecha_fin: date) -> Dict[str, Any]:
         """
         Genera reporte de compras en un periodo de tiempo
@@ -148,13 +186,13 @@ class ReporteRepository:
                 JOIN empleados emp ON c.id_empleado = emp.id_empleado
                 JOIN personas e ON emp.id_persona = e.id_persona
                 LEFT JOIN detalle_compras dc ON c.id_compra = dc.id_compra
-                WHERE DATE(c.fecha_compra) BETWEEN %s AND %s
+                WHERE c.fecha_compra >= %s AND c.fecha_compra < %s
                 GROUP BY c.id_compra, c.numero_factura, c.fecha_compra, c.total, 
                          prov.nombre_empresa, e.nombre, e.apellido
                 ORDER BY c.fecha_compra DESC
             """
             
-            compras = self.db.execute_query(query_compras, (fecha_inicio, fecha_fin))
+            rango = (fecha_inicio, fecha_fin + timedelta(days=1))
             
             # Resumen del periodo
             query_resumen = """
@@ -163,10 +201,17 @@ class ReporteRepository:
                     COALESCE(SUM(total), 0) as total_gastado,
                     COALESCE(AVG(total), 0) as promedio_compra
                 FROM compras
-                WHERE DATE(fecha_compra) BETWEEN %s AND %s
+                WHERE fecha_compra >= %s AND fecha_compra < %s
             """
             
-            resumen = self.db.execute_query(query_resumen, (fecha_inicio, fecha_fin), fetch='one')
+            # Periodo repartido en tramos entre las conexiones de la sesión
+            with SesionReporte(self.db) as sesion:
+                tramos = self._tramos(*rango, sesion.paralelismo)
+                resultados = sesion.en_paralelo(
+                    [(query_compras, tramo, True) for tramo in tramos] + [(query_resumen, rango, 'one')]
+                )
+            compras = [fila for parte in resultados[:-1] for fila in parte]
+            resumen = resultados[-1]
             
             return {
                 'success': True,
@@ -179,10 +224,17 @@ class ReporteRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def productos_y_existencias(self) -> Dict[str, Any]:
         """
         Genera reporte de productos con sus existencias actuales
         
+        Los conteos y unidades salen del listado de productos (al momento,
+        como el detalle). Los valores del inventario (al costo y a precio de
+        venta, total y por categoría) se leen de la vista materializada
+        valorizacion_inventario (puede tener unos minutos de atraso;
+        'valorizacion_actualizada' indica el último refresco).
+        
         Returns:
             Dict con listado de productos, stock y alertas
         """
@@ -193,6 +245,7 @@ class ReporteRepository:
                     p.codigo,
                     p.nombre,
                     p.descripcion,
+                    p.id_categoria,
                     c.nombre as categoria,
                     p.stock_actual,
                     p.stock_minimo,
@@ -215,35 +268,82 @@ class ReporteRepository:
                     p.nombre
             """
             
-            productos = self.db.execute_query(query)
-            
-            # Estadísticas de inventario
-            query_stats = """
+            # Valorización por categoría (vista materializada, ver ValorizacionService)
+            query_valorizacion = """
                 SELECT 
-                    COUNT(*) as total_productos,
-                    COUNT(CASE WHEN stock_actual = 0 THEN 1 END) as sin_stock,
-                    COUNT(CASE WHEN stock_actual <= stock_minimo AND stock_actual > 0 THEN 1 END) as bajo_stock,
-                    COALESCE(SUM(stock_actual), 0) as total_unidades,
-                    COALESCE(SUM(stock_actual * precio_venta), 0) as valor_inventario
-                FROM productos
-                WHERE estado = true
+                    id_categoria,
+                    categoria,
+                    productos,
+                    sin_stock,
+                    bajo_stock,
+                    unidades,
+                    valor_costo,
+                    valor_venta
+                FROM valorizacion_inventario
+                ORDER BY valor_venta DESC
+            """
+            
+            query_actualizado = """
+                SELECT MAX(actualizado) as actualizado
+                FROM valorizacion_inventario_diaria
+                WHERE fecha = (SELECT MAX(fecha) FROM valorizacion_inventario_diaria)
             """
             
-            stats = self.db.execute_query(query_stats, fetch='one')
+            with SesionReporte(self.db) as sesion:
+                productos, valorizacion, actualizado = sesion.en_paralelo([
+                    (query, None, True),
+                    (query_valorizacion, None, True),
+                    (query_actualizado, None, 'one')
+                ])
+            productos = productos or []
+            
+            # Conteos de los productos activos del mismo snapshot que el
+            # listado, por categoría como en la vista (sin categoría = 0)
+            activos = [p for p in productos if p['estado']]
+            conteos = {}
+            for p in activos:
+                conteo = conteos.setdefault(p['id_categoria'] or 0, {
+                    'productos': 0, 'sin_stock': 0, 'bajo_stock': 0, 'unidades': 0
+                })
+                conteo['productos'] += 1
+                conteo['sin_stock'] += p['nivel_stock'] == 'SIN_STOCK'
+                conteo['bajo_stock'] += p['nivel_stock'] == 'BAJO_STOCK'
+                conteo['unidades'] += p['stock_actual'] or 0
+            
+            # De la vista solo los valores al costo y a precio de venta
+            vacio = {'productos': 0, 'sin_stock': 0, 'bajo_stock': 0, 'unidades': 0}
+            valorizacion = [
+                {**v, **conteos.get(v['id_categoria'], vacio)} for v in valorizacion or []
+            ]
+            
+            stats = {
+                'total_productos': len(activos),
+                'sin_stock': sum(c['sin_stock'] for c in conteos.values()),
+                'bajo_stock': sum(c['bajo_stock'] for c in conteos.values()),
+                'total_unidades': sum(c['unidades'] for c in conteos.values()),
+                'valor_inventario': sum(v['valor_venta'] for v in valorizacion),
+                'valor_costo': sum(v['valor_costo'] for v in valorizacion)
+            }
             
             return {
                 'success': True,
-                'productos': productos or [],
-                'estadisticas': stats or {}
+                'productos': productos,
+                'estadisticas': stats,
+                'valorizacion': valorizacion,
+                'valorizacion_actualizada': actualizado['actualizado'] if actualizado else None
             }
             
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def cartera_clientes(self) -> Dict[str, Any]:
         """
         Genera reporte de cartera de clientes con historial de compras
         
+        Las estadísticas de compra (ventas completadas) se mantienen en
+        clientes junto con cada venta: una fila por cliente, sin leer ventas.
+        
         Returns:
             Dict con listado de clientes y sus estadísticas
         """
@@ -257,33 +357,33 @@ class ReporteRepository:
                     p.telefono,
                     p.dpi_nit,
                     p.direccion,
-                    COUNT(v.id_venta) as total_compras,
-                    COALESCE(SUM(v.total), 0) as total_gastado,
-                    COALESCE(MAX(v.fecha_venta), NULL) as ultima_compra
+                    c.cantidad_compras as total_compras,
+                    c.total_compras as total_gastado,
+                    c.ticket_promedio,
+                    c.fecha_ultima_compra as ultima_compra
                 FROM clientes c
                 JOIN personas p ON c.id_persona = p.id_persona
-                LEFT JOIN ventas v ON c.id_cliente = v.id_cliente
                 WHERE p.estado = true
-                GROUP BY c.id_cliente, p.nombre, p.apellido, p.email, 
-                         p.telefono, p.dpi_nit, p.direccion
-                ORDER BY total_gastado DESC
+                ORDER BY c.total_compras DESC
             """
             
-            clientes = self.db.execute_query(query)
-            
             # Estadísticas generales
             query_stats = """
                 SELECT 
-                    COUNT(DISTINCT c.id_cliente) as total_clientes,
-                    COUNT(v.id_venta) as total_ventas,
-                    COALESCE(AVG(v.total), 0) as ticket_promedio
+                    COUNT(*) as total_clientes,
+                    COALESCE(SUM(c.cantidad_compras), 0) as total_ventas,
+                    COALESCE(SUM(c.total_compras) / NULLIF(SUM(c.cantidad_compras), 0), 0) as ticket_promedio
                 FROM clientes c
                 JOIN personas p ON c.id_persona = p.id_persona
-                LEFT JOIN ventas v ON c.id_cliente = v.id_cliente
                 WHERE p.estado = true
             """
             
-            stats = self.db.execute_query(query_stats, fetch='one')
+            # Listado y estadísticas sobre el mismo snapshot
+            with SesionReporte(self.db) as sesion:
+                clientes, stats = sesion.en_paralelo([
+                    (query, None, True),
+                    (query_stats, None, 'one')
+                ])
             
             return {
                 'success': True,
@@ -294,10 +394,14 @@ class ReporteRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def cartera_proveedores(self) -> Dict[str, Any]:
         """
         Genera reporte de cartera de proveedores con historial
         
+        Las estadísticas (compras no canceladas) se leen de
+        estadisticas_proveedores, que se mantiene junto con cada compra.
+        
         Returns:
             Dict con listado de proveedores y sus estadísticas
         """
@@ -310,32 +414,37 @@ class ReporteRepository:
                     prov.email_empresa as email,
                     prov.telefono_empresa as telefono,
                     prov.direccion_empresa as direccion,
-                    COUNT(c.id_compra) as total_compras,
-                    COALESCE(SUM(c.total), 0) as total_comprado,
-                    COALESCE(MAX(c.fecha_compra), NULL) as ultima_compra
+                    COALESCE(ep.cantidad_compras, 0) as total_compras,
+                    COALESCE(ep.total_comprado, 0) as total_comprado,
+                    COALESCE(em.total_comprado, 0) as comprado_mes,
+                    ep.ultima_compra
                 FROM proveedores prov
                 LEFT JOIN personas p ON prov.id_persona_contacto = p.id_persona
-                LEFT JOIN compras c ON prov.id_proveedor = c.id_proveedor
+                LEFT JOIN estadisticas_proveedores ep ON ep.id_proveedor = prov.id_proveedor
+                LEFT JOIN estadisticas_proveedores_mes em
+                    ON em.id_proveedor = prov.id_proveedor
+                    AND em.mes = date_trunc('month', CURRENT_DATE)::date
                 WHERE prov.estado = true
-                GROUP BY prov.id_proveedor, prov.nombre_empresa, p.nombre, p.apellido,
-                         prov.email_empresa, prov.telefono_empresa, prov.direccion_empresa
                 ORDER BY total_comprado DESC
             """
             
-            proveedores = self.db.execute_query(query)
-            
             # Estadísticas generales
             query_stats = """
                 SELECT 
-                    COUNT(DISTINCT prov.id_proveedor) as total_proveedores,
-                    COUNT(c.id_compra) as total_compras,
-                    COALESCE(AVG(c.total), 0) as compra_promedio
+                    COUNT(*) as total_proveedores,
+                    COALESCE(SUM(ep.cantidad_compras), 0) as total_compras,
+                    COALESCE(SUM(ep.total_comprado) / NULLIF(SUM(ep.cantidad_compras), 0), 0) as compra_promedio
                 FROM proveedores prov
-                LEFT JOIN compras c ON prov.id_proveedor = c.id_proveedor
+                LEFT JOIN estadisticas_proveedores ep ON ep.id_proveedor = prov.id_proveedor
                 WHERE prov.estado = true
             """
             
-            stats = self.db.execute_query(query_stats, fetch='one')
+            # Listado y estadísticas sobre el mismo snapshot
+            with SesionReporte(self.db) as sesion:
+                proveedores, stats = sesion.en_paralelo([
+                    (query, None, True),
+                    (query_stats, None, 'one')
+                ])
             
             return {
                 'success': True,
@@ -346,10 +455,14 @@ class ReporteRepository:
         except Exception as e:
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    @solo_lectura
     def cartera_empleados(self) -> Dict[str, Any]:
         """
         Genera reporte de cartera de empleados con información laboral
         
+        Las ventas completadas de cada empleado (total y del mes en curso) se
+        leen de estadisticas_empleados / estadisticas_empleados_mes.
+        
         Returns:
             Dict con listado de empleados y sus datos
         """
@@ -367,20 +480,21 @@ class ReporteRepository:
                     e.fecha_contratacion,
                     e.salario,
                     e.estado,
-                    COUNT(DISTINCT v.id_venta) as total_ventas_realizadas,
-                    COALESCE(SUM(v.total), 0) as monto_total_ventas
+                    COALESCE(ee.cantidad_ventas, 0) as total_ventas_realizadas,
+                    COALESCE(ee.total_vendido, 0) as monto_total_ventas,
+                    COALESCE(em.cantidad_ventas, 0) as ventas_mes,
+                    COALESCE(em.total_vendido, 0) as monto_ventas_mes,
+                    ee.ultima_venta
                 FROM empleados e
                 JOIN personas p ON e.id_persona = p.id_persona
                 JOIN roles r ON e.id_rol = r.id_rol
-                LEFT JOIN ventas v ON e.id_empleado = v.id_empleado
-                GROUP BY e.id_empleado, p.nombre, p.apellido, p.email, p.telefono,
-                         p.dpi_nit, e.puesto, r.nombre, e.fecha_contratacion, 
-                         e.salario, e.estado
+                LEFT JOIN estadisticas_empleados ee ON ee.id_empleado = e.id_empleado
+                LEFT JOIN estadisticas_empleados_mes em
+                    ON em.id_empleado = e.id_empleado
+                    AND em.mes = date_trunc('month', CURRENT_DATE)::date
                 ORDER BY e.estado DESC, p.apellido, p.nombre
             """
             
-            empleados = self.db.execute_query(query)
-            
             # Estadísticas generales
             query_stats = """
                 SELECT 
@@ -392,7 +506,12 @@ class ReporteRepository:
                 JOIN personas p ON e.id_persona = p.id_persona
             """
             
-            stats = self.db.execute_query(query_stats, fetch='one')
+            # Listado y estadísticas sobre el mismo snapshot
+            with SesionReporte(self.db) as sesion:
+                empleados, stats = sesion.en_paralelo([
+                    (query, None, True),
+                    (query_stats, None, 'one')
+                ])
             
             return {
                 'success': True,
@@ -3,28 +3,162 @@ Repository para gestión de Ventas.
 Maneja operaciones CRUD y lógica de negocio relacionada con ventas.
 """
 from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+import os
+import time
+import psycopg2
+from psycopg2.extras import Json
 from database.connection import DatabaseConnection
 from models.venta import Venta, DetalleVenta
+from utils.metricas import VENTAS_CREADAS, VENTAS_ANULADAS, LATENCIA_CHECKOUT
+
+
+# Estadísticas del vendedor (total y del mes de la venta) para una venta nueva
+_SUMAR_VENTA_EMPLEADO = """
+    WITH total AS (
+        INSERT INTO estadisticas_empleados AS e (id_empleado, cantidad_ventas, total_vendido, ultima_venta)
+        VALUES (%(id_empleado)s, 1, %(total)s, %(fecha)s)
+        ON CONFLICT (id_empleado) DO UPDATE
+        SET cantidad_ventas = e.cantidad_ventas + 1,
+            total_vendido = e.total_vendido + EXCLUDED.total_vendido,
+            ultima_venta = GREATEST(e.ultima_venta, EXCLUDED.ultima_venta)
+    )
+    INSERT INTO estadisticas_empleados_mes AS m (id_empleado, mes, cantidad_ventas, total_vendido)
+    VALUES (%(id_empleado)s, date_trunc('month', %(fecha)s::timestamp)::date, 1, %(total)s)
+    ON CONFLICT (id_empleado, mes) DO UPDATE
+    SET cantidad_ventas = m.cantidad_ventas + 1,
+        total_vendido = m.total_vendido + EXCLUDED.total_vendido
+"""
+
+# Lo inverso al anular; la última venta solo se busca de nuevo si la anulada era la más reciente
+_RESTAR_VENTA_EMPLEADO = """
+    WITH total AS (
+        UPDATE estadisticas_empleados
+        SET cantidad_ventas = GREATEST(cantidad_ventas - 1, 0),
+            total_vendido = total_vendido - %(total)s,
+            ultima_venta = CASE
+                WHEN ultima_venta > %(fecha)s THEN ultima_venta
+                ELSE (
+                    SELECT MAX(v.fecha_venta)
+                    FROM ventas v
+                    WHERE v.id_empleado = %(id_empleado)s
+                    AND v.estado = 'completada'
+                )
+            END
+        WHERE id_empleado = %(id_empleado)s
+    )
+    UPDATE estadisticas_empleados_mes
+    SET cantidad_ventas = GREATEST(cantidad_ventas - 1, 0),
+        total_vendido = total_vendido - %(total)s
+    WHERE id_empleado = %(id_empleado)s
+    AND mes = date_trunc('month', %(fecha)s::timestamp)::date
+"""
+
+
+# 'sentencias': checkout desde Python; 'funcion': una llamada a registrar_venta(jsonb)
+MODOS_CHECKOUT = ('sentencias', 'funcion')
+
+# Conexión perdida, deadlock o timeout: con clave de idempotencia es seguro reintentar
+_ERRORES_REINTENTABLES = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# Reserva la clave de la venta. Si otro intento con la misma clave está en curso
+# espera a que termine; si ya se confirmó, no inserta (rowcount 0)
+_RESERVAR_CLAVE = """
+    INSERT INTO ventas_clave_idempotencia (clave)
+    VALUES (%s)
+    ON CONFLICT (clave) DO NOTHING
+"""
+
+
+# Sentencias del checkout que se ejecutan por línea o por venta: preparadas
+# una vez por conexión (DatabaseConnection.registrar_sentencia)
+# Bloquea los productos de la venta en orden de id hasta el commit, como
+# registrar_venta: dos ventas con productos en común esperan una a la otra
+# (sin deadlocks) y el stock validado no cambia antes de descontarlo
+_BLOQUEAR_PRODUCTOS = DatabaseConnection.registrar_sentencia('venta_bloquear_productos', """
+    SELECT id_producto, stock_actual, nombre, estado
+    FROM productos 
+    WHERE id_producto = ANY(%s::int[])
+    ORDER BY id_producto
+    FOR UPDATE
+""")
+
+_INSERTAR_VENTA = DatabaseConnection.registrar_sentencia('venta_insertar', """
+    INSERT INTO ventas (
+        numero_factura, id_cliente, id_empleado, id_caja,
+        fecha_venta, subtotal, descuento, total,
+        metodo_pago, estado, observaciones
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id_venta, fecha_venta
+""")
+
+_INSERTAR_DETALLE = DatabaseConnection.registrar_sentencia('venta_insertar_detalle', """
+    INSERT INTO detalle_ventas (
+        id_venta, fecha_venta, id_producto, cantidad, 
+        precio_unitario, subtotal
+    ) VALUES (%s, %s, %s, %s, %s, %s)
+""")
+
+_RESTAR_STOCK = DatabaseConnection.registrar_sentencia('venta_restar_stock', """
+    UPDATE productos 
+    SET stock_actual = stock_actual - %s,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id_producto = %s
+""")
+
+_INSERTAR_MOVIMIENTO_CAJA = DatabaseConnection.registrar_sentencia('venta_movimiento_caja', """
+    INSERT INTO movimientos_caja (
+        id_caja, tipo, concepto, monto, 
+        fecha_movimiento, id_empleado, observaciones
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+""")
+
+# Bloquea la fila de la caja hasta el commit: un cierre concurrente espera a
+# la venta o la venta ve la caja cerrada
+_SUMAR_VENTA_CAJA = DatabaseConnection.registrar_sentencia('venta_sumar_caja', """
+    UPDATE cajas 
+    SET total_ventas = total_ventas + %s,
+        total_ingresos = total_ingresos + %s
+    WHERE id_caja = %s AND estado = 'abierta'
+""")
 
 
 class VentaRepository:
     """Repository para operaciones de ventas"""
     
-    def __init__(self):
+    def __init__(self, modo_checkout: Optional[str] = None):
+        """
+        Args:
+            modo_checkout: Uno de MODOS_CHECKOUT; por defecto la variable de
+                entorno VENTAS_MODO_CHECKOUT o 'sentencias'
+        """
         self.db = DatabaseConnection()
+        self.modo_checkout = modo_checkout or os.getenv('VENTAS_MODO_CHECKOUT') or 'sentencias'
+        self.reintentos = int(os.getenv('VENTAS_REINTENTOS', '2') or 0)
+        if self.modo_checkout not in MODOS_CHECKOUT:
+            raise ValueError(
+                f"Modo de checkout desconocido: {self.modo_checkout}. Opciones: {', '.join(MODOS_CHECKOUT)}"
+            )
     
     def crear(self, venta: Venta, id_caja_actual: int) -> Dict[str, Any]:
         """
         Crea una nueva venta con sus detalles.
         
         Proceso:
-        1. Validar stock disponible para todos los productos
+        1. Bloquear los productos (en orden de id) y validar el stock disponible
         2. Insertar venta en tabla ventas
         3. Insertar detalles en tabla detalle_ventas
         4. RESTAR stock de cada producto (stock_actual - cantidad)
         5. Registrar movimiento de caja (ingreso)
         
+        En modo 'funcion' todo el proceso lo hace registrar_venta(jsonb) en el
+        servidor con una sola llamada.
+        
+        Con venta.clave_idempotencia (UUID generado por la terminal) la venta se
+        registra una sola vez: un reintento con la misma clave retorna la venta
+        original ('repetida': True) sin repetir el checkout. Por eso, con clave,
+        los errores de conexión se reintentan solos (VENTAS_REINTENTOS, 2 por defecto).
+        
         Args:
             venta: Objeto Venta con detalles
             id_caja_actual: ID de la caja abierta actual
@@ -32,8 +166,7 @@ class VentaRepository:
         Returns:
             Dict con success y id_venta o mensaje de error
         """
-        connection = None
-        cursor = None
+        inicio = time.perf_counter()
         
         try:
             # Validar venta
@@ -41,42 +174,70 @@ class VentaRepository:
             if not es_valido:
                 return {'success': False, 'message': mensaje}
             
+            reintentos = self.reintentos if venta.clave_idempotencia else 0
+            for intento in range(reintentos + 1):
+                try:
+                    if self.modo_checkout == 'funcion':
+                        return self._crear_con_funcion(venta, id_caja_actual)
+                    return self._crear_con_sentencias(venta, id_caja_actual)
+                except _ERRORES_REINTENTABLES as e:
+                    if intento == reintentos:
+                        # Sin clave el commit pudo llegar al servidor aunque la
+                        # respuesta se perdiera: reenviar podría duplicar la venta
+                        if not venta.clave_idempotencia:
+                            return self._error_crear(e)
+                        # 'reintentable': falló la conexión; reenviar con la misma clave es seguro
+                        return {**self._error_crear(e), 'reintentable': True}
+                    time.sleep(min(0.25 * 2 ** intento, 2.0))
+        
+        finally:
+            LATENCIA_CHECKOUT.observe(time.perf_counter() - inicio)
+    
+    def _crear_con_sentencias(self, venta: Venta, id_caja_actual: int) -> Dict[str, Any]:
+        """Checkout desde Python; los errores reintentables se propagan a crear()"""
+        connection = None
+        cursor = None
+        
+        try:
             connection = self.db.get_connection()
             cursor = connection.cursor()
             
-            # Paso 1: Validar stock disponible para todos los productos
+            # Paso 0: Reservar la clave de idempotencia; si ya existe, la venta
+            # se registró en un intento anterior
+            if venta.clave_idempotencia:
+                cursor.execute(_RESERVAR_CLAVE, (venta.clave_idempotencia,))
+                if cursor.rowcount == 0:
+                    resultado = self._venta_repetida(cursor, venta.clave_idempotencia)
+                    connection.rollback()
+                    return resultado
+            
+            # Paso 1: Bloquear los productos en orden de id y validar el stock
+            # sobre las filas bloqueadas (las líneas de un mismo producto se suman)
+            cantidades = {}
             for detalle in venta.detalles:
-                cursor.execute("""
-                    SELECT stock_actual, nombre 
-                    FROM productos 
-                    WHERE id_producto = %s AND estado = true
-                """, (detalle.id_producto,))
-                
-                producto_data = cursor.fetchone()
-                if not producto_data:
+                cantidades[detalle.id_producto] = cantidades.get(detalle.id_producto, 0) + detalle.cantidad
+            
+            self.db.ejecutar(cursor, _BLOQUEAR_PRODUCTOS, (sorted(cantidades),))
+            productos = {fila[0]: fila[1:] for fila in cursor.fetchall()}
+            
+            for id_producto, cantidad in sorted(cantidades.items()):
+                stock_actual, nombre_producto, activo = productos.get(id_producto, (None, None, False))
+                if not activo:
+                    connection.rollback()
                     return {
                         'success': False, 
-                        'message': f'El producto con ID {detalle.id_producto} no existe o está inactivo'
+                        'message': f'El producto con ID {id_producto} no existe o está inactivo'
                     }
                 
-                stock_actual = producto_data[0]
-                nombre_producto = producto_data[1]
-                
-                if stock_actual < detalle.cantidad:
+                if stock_actual < cantidad:
+                    connection.rollback()
                     return {
                         'success': False,
-                        'message': f'Stock insuficiente para {nombre_producto}. Disponible: {stock_actual}, Solicitado: {detalle.cantidad}'
+                        'message': f'Stock insuficiente para {nombre_producto}. Disponible: {stock_actual}, Solicitado: {cantidad}'
                     }
             
             # Paso 2: Insertar venta
-            cursor.execute("""
-                INSERT INTO ventas (
-                    numero_factura, id_cliente, id_empleado, id_caja,
-                    fecha_venta, subtotal, descuento, total,
-                    metodo_pago, estado, observaciones
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id_venta
-            """, (
+            self.db.ejecutar(cursor, _INSERTAR_VENTA, (
                 venta.numero_factura,
                 venta.id_cliente,
                 venta.id_empleado,
@@ -90,39 +251,26 @@ class VentaRepository:
                 venta.observaciones
             ))
             
-            id_venta = cursor.fetchone()[0]
+            id_venta, fecha_venta = cursor.fetchone()
             
-            # Paso 3: Insertar detalles y actualizar stock
+            # Paso 3: Insertar detalles
             for detalle in venta.detalles:
                 # Insertar detalle
-                cursor.execute("""
-                    INSERT INTO detalle_ventas (
-                        id_venta, id_producto, cantidad, 
-                        precio_unitario, subtotal
-                    ) VALUES (%s, %s, %s, %s, %s)
-                """, (
+                self.db.ejecutar(cursor, _INSERTAR_DETALLE, (
                     id_venta,
+                    fecha_venta,
                     detalle.id_producto,
                     detalle.cantidad,
                     detalle.precio_unitario,
                     detalle.subtotal
                 ))
-                
-                # Paso 4: RESTAR stock (VENTAS DISMINUYEN EL STOCK)
-                cursor.execute("""
-                    UPDATE productos 
-                    SET stock_actual = stock_actual - %s,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id_producto = %s
-                """, (detalle.cantidad, detalle.id_producto))
+            
+            # Paso 4: RESTAR stock (VENTAS DISMINUYEN EL STOCK), en orden de id
+            for id_producto, cantidad in sorted(cantidades.items()):
+                self.db.ejecutar(cursor, _RESTAR_STOCK, (cantidad, id_producto))
             
             # Paso 5: Registrar movimiento de caja (INGRESO)
-            cursor.execute("""
-                INSERT INTO movimientos_caja (
-                    id_caja, tipo, concepto, monto, 
-                    fecha_movimiento, id_empleado, observaciones
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
+            self.db.ejecutar(cursor, _INSERTAR_MOVIMIENTO_CAJA, (
                 id_caja_actual,
                 'ingreso',
                 f'Venta - Factura {venta.numero_factura}',
@@ -132,46 +280,43 @@ class VentaRepository:
                 f'Método de pago: {venta.metodo_pago}'
             ))
             
-            # Actualizar totales de caja
-            cursor.execute("""
-                UPDATE cajas 
-                SET total_ventas = total_ventas + %s,
-                    total_ingresos = total_ingresos + %s
-                WHERE id_caja = %s
-            """, (venta.total, venta.total, id_caja_actual))
+            # Actualizar totales de caja (bloquea la fila hasta el commit)
+            self.db.ejecutar(cursor, _SUMAR_VENTA_CAJA, (venta.total, venta.total, id_caja_actual))
+            
+            if cursor.rowcount == 0:
+                connection.rollback()
+                return {
+                    'success': False,
+                    'message': 'La caja fue cerrada. Abra una caja para continuar vendiendo.'
+                }
             
-            # Paso 6: Actualizar datos del cliente (si hay cliente)
+            # Paso 6: Actualizar estadísticas del cliente (si hay cliente)
             if venta.id_cliente:
-                # Verificar si es la primera compra
                 cursor.execute("""
-                    SELECT fecha_primera_compra
-                    FROM clientes
-                    WHERE id_cliente = %s
-                """, (venta.id_cliente,))
-                
-                cliente_data = cursor.fetchone()
-                if cliente_data:
-                    fecha_primera = cliente_data[0]
-                    
-                    if fecha_primera is None:
-                        # Es la primera compra, actualizar fecha y total
-                        cursor.execute("""
-                            UPDATE clientes
-                            SET fecha_primera_compra = CURRENT_DATE,
-                                total_compras = %s,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id_cliente = %s
-                        """, (venta.total, venta.id_cliente))
-                    else:
-                        # Ya tiene compras, solo sumar al total
-                        cursor.execute("""
-                            UPDATE clientes
-                            SET total_compras = total_compras + %s,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id_cliente = %s
-                        """, (venta.total, venta.id_cliente))
+                    UPDATE clientes
+                    SET cantidad_compras = cantidad_compras + 1,
+                        total_compras = total_compras + %(total)s,
+                        fecha_primera_compra = COALESCE(fecha_primera_compra, %(fecha)s::date),
+                        fecha_ultima_compra = GREATEST(fecha_ultima_compra, %(fecha)s),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id_cliente = %(id_cliente)s
+                """, {'total': venta.total, 'fecha': fecha_venta, 'id_cliente': venta.id_cliente})
+            
+            # Paso 7: Actualizar estadísticas del vendedor
+            cursor.execute(_SUMAR_VENTA_EMPLEADO, {
+                'id_empleado': venta.id_empleado, 'total': venta.total, 'fecha': fecha_venta
+            })
+            
+            # Paso 8: Asociar la clave de idempotencia a la venta
+            if venta.clave_idempotencia:
+                cursor.execute("""
+                    UPDATE ventas_clave_idempotencia
+                    SET id_venta = %s, fecha_venta = %s, numero_factura = %s
+                    WHERE clave = %s
+                """, (id_venta, fecha_venta, venta.numero_factura, venta.clave_idempotencia))
             
             connection.commit()
+            VENTAS_CREADAS.inc(metodo_pago=venta.metodo_pago)
             
             return {
                 'success': True,
@@ -179,31 +324,138 @@ class VentaRepository:
                 'message': 'Venta registrada exitosamente'
             }
             
+        except _ERRORES_REINTENTABLES:
+            self._revertir(connection)
+            raise
+        
         except Exception as e:
             if connection:
                 connection.rollback()
-            
-            error_msg = str(e).lower()
-            
-            # Manejo de errores específicos
-            if 'duplicate' in error_msg or 'unique' in error_msg:
-                if 'numero_factura' in error_msg:
-                    return {
-                        'success': False,
-                        'message': 'El número de factura ya existe. Por favor ingrese un número diferente.'
+            return self._error_crear(e)
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
+    
+    def _crear_con_funcion(self, venta: Venta, id_caja_actual: int) -> Dict[str, Any]:
+        """
+        Checkout con registrar_venta(jsonb): la función es atómica por sí sola,
+        así que se ejecuta en autocommit y no hace falta el viaje del COMMIT
+        """
+        connection = None
+        cursor = None
+        
+        try:
+            payload = {
+                'numero_factura': venta.numero_factura,
+                'id_cliente': venta.id_cliente,
+                'id_empleado': venta.id_empleado,
+                'id_caja': id_caja_actual,
+                'fecha_venta': venta.fecha_venta.isoformat() if venta.fecha_venta else None,
+                'subtotal': venta.subtotal,
+                'descuento': venta.descuento,
+                'total': venta.total,
+                'metodo_pago': venta.metodo_pago,
+                'estado': venta.estado,
+                'observaciones': venta.observaciones,
+                'clave_idempotencia': venta.clave_idempotencia,
+                'detalles': [
+                    {
+                        'id_producto': d.id_producto,
+                        'cantidad': d.cantidad,
+                        'precio_unitario': d.precio_unitario,
+                        'subtotal': d.subtotal
                     }
+                    for d in venta.detalles
+                ]
+            }
             
+            connection = self.db.get_connection()
+            connection.autocommit = True
+            cursor = connection.cursor()
+            cursor.execute("SELECT registrar_venta(%s)", (Json(payload),))
+            resultado = cursor.fetchone()[0]
+            
+            if resultado.get('repetida'):
+                return {
+                    'success': True,
+                    'id_venta': resultado['id_venta'],
+                    'numero_factura': resultado['numero_factura'],
+                    'repetida': True,
+                    'message': f"La venta {resultado['numero_factura']} ya estaba registrada"
+                }
+            
+            VENTAS_CREADAS.inc(metodo_pago=venta.metodo_pago)
             return {
-                'success': False,
-                'message': f'Error al crear venta: {str(e)}'
+                'success': True,
+                'id_venta': resultado['id_venta'],
+                'message': 'Venta registrada exitosamente'
             }
+            
+        except _ERRORES_REINTENTABLES:
+            raise
+        
+        except psycopg2.Error as e:
+            # RAISE EXCEPTION de la función: el mensaje ya es para el usuario
+            if e.pgcode == 'P0001':
+                return {'success': False, 'message': e.diag.message_primary}
+            return self._error_crear(e)
+        
+        except Exception as e:
+            return self._error_crear(e)
         
         finally:
             if cursor:
                 cursor.close()
             if connection:
+                if not connection.closed:
+                    connection.autocommit = False
                 self.db.return_connection(connection)
     
+    def _venta_repetida(self, cursor, clave: str) -> Dict[str, Any]:
+        """Resultado de una venta ya registrada con la misma clave de idempotencia"""
+        cursor.execute("""
+            SELECT id_venta, numero_factura
+            FROM ventas_clave_idempotencia
+            WHERE clave = %s
+        """, (clave,))
+        id_venta, numero_factura = cursor.fetchone()
+        return {
+            'success': True,
+            'id_venta': id_venta,
+            'numero_factura': numero_factura,
+            'repetida': True,
+            'message': f'La venta {numero_factura} ya estaba registrada'
+        }
+    
+    def _revertir(self, connection):
+        """Rollback que tolera una conexión caída"""
+        try:
+            if connection and not connection.closed:
+                connection.rollback()
+        except psycopg2.Error:
+            pass
+    
+    def _error_crear(self, e: Exception) -> Dict[str, Any]:
+        """Mensaje para el usuario de un error al crear la venta"""
+        error_msg = str(e).lower()
+        
+        # Manejo de errores específicos
+        if 'duplicate' in error_msg or 'unique' in error_msg:
+            if 'numero_factura' in error_msg:
+                return {
+                    'success': False,
+                    'message': 'El número de factura ya existe. Por favor ingrese un número diferente.',
+                    'factura_duplicada': True
+                }
+        
+        return {
+            'success': False,
+            'message': f'Error al crear venta: {str(e)}'
+        }
+    
     def anular(self, id_venta: int, id_empleado: int) -> Dict[str, Any]:
         """
         Anula una venta y revierte el stock.
@@ -228,28 +480,31 @@ class VentaRepository:
             connection = self.db.get_connection()
             cursor = connection.cursor()
             
-            # Verificar que la venta existe y no está ya anulada
+            # Verificar que la venta existe y no está ya anulada (bloqueada: dos
+            # anulaciones simultáneas descontarían dos veces caja y cliente)
             cursor.execute("""
-                SELECT estado, total, id_caja, numero_factura, id_cliente
+                SELECT estado, total, id_caja, numero_factura, id_cliente, fecha_venta, id_empleado
                 FROM ventas 
                 WHERE id_venta = %s
+                FOR UPDATE
             """, (id_venta,))
             
             venta_data = cursor.fetchone()
             if not venta_data:
                 return {'success': False, 'message': 'Venta no encontrada'}
             
-            estado_actual, total, id_caja, numero_factura, id_cliente = venta_data
+            (estado_actual, total, id_caja, numero_factura, id_cliente,
+             fecha_venta, id_vendedor) = venta_data
             
             if estado_actual == 'anulada':
                 return {'success': False, 'message': 'La venta ya está anulada'}
             
-            # Obtener detalles de la venta
+            # Obtener detalles de la venta (fecha_venta limita la búsqueda a su partición)
             cursor.execute("""
                 SELECT id_producto, cantidad
                 FROM detalle_ventas
-                WHERE id_venta = %s
-            """, (id_venta,))
+                WHERE id_venta = %s AND fecha_venta = %s
+            """, (id_venta, fecha_venta))
             
             detalles = cursor.fetchall()
             
@@ -267,8 +522,8 @@ class VentaRepository:
                 UPDATE ventas
                 SET estado = 'anulada',
                     updated_at = CURRENT_TIMESTAMP
-                WHERE id_venta = %s
-            """, (id_venta,))
+                WHERE id_venta = %s AND fecha_venta = %s
+            """, (id_venta, fecha_venta))
             
             # Registrar movimiento de caja (EGRESO por devolución)
             cursor.execute("""
@@ -294,16 +549,33 @@ class VentaRepository:
                 WHERE id_caja = %s
             """, (total, total, id_caja))
             
-            # Actualizar total_compras del cliente (si tiene cliente)
+            # Actualizar estadísticas del cliente (si tiene cliente); la última
+            # compra solo se busca de nuevo si la anulada era la más reciente
             if id_cliente:
                 cursor.execute("""
                     UPDATE clientes
-                    SET total_compras = GREATEST(total_compras - %s, 0),
+                    SET cantidad_compras = GREATEST(cantidad_compras - 1, 0),
+                        total_compras = GREATEST(total_compras - %(total)s, 0),
+                        fecha_ultima_compra = CASE
+                            WHEN fecha_ultima_compra > %(fecha)s THEN fecha_ultima_compra
+                            ELSE (
+                                SELECT MAX(v.fecha_venta)
+                                FROM ventas v
+                                WHERE v.id_cliente = %(id_cliente)s
+                                AND v.estado = 'completada'
+                            )
+                        END,
                         updated_at = CURRENT_TIMESTAMP
-                    WHERE id_cliente = %s
-                """, (total, id_cliente))
+                    WHERE id_cliente = %(id_cliente)s
+                """, {'total': total, 'fecha': fecha_venta, 'id_cliente': id_cliente})
+            
+            # Actualizar estadísticas del vendedor
+            cursor.execute(_RESTAR_VENTA_EMPLEADO, {
+                'id_empleado': id_vendedor, 'total': total, 'fecha': fecha_venta
+            })
             
             connection.commit()
+            VENTAS_ANULADAS.inc()
             
             return {
                 'success': True,
@@ -392,9 +664,9 @@ class VentaRepository:
                     p.nombre as producto_nombre
                 FROM detalle_ventas dv
                 JOIN productos p ON dv.id_producto = p.id_producto
-                WHERE dv.id_venta = %s
+                WHERE dv.id_venta = %s AND dv.fecha_venta = %s
                 ORDER BY dv.id_detalle_venta
-            """, (id_venta,))
+            """, (id_venta, venta.fecha_venta))
             
             detalles_rows = cursor.fetchall()
             for detalle_row in detalles_rows:
@@ -437,9 +709,11 @@ class VentaRepository:
             connection = self.db.get_connection()
             cursor = connection.cursor()
             
+            # Las facturas de ventas hechas sin conexión (LOC-...) no siguen la numeración
             cursor.execute("""
                 SELECT numero_factura
                 FROM ventas
+                WHERE numero_factura NOT LIKE 'LOC-%'
                 ORDER BY id_venta DESC
                 LIMIT 1
             """)
@@ -506,13 +780,14 @@ class VentaRepository:
                 condiciones.append("v.estado = %s")
                 parametros.append(estado)
             
+            # Rangos sobre la columna sin funciones para que se descarten particiones
             if fecha_inicio:
-                condiciones.append("DATE(v.fecha_venta) >= %s")
+                condiciones.append("v.fecha_venta >= %s")
                 parametros.append(fecha_inicio)
             
             if fecha_fin:
-                condiciones.append("DATE(v.fecha_venta) <= %s")
-                parametros.append(fecha_fin)
+                condiciones.append("v.fecha_venta < %s")
+                parametros.append(fecha_fin + timedelta(days=1))
             
             if id_cliente:
                 condiciones.append("v.id_cliente = %s")
@@ -1,6 +1,17 @@
 # Services package
-from .auth_service import AuthService
-from .reporte_service import ReporteService
-from .configuracion_service import ConfiguracionService
+# Importación diferida: cada servicio se carga al pedirlo (ver views/__init__.py)
+import importlib
+
+_MODULOS = {
+    'AuthService': 'auth_service',
+    'ReporteService': 'reporte_service',
+    'ConfiguracionService': 'configuracion_service',
+}
 
 __all__ = ['AuthService', 'ReporteService', 'ConfiguracionService']
+
+
+def __getattr__(nombre):
+    if nombre in _MODULOS:
+        return getattr(importlib.import_module(f'.{_MODULOS[nombre]}', __name__), nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
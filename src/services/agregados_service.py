@@ -0,0 +1,277 @@
+"""
+Servicio para verificar y recalcular los agregados que se mantienen de forma
+incremental en la misma transacción que cada venta o compra (estadísticas de
+clientes, proveedores y empleados)
+"""
+from typing import Dict, Any
+
+from database.connection import DatabaseConnection
+
+
+# Diferencias de ejemplo que retorna la verificación
+MAX_MUESTRA = 20
+
+_COMPRAS_VIGENTES = "FROM compras WHERE estado <> 'cancelada'"
+_VENTAS_COMPLETADAS = "FROM ventas WHERE estado = 'completada'"
+
+# Por agregado: tabla, claves, columnas mantenidas y la consulta que las
+# calcula desde cero. 'completar' son columnas que solo se llenan si están
+# vacías (no se verifican).
+#
+# Las tablas 'derivadas' solo contienen el agregado: el cálculo retorna las
+# entidades con actividad y una fila ausente equivale a 'cero' (las columnas
+# que no figuran en 'cero' valen NULL). El recálculo inserta las filas que
+# faltan y pone en cero las que ya no tienen actividad.
+AGREGADOS: Dict[str, Dict[str, Any]] = {
+    'clientes': {
+        'tabla': 'clientes',
+        'claves': ('id_cliente',),
+        'columnas': ('cantidad_compras', 'total_compras', 'fecha_ultima_compra'),
+        'completar': ('fecha_primera_compra',),
+        'calculo': """
+            SELECT
+                c.id_cliente,
+                COALESCE(v.cantidad, 0) AS cantidad_compras,
+                COALESCE(v.total, 0) AS total_compras,
+                v.ultima AS fecha_ultima_compra,
+                v.primera::date AS fecha_primera_compra
+            FROM clientes c
+            LEFT JOIN (
+                SELECT
+                    id_cliente,
+                    COUNT(*) AS cantidad,
+                    SUM(total) AS total,
+                    MIN(fecha_venta) AS primera,
+                    MAX(fecha_venta) AS ultima
+                FROM ventas
+                WHERE estado = 'completada' AND id_cliente IS NOT NULL
+                GROUP BY id_cliente
+            ) v ON v.id_cliente = c.id_cliente
+        """
+    },
+    'proveedores': {
+        'tabla': 'estadisticas_proveedores',
+        'claves': ('id_proveedor',),
+        'columnas': ('cantidad_compras', 'total_comprado', 'ultima_compra'),
+        'derivada': True,
+        'cero': {'cantidad_compras': '0', 'total_comprado': '0'},
+        'calculo': f"""
+            SELECT
+                id_proveedor,
+                COUNT(*) AS cantidad_compras,
+                SUM(total) AS total_comprado,
+                MAX(fecha_compra) AS ultima_compra
+            {_COMPRAS_VIGENTES}
+            GROUP BY id_proveedor
+        """
+    },
+    'proveedores_mes': {
+        'tabla': 'estadisticas_proveedores_mes',
+        'claves': ('id_proveedor', 'mes'),
+        'columnas': ('cantidad_compras', 'total_comprado'),
+        'derivada': True,
+        'cero': {'cantidad_compras': '0', 'total_comprado': '0'},
+        'calculo': f"""
+            SELECT
+                id_proveedor,
+                date_trunc('month', fecha_compra)::date AS mes,
+                COUNT(*) AS cantidad_compras,
+                SUM(total) AS total_comprado
+            {_COMPRAS_VIGENTES}
+            GROUP BY 1, 2
+        """
+    },
+    'empleados': {
+        'tabla': 'estadisticas_empleados',
+        'claves': ('id_empleado',),
+        'columnas': ('cantidad_ventas', 'total_vendido', 'ultima_venta'),
+        'derivada': True,
+        'cero': {'cantidad_ventas': '0', 'total_vendido': '0'},
+        'calculo': f"""
+            SELECT
+                id_empleado,
+                COUNT(*) AS cantidad_ventas,
+                SUM(total) AS total_vendido,
+                MAX(fecha_venta) AS ultima_venta
+            {_VENTAS_COMPLETADAS}
+            GROUP BY id_empleado
+        """
+    },
+    'empleados_mes': {
+        'tabla': 'estadisticas_empleados_mes',
+        'claves': ('id_empleado', 'mes'),
+        'columnas': ('cantidad_ventas', 'total_vendido'),
+        'derivada': True,
+        'cero': {'cantidad_ventas': '0', 'total_vendido': '0'},
+        'calculo': f"""
+            SELECT
+                id_empleado,
+                date_trunc('month', fecha_venta)::date AS mes,
+                COUNT(*) AS cantidad_ventas,
+                SUM(total) AS total_vendido
+            {_VENTAS_COMPLETADAS}
+            GROUP BY 1, 2
+        """
+    },
+}
+
+
+def _esperado(d: Dict[str, Any], col: str) -> str:
+    """Valor esperado de una columna; en tablas derivadas, la fila ausente vale 'cero'"""
+    cero = d.get('cero', {})
+    return f"COALESCE(e.{col}, {cero[col]})" if col in cero else f"e.{col}"
+
+
+def _cruce(d: Dict[str, Any], izquierda: str = 't', derecha: str = 'e') -> str:
+    return ' AND '.join(f"{derecha}.{k} = {izquierda}.{k}" for k in d['claves'])
+
+
+class AgregadosService:
+    """Servicio para comparar los agregados incrementales con su cálculo completo"""
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+
+    def _definicion(self, nombre: str) -> Dict[str, Any]:
+        if nombre not in AGREGADOS:
+            raise ValueError(f"Agregado desconocido: {nombre}. Opciones: {', '.join(AGREGADOS)}")
+        return AGREGADOS[nombre]
+
+    def verificar(self, nombre: str) -> Dict[str, Any]:
+        """
+        Compara los valores almacenados contra el cálculo desde las tablas de origen
+
+        Args:
+            nombre: Clave de AGREGADOS ('clientes', 'proveedores', ...)
+
+        Returns:
+            Dict con 'success', 'revisados', 'diferencias' (cantidad) y 'muestra'
+            (hasta MAX_MUESTRA filas con el valor almacenado y el '<columna>_esperado')
+        """
+        try:
+            d = self._definicion(nombre)
+            registrados = ', '.join(f"t.{col}" for col in d['columnas'])
+            esperados = ', '.join(_esperado(d, col) for col in d['columnas'])
+            columnas = ', '.join(
+                f"t.{col}, {_esperado(d, col)} AS {col}_esperado" for col in d['columnas']
+            )
+            # En las derivadas también cuentan las filas que faltan en la tabla
+            if d.get('derivada'):
+                claves = ', '.join(f"COALESCE(t.{k}, e.{k}) AS {k}" for k in d['claves'])
+                cruce = 'FULL JOIN'
+            else:
+                claves = ', '.join(f"t.{k}" for k in d['claves'])
+                cruce = 'JOIN'
+
+            muestra = self.db.execute_query(f"""
+                SELECT {claves}, {columnas}, COUNT(*) OVER () AS diferencias
+                FROM {d['tabla']} t
+                {cruce} ({d['calculo']}) e ON {_cruce(d)}
+                WHERE ({registrados}) IS DISTINCT FROM ({esperados})
+                ORDER BY {', '.join(str(i + 1) for i in range(len(d['claves'])))}
+                LIMIT {MAX_MUESTRA}
+            """) or []
+            revisados = self.db.execute_query(
+                f"SELECT COUNT(*) AS total FROM {d['tabla']}", fetch='one'
+            )['total']
+
+            diferencias = muestra[0]['diferencias'] if muestra else 0
+            for fila in muestra:
+                fila.pop('diferencias')
+
+            return {
+                'success': True,
+                'revisados': revisados,
+                'diferencias': diferencias,
+                'muestra': muestra
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'Error al verificar {nombre}: {str(e)}'}
+
+    def recalcular(self, nombre: str) -> Dict[str, Any]:
+        """
+        Recalcula los valores que no coinciden con el cálculo completo
+
+        Bloquea las escrituras de la tabla mientras dura (lectura permitida): una
+        venta o compra en curso que actualiza la misma fila espera y suma sobre el valor
+        recalculado, sin perder su incremento.
+
+        Args:
+            nombre: Clave de AGREGADOS ('clientes', 'proveedores', ...)
+
+        Returns:
+            Dict con 'success', 'message' y 'actualizados'
+        """
+        connection = None
+        cursor = None
+
+        try:
+            d = self._definicion(nombre)
+
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+
+            cursor.execute(f"LOCK TABLE {d['tabla']} IN EXCLUSIVE MODE")
+            if d.get('derivada'):
+                actualizados = self._reconstruir(cursor, d)
+            else:
+                asignaciones = [f"{col} = e.{col}" for col in d['columnas']]
+                asignaciones += [f"{col} = COALESCE(t.{col}, e.{col})" for col in d.get('completar', ())]
+                registrados = ', '.join(f"t.{col}" for col in d['columnas'])
+                esperados = ', '.join(f"e.{col}" for col in d['columnas'])
+
+                cursor.execute(f"""
+                    UPDATE {d['tabla']} t
+                    SET {', '.join(asignaciones)}
+                    FROM ({d['calculo']}) e
+                    WHERE {_cruce(d)}
+                    AND ({registrados}) IS DISTINCT FROM ({esperados})
+                """)
+                actualizados = cursor.rowcount
+
+            connection.commit()
+            return {
+                'success': True,
+                'message': f'{actualizados} registros de {nombre} recalculados',
+                'actualizados': actualizados
+            }
+
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {'success': False, 'message': f'Error al recalcular {nombre}: {str(e)}'}
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
+
+    def _reconstruir(self, cursor, d: Dict[str, Any]) -> int:
+        """
+        Deja una tabla derivada igual a su cálculo: inserta o corrige las filas
+        con actividad y pone en cero las que ya no tienen (se conservan, las
+        escrituras incrementales las reutilizan)
+        """
+        claves = ', '.join(d['claves'])
+        columnas = ', '.join(d['columnas'])
+        excluidos = ', '.join(f"EXCLUDED.{col}" for col in d['columnas'])
+        registrados = ', '.join(f"t.{col}" for col in d['columnas'])
+        ceros = [d['cero'].get(col, 'NULL') for col in d['columnas']]
+
+        cursor.execute(f"""
+            INSERT INTO {d['tabla']} AS t ({claves}, {columnas})
+            SELECT {claves}, {columnas} FROM ({d['calculo']}) e
+            ON CONFLICT ({claves}) DO UPDATE
+            SET {', '.join(f"{col} = EXCLUDED.{col}" for col in d['columnas'])}
+            WHERE ({registrados}) IS DISTINCT FROM ({excluidos})
+        """)
+        actualizados = cursor.rowcount
+
+        cursor.execute(f"""
+            UPDATE {d['tabla']} t
+            SET {', '.join(f"{col} = {cero}" for col, cero in zip(d['columnas'], ceros))}
+            WHERE NOT EXISTS (SELECT 1 FROM ({d['calculo']}) e WHERE {_cruce(d)})
+            AND ({registrados}) IS DISTINCT FROM ({', '.join(ceros)})
+        """)
+        return actualizados + cursor.rowcount
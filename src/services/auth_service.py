@@ -3,16 +3,41 @@ Servicio de Autenticación y Autorización
 Maneja login, verificación de permisos y sesiones
 """
 import hashlib
+import os
+import threading
 from datetime import datetime
 from typing import Optional, Dict, List
 
+from repositories.local_repository import CatalogoLocalRepository
+from services.sincronizacion_service import modo_local
+
+
+# Sin conexión solo se habilitan estos módulos (los demás leen del servidor)
+MODULOS_SIN_CONEXION = ('ventas',)
+
+
+def dias_sesion_local() -> int:
+    """
+    Días que una sesión guardada en la terminal permite entrar sin conexión
+    desde el último login con conexión (POS_SESION_LOCAL_DIAS, por defecto 7)
+    """
+    try:
+        return max(int(os.getenv('POS_SESION_LOCAL_DIAS', '7')), 0)
+    except ValueError:
+        return 7
+
 
 class AuthService:
     """Servicio para manejar autenticación y permisos"""
     
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, sin_conexion: bool = False):
         self.db = db_connection
         self.sesion_actual = None  # Almacena datos del usuario logueado
+        
+        # Sin conexión el login y los permisos salen de las sesiones guardadas
+        # en la terminal (solo empleados que ya iniciaron sesión en ella)
+        self.sin_conexion = sin_conexion
+        self.permisos_locales = set()
 
     @staticmethod
     def hash_password(password: str) -> str:
@@ -33,6 +58,9 @@ class AuthService:
         try:
             password_hash = self.hash_password(password)
             
+            if self.sin_conexion:
+                return self._login_local(usuario, password)
+            
             query = """
                 SELECT 
                     e.id_empleado,
@@ -58,6 +86,10 @@ class AuthService:
             resultado = self.db.execute_query(query, (usuario, password_hash))
             
             if not resultado:
+                # Contraseña cambiada o empleado desactivado: la sesión guardada
+                # en la terminal ya no debe servir para entrar sin conexión
+                if modo_local() != 'no':
+                    self._borrar_sesion_local(usuario)
                 return {
                     'success': False,
                     'message': 'Usuario o contraseña incorrectos'
@@ -78,6 +110,10 @@ class AuthService:
             # Registrar en logs
             self._registrar_log(empleado['id_empleado'], 'login', None, None, 'Login exitoso')
             
+            # Recordar la sesión para poder vender sin conexión
+            if modo_local() != 'no':
+                self._guardar_sesion_local(usuario, password, empleado)
+            
             return {
                 'success': True,
                 'message': f"Bienvenido {empleado['nombre']} {empleado['apellido']}",
@@ -117,6 +153,9 @@ class AuthService:
         if not self.sesion_actual:
             return False
         
+        if self.sin_conexion:
+            return (modulo, accion) in self.permisos_locales
+        
         try:
             query = """
                 SELECT COUNT(*) as tiene_permiso
@@ -150,6 +189,9 @@ class AuthService:
         if not self.sesion_actual:
             return []
         
+        if self.sin_conexion:
+            return [{'modulo': m, 'accion': a} for m, a in sorted(self.permisos_locales)]
+        
         try:
             query = """
                 SELECT DISTINCT
@@ -224,9 +266,56 @@ class AuthService:
                 'message': f'Error: {str(e)}'
             }
 
+    def _login_local(self, usuario: str, password: str) -> Dict:
+        """Login contra las sesiones guardadas en la terminal"""
+        dias = dias_sesion_local()
+        sesion = CatalogoLocalRepository().obtener_sesion(usuario, password, dias)
+        if not sesion:
+            return {
+                'success': False,
+                'message': f'Sin conexión al servidor: solo pueden ingresar usuarios que iniciaron sesión en esta terminal en los últimos {dias} días'
+            }
+        
+        self.sesion_actual = sesion['empleado']
+        self.permisos_locales = {p for p in sesion['permisos'] if p[0] in MODULOS_SIN_CONEXION}
+        return {
+            'success': True,
+            'message': f"Bienvenido {self.sesion_actual['nombre']} {self.sesion_actual['apellido']} (sin conexión)",
+            'empleado': self.sesion_actual
+        }
+    
+    def _guardar_sesion_local(self, usuario: str, password: str, empleado: Dict):
+        """
+        Guarda el empleado y sus permisos en el almacén local; el hash bcrypt
+        se calcula en un hilo aparte para no demorar el login
+        """
+        try:
+            permisos = [(p['modulo'], p['accion']) for p in self.obtener_permisos_usuario()]
+        except Exception as e:
+            print(f"⚠️ Error guardando la sesión local: {e}")
+            return
+        
+        def guardar():
+            try:
+                CatalogoLocalRepository().guardar_sesion(usuario, password, empleado, permisos)
+            except Exception as e:
+                print(f"⚠️ Error guardando la sesión local: {e}")
+        
+        threading.Thread(target=guardar, name='sesion-local', daemon=True).start()
+    
+    def _borrar_sesion_local(self, usuario: str):
+        """Borra la sesión guardada del usuario en el almacén local"""
+        try:
+            CatalogoLocalRepository().borrar_sesion(usuario)
+        except Exception as e:
+            print(f"⚠️ Error borrando la sesión local: {e}")
+    
     def _registrar_log(self, id_empleado: int, accion: str, tabla_afectada: Optional[str],
                        id_registro: Optional[int], descripcion: str):
         """Registra una acción en la tabla de logs"""
+        if self.sin_conexion:
+            return
+        
         try:
             query = """
                 INSERT INTO logs_sistema (id_empleado, accion, tabla_afectada, id_registro, descripcion)
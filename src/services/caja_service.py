@@ -1,9 +1,52 @@
 """
 Servicio para gestión de cajas (apertura, cierre, movimientos)
+y conciliación de sus totales contra movimientos_caja
 """
-from datetime import datetime
-from typing import Optional, Dict, List, Any
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, List, Any, Tuple
 from database.connection import DatabaseConnection
+from utils.metricas import CAJAS_DESCUADRADAS
+
+
+# Suma por tipo de los movimientos de una caja: index-only scan sobre
+# idx_movimientos_caja_tipo (id_caja, tipo) INCLUDE (monto)
+_TOTALES_MOVIMIENTOS = """
+    SELECT
+        COALESCE(SUM(m.monto) FILTER (WHERE m.tipo = 'ingreso'), 0) as ingresos_movimientos,
+        COALESCE(SUM(m.monto) FILTER (WHERE m.tipo = 'egreso'), 0) as egresos_movimientos,
+        COUNT(*) as movimientos
+    FROM movimientos_caja m
+    WHERE m.id_caja = {id_caja}
+"""
+
+# Totales registrados en cajas junto a los calculados desde sus movimientos
+_CONCILIACION = f"""
+    SELECT
+        c.id_caja,
+        c.id_empleado,
+        c.estado,
+        c.fecha_apertura,
+        c.total_ingresos,
+        c.total_egresos,
+        m.ingresos_movimientos,
+        m.egresos_movimientos,
+        m.movimientos
+    FROM cajas c
+    CROSS JOIN LATERAL ({_TOTALES_MOVIMIENTOS.format(id_caja='c.id_caja')}) m
+"""
+
+
+def _resultado_conciliacion(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrega el descuadre (movimientos - registrado) a una fila de conciliación"""
+    resultado = dict(fila)
+    for campo in ('total_ingresos', 'total_egresos', 'ingresos_movimientos', 'egresos_movimientos'):
+        resultado[campo] = float(resultado[campo] or 0)
+    resultado['descuadre_ingresos'] = round(resultado['ingresos_movimientos'] - resultado['total_ingresos'], 2)
+    resultado['descuadre_egresos'] = round(resultado['egresos_movimientos'] - resultado['total_egresos'], 2)
+    resultado['cuadra'] = resultado['descuadre_ingresos'] == 0 and resultado['descuadre_egresos'] == 0
+    return resultado
 
 
 class CajaService:
@@ -70,6 +113,10 @@ class CajaService:
         """
         Abre una nueva caja para el empleado
         
+        La caja y el movimiento de apertura se insertan en una sola sentencia:
+        total_ingresos arranca con el monto inicial, igual que la suma de sus
+        movimientos.
+        
         Args:
             id_empleado: ID del empleado que abre la caja
             monto_inicial: Monto inicial con el que se abre la caja
@@ -87,31 +134,29 @@ class CajaService:
                     'message': 'Ya existe una caja abierta para este empleado'
                 }
             
-            # Insertar nueva caja
+            # Insertar nueva caja junto con el movimiento inicial
             query = """
-                INSERT INTO cajas 
-                    (id_empleado, fecha_apertura, monto_inicial, estado, observaciones)
-                VALUES 
-                    (%s, CURRENT_TIMESTAMP, %s, 'abierta', %s)
-                RETURNING id_caja, fecha_apertura
+                WITH caja AS (
+                    INSERT INTO cajas 
+                        (id_empleado, fecha_apertura, monto_inicial, total_ingresos, estado, observaciones)
+                    VALUES 
+                        (%(id_empleado)s, CURRENT_TIMESTAMP, %(monto)s, %(monto)s, 'abierta', %(observaciones)s)
+                    RETURNING id_caja, fecha_apertura
+                ), apertura AS (
+                    INSERT INTO movimientos_caja (id_caja, tipo, concepto, monto, id_empleado)
+                    SELECT id_caja, 'ingreso', 'Apertura de caja - Monto inicial', %(monto)s, %(id_empleado)s
+                    FROM caja
+                )
+                SELECT id_caja, fecha_apertura FROM caja
             """
             
             result = self.db.execute_query(
                 query, 
-                (id_empleado, monto_inicial, observaciones),
+                {'id_empleado': id_empleado, 'monto': monto_inicial, 'observaciones': observaciones},
                 fetch='one'
             )
             
             if result:
-                # Registrar el movimiento inicial
-                self.registrar_movimiento(
-                    id_caja=result['id_caja'],
-                    tipo='ingreso',
-                    monto=monto_inicial,
-                    concepto='Apertura de caja - Monto inicial',
-                    id_empleado=id_empleado
-                )
-                
                 return {
                     'success': True,
                     'message': 'Caja abierta exitosamente',
@@ -134,80 +179,99 @@ class CajaService:
         """
         Cierra una caja existente
         
+        Con la fila de la caja bloqueada (ninguna venta ni movimiento puede
+        entrar mientras tanto) concilia los totales contra movimientos_caja y
+        calcula la diferencia sobre los montos conciliados. Si los totales
+        acumulados no cuadraban se corrigen y se informa en 'descuadre'.
+        
         Args:
             id_caja: ID de la caja a cerrar
             monto_final: Monto final contado en caja
             observaciones: Observaciones del cierre
             
         Returns:
-            Dict con 'success' (bool), 'message' (str), 'diferencia' (float si success=True)
+            Dict con 'success' (bool), 'message' (str), 'diferencia' (float si success=True),
+            'monto_esperado' y 'descuadre' (None si los totales cuadraban)
         """
+        connection = None
+        cursor = None
+        
         try:
-            # Obtener información de la caja
-            caja_info = self.obtener_resumen_caja(id_caja)
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
             
-            if not caja_info:
+            conciliacion = self._conciliar(cursor, id_caja)
+            if not conciliacion:
+                connection.rollback()
                 return {
                     'success': False,
                     'message': 'Caja no encontrada'
                 }
             
-            if caja_info['estado'] == 'cerrada':
+            if conciliacion['estado'] == 'cerrada':
+                connection.rollback()
                 return {
                     'success': False,
                     'message': 'La caja ya está cerrada'
                 }
             
-            # Calcular diferencia
-            monto_esperado = float(caja_info['total_calculado'])
-            diferencia = float(monto_final) - monto_esperado
-            
-            # Actualizar caja
-            query = """
+            cursor.execute("""
                 UPDATE cajas 
                 SET 
                     fecha_cierre = CURRENT_TIMESTAMP,
-                    monto_final = %s,
-                    diferencia = %s,
+                    monto_final = %(monto_final)s,
+                    diferencia = %(monto_final)s - (total_ingresos - total_egresos),
                     estado = 'cerrada',
                     observaciones = CASE 
-                        WHEN observaciones IS NULL OR observaciones = '' THEN %s
-                        ELSE observaciones || ' | CIERRE: ' || %s
+                        WHEN observaciones IS NULL OR observaciones = '' THEN %(observaciones)s
+                        ELSE observaciones || ' | CIERRE: ' || %(observaciones)s
                     END
-                WHERE id_caja = %s
-                RETURNING fecha_cierre
-            """
+                WHERE id_caja = %(id_caja)s
+                RETURNING fecha_cierre, diferencia, total_ingresos - total_egresos
+            """, {'monto_final': monto_final, 'observaciones': observaciones, 'id_caja': id_caja})
             
-            result = self.db.execute_query(
-                query,
-                (monto_final, diferencia, observaciones, observaciones, id_caja),
-                fetch='one'
-            )
+            fecha_cierre, diferencia, monto_esperado = cursor.fetchone()
+            connection.commit()
             
-            if result:
-                return {
-                    'success': True,
-                    'message': 'Caja cerrada exitosamente',
-                    'diferencia': diferencia,
-                    'monto_esperado': monto_esperado,
-                    'monto_final': monto_final,
-                    'fecha_cierre': result['fecha_cierre']
-                }
-            else:
-                return {
-                    'success': False,
-                    'message': 'Error al cerrar la caja'
+            descuadre = None
+            if not conciliacion['cuadra']:
+                descuadre = {
+                    'ingresos': conciliacion['descuadre_ingresos'],
+                    'egresos': conciliacion['descuadre_egresos']
                 }
+                print(f"[ADVERTENCIA] Caja {id_caja}: totales corregidos al cerrar "
+                      f"(ingresos {descuadre['ingresos']:+.2f}, egresos {descuadre['egresos']:+.2f})")
+            
+            return {
+                'success': True,
+                'message': 'Caja cerrada exitosamente',
+                'diferencia': float(diferencia),
+                'monto_esperado': float(monto_esperado),
+                'monto_final': monto_final,
+                'fecha_cierre': fecha_cierre,
+                'descuadre': descuadre
+            }
                 
         except Exception as e:
+            if connection:
+                connection.rollback()
             return {
                 'success': False,
                 'message': f'Error al cerrar caja: {str(e)}'
             }
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
     
     def obtener_resumen_caja(self, id_caja: int) -> Optional[Dict[str, Any]]:
         """
-        Obtiene el resumen completo de una caja (ingresos, egresos, total)
+        Obtiene el resumen de una caja (ingresos, egresos, total)
+        
+        Lee los totales acumulados de la caja; no recorre sus movimientos
+        (ver verificar_caja para compararlos contra movimientos_caja).
         
         Args:
             id_caja: ID de la caja
@@ -227,19 +291,14 @@ class CajaService:
                 c.estado,
                 c.observaciones,
                 p.nombre || ' ' || p.apellido as nombre_empleado,
-                COALESCE(SUM(CASE WHEN m.tipo = 'ingreso' THEN m.monto ELSE 0 END), 0) as total_ingresos,
-                COALESCE(SUM(CASE WHEN m.tipo = 'egreso' THEN m.monto ELSE 0 END), 0) as total_egresos,
-                COALESCE(SUM(CASE WHEN m.tipo = 'ingreso' THEN m.monto ELSE -m.monto END), 0) as total_calculado,
-                COUNT(m.id_movimiento) as total_movimientos
+                c.total_ventas,
+                c.total_ingresos,
+                c.total_egresos,
+                c.total_ingresos - c.total_egresos as total_calculado
             FROM cajas c
             INNER JOIN empleados emp ON c.id_empleado = emp.id_empleado
             INNER JOIN personas p ON emp.id_persona = p.id_persona
-            LEFT JOIN movimientos_caja m ON c.id_caja = m.id_caja
             WHERE c.id_caja = %s
-            GROUP BY 
-                c.id_caja, c.id_empleado, c.fecha_apertura, c.fecha_cierre,
-                c.monto_inicial, c.monto_final, c.diferencia, c.estado,
-                c.observaciones, p.nombre, p.apellido
         """
         
         result = self.db.execute_query(query, (id_caja,), fetch='one')
@@ -256,6 +315,9 @@ class CajaService:
         """
         Registra un movimiento de caja (ingreso o egreso)
         
+        El movimiento y el total de la caja se actualizan en la misma
+        sentencia; solo se aceptan movimientos en cajas abiertas.
+        
         Args:
             id_caja: ID de la caja
             tipo: 'ingreso' o 'egreso'
@@ -266,18 +328,31 @@ class CajaService:
         Returns:
             Dict con 'success' (bool), 'message' (str), 'id_movimiento' (int si success=True)
         """
+        if tipo not in ('ingreso', 'egreso'):
+            return {'success': False, 'message': f'Tipo de movimiento inválido: {tipo}'}
+        if monto is None or monto <= 0:
+            return {'success': False, 'message': 'El monto debe ser mayor a cero'}
+        
         try:
             query = """
+                WITH caja AS (
+                    UPDATE cajas
+                    SET total_ingresos = total_ingresos + CASE WHEN %(tipo)s = 'ingreso' THEN %(monto)s ELSE 0 END,
+                        total_egresos = total_egresos + CASE WHEN %(tipo)s = 'egreso' THEN %(monto)s ELSE 0 END
+                    WHERE id_caja = %(id_caja)s AND estado = 'abierta'
+                    RETURNING id_caja
+                )
                 INSERT INTO movimientos_caja 
                     (id_caja, tipo, monto, concepto, id_empleado)
-                VALUES 
-                    (%s, %s, %s, %s, %s)
+                SELECT id_caja, %(tipo)s, %(monto)s, %(concepto)s, %(id_empleado)s
+                FROM caja
                 RETURNING id_movimiento, fecha_movimiento
             """
             
             result = self.db.execute_query(
                 query,
-                (id_caja, tipo, monto, concepto, id_empleado),
+                {'id_caja': id_caja, 'tipo': tipo, 'monto': monto,
+                 'concepto': concepto, 'id_empleado': id_empleado},
                 fetch='one'
             )
             
@@ -291,7 +366,7 @@ class CajaService:
             else:
                 return {
                     'success': False,
-                    'message': 'Error al registrar el movimiento'
+                    'message': 'La caja no existe o ya está cerrada'
                 }
                 
         except Exception as e:
@@ -332,7 +407,7 @@ class CajaService:
     
     def obtener_historial_cajas(self, id_empleado: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
         """
-        Obtiene el historial de cajas
+        Obtiene las cajas más recientes
         
         Args:
             id_empleado: Filtrar por empleado (opcional)
@@ -341,43 +416,260 @@ class CajaService:
         Returns:
             Lista de cajas
         """
+        return self.listar_historial(id_empleado=id_empleado, limit=limit)['cajas']
+    
+    def listar_historial(
+        self,
+        estado: Optional[str] = None,
+        id_empleado: Optional[int] = None,
+        fecha_inicio: Optional[date] = None,
+        fecha_fin: Optional[date] = None,
+        limit: int = 20,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Lista el historial de cajas con filtros y paginación por cursor
+        
+        Ordena por (fecha_apertura, id_caja) descendente y continúa desde la
+        última caja de la página anterior, así cada página cuesta lo mismo sin
+        importar cuán atrás esté (idx_cajas_empleado_historial / idx_cajas_historial).
+        
+        Args:
+            estado: 'abierta' o 'cerrada' (None = todas)
+            id_empleado: Filtrar por empleado
+            fecha_inicio: Cajas abiertas desde esta fecha
+            fecha_fin: Cajas abiertas hasta esta fecha (inclusive)
+            limit: Cajas por página
+            despues_de: Cursor 'siguiente' de la página anterior (None = primera página)
+            
+        Returns:
+            Dict con 'cajas' (lista) y 'siguiente' (cursor de la próxima página o None)
+        """
+        condiciones = ["1=1"]
+        parametros = []
+        
+        if estado:
+            condiciones.append("c.estado = %s")
+            parametros.append(estado)
+        
         if id_empleado:
-            query = """
-                SELECT 
-                    c.id_caja,
-                    c.fecha_apertura,
-                    c.fecha_cierre,
-                    c.monto_inicial,
-                    c.monto_final,
-                    c.diferencia,
-                    c.estado,
-                    p.nombre || ' ' || p.apellido as nombre_empleado
-                FROM cajas c
-                INNER JOIN empleados emp ON c.id_empleado = emp.id_empleado
-                INNER JOIN personas p ON emp.id_persona = p.id_persona
-                WHERE c.id_empleado = %s
-                ORDER BY c.fecha_apertura DESC
-                LIMIT %s
-            """
-            params = (id_empleado, limit)
-        else:
-            query = """
-                SELECT 
-                    c.id_caja,
-                    c.fecha_apertura,
-                    c.fecha_cierre,
-                    c.monto_inicial,
-                    c.monto_final,
-                    c.diferencia,
-                    c.estado,
-                    p.nombre || ' ' || p.apellido as nombre_empleado
-                FROM cajas c
-                INNER JOIN empleados emp ON c.id_empleado = emp.id_empleado
-                INNER JOIN personas p ON emp.id_persona = p.id_persona
-                ORDER BY c.fecha_apertura DESC
-                LIMIT %s
-            """
-            params = (limit,)
+            condiciones.append("c.id_empleado = %s")
+            parametros.append(id_empleado)
         
-        result = self.db.execute_query(query, params, fetch='all')
-        return result if result else []
+        if fecha_inicio:
+            condiciones.append("c.fecha_apertura >= %s")
+            parametros.append(fecha_inicio)
+        
+        if fecha_fin:
+            condiciones.append("c.fecha_apertura < %s")
+            parametros.append(fecha_fin + timedelta(days=1))
+        
+        if despues_de:
+            condiciones.append("(c.fecha_apertura, c.id_caja) < (%s, %s)")
+            parametros.extend(despues_de)
+        
+        query = f"""
+            SELECT 
+                c.id_caja,
+                c.id_empleado,
+                c.fecha_apertura,
+                c.fecha_cierre,
+                c.monto_inicial,
+                c.monto_final,
+                c.diferencia,
+                c.estado,
+                p.nombre || ' ' || p.apellido as nombre_empleado
+            FROM cajas c
+            INNER JOIN empleados emp ON c.id_empleado = emp.id_empleado
+            INNER JOIN personas p ON emp.id_persona = p.id_persona
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY c.fecha_apertura DESC, c.id_caja DESC
+            LIMIT %s
+        """
+        # Una fila extra indica si existe otra página
+        parametros.append(limit + 1)
+        
+        cajas = self.db.execute_query(query, tuple(parametros), fetch='all') or []
+        siguiente = None
+        if len(cajas) > limit:
+            cajas = cajas[:limit]
+            siguiente = (cajas[-1]['fecha_apertura'], cajas[-1]['id_caja'])
+        
+        return {'cajas': cajas, 'siguiente': siguiente}
+    
+    # ----------------------------------------
+    # Conciliación
+    # ----------------------------------------
+    def _conciliar(self, cursor, id_caja: int) -> Optional[Dict[str, Any]]:
+        """
+        Bloquea la caja y deja sus totales iguales a la suma de sus movimientos
+        (dentro de la transacción del cursor; no hace commit)
+        
+        Returns:
+            Resultado de la conciliación previo a la corrección o None si la caja no existe
+        """
+        # Primero el bloqueo y después la suma, en sentencias separadas: la suma
+        # toma su snapshot cuando ya terminaron las ventas que tenían la fila
+        cursor.execute("SELECT id_caja FROM cajas WHERE id_caja = %s FOR UPDATE", (id_caja,))
+        if not cursor.fetchone():
+            return None
+        
+        cursor.execute(_CONCILIACION + " WHERE c.id_caja = %s", (id_caja,))
+        columnas = [d[0] for d in cursor.description]
+        resultado = _resultado_conciliacion(dict(zip(columnas, cursor.fetchone())))
+        
+        if not resultado['cuadra']:
+            cursor.execute("""
+                UPDATE cajas
+                SET total_ingresos = %(ingresos)s,
+                    total_egresos = %(egresos)s,
+                    diferencia = CASE
+                        WHEN estado = 'cerrada' THEN monto_final - (%(ingresos)s - %(egresos)s)
+                        ELSE diferencia
+                    END
+                WHERE id_caja = %(id_caja)s
+            """, {
+                'ingresos': resultado['ingresos_movimientos'],
+                'egresos': resultado['egresos_movimientos'],
+                'id_caja': id_caja
+            })
+        return resultado
+    
+    def verificar_caja(self, id_caja: int) -> Optional[Dict[str, Any]]:
+        """
+        Compara los totales registrados de una caja contra sus movimientos (solo lectura)
+        
+        Args:
+            id_caja: ID de la caja
+            
+        Returns:
+            Dict con los totales registrados ('total_ingresos', 'total_egresos'),
+            los calculados ('ingresos_movimientos', 'egresos_movimientos'),
+            'descuadre_ingresos', 'descuadre_egresos' y 'cuadra'; None si no existe
+        """
+        fila = self.db.execute_query(_CONCILIACION + " WHERE c.id_caja = %s", (id_caja,), fetch='one')
+        return _resultado_conciliacion(fila) if fila else None
+    
+    def verificar_cajas_abiertas(self) -> Dict[str, Any]:
+        """
+        Verifica todas las cajas abiertas en una sola consulta
+        
+        Returns:
+            Dict con 'success', 'revisadas' y 'descuadradas' (lista como en verificar_caja)
+        """
+        try:
+            filas = self.db.execute_query(
+                _CONCILIACION + " WHERE c.estado = 'abierta' ORDER BY c.id_caja"
+            ) or []
+            descuadradas = [r for r in map(_resultado_conciliacion, filas) if not r['cuadra']]
+            CAJAS_DESCUADRADAS.set(len(descuadradas))
+            return {
+                'success': True,
+                'revisadas': len(filas),
+                'descuadradas': descuadradas
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'Error al verificar cajas: {str(e)}'}
+    
+    def conciliar_caja(self, id_caja: int) -> Dict[str, Any]:
+        """
+        Corrige los totales de una caja con la suma de sus movimientos
+        (en cajas cerradas también recalcula la diferencia del cierre)
+        
+        Args:
+            id_caja: ID de la caja
+            
+        Returns:
+            Dict con 'success', 'message', 'corregida' y el detalle de verificar_caja
+        """
+        connection = None
+        cursor = None
+        
+        try:
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+            
+            resultado = self._conciliar(cursor, id_caja)
+            if not resultado:
+                connection.rollback()
+                return {'success': False, 'message': 'Caja no encontrada'}
+            
+            connection.commit()
+            resultado.update({
+                'success': True,
+                'corregida': not resultado['cuadra'],
+                'message': 'La caja cuadra' if resultado['cuadra'] else 'Totales de la caja corregidos'
+            })
+            return resultado
+            
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {'success': False, 'message': f'Error al conciliar caja: {str(e)}'}
+        
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
+
+
+class AuditorCajas:
+    """Verifica periódicamente, en un hilo daemon, que las cajas abiertas cuadren"""
+    
+    def __init__(self, intervalo: float = 300.0, corregir: bool = False):
+        self.intervalo = intervalo
+        self.corregir = corregir
+        self.caja_service = CajaService()
+        self._detener = threading.Event()
+        self._hilo = None
+    
+    def revisar(self) -> Dict[str, Any]:
+        """Una pasada de verificación (y corrección si corregir=True)"""
+        resultado = self.caja_service.verificar_cajas_abiertas()
+        if not resultado['success']:
+            print(f"[ERROR] {resultado['message']}")
+            return resultado
+        
+        for caja in resultado['descuadradas']:
+            print(f"[ADVERTENCIA] Caja {caja['id_caja']} descuadrada: "
+                  f"ingresos {caja['descuadre_ingresos']:+.2f}, egresos {caja['descuadre_egresos']:+.2f}")
+            if self.corregir:
+                conciliacion = self.caja_service.conciliar_caja(caja['id_caja'])
+                if not conciliacion['success']:
+                    print(f"[ERROR] {conciliacion['message']}")
+        return resultado
+    
+    def iniciar(self):
+        """Inicia la verificación cada `intervalo` segundos"""
+        def _bucle():
+            while not self._detener.wait(self.intervalo):
+                try:
+                    self.revisar()
+                except Exception as e:
+                    print(f"[ERROR] Error en la auditoría de cajas: {e}")
+        
+        self._hilo = threading.Thread(target=_bucle, daemon=True)
+        self._hilo.start()
+        print(f"[OK] Auditoría de cajas cada {self.intervalo:g}s")
+    
+    def detener(self):
+        self._detener.set()
+
+
+def iniciar_auditor_desde_entorno() -> Optional[AuditorCajas]:
+    """
+    Inicia el auditor de cajas según variables de entorno:
+        CAJAS_AUDITORIA_INTERVALO: segundos entre verificaciones (por defecto 300; 0 desactiva)
+        CAJAS_AUDITORIA_CORREGIR: '1' para corregir los descuadres encontrados
+
+    Returns:
+        El auditor iniciado o None si está desactivado
+    """
+    intervalo = float(os.getenv('CAJAS_AUDITORIA_INTERVALO', '300') or 0)
+    if intervalo <= 0:
+        return None
+    
+    auditor = AuditorCajas(intervalo, corregir=os.getenv('CAJAS_AUDITORIA_CORREGIR') == '1')
+    auditor.iniciar()
+    return auditor
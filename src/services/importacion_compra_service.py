@@ -0,0 +1,228 @@
+"""
+Servicio para importar facturas de proveedor desde CSV o Excel
+Lee el archivo con pandas, valida todas las líneas a la vez, resuelve los
+códigos en una sola consulta y registra la compra con CompraRepository.crear
+"""
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from models.compra import Compra, DetalleCompra
+from repositories.compra_repository import CompraRepository
+from repositories.producto_repository import ProductoRepository
+from utils.lectura_archivos import leer_tabla
+
+
+# Encabezados aceptados (sin tildes, en minúsculas) para cada columna
+ALIAS_COLUMNAS = {
+    'codigo': ('codigo', 'cod', 'codigo_producto', 'sku'),
+    'cantidad': ('cantidad', 'cant', 'unidades'),
+    'precio_unitario': ('precio_unitario', 'precio', 'costo', 'costo_unitario', 'precio_costo'),
+}
+
+
+def _a_numero(serie: pd.Series) -> pd.Series:
+    """
+    Convierte texto a número: quita el símbolo 'Q' y los espacios. El último
+    separador (',' o '.') es el decimal: '12,50', '1.250,00' y '1,250.00'
+    son válidos. Lo que no se puede convertir queda como NaN.
+    """
+    texto = (serie.astype(str).str.strip()
+             .str.replace(r'^[Qq]\.?', '', regex=True)
+             .str.replace(' ', '', regex=False))
+    coma_decimal = texto.str.rfind(',') > texto.str.rfind('.')
+    texto = texto.where(
+        coma_decimal,
+        texto.str.replace(',', '', regex=False)
+    )
+    texto = texto.where(
+        ~coma_decimal,
+        texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    )
+    return pd.to_numeric(texto, errors='coerce')
+
+
+def _marcar(errores: pd.Series, condicion: pd.Series, mensaje: str) -> pd.Series:
+    """Asigna el mensaje a las filas que cumplen la condición y aún no tienen error"""
+    return errores.mask(condicion & errores.eq(''), mensaje)
+
+
+class ImportacionCompraService:
+    """Servicio para la importación masiva de compras"""
+
+    def __init__(self):
+        self.compra_repo = CompraRepository()
+        self.producto_repo = ProductoRepository()
+
+    def leer_archivo(self, ruta: str) -> pd.DataFrame:
+        """
+        Lee el archivo del proveedor y deja las columnas codigo, cantidad y
+        precio_unitario como texto, más 'linea' (número de fila en el archivo)
+
+        Raises:
+            ValueError: Si la extensión no es soportada o faltan columnas
+        """
+        return leer_tabla(ruta, ALIAS_COLUMNAS, ALIAS_COLUMNAS.keys())
+
+    def validar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Valida todas las líneas y resuelve los códigos en una sola consulta
+
+        Returns:
+            DataFrame con linea, codigo, cantidad, precio_unitario, subtotal,
+            los datos actuales del producto y 'error' ('' si la línea es válida)
+        """
+        lineas = pd.DataFrame({
+            'linea': df['linea'],
+            'codigo': df['codigo'].astype(str).str.strip(),
+            'cantidad': _a_numero(df['cantidad']),
+            'precio_unitario': _a_numero(df['precio_unitario']).round(2),
+        })
+        errores = pd.Series('', index=lineas.index, dtype=object)
+
+        errores = _marcar(errores, lineas['codigo'].eq(''), 'Código vacío')
+        errores = _marcar(errores, lineas['cantidad'].isna(), 'Cantidad inválida')
+        errores = _marcar(errores, lineas['cantidad'] <= 0, 'La cantidad debe ser mayor a cero')
+        errores = _marcar(errores, lineas['cantidad'] % 1 != 0, 'La cantidad debe ser un número entero')
+        errores = _marcar(errores, lineas['precio_unitario'].isna(), 'Precio inválido')
+        errores = _marcar(errores, lineas['precio_unitario'] <= 0, 'El precio unitario debe ser mayor a cero')
+
+        # Una sola consulta para todos los códigos distintos del archivo
+        codigos = lineas.loc[lineas['codigo'].ne(''), 'codigo'].unique().tolist()
+        productos = pd.DataFrame(
+            self.producto_repo.obtener_por_codigos(codigos),
+            columns=['codigo_buscado', 'id_producto', 'codigo_producto', 'nombre_producto',
+                     'precio_costo', 'precio_venta', 'margen_ganancia', 'stock_actual', 'estado']
+        )
+        # Una fila por código buscado: el merge conserva exactamente una fila por línea
+        productos = productos.drop_duplicates('codigo_buscado')
+
+        resueltas = lineas.merge(productos, how='left', left_on='codigo', right_on='codigo_buscado')
+        resueltas.index = lineas.index
+        errores = _marcar(errores, resueltas['id_producto'].isna() & lineas['codigo'].ne(''),
+                          'El código no existe')
+        errores = _marcar(errores, resueltas['estado'].eq(False), 'Producto inactivo')
+
+        resueltas = resueltas.drop(columns=['codigo_buscado', 'estado'])
+        # psycopg2 entrega DECIMAL como Decimal: pasar a float para operar por columnas
+        for columna in ('precio_costo', 'precio_venta', 'margen_ganancia', 'stock_actual'):
+            resueltas[columna] = pd.to_numeric(resueltas[columna], errors='coerce').astype(float)
+        resueltas['subtotal'] = (resueltas['cantidad'] * resueltas['precio_unitario']).round(2)
+        resueltas['error'] = errores
+        return resueltas
+
+    def vista_previa(self, lineas: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Diferencia que produciría la compra, por producto: stock y precios
+        actuales contra los nuevos (mismas reglas que CompraRepository.crear:
+        se suman las cantidades y prevalece el último precio)
+
+        Args:
+            lineas: Resultado de validar()
+
+        Returns:
+            Dict con 'cambios' (DataFrame por producto), 'errores' (DataFrame
+            de líneas rechazadas), 'total', 'lineas' y 'lineas_validas'
+        """
+        validas = lineas[lineas['error'].eq('')]
+        errores = lineas.loc[lineas['error'].ne(''), ['linea', 'codigo', 'cantidad', 'precio_unitario', 'error']]
+
+        cambios = validas.groupby('id_producto', sort=False).agg(
+            codigo=('codigo_producto', 'first'),
+            nombre=('nombre_producto', 'first'),
+            lineas=('linea', 'size'),
+            cantidad=('cantidad', 'sum'),
+            precio_costo_nuevo=('precio_unitario', 'last'),
+            stock_actual=('stock_actual', 'first'),
+            precio_costo=('precio_costo', 'first'),
+            precio_venta=('precio_venta', 'first'),
+            margen_ganancia=('margen_ganancia', 'first'),
+        ).reset_index()
+
+        cambios['stock_nuevo'] = cambios['stock_actual'] + cambios['cantidad']
+        cambios['variacion_costo'] = ((cambios['precio_costo_nuevo'] - cambios['precio_costo'])
+                                      / cambios['precio_costo'].where(cambios['precio_costo'] > 0) * 100).round(2)
+        # El precio de venta conserva el margen actual del producto
+        cambios['precio_venta_nuevo'] = (cambios['precio_costo_nuevo']
+                                         * (1 + cambios['margen_ganancia'] / 100)).round(2)
+        cambios['precio_venta_nuevo'] = cambios['precio_venta_nuevo'].fillna(cambios['precio_venta'])
+        cambios = cambios.drop(columns=['margen_ganancia'])
+
+        return {
+            'lineas': len(lineas),
+            'lineas_validas': len(validas),
+            'total': float(validas['subtotal'].sum()),
+            'cambios': cambios,
+            'errores': errores,
+        }
+
+    def registrar(self, lineas: pd.DataFrame, id_proveedor: int, id_empleado: int,
+                  numero_factura: Optional[str] = None, observaciones: Optional[str] = None,
+                  omitir_errores: bool = False) -> Dict[str, Any]:
+        """
+        Registra la compra con las líneas validadas
+
+        Args:
+            lineas: Resultado de validar()
+            id_proveedor: Proveedor de la factura
+            id_empleado: Empleado que registra
+            numero_factura: Número de factura del proveedor (opcional)
+            observaciones: Observaciones de la compra
+            omitir_errores: Registrar solo las líneas válidas si hay rechazadas
+
+        Returns:
+            Dict con 'success', 'message' y 'id_compra' (resultado de CompraRepository.crear)
+        """
+        con_error = lineas['error'].ne('')
+        if con_error.any() and not omitir_errores:
+            return {
+                'success': False,
+                'message': f'{int(con_error.sum())} líneas con errores. Corrija el archivo o omítalas'
+            }
+
+        validas = lineas[~con_error]
+        if validas.empty:
+            return {'success': False, 'message': 'El archivo no tiene líneas válidas'}
+
+        detalles: List[DetalleCompra] = [
+            DetalleCompra(id_producto=id_producto, cantidad=cantidad, precio_unitario=precio,
+                          subtotal=subtotal, codigo_producto=codigo, nombre_producto=nombre)
+            for id_producto, cantidad, precio, subtotal, codigo, nombre in zip(
+                validas['id_producto'].astype(int).tolist(),
+                validas['cantidad'].astype(int).tolist(),
+                validas['precio_unitario'].tolist(),
+                validas['subtotal'].tolist(),
+                validas['codigo_producto'].tolist(),
+                validas['nombre_producto'].tolist(),
+            )
+        ]
+
+        compra = Compra(
+            numero_factura=numero_factura or None,
+            id_proveedor=id_proveedor,
+            id_empleado=id_empleado,
+            observaciones=observaciones,
+            detalles=detalles
+        )
+        compra.calcular_totales()
+        return self.compra_repo.crear(compra)
+
+    def importar(self, ruta: str) -> Dict[str, Any]:
+        """
+        Lee y valida un archivo y arma su vista previa
+
+        Returns:
+            Dict con 'success' y, si tuvo éxito, 'lineas' (DataFrame validado)
+            y 'vista_previa'; si no, 'message'
+        """
+        try:
+            lineas = self.validar(self.leer_archivo(ruta))
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        except Exception as e:
+            return {'success': False, 'message': f'Error al leer el archivo: {str(e)}'}
+
+        if lineas.empty:
+            return {'success': False, 'message': 'El archivo no tiene líneas'}
+
+        return {'success': True, 'lineas': lineas, 'vista_previa': self.vista_previa(lineas)}
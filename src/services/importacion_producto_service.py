@@ -0,0 +1,79 @@
+"""
+Servicio para la carga masiva del catálogo de productos desde CSV o Excel
+El archivo se envía con COPY a ProductoRepository.importar_catalogo, que
+valida y aplica todo con sentencias por conjunto
+"""
+import io
+import time
+from typing import Dict, Any, List
+
+import pandas as pd
+
+from repositories.producto_repository import ProductoRepository, COLUMNAS_IMPORTACION
+from utils.lectura_archivos import leer_tabla
+
+
+# Encabezados aceptados (sin tildes, en minúsculas) para cada columna
+ALIAS_COLUMNAS = {
+    'codigo': ('codigo', 'cod', 'codigo_producto', 'sku'),
+    'nombre': ('nombre', 'producto', 'nombre_producto'),
+    'descripcion': ('descripcion',),
+    'categoria': ('categoria', 'id_categoria'),
+    'precio_costo': ('precio_costo', 'costo', 'precio_compra'),
+    'precio_venta': ('precio_venta', 'precio', 'pvp'),
+    'stock_actual': ('stock_actual', 'stock', 'existencia', 'existencias'),
+    'stock_minimo': ('stock_minimo', 'minimo'),
+    'unidad_medida': ('unidad_medida', 'unidad'),
+}
+
+
+class ImportacionProductoService:
+    """Servicio para importar (crear o actualizar) productos en lote"""
+
+    def __init__(self):
+        self.producto_repo = ProductoRepository()
+
+    def importar(self, ruta: str, solo_validar: bool = False) -> Dict[str, Any]:
+        """
+        Importa un catálogo de productos
+
+        Args:
+            ruta: Archivo CSV o XLSX (columna 'codigo' obligatoria; nombre y
+                  precios obligatorios solo para productos nuevos)
+            solo_validar: Validar y reportar sin aplicar cambios
+
+        Returns:
+            Dict de ProductoRepository.importar_catalogo más 'lineas' y 'segundos'
+        """
+        inicio = time.perf_counter()
+        try:
+            df = leer_tabla(ruta, ALIAS_COLUMNAS, ('codigo',))
+        except ValueError as e:
+            return {'success': False, 'message': str(e), 'errores': []}
+        except Exception as e:
+            return {'success': False, 'message': f'Error al leer el archivo: {str(e)}', 'errores': []}
+
+        if df.empty:
+            return {'success': False, 'message': 'El archivo no tiene líneas', 'errores': []}
+
+        archivo_csv = io.StringIO()
+        df[list(COLUMNAS_IMPORTACION)].to_csv(archivo_csv, index=False, header=False)
+        archivo_csv.seek(0)
+
+        resultado = self.producto_repo.importar_catalogo(archivo_csv, solo_validar=solo_validar)
+        resultado['lineas'] = len(df)
+        resultado['segundos'] = time.perf_counter() - inicio
+        return resultado
+
+    @staticmethod
+    def guardar_reporte_errores(errores: List[Dict[str, Any]], ruta: str) -> str:
+        """
+        Escribe el reporte de filas rechazadas (linea, codigo, error) en CSV
+
+        Returns:
+            Ruta del archivo generado
+        """
+        pd.DataFrame(errores, columns=['linea', 'codigo', 'error']).to_csv(
+            ruta, index=False, encoding='utf-8-sig'
+        )
+        return ruta
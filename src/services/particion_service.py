@@ -0,0 +1,192 @@
+"""
+Servicio para el mantenimiento de las tablas particionadas por mes
+(ventas, detalle_ventas, movimientos_caja y logs_sistema)
+"""
+import time
+from datetime import date
+from typing import Dict, List, Any
+
+from psycopg2 import errorcodes, sql
+
+from database.connection import DatabaseConnection
+
+
+# Orden de desacople: detalle_ventas referencia a ventas y debe salir primero
+TABLAS_PARTICIONADAS = ('detalle_ventas', 'movimientos_caja', 'logs_sistema', 'ventas')
+
+# Esquema donde quedan los meses archivados (consultables, fuera de las tablas vivas)
+ESQUEMA_ARCHIVO = 'archivo'
+
+
+class ParticionService:
+    """Servicio para crear particiones futuras y archivar meses antiguos"""
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+
+    def asegurar_particiones(self, meses_adelante: int = 3) -> Dict[str, Any]:
+        """
+        Crea las particiones del mes actual y de los próximos meses si faltan
+
+        Args:
+            meses_adelante: Meses futuros a preparar
+
+        Returns:
+            Dict con 'success' (bool) y 'creadas' (int) o 'message'
+        """
+        try:
+            result = self.db.execute_query(
+                "SELECT mantener_particiones(%s) as creadas",
+                (meses_adelante,),
+                fetch='one'
+            )
+            return {'success': True, 'creadas': result['creadas'] if result else 0}
+        except Exception as e:
+            return {'success': False, 'message': f'Error al crear particiones: {str(e)}'}
+
+    def listar_particiones(self) -> List[Dict[str, Any]]:
+        """
+        Lista las particiones vivas con su rango, tamaño y filas estimadas
+
+        Returns:
+            Lista de dicts ordenada por tabla y partición
+        """
+        query = """
+            SELECT
+                padre.relname as tabla,
+                hija.relname as particion,
+                pg_get_expr(hija.relpartbound, hija.oid) as rango,
+                pg_total_relation_size(hija.oid) as bytes,
+                GREATEST(hija.reltuples, 0)::BIGINT as filas_estimadas
+            FROM pg_inherits i
+            JOIN pg_class padre ON i.inhparent = padre.oid
+            JOIN pg_class hija ON i.inhrelid = hija.oid
+            WHERE padre.relname = ANY(%s)
+            ORDER BY padre.relname, hija.relname
+        """
+        return self.db.execute_query(query, (list(TABLAS_PARTICIONADAS),)) or []
+
+    def filas_en_default(self) -> Dict[str, int]:
+        """
+        Cuenta las filas que cayeron en las particiones DEFAULT.
+        Deberían ser cero; si no, el mantenimiento de particiones está atrasado.
+
+        Returns:
+            Dict tabla -> filas en su partición DEFAULT
+        """
+        conteos = {}
+        for tabla in TABLAS_PARTICIONADAS:
+            result = self.db.execute_query(
+                sql.SQL("SELECT COUNT(*) as total FROM {}").format(sql.Identifier(f'{tabla}_default')),
+                fetch='one'
+            )
+            conteos[tabla] = result['total'] if result else 0
+        return conteos
+
+    def archivar_mes(self, año: int, mes: int, intentos: int = 5, lock_timeout: str = '2s') -> Dict[str, Any]:
+        """
+        Desacopla las particiones de un mes y las mueve al esquema de archivo.
+
+        DETACH PARTITION solo toma el bloqueo exclusivo un instante; con
+        lock_timeout no se queda esperando detrás de consultas largas (lo que
+        detendría las ventas) sino que reintenta.
+
+        Args:
+            año: Año del mes a archivar
+            mes: Mes a archivar (1-12)
+            intentos: Reintentos por partición si no se obtiene el bloqueo
+            lock_timeout: Espera máxima por el bloqueo en cada intento
+
+        Returns:
+            Dict con 'success' (bool), 'message' (str) y 'archivadas' (lista)
+        """
+        if date(año, mes, 1) >= date.today().replace(day=1):
+            return {'success': False, 'message': 'Solo se pueden archivar meses anteriores al actual'}
+
+        sufijo = f'{año:04d}_{mes:02d}'
+        connection = None
+        cursor = None
+        archivadas = []
+
+        try:
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+
+            cursor.execute(
+                sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(ESQUEMA_ARCHIVO))
+            )
+            connection.commit()
+
+            for tabla in TABLAS_PARTICIONADAS:
+                particion = f'{tabla}_{sufijo}'
+                cursor.execute("SELECT to_regclass(%s)", (f'public.{particion}',))
+                if cursor.fetchone()[0] is None:
+                    continue
+
+                self._desacoplar(connection, cursor, tabla, particion, intentos, lock_timeout)
+                archivadas.append(particion)
+
+            if not archivadas:
+                return {'success': False, 'message': f'No hay particiones vivas para {sufijo}', 'archivadas': []}
+
+            return {
+                'success': True,
+                'message': f'{len(archivadas)} particiones movidas al esquema {ESQUEMA_ARCHIVO}',
+                'archivadas': archivadas
+            }
+
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {
+                'success': False,
+                'message': f'Error al archivar {sufijo}: {str(e)}',
+                'archivadas': archivadas
+            }
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
+
+    def _desacoplar(self, connection, cursor, tabla: str, particion: str, intentos: int, lock_timeout: str):
+        """Desacopla una partición (con reintentos) y la mueve al esquema de archivo"""
+        for intento in range(1, intentos + 1):
+            try:
+                cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                        sql.Identifier(tabla), sql.Identifier(particion)
+                    )
+                )
+
+                # La FK hacia ventas queda copiada en la tabla desacoplada y
+                # bloquearía el desacople del mes en ventas
+                cursor.execute("""
+                    SELECT conname
+                    FROM pg_constraint
+                    WHERE conrelid = %s::regclass
+                    AND contype = 'f'
+                    AND confrelid = 'ventas'::regclass
+                """, (particion,))
+                for (restriccion,) in cursor.fetchall():
+                    cursor.execute(
+                        sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                            sql.Identifier(particion), sql.Identifier(restriccion)
+                        )
+                    )
+
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+                        sql.Identifier(particion), sql.Identifier(ESQUEMA_ARCHIVO)
+                    )
+                )
+                connection.commit()
+                return
+
+            except Exception as e:
+                connection.rollback()
+                if getattr(e, 'pgcode', None) != errorcodes.LOCK_NOT_AVAILABLE or intento == intentos:
+                    raise
+                time.sleep(intento)
@@ -0,0 +1,296 @@
+"""
+Servicio para el cambio masivo de precios
+Aumentos o descuentos por porcentaje o monto fijo y recálculo del precio de
+venta según el margen, sobre una categoría, un proveedor o un filtro.
+Cada cambio es un único UPDATE y su historial un solo INSERT ... SELECT
+(trigger_historial_precios, por fila, se omite con app.historial_precios).
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from database.connection import DatabaseConnection
+
+
+MODOS = ('porcentaje', 'monto', 'margen')
+APLICAR_A = ('venta', 'costo', 'ambos')
+
+# Filas de ejemplo que retorna la simulación
+MAX_MUESTRA = 50
+
+# Condición de validez del precio resultante (mismas reglas que Producto.validar)
+_PRECIO_VALIDO = "o.costo_nuevo >= 0 AND o.venta_nuevo > 0 AND o.venta_nuevo >= o.costo_nuevo"
+
+
+class PrecioService:
+    """Servicio para actualizar precios de muchos productos a la vez"""
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+
+    # ----------------------------------------
+    # Construcción de la consulta
+    # ----------------------------------------
+    def _validar_parametros(self, modo: str, valor: Optional[float], aplicar_a: str,
+                            redondeo: Optional[float]) -> Tuple[bool, str]:
+        """Valida la combinación de modo, valor y redondeo"""
+        if modo not in MODOS:
+            return False, f"Modo inválido: {modo}"
+        if aplicar_a not in APLICAR_A:
+            return False, f"Precio a modificar inválido: {aplicar_a}"
+        if modo in ('porcentaje', 'monto') and not valor:
+            return False, "Debe indicar un valor distinto de cero"
+        if modo == 'porcentaje' and valor <= -100:
+            return False, "El descuento no puede ser del 100% o más"
+        if modo == 'margen' and valor is not None and valor < 0:
+            return False, "El margen no puede ser negativo"
+        if redondeo is not None and redondeo <= 0:
+            return False, "El redondeo debe ser mayor a cero"
+        return True, ""
+
+    def _filtros(self, id_categoria: Optional[int], id_proveedor: Optional[int],
+                 busqueda: Optional[str], ids_productos: Optional[List[int]],
+                 solo_activos: bool) -> Tuple[str, Dict[str, Any]]:
+        """WHERE sobre productos p para los criterios indicados"""
+        condiciones = ["1=1"]
+        params: Dict[str, Any] = {}
+
+        if solo_activos:
+            condiciones.append("p.estado = TRUE")
+        if id_categoria:
+            condiciones.append("p.id_categoria = %(id_categoria)s")
+            params['id_categoria'] = id_categoria
+        if id_proveedor:
+            # Productos que el proveedor ha vendido a la tienda
+            condiciones.append("""p.id_producto IN (
+                SELECT dc.id_producto
+                FROM compras c
+                JOIN detalle_compras dc ON dc.id_compra = c.id_compra
+                WHERE c.id_proveedor = %(id_proveedor)s
+                AND c.estado <> 'cancelada'
+            )""")
+            params['id_proveedor'] = id_proveedor
+        if busqueda:
+            condiciones.append(
+                "(p.codigo_normalizado LIKE LOWER(%(busqueda)s) OR LOWER(p.nombre) LIKE LOWER(%(busqueda)s))"
+            )
+            params['busqueda'] = f'%{busqueda.strip()}%'
+        if ids_productos:
+            condiciones.append("p.id_producto = ANY(%(ids_productos)s)")
+            params['ids_productos'] = list(ids_productos)
+
+        return ' AND '.join(condiciones), params
+
+    def _objetivo(self, modo: str, valor: Optional[float], aplicar_a: str,
+                  redondeo: Optional[float], **criterio) -> Tuple[str, Dict[str, Any]]:
+        """
+        SELECT con el precio actual y el nuevo de cada producto afectado
+        (id_producto, codigo, nombre, precio_costo, precio_venta, costo_nuevo, venta_nuevo)
+        """
+        where, params = self._filtros(**criterio)
+        params['valor'] = valor
+
+        if modo == 'porcentaje':
+            cambio = "{} * (1 + %(valor)s::numeric / 100)"
+        elif modo == 'monto':
+            cambio = "{} + %(valor)s::numeric"
+        else:
+            cambio = None
+
+        if cambio:
+            costo = cambio.format('p.precio_costo') if aplicar_a in ('costo', 'ambos') else None
+            venta = cambio.format('p.precio_venta') if aplicar_a in ('venta', 'ambos') else None
+        else:
+            # Margen indicado, o el margen actual de cada producto
+            costo = None
+            venta = "p.precio_costo * (1 + COALESCE(%(valor)s::numeric, p.margen_ganancia, 0) / 100)"
+
+        def redondear(expresion: Optional[str], actual: str) -> str:
+            if expresion is None:
+                return actual
+            if redondeo:
+                params['redondeo'] = redondeo
+                return f"ROUND(({expresion}) / %(redondeo)s::numeric) * %(redondeo)s::numeric"
+            return f"ROUND({expresion}, 2)"
+
+        query = f"""
+            SELECT
+                p.id_producto,
+                p.codigo,
+                p.nombre,
+                p.precio_costo,
+                p.precio_venta,
+                {redondear(costo, 'p.precio_costo')} as costo_nuevo,
+                {redondear(venta, 'p.precio_venta')} as venta_nuevo
+            FROM productos p
+            WHERE {where}
+        """
+        return query, params
+
+    # ----------------------------------------
+    # Operaciones
+    # ----------------------------------------
+    def simular(self, modo: str, valor: Optional[float] = None, aplicar_a: str = 'venta',
+                redondeo: Optional[float] = None, id_categoria: Optional[int] = None,
+                id_proveedor: Optional[int] = None, busqueda: Optional[str] = None,
+                ids_productos: Optional[List[int]] = None, solo_activos: bool = True) -> Dict[str, Any]:
+        """
+        Calcula el efecto del cambio sin aplicarlo
+
+        Args:
+            modo: 'porcentaje', 'monto' o 'margen'
+            valor: Porcentaje (10 = +10%, -5 = -5%), monto en quetzales o margen
+                   en %; en modo 'margen' None usa el margen actual de cada producto
+            aplicar_a: 'venta', 'costo' o 'ambos' (el modo 'margen' solo cambia la venta)
+            redondeo: Redondear al múltiplo indicado (0.05, 0.25, 1...); None = centavos
+            id_categoria, id_proveedor, busqueda, ids_productos, solo_activos: Criterios
+
+        Returns:
+            Dict con 'success', 'productos' (que cumplen el criterio), 'a_cambiar',
+            'sin_cambio', 'invalidos' (precio resultante no válido) y 'muestra'
+        """
+        es_valido, mensaje = self._validar_parametros(modo, valor, aplicar_a, redondeo)
+        if not es_valido:
+            return {'success': False, 'message': mensaje}
+
+        try:
+            objetivo, params = self._objetivo(
+                modo, valor, aplicar_a, redondeo, id_categoria=id_categoria, id_proveedor=id_proveedor,
+                busqueda=busqueda, ids_productos=ids_productos, solo_activos=solo_activos
+            )
+            conteo = self.db.execute_query(f"""
+                WITH o AS ({objetivo})
+                SELECT
+                    COUNT(*) as productos,
+                    COUNT(*) FILTER (WHERE NOT ({_PRECIO_VALIDO})) as invalidos,
+                    COUNT(*) FILTER (WHERE {_PRECIO_VALIDO}
+                        AND (o.precio_costo, o.precio_venta) IS DISTINCT FROM (o.costo_nuevo, o.venta_nuevo)
+                    ) as a_cambiar
+                FROM o
+            """, params, fetch='one')
+
+            muestra = self.db.execute_query(f"""
+                WITH o AS ({objetivo})
+                SELECT o.*, ({_PRECIO_VALIDO}) as valido
+                FROM o
+                ORDER BY o.nombre
+                LIMIT {MAX_MUESTRA}
+            """, params) or []
+
+            return {
+                'success': True,
+                'productos': conteo['productos'],
+                'a_cambiar': conteo['a_cambiar'],
+                'invalidos': conteo['invalidos'],
+                'sin_cambio': conteo['productos'] - conteo['a_cambiar'] - conteo['invalidos'],
+                'muestra': muestra
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'Error al simular el cambio de precios: {str(e)}'}
+
+    def aplicar(self, id_empleado: Optional[int], modo: str, valor: Optional[float] = None,
+                aplicar_a: str = 'venta', redondeo: Optional[float] = None,
+                id_categoria: Optional[int] = None, id_proveedor: Optional[int] = None,
+                busqueda: Optional[str] = None, ids_productos: Optional[List[int]] = None,
+                solo_activos: bool = True, lock_timeout: str = '5s') -> Dict[str, Any]:
+        """
+        Aplica el cambio de precios en una sola transacción
+
+        Los productos cuyo precio resultante no es válido (venta menor al
+        costo, precios negativos) se omiten; el resto se actualiza con un
+        único UPDATE. El historial queda a nombre de id_empleado.
+
+        Args:
+            id_empleado: Empleado responsable (se registra en historial_precios)
+            lock_timeout: Espera máxima por productos bloqueados por ventas en curso
+            (los demás como en simular)
+
+        Returns:
+            Dict con 'success', 'message', 'actualizados' e 'invalidos'
+        """
+        es_valido, mensaje = self._validar_parametros(modo, valor, aplicar_a, redondeo)
+        if not es_valido:
+            return {'success': False, 'message': mensaje}
+
+        connection = None
+        cursor = None
+
+        try:
+            objetivo, params = self._objetivo(
+                modo, valor, aplicar_a, redondeo, id_categoria=id_categoria, id_proveedor=id_proveedor,
+                busqueda=busqueda, ids_productos=ids_productos, solo_activos=solo_activos
+            )
+
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+
+            cursor.execute("SELECT set_config('app.id_empleado', %s, true)",
+                           (str(id_empleado) if id_empleado else '',))
+            cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+            cursor.execute("SELECT set_config('app.historial_precios', 'lote', true)")
+
+            # 1. Bloquear en orden de id_producto, el mismo orden en que bloquean el
+            # checkout (VentaRepository y registrar_venta) y CompraRepository: si
+            # comparten productos, una transacción espera a la otra sin deadlock
+            cursor.execute(f"""
+                SELECT p.id_producto
+                FROM productos p
+                WHERE p.id_producto IN (SELECT id_producto FROM ({objetivo}) o)
+                ORDER BY p.id_producto
+                FOR UPDATE
+            """, params)
+
+            cursor.execute(f"""
+                SELECT COUNT(*) FILTER (WHERE NOT ({_PRECIO_VALIDO}))
+                FROM ({objetivo}) o
+            """, params)
+            invalidos = cursor.fetchone()[0]
+
+            # 2. Historial con un solo INSERT (las filas ya están bloqueadas:
+            # los precios actuales son los anteriores al cambio)
+            cursor.execute(f"""
+                INSERT INTO historial_precios (
+                    id_producto, precio_costo_anterior, precio_venta_anterior,
+                    precio_costo_nuevo, precio_venta_nuevo, id_empleado
+                )
+                SELECT o.id_producto, o.precio_costo, o.precio_venta,
+                       o.costo_nuevo, o.venta_nuevo,
+                       NULLIF(current_setting('app.id_empleado', true), '')::INT
+                FROM ({objetivo}) o
+                WHERE {_PRECIO_VALIDO}
+                AND (o.precio_costo, o.precio_venta) IS DISTINCT FROM (o.costo_nuevo, o.venta_nuevo)
+            """, params)
+
+            # 3. Un solo UPDATE para todos los productos
+            cursor.execute(f"""
+                UPDATE productos p
+                SET precio_costo = o.costo_nuevo,
+                    precio_venta = o.venta_nuevo,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM ({objetivo}) o
+                WHERE p.id_producto = o.id_producto
+                AND {_PRECIO_VALIDO}
+                AND (p.precio_costo, p.precio_venta) IS DISTINCT FROM (o.costo_nuevo, o.venta_nuevo)
+            """, params)
+            actualizados = cursor.rowcount
+
+            connection.commit()
+
+            mensaje = f'{actualizados} productos actualizados'
+            if invalidos:
+                mensaje += f'; {invalidos} omitidos porque el precio resultante no es válido'
+            return {
+                'success': True,
+                'message': mensaje,
+                'actualizados': actualizados,
+                'invalidos': invalidos
+            }
+
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {'success': False, 'message': f'Error al actualizar precios: {str(e)}'}
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
@@ -2,36 +2,86 @@
 Servicio de Reportes
 Maneja la lógica de negocio para generación de reportes
 """
+import os
 from datetime import date, datetime
 from typing import Dict, Any
+from database.connection import TokenCancelacion
 from repositories.reporte_repository import ReporteRepository
 
 
+# Segundos que puede tardar cada consulta de un reporte antes de que el
+# servidor la corte (statement_timeout). REPORTES_LIMITE_<TIPO> los cambia,
+# p. ej. REPORTES_LIMITE_CIERRE_MENSUAL=300; 0 quita el límite
+_LIMITES_REPORTE = {
+    'cierre_diario': 30,
+    'cierre_mensual': 120,
+    'compras_periodo': 120,
+    'productos_existencias': 60,
+    'cartera_clientes': 60,
+    'cartera_proveedores': 60,
+    'cartera_empleados': 60,
+}
+
+
+def limite_reporte(tipo: str) -> float:
+    """Límite en segundos de las consultas del reporte `tipo` (0: sin límite)"""
+    valor = os.getenv(f'REPORTES_LIMITE_{tipo.upper()}')
+    if valor:
+        try:
+            return max(float(valor), 0)
+        except ValueError:
+            print(f"[ADVERTENCIA] REPORTES_LIMITE_{tipo.upper()} inválido: {valor}")
+    return _LIMITES_REPORTE.get(tipo, 60)
+
+
 class ReporteService:
     """Servicio para gestión de reportes"""
     
     def __init__(self):
         self.repository = ReporteRepository()
     
-    def generar_cierre_caja_diario(self, fecha: date) -> Dict[str, Any]:
+    def _generar(self, tipo: str, funcion, *args, token: TokenCancelacion = None) -> Dict[str, Any]:
+        """
+        Ejecuta un reporte del repositorio con su límite de tiempo y, si se
+        indica, un token para cancelarlo desde otro hilo (la consulta en curso
+        se interrumpe en el servidor y la conexión vuelve al pool)
+        """
+        token = token or TokenCancelacion()
+        segundos = limite_reporte(tipo)
+        with self.repository.db.limitar(token, segundos):
+            resultado = funcion(*args)
+        
+        if token.cancelado:
+            return {'success': False, 'cancelado': True, 'message': 'Reporte cancelado'}
+        if token.tiempo_agotado:
+            return {
+                'success': False,
+                'message': f'El reporte superó el límite de {segundos:g} segundos. '
+                           f'Reduzca el periodo o ajuste REPORTES_LIMITE_{tipo.upper()}'
+            }
+        return resultado
+    
+    def generar_cierre_caja_diario(self, fecha: date, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de cierre de caja diario
         
         Args:
             fecha: Fecha del reporte
+            token: Permite cancelar el reporte
             
         Returns:
             Dict con el reporte generado
         """
-        return self.repository.cierre_caja_diario(fecha)
+        return self._generar('cierre_diario', self.repository.cierre_caja_diario, fecha, token=token)
     
-    def generar_cierre_caja_mensual(self, año: int, mes: int) -> Dict[str, Any]:
+    def generar_cierre_caja_mensual(self, año: int, mes: int, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de cierre de caja mensual
         
         Args:
             año: Año del reporte
             mes: Mes del reporte (1-12)
+            token: Permite cancelar el reporte
             
         Returns:
             Dict con el reporte generado
@@ -39,15 +89,17 @@ class ReporteService:
         if mes < 1 or mes > 12:
             return {'success': False, 'message': 'El mes debe estar entre 1 y 12'}
         
-        return self.repository.cierre_caja_mensual(año, mes)
+        return self._generar('cierre_mensual', self.repository.cierre_caja_mensual, año, mes, token=token)
     
-    def generar_compras_por_periodo(self, fecha_inicio: date, fecha_fin: date) -> Dict[str, Any]:
+    def generar_compras_por_periodo(self, fecha_inicio: date, fecha_fin: date,
+                                    token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de compras en un periodo
         
         Args:
             fecha_inicio: Fecha inicial
             fecha_fin: Fecha final
+            token: Permite cancelar el reporte
             
         Returns:
             Dict con el reporte generado
@@ -55,40 +107,53 @@ class ReporteService:
         if fecha_inicio > fecha_fin:
             return {'success': False, 'message': 'La fecha inicial no puede ser mayor a la fecha final'}
         
-        return self.repository.compras_por_periodo(fecha_inicio, fecha_fin)
+        return self._generar('compras_periodo', self.repository.compras_por_periodo,
+                             fecha_inicio, fecha_fin, token=token)
     
-    def generar_productos_y_existencias(self) -> Dict[str, Any]:
+    def generar_productos_y_existencias(self, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de productos y existencias
         
+        Args:
+            token: Permite cancelar el reporte
+        
         Returns:
             Dict con el reporte generado
         """
-        return self.repository.productos_y_existencias()
+        return self._generar('productos_existencias', self.repository.productos_y_existencias, token=token)
     
-    def generar_cartera_clientes(self) -> Dict[str, Any]:
+    def generar_cartera_clientes(self, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de cartera de clientes
         
+        Args:
+            token: Permite cancelar el reporte
+        
         Returns:
             Dict con el reporte generado
         """
-        return self.repository.cartera_clientes()
+        return self._generar('cartera_clientes', self.repository.cartera_clientes, token=token)
     
-    def generar_cartera_proveedores(self) -> Dict[str, Any]:
+    def generar_cartera_proveedores(self, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de cartera de proveedores
         
+        Args:
+            token: Permite cancelar el reporte
+        
         Returns:
             Dict con el reporte generado
         """
-        return self.repository.cartera_proveedores()
+        return self._generar('cartera_proveedores', self.repository.cartera_proveedores, token=token)
     
-    def generar_cartera_empleados(self) -> Dict[str, Any]:
+    def generar_cartera_empleados(self, token: TokenCancelacion = None) -> Dict[str, Any]:
         """
         Genera reporte de cartera de empleados
         
+        Args:
+            token: Permite cancelar el reporte
+        
         Returns:
             Dict con el reporte generado
         """
-        return self.repository.cartera_empleados()
+        return self._generar('cartera_empleados', self.repository.cartera_empleados, token=token)
@@ -0,0 +1,250 @@
+"""
+Servicio de sincronización del punto de venta local
+Envía al servidor las ventas guardadas en la terminal (cola SQLite) con su
+clave de idempotencia y mantiene la copia local del catálogo
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from repositories.local_repository import CatalogoLocalRepository, ColaVentasRepository, numero_factura_local
+from utils.metricas import VENTAS_LOCALES_ENVIADAS, VENTAS_LOCALES_PENDIENTES
+
+
+# 'no': sin almacén local; 'respaldo': la cola se usa solo si el servidor no
+# responde; 'siempre': toda venta se guarda en la terminal y se envía después
+MODOS_LOCAL = ('no', 'respaldo', 'siempre')
+
+
+def catalogo_local_activo() -> bool:
+    """
+    True si la vista de ventas usa la copia local del catálogo: siempre que
+    haya punto de venta local y, en modo 'no', salvo POS_CATALOGO_LOCAL=no
+    """
+    return modo_local() != 'no' or os.getenv('POS_CATALOGO_LOCAL', 'si').lower() not in ('no', '0', 'false')
+
+
+def modo_local() -> str:
+    """Modo del punto de venta local según POS_MODO_LOCAL (por defecto 'no')"""
+    modo = os.getenv('POS_MODO_LOCAL') or 'no'
+    if modo not in MODOS_LOCAL:
+        raise ValueError(f"Modo local desconocido: {modo}. Opciones: {', '.join(MODOS_LOCAL)}")
+    return modo
+
+
+class SincronizacionService:
+    """Servicio para enviar la cola local de ventas y copiar el catálogo"""
+
+    def __init__(self):
+        self.cola = ColaVentasRepository()
+        self.catalogo = CatalogoLocalRepository()
+
+    def sincronizar(self, lote: int = 50) -> Dict[str, Any]:
+        """
+        Envía un lote de ventas pendientes con VentaRepository.crear
+
+        Cada venta lleva la clave con la que se guardó en la terminal: si un
+        envío anterior llegó al servidor pero se perdió la respuesta, el
+        servidor retorna la venta original en lugar de duplicarla. Las ventas
+        que el servidor rechaza (stock insuficiente, caja cerrada, ...) quedan
+        como 'conflicto' para revisarlas; un error de conexión detiene el lote
+        y la venta sigue pendiente.
+
+        Una venta de modo respaldo conserva el número con que se intentó en el
+        servidor. Si ese intento no llegó a confirmarse y otra venta ya usa el
+        número, se registra con el número local (LOC-...) y queda como
+        'renumerada' para corregir el comprobante impreso.
+
+        Returns:
+            Dict con 'success', 'enviadas', 'conflictos', 'pendientes' y
+            'sin_conexion'
+        """
+        enviadas = 0
+        conflictos = 0
+        sin_conexion = False
+
+        try:
+            pendientes = self.cola.pendientes(lote)
+            if pendientes:
+                # Se importa aquí: crear el repositorio conecta con el servidor
+                from repositories.venta_repository import VentaRepository
+                try:
+                    ventas = VentaRepository()
+                except Exception as e:
+                    return self._resultado(0, 0, True, f'Servidor no disponible: {str(e)}')
+
+                for clave, id_caja, venta in pendientes:
+                    resultado = ventas.crear(venta, id_caja)
+                    impreso = venta.numero_factura
+                    if resultado.get('factura_duplicada') and impreso != numero_factura_local(clave):
+                        venta.numero_factura = numero_factura_local(clave)
+                        resultado = ventas.crear(venta, id_caja)
+                        if resultado['success']:
+                            self.cola.marcar_renumerada(
+                                clave, resultado['id_venta'], venta.numero_factura,
+                                f'Registrada como {venta.numero_factura}: otra venta ya usa el número '
+                                f'{impreso} del comprobante impreso'
+                            )
+                            VENTAS_LOCALES_ENVIADAS.inc(resultado='renumerada')
+                            enviadas += 1
+                            continue
+
+                    if resultado['success']:
+                        self.cola.marcar_sincronizada(clave, resultado['id_venta'])
+                        VENTAS_LOCALES_ENVIADAS.inc(resultado='sincronizada')
+                        enviadas += 1
+                    elif resultado.get('reintentable'):
+                        self.cola.registrar_intento(clave, resultado['message'])
+                        sin_conexion = True
+                        break
+                    else:
+                        self.cola.marcar_conflicto(clave, resultado['message'])
+                        VENTAS_LOCALES_ENVIADAS.inc(resultado='conflicto')
+                        conflictos += 1
+
+            return self._resultado(enviadas, conflictos, sin_conexion)
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error al sincronizar ventas: {str(e)}'}
+
+    def _resultado(self, enviadas: int, conflictos: int, sin_conexion: bool,
+                   message: Optional[str] = None) -> Dict[str, Any]:
+        pendientes = self.cola.resumen()['pendientes']
+        VENTAS_LOCALES_PENDIENTES.set(pendientes)
+        return {
+            'success': True,
+            'enviadas': enviadas,
+            'conflictos': conflictos,
+            'pendientes': pendientes,
+            'sin_conexion': sin_conexion,
+            'message': message or f'{enviadas} ventas enviadas, {conflictos} en conflicto, {pendientes} pendientes'
+        }
+
+    def actualizar_catalogo(self, horas_completo: float = 24.0) -> Dict[str, Any]:
+        """
+        Pone al día la copia local con lo que cambió en el servidor
+
+        La primera vez (o si la última copia completa tiene más de
+        `horas_completo` horas) copia todos los productos y clientes activos;
+        si no, solo los cambios por version_catalogo desde las marcas
+        guardadas y el stock de todos los productos (las ventas no cambian
+        version_catalogo). La copia completa periódica recoge lo que los
+        cambios no ven (productos borrados).
+
+        Solo con la cola vacía: el stock local ya descuenta las ventas
+        pendientes y el del servidor todavía no.
+
+        Returns:
+            Dict con 'success', 'completo', 'productos' y 'clientes'
+        """
+        try:
+            if self.cola.resumen()['pendientes']:
+                return {'success': False, 'message': 'Hay ventas pendientes de enviar'}
+
+            from repositories.cliente_repository import ClienteRepository
+            from repositories.producto_repository import ProductoRepository
+
+            productos = ProductoRepository()
+            marcas = self.catalogo.marcas()
+            completo = (
+                marcas['productos'] is None or marcas['clientes'] is None or not marcas['completo']
+                or datetime.now() - marcas['completo'] >= timedelta(hours=horas_completo)
+            )
+            # Antes de leer: lo que se confirme durante la copia entra en la siguiente
+            marca = productos.marca_cambios()
+            if completo:
+                resultado = self.catalogo.guardar_catalogo(
+                    productos.listar_activos_para_ventas(con_stock=False),
+                    ClienteRepository().listar_todos(),
+                    marca
+                )
+            else:
+                resultado = self.catalogo.aplicar_cambios(
+                    productos.listar_cambios_para_ventas(marcas['productos']),
+                    ClienteRepository().listar_cambios(marcas['clientes']),
+                    productos.listar_existencias(),
+                    marca
+                )
+            return {**resultado, 'completo': completo}
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error al copiar el catálogo: {str(e)}'}
+
+
+class SincronizadorVentas:
+    """Envía periódicamente, en un hilo daemon, la cola local de ventas"""
+
+    def __init__(self, intervalo: float = 15.0, lote: int = 50, intervalo_catalogo: float = 60.0,
+                 horas_catalogo_completo: float = 24.0):
+        self.intervalo = intervalo
+        self.lote = lote
+        self.intervalo_catalogo = intervalo_catalogo
+        self.horas_catalogo_completo = horas_catalogo_completo
+        self.sincronizacion_service = SincronizacionService()
+        self._ultimo_catalogo = 0.0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def sincronizar(self) -> Dict[str, Any]:
+        """Envía lotes hasta vaciar la cola o perder la conexión; luego copia el catálogo si toca"""
+        while True:
+            resultado = self.sincronizacion_service.sincronizar(self.lote)
+            if not resultado['success']:
+                print(f"[ERROR] {resultado['message']}")
+                return resultado
+            if resultado['enviadas'] or resultado['conflictos']:
+                print(f"[OK] Cola local: {resultado['message']}")
+            if resultado['sin_conexion'] or not resultado['pendientes']:
+                break
+
+        if not resultado['sin_conexion'] and time.monotonic() - self._ultimo_catalogo >= self.intervalo_catalogo:
+            catalogo = self.sincronizacion_service.actualizar_catalogo(self.horas_catalogo_completo)
+            if catalogo['success']:
+                self._ultimo_catalogo = time.monotonic()
+                self.sincronizacion_service.cola.depurar()
+        return resultado
+
+    def iniciar(self):
+        """Sincroniza al iniciar y luego cada `intervalo` segundos"""
+        def _bucle():
+            while True:
+                try:
+                    self.sincronizar()
+                except Exception as e:
+                    print(f"[ERROR] Error al sincronizar ventas locales: {e}")
+                if self._detener.wait(self.intervalo):
+                    break
+
+        self._hilo = threading.Thread(target=_bucle, daemon=True)
+        self._hilo.start()
+        print(f"[OK] Sincronización de ventas locales cada {self.intervalo:g}s")
+
+    def detener(self):
+        self._detener.set()
+
+
+def iniciar_sincronizacion_desde_entorno() -> Optional[SincronizadorVentas]:
+    """
+    Inicia la sincronización según variables de entorno:
+        POS_MODO_LOCAL: 'respaldo' o 'siempre' la activan ('no', por defecto, la desactiva)
+        POS_SINCRONIZACION_INTERVALO: segundos entre envíos de la cola (por defecto 15)
+        POS_SINCRONIZACION_LOTE: ventas por lote (por defecto 50)
+        POS_CATALOGO_INTERVALO: segundos entre actualizaciones del catálogo (por defecto 60)
+        POS_CATALOGO_COMPLETO_HORAS: horas entre copias completas del catálogo (por defecto 24)
+
+    Returns:
+        El sincronizador iniciado o None si está desactivado
+    """
+    if modo_local() == 'no':
+        return None
+
+    sincronizador = SincronizadorVentas(
+        intervalo=float(os.getenv('POS_SINCRONIZACION_INTERVALO', '15') or 15),
+        lote=int(os.getenv('POS_SINCRONIZACION_LOTE', '50') or 50),
+        intervalo_catalogo=float(os.getenv('POS_CATALOGO_INTERVALO', '60') or 60),
+        horas_catalogo_completo=float(os.getenv('POS_CATALOGO_COMPLETO_HORAS', '24') or 24)
+    )
+    sincronizador.iniciar()
+    return sincronizador
@@ -0,0 +1,225 @@
+"""
+Servicio de valorización del inventario
+Refresca la vista materializada valorizacion_inventario (valor por categoría
+al costo y a precio de venta) y guarda una foto diaria para consultar la
+tendencia sin recalcular sobre productos
+"""
+import os
+import threading
+import time
+from datetime import date
+from typing import Dict, Any, Optional
+
+from database.connection import DatabaseConnection
+from utils.metricas import DURACION_VALORIZACION
+
+
+# Guarda la foto del día (la última actualización del día reemplaza a la anterior)
+_GUARDAR_FOTO = """
+    INSERT INTO valorizacion_inventario_diaria
+        (fecha, id_categoria, categoria, productos, unidades, valor_costo, valor_venta, actualizado)
+    SELECT CURRENT_DATE, id_categoria, categoria, productos, unidades, valor_costo, valor_venta, CURRENT_TIMESTAMP
+    FROM valorizacion_inventario
+    ON CONFLICT (fecha, id_categoria) DO UPDATE
+    SET categoria = EXCLUDED.categoria,
+        productos = EXCLUDED.productos,
+        unidades = EXCLUDED.unidades,
+        valor_costo = EXCLUDED.valor_costo,
+        valor_venta = EXCLUDED.valor_venta,
+        actualizado = EXCLUDED.actualizado
+"""
+
+# True si alguna instancia guardó la foto del día hace menos de %s segundos
+_FOTO_RECIENTE = """
+    SELECT COALESCE(MAX(actualizado) > CURRENT_TIMESTAMP - make_interval(secs => %s), false)
+    FROM valorizacion_inventario_diaria
+    WHERE fecha = CURRENT_DATE
+"""
+
+# Categorías que ya no tienen productos activos salen de la foto del día
+_DEPURAR_FOTO = """
+    DELETE FROM valorizacion_inventario_diaria d
+    WHERE d.fecha = CURRENT_DATE
+    AND NOT EXISTS (
+        SELECT 1 FROM valorizacion_inventario v WHERE v.id_categoria = d.id_categoria
+    )
+"""
+
+
+class ValorizacionService:
+    """Servicio para actualizar y consultar la valorización del inventario"""
+
+    def __init__(self):
+        self.db = DatabaseConnection()
+
+    def actualizar(self, vigencia: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Refresca la valorización y guarda la foto del día en una transacción
+
+        REFRESH ... CONCURRENTLY no bloquea a quienes leen la vista. Si otra
+        sesión (otra instancia de la aplicación) ya está actualizando, no se
+        espera: se retorna 'omitido'.
+
+        Args:
+            vigencia: Segundos; si alguna instancia actualizó hace menos que
+                eso, no se repite el refresco ('omitido'). None siempre refresca
+
+        Returns:
+            Dict con 'success', 'message', 'omitido', 'segundos',
+            'valor_costo' y 'valor_venta'
+        """
+        connection = None
+        cursor = None
+
+        try:
+            connection = self.db.get_connection()
+            cursor = connection.cursor()
+
+            cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('valorizacion_inventario'))")
+            if not cursor.fetchone()[0]:
+                connection.rollback()
+                return {
+                    'success': True,
+                    'omitido': True,
+                    'message': 'Otra sesión está actualizando la valorización'
+                }
+
+            if vigencia:
+                cursor.execute(_FOTO_RECIENTE, (vigencia,))
+                if cursor.fetchone()[0]:
+                    connection.rollback()
+                    return {
+                        'success': True,
+                        'omitido': True,
+                        'message': 'La valorización ya está al día'
+                    }
+
+            inicio = time.perf_counter()
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY valorizacion_inventario")
+            cursor.execute(_GUARDAR_FOTO)
+            cursor.execute(_DEPURAR_FOTO)
+            cursor.execute("""
+                SELECT COALESCE(SUM(valor_costo), 0), COALESCE(SUM(valor_venta), 0)
+                FROM valorizacion_inventario
+            """)
+            valor_costo, valor_venta = cursor.fetchone()
+
+            connection.commit()
+            segundos = time.perf_counter() - inicio
+            DURACION_VALORIZACION.observe(segundos)
+
+            return {
+                'success': True,
+                'omitido': False,
+                'message': 'Valorización actualizada',
+                'segundos': segundos,
+                'valor_costo': float(valor_costo),
+                'valor_venta': float(valor_venta)
+            }
+
+        except Exception as e:
+            if connection:
+                connection.rollback()
+            return {'success': False, 'message': f'Error al actualizar la valorización: {str(e)}'}
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                self.db.return_connection(connection)
+
+    def tendencia(self, fecha_inicio: date, fecha_fin: date,
+                  id_categoria: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Valor del inventario por día desde las fotos diarias
+
+        Args:
+            fecha_inicio: Primer día (incluido)
+            fecha_fin: Último día (incluido)
+            id_categoria: Solo esa categoría (0 = sin categoría); None suma todas
+
+        Returns:
+            Dict con 'success' y 'dias' (fecha, productos, unidades, valor_costo, valor_venta)
+        """
+        try:
+            filtro = "AND id_categoria = %s" if id_categoria is not None else ""
+            params = [fecha_inicio, fecha_fin]
+            if id_categoria is not None:
+                params.append(id_categoria)
+
+            dias = self.db.execute_query(f"""
+                SELECT
+                    fecha,
+                    SUM(productos) AS productos,
+                    SUM(unidades) AS unidades,
+                    SUM(valor_costo) AS valor_costo,
+                    SUM(valor_venta) AS valor_venta
+                FROM valorizacion_inventario_diaria
+                WHERE fecha BETWEEN %s AND %s
+                {filtro}
+                GROUP BY fecha
+                ORDER BY fecha
+            """, tuple(params))
+
+            return {'success': True, 'dias': dias or []}
+
+        except Exception as e:
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+class ActualizadorValorizacion:
+    """
+    Refresca periódicamente, en un hilo daemon, la valorización del inventario
+
+    Cada terminal tiene su actualizador: el refresco se omite si otra ya lo
+    hizo en la última mitad del intervalo, así que con varias terminales la
+    vista se refresca a lo sumo una vez cada intervalo / 2 y no una vez por
+    terminal.
+    """
+
+    def __init__(self, intervalo: float = 900.0):
+        self.intervalo = intervalo
+        self.valorizacion_service = ValorizacionService()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def actualizar(self) -> Dict[str, Any]:
+        resultado = self.valorizacion_service.actualizar(vigencia=self.intervalo / 2)
+        if not resultado['success']:
+            print(f"[ERROR] {resultado['message']}")
+        return resultado
+
+    def iniciar(self):
+        """Actualiza al iniciar y luego cada `intervalo` segundos"""
+        def _bucle():
+            while True:
+                try:
+                    self.actualizar()
+                except Exception as e:
+                    print(f"[ERROR] Error al actualizar la valorización: {e}")
+                if self._detener.wait(self.intervalo):
+                    break
+
+        self._hilo = threading.Thread(target=_bucle, daemon=True)
+        self._hilo.start()
+        print(f"[OK] Valorización de inventario cada {self.intervalo:g}s")
+
+    def detener(self):
+        self._detener.set()
+
+
+def iniciar_valorizacion_desde_entorno() -> Optional[ActualizadorValorizacion]:
+    """
+    Inicia la actualización periódica según la variable de entorno
+    VALORIZACION_INTERVALO: segundos entre actualizaciones (por defecto 900; 0 desactiva)
+
+    Returns:
+        El actualizador iniciado o None si está desactivado
+    """
+    intervalo = float(os.getenv('VALORIZACION_INTERVALO', '900') or 0)
+    if intervalo <= 0:
+        return None
+
+    actualizador = ActualizadorValorizacion(intervalo)
+    actualizador.iniciar()
+    return actualizador
@@ -13,6 +13,7 @@ import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 import os
+from utils.metricas import TIEMPO_EXPORTACION
 
 
 class ExportadorReportes:
@@ -39,6 +40,13 @@ class ExportadorReportes:
         os.makedirs("reportes", exist_ok=True)
         ruta_completa = os.path.join("reportes", nombre_archivo)
         
+        with TIEMPO_EXPORTACION.medir(formato='pdf', tipo_reporte=tipo_reporte):
+            ExportadorReportes._construir_pdf(ruta_completa, datos, tipo_reporte)
+        return ruta_completa
+    
+    @staticmethod
+    def _construir_pdf(ruta_completa: str, datos: Dict[str, Any], tipo_reporte: str):
+        """Construye el documento PDF en la ruta indicada"""
         # Crear documento PDF
         doc = SimpleDocTemplate(ruta_completa, pagesize=letter)
         elementos = []
@@ -82,7 +90,6 @@ class ExportadorReportes:
         
         # Generar PDF
         doc.build(elementos)
-        return ruta_completa
     
     @staticmethod
     def _generar_pdf_cierre_diario(elementos, datos, estilo_titulo, estilo_subtitulo):
@@ -279,6 +286,7 @@ class ExportadorReportes:
             ['Sin Stock', str(stats.get('sin_stock', 0))],
             ['Bajo Stock', str(stats.get('bajo_stock', 0))],
             ['Valor Inventario', f"Q{stats.get('valor_inventario', 0):,.2f}"],
+            ['Valor al Costo', f"Q{stats.get('valor_costo', 0):,.2f}"],
         ]
         
         tabla_stats = Table(datos_stats, colWidths=[3*inch, 2*inch])
@@ -476,6 +484,13 @@ class ExportadorReportes:
         os.makedirs("reportes", exist_ok=True)
         ruta_completa = os.path.join("reportes", nombre_archivo)
         
+        with TIEMPO_EXPORTACION.medir(formato='excel', tipo_reporte=tipo_reporte):
+            ExportadorReportes._construir_excel(ruta_completa, datos, tipo_reporte)
+        return ruta_completa
+    
+    @staticmethod
+    def _construir_excel(ruta_completa: str, datos: Dict[str, Any], tipo_reporte: str):
+        """Construye el libro de Excel en la ruta indicada"""
         # Crear workbook
         wb = openpyxl.Workbook()
         ws = wb.active
@@ -509,7 +524,6 @@ class ExportadorReportes:
         
         # Guardar
         wb.save(ruta_completa)
-        return ruta_completa
     
     @staticmethod
     def _generar_excel_cierre_diario(ws, datos, titulo_font, encabezado_fill, encabezado_font, border):
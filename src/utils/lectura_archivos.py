@@ -0,0 +1,78 @@
+"""
+Utilidades para leer archivos tabulares (CSV / Excel) de importación
+"""
+import os
+import unicodedata
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+
+
+EXTENSIONES_SOPORTADAS = ('.csv', '.xlsx')
+
+
+def normalizar_encabezado(texto: str) -> str:
+    """'Código Producto' -> 'codigo_producto'"""
+    sin_tildes = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(sin_tildes.strip().lower().split())
+
+
+def _leer_csv(ruta: str) -> pd.DataFrame:
+    """CSV con ',' o ';' como separador, en UTF-8 (con o sin BOM) o Latin-1"""
+    for encoding in ('utf-8-sig', 'latin-1'):
+        try:
+            with open(ruta, encoding=encoding) as archivo:
+                encabezado = archivo.readline()
+            separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+            return pd.read_csv(ruta, sep=separador, dtype=str, keep_default_na=False,
+                               encoding=encoding, skip_blank_lines=True)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("No se pudo leer el archivo: codificación desconocida")
+
+
+def leer_tabla(ruta: str, alias_columnas: Dict[str, Tuple[str, ...]],
+               obligatorias: Iterable[str]) -> pd.DataFrame:
+    """
+    Lee un CSV o XLSX como texto y renombra sus columnas a los nombres internos
+
+    Args:
+        ruta: Ruta del archivo
+        alias_columnas: Columna interna -> encabezados aceptados (sin tildes, en minúsculas)
+        obligatorias: Columnas que deben estar en el archivo; las demás se completan con ''
+
+    Returns:
+        DataFrame con una columna por clave de alias_columnas más 'linea'
+        (número de fila en el archivo; la fila 1 son los encabezados)
+
+    Raises:
+        ValueError: Si la extensión no es soportada o faltan columnas obligatorias
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in EXTENSIONES_SOPORTADAS:
+        raise ValueError(f"Formato no soportado: {extension}. Use CSV o XLSX")
+
+    if extension == '.csv':
+        df = _leer_csv(ruta)
+    else:
+        df = pd.read_excel(ruta, dtype=str, keep_default_na=False, engine='openpyxl')
+
+    df.columns = [normalizar_encabezado(c) for c in df.columns]
+    obligatorias = set(obligatorias)
+    renombrar = {}
+    for columna, alias in alias_columnas.items():
+        encontrada = next((a for a in alias if a in df.columns), None)
+        if encontrada is not None:
+            renombrar[encontrada] = columna
+        elif columna in obligatorias:
+            raise ValueError(f"Falta la columna '{columna}' (se aceptan: {', '.join(alias)})")
+
+    df = df[list(renombrar)].rename(columns=renombrar)
+    for columna in alias_columnas:
+        if columna not in df.columns:
+            df[columna] = ''
+    df = df[list(alias_columnas)]
+
+    # Filas vacías (típicas al final de una hoja de Excel) no son líneas
+    df = df[df.apply(lambda c: c.astype(str).str.strip()).ne('').any(axis=1)]
+    return df.assign(linea=df.index + 2)
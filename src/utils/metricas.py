@@ -0,0 +1,419 @@
+"""
+Registro de métricas estilo Prometheus
+Contadores, gauges e histogramas expuestos en formato de texto de Prometheus,
+ya sea por un endpoint HTTP local o por un archivo .prom para node-exporter
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Buckets por defecto (segundos) para latencias de operaciones de la aplicación
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor: str) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = '') -> str:
+    """Construye el bloque {etiqueta="valor",...} de una muestra"""
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _formatear_numero(valor: float) -> str:
+    """Formatea un número como lo espera Prometheus"""
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica(ABC):
+    """Base común de todas las métricas del registro"""
+    tipo = 'untyped'
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple[str, ...]:
+        """Ordena los valores de etiqueta según la definición de la métrica"""
+        return tuple(str(etiquetas.get(n, '')) for n in self.etiquetas)
+
+    def _encabezado(self) -> List[str]:
+        return [
+            f'# HELP {self.nombre} {self.descripcion}',
+            f'# TYPE {self.nombre} {self.tipo}'
+        ]
+
+    @abstractmethod
+    def exponer(self) -> List[str]:
+        """Líneas de la métrica en formato de texto de Prometheus (encabezado y muestras)"""
+
+
+class Contador(_Metrica):
+    """Contador monótono creciente"""
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Tuple[str, ...] = ()):
+        super().__init__(nombre, descripcion, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1.0, **etiquetas):
+        """Incrementa el contador"""
+        if cantidad < 0:
+            raise ValueError('Un contador no puede disminuir')
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas) -> float:
+        """Valor actual para un conjunto de etiquetas"""
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def exponer(self) -> List[str]:
+        lineas = self._encabezado()
+        with self._lock:
+            valores = dict(self._valores) or ({(): 0.0} if not self.etiquetas else {})
+        for clave, valor in valores.items():
+            lineas.append(f'{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}')
+        return lineas
+
+
+class Gauge(_Metrica):
+    """Valor que puede subir y bajar, o calcularse al momento de exponer"""
+    tipo = 'gauge'
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Tuple[str, ...] = ()):
+        super().__init__(nombre, descripcion, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._funcion: Optional[Callable[[], float]] = None
+
+    def set(self, valor: float, **etiquetas):
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = float(valor)
+
+    def inc(self, cantidad: float = 1.0, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def dec(self, cantidad: float = 1.0, **etiquetas):
+        self.inc(-cantidad, **etiquetas)
+
+    def set_funcion(self, funcion: Callable[[], float]):
+        """Registra una función que se evalúa cada vez que se exponen las métricas"""
+        self._funcion = funcion
+
+    def exponer(self) -> List[str]:
+        lineas = self._encabezado()
+        if self._funcion is not None:
+            try:
+                self.set(self._funcion())
+            except Exception:
+                pass
+        with self._lock:
+            valores = dict(self._valores) or ({(): 0.0} if not self.etiquetas else {})
+        for clave, valor in valores.items():
+            lineas.append(f'{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_formatear_numero(valor)}')
+        return lineas
+
+
+class Histograma(_Metrica):
+    """Histograma acumulativo con buckets fijos"""
+    tipo = 'histogram'
+
+    def __init__(
+        self,
+        nombre: str,
+        descripcion: str,
+        etiquetas: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_LATENCIA
+    ):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # clave -> [conteos por bucket, suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, valor: float, **etiquetas):
+        """Registra una observación"""
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = [[0] * len(self.buckets), 0.0, 0]
+                self._series[clave] = serie
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Context manager que observa la duración del bloque en segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **etiquetas)
+
+    def conteo(self, **etiquetas) -> int:
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas))
+            return serie[2] if serie else 0
+
+    def exponer(self) -> List[str]:
+        lineas = self._encabezado()
+        with self._lock:
+            series = {k: ([*v[0]], v[1], v[2]) for k, v in self._series.items()}
+        for clave, (conteos, suma, total) in series.items():
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = 'le="' + _formatear_numero(limite) + '"'
+                lineas.append(
+                    f'{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}'
+                )
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f'{self.nombre}_sum{etiquetas} {_formatear_numero(suma)}')
+            lineas.append(f'{self.nombre}_count{etiquetas} {total}')
+        return lineas
+
+
+class RegistroMetricas:
+    """
+    Registro Singleton de métricas de la aplicación
+    Cada terminal POS mantiene su propio registro en memoria
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RegistroMetricas, cls).__new__(cls)
+            cls._instance._metricas = {}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def _obtener_o_crear(self, clase, nombre: str, *args, **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = clase(nombre, *args, **kwargs)
+                self._metricas[nombre] = metrica
+            elif not isinstance(metrica, clase):
+                raise ValueError(f'La métrica {nombre} ya existe con otro tipo')
+            return metrica
+
+    def contador(self, nombre: str, descripcion: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+        return self._obtener_o_crear(Contador, nombre, descripcion, etiquetas)
+
+    def gauge(self, nombre: str, descripcion: str, etiquetas: Tuple[str, ...] = ()) -> Gauge:
+        return self._obtener_o_crear(Gauge, nombre, descripcion, etiquetas)
+
+    def histograma(
+        self,
+        nombre: str,
+        descripcion: str,
+        etiquetas: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_LATENCIA
+    ) -> Histograma:
+        return self._obtener_o_crear(Histograma, nombre, descripcion, etiquetas, buckets)
+
+    def exponer(self) -> str:
+        """Genera el texto completo en formato de exposición de Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+def get_metricas() -> RegistroMetricas:
+    """Retorna la instancia singleton del registro de métricas"""
+    return RegistroMetricas()
+
+
+# ========================================
+# MÉTRICAS DE LA APLICACIÓN
+# ========================================
+_registro = get_metricas()
+
+VENTAS_CREADAS = _registro.contador(
+    'inventario_ventas_creadas_total',
+    'Ventas registradas exitosamente',
+    ('metodo_pago',)
+)
+VENTAS_ANULADAS = _registro.contador(
+    'inventario_ventas_anuladas_total',
+    'Ventas anuladas'
+)
+LATENCIA_CHECKOUT = _registro.histograma(
+    'inventario_checkout_duracion_segundos',
+    'Duración de VentaRepository.crear de principio a fin'
+)
+CONEXIONES_EN_USO = _registro.gauge(
+    'inventario_pool_conexiones_en_uso',
+    'Conexiones del pool prestadas actualmente'
+)
+CONEXIONES_LIBRES = _registro.gauge(
+    'inventario_pool_conexiones_libres',
+    'Conexiones abiertas y disponibles en el pool'
+)
+ESPERA_CONEXION = _registro.histograma(
+    'inventario_pool_obtener_conexion_segundos',
+    'Tiempo para obtener una conexión del pool'
+)
+RETRASO_REPLICA = _registro.gauge(
+    'inventario_replica_retraso_segundos',
+    'Retraso de replicación de la réplica de lectura en la última verificación'
+)
+CONEXIONES_LECTURA = _registro.contador(
+    'inventario_conexiones_lectura_total',
+    'Conexiones pedidas por métodos de solo lectura, por servidor que las atendió',
+    ('destino',)
+)
+TIEMPO_NAVEGACION = _registro.histograma(
+    'inventario_navegacion_duracion_segundos',
+    'Tiempo de construcción y render de una vista del dashboard',
+    ('ruta',)
+)
+TIEMPO_ARRANQUE = _registro.histograma(
+    'inventario_arranque_duracion_segundos',
+    'Tiempo desde el inicio de la aplicación hasta cada etapa (login, conexion, servicios)',
+    ('etapa',)
+)
+TIEMPO_EXPORTACION = _registro.histograma(
+    'inventario_exportacion_duracion_segundos',
+    'Duración de la exportación de reportes',
+    ('formato', 'tipo_reporte')
+)
+CAJAS_DESCUADRADAS = _registro.gauge(
+    'inventario_cajas_descuadradas',
+    'Cajas abiertas cuyos totales no cuadran con sus movimientos (última auditoría)'
+)
+DURACION_VALORIZACION = _registro.histograma(
+    'inventario_valorizacion_refresco_segundos',
+    'Duración del refresco de valorizacion_inventario y la foto diaria'
+)
+VENTAS_LOCALES_PENDIENTES = _registro.gauge(
+    'inventario_ventas_locales_pendientes',
+    'Ventas guardadas en la terminal que aún no llegan al servidor'
+)
+VENTAS_LOCALES_ENVIADAS = _registro.contador(
+    'inventario_ventas_locales_enviadas_total',
+    'Ventas de la cola local procesadas por el servidor',
+    ('resultado',)
+)
+
+
+# ========================================
+# EXPORTACIÓN
+# ========================================
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    """Manejador HTTP que sirve /metrics"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        cuerpo = get_metricas().exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        # Silenciar el log por petición del servidor HTTP
+        pass
+
+
+class ExportadorMetricas:
+    """Expone el registro por HTTP local y/o archivo de texto periódico"""
+
+    def __init__(self):
+        self._servidor = None
+        self._detener = threading.Event()
+        self._hilo_archivo = None
+
+    def iniciar_servidor_http(self, puerto: int, host: str = '127.0.0.1'):
+        """Inicia el endpoint /metrics en un hilo daemon"""
+        self._servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        print(f"[OK] Métricas disponibles en http://{host}:{puerto}/metrics")
+
+    def escribir_archivo(self, ruta: str):
+        """Escribe las métricas de forma atómica (requisito del textfile collector)"""
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(get_metricas().exponer())
+        os.replace(temporal, ruta)
+
+    def iniciar_archivo_texto(self, ruta: str, intervalo: float = 15.0):
+        """Reescribe el archivo .prom cada `intervalo` segundos en un hilo daemon"""
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        def _bucle():
+            while not self._detener.is_set():
+                try:
+                    self.escribir_archivo(ruta)
+                except Exception as e:
+                    print(f"[ERROR] Error escribiendo métricas en {ruta}: {e}")
+                self._detener.wait(intervalo)
+
+        self._hilo_archivo = threading.Thread(target=_bucle, daemon=True)
+        self._hilo_archivo.start()
+        print(f"[OK] Métricas escritas cada {intervalo:g}s en {ruta}")
+
+    def detener(self):
+        self._detener.set()
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor = None
+
+
+def iniciar_exportador_desde_entorno() -> Optional[ExportadorMetricas]:
+    """
+    Inicia la exportación según variables de entorno (ambas son opcionales):
+        METRICS_PORT: puerto del endpoint HTTP local
+        METRICS_HOST: interfaz del endpoint (por defecto 127.0.0.1)
+        METRICS_TEXTFILE: ruta del archivo .prom
+        METRICS_INTERVAL: segundos entre escrituras del archivo (por defecto 15)
+
+    Returns:
+        El exportador iniciado o None si no hay nada configurado
+    """
+    puerto = os.getenv('METRICS_PORT')
+    archivo = os.getenv('METRICS_TEXTFILE')
+    if not puerto and not archivo:
+        return None
+
+    exportador = ExportadorMetricas()
+    try:
+        if puerto:
+            exportador.iniciar_servidor_http(int(puerto), os.getenv('METRICS_HOST', '127.0.0.1'))
+        if archivo:
+            exportador.iniciar_archivo_texto(archivo, float(os.getenv('METRICS_INTERVAL', '15')))
+    except Exception as e:
+        print(f"[ERROR] No se pudo iniciar el exportador de métricas: {e}")
+    return exportador
@@ -1,11 +1,24 @@
 # Views package
-from .login_view import LoginView
-from .dashboard_view import DashboardView
-from .compras_view import ComprasView
-from .proveedores_view import ProveedoresView
-from .ventas_view import VentasView
-from .cajas_view import CajasView
-from .reportes_view import ReportesView
-from .configuracion_view import ConfiguracionView
+# Las vistas se importan al pedirlas (from views import LoginView carga solo
+# login_view): el login se muestra sin cargar antes las demás vistas, sus
+# servicios y repositorios
+import importlib
+
+_MODULOS = {
+    'LoginView': 'login_view',
+    'DashboardView': 'dashboard_view',
+    'ComprasView': 'compras_view',
+    'ProveedoresView': 'proveedores_view',
+    'VentasView': 'ventas_view',
+    'CajasView': 'cajas_view',
+    'ReportesView': 'reportes_view',
+    'ConfiguracionView': 'configuracion_view',
+}
 
 __all__ = ['LoginView', 'DashboardView', 'ComprasView', 'ProveedoresView', 'VentasView', 'CajasView', 'ReportesView', 'ConfiguracionView']
+
+
+def __getattr__(nombre):
+    if nombre in _MODULOS:
+        return getattr(importlib.import_module(f'.{_MODULOS[nombre]}', __name__), nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
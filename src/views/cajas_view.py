@@ -1,6 +1,5 @@
 import flet as ft
 from datetime import datetime
-import math
 from services.caja_service import CajaService
 from models.caja import Caja, MovimientoCaja
 from utils.theme import VoltTheme
@@ -19,9 +18,16 @@ class CajasView:
         self.movimientos = []
         self.historial = []
         
-        # Paginación
+        # Paginación por cursor: cursores[i] es el inicio de la página i + 1
         self.pagina_actual = 1
         self.items_por_pagina = 5
+        self.cursores = [None]
+        self.siguiente = None
+        
+        # Filtros del historial
+        self.dropdown_estado_historial = None
+        self.campo_fecha_inicio = None
+        self.campo_fecha_fin = None
         
         # Referencias a controles
         self.tabla_historial = None
@@ -73,9 +79,58 @@ class CajasView:
             scroll=ft.ScrollMode.AUTO
         )
         
+        # Filtros del historial
+        self.dropdown_estado_historial = ft.Dropdown(
+            label="Estado",
+            options=[
+                ft.dropdown.Option(key="cerrada", text="Cerradas"),
+                ft.dropdown.Option(key="abierta", text="Abiertas"),
+                ft.dropdown.Option(key="", text="Todas")
+            ],
+            width=150,
+            value="cerrada",
+            border_color=VoltTheme.BORDER_COLOR
+        )
+        
+        self.campo_fecha_inicio = ft.TextField(
+            label="Fecha Inicio",
+            hint_text="DD/MM/YYYY",
+            width=140,
+            border_color=VoltTheme.BORDER_COLOR,
+            prefix_icon=ft.Icons.CALENDAR_TODAY
+        )
+        
+        self.campo_fecha_fin = ft.TextField(
+            label="Fecha Fin",
+            hint_text="DD/MM/YYYY",
+            width=140,
+            border_color=VoltTheme.BORDER_COLOR,
+            prefix_icon=ft.Icons.CALENDAR_TODAY
+        )
+        
+        filtros_historial = ft.Row([
+            self.dropdown_estado_historial,
+            self.campo_fecha_inicio,
+            self.campo_fecha_fin,
+            ft.ElevatedButton(
+                "Buscar",
+                icon=ft.Icons.SEARCH,
+                on_click=lambda _: self.buscar_historial(),
+                bgcolor=VoltTheme.SECONDARY,
+                color=ft.Colors.WHITE
+            ),
+            ft.IconButton(
+                icon="refresh",
+                tooltip="Limpiar filtros",
+                on_click=lambda _: self.limpiar_filtros_historial(),
+                icon_color=VoltTheme.PRIMARY
+            )
+        ], spacing=10)
+        
         tabla_container = ft.Container(
             content=ft.Column([
                 ft.Text("Historial de Cajas", size=18, weight=ft.FontWeight.BOLD, color=VoltTheme.PRIMARY),
+                filtros_historial,
                 self.tabla_historial
             ], spacing=10),
             bgcolor=ft.Colors.WHITE,
@@ -185,23 +240,51 @@ class CajasView:
         
         self.page.update()
     
+    def buscar_historial(self):
+        """Aplica los filtros del historial desde la primera página"""
+        self.pagina_actual = 1
+        self.cursores = [None]
+        self.cargar_historial()
+    
+    def limpiar_filtros_historial(self):
+        """Restablece los filtros del historial y recarga"""
+        self.dropdown_estado_historial.value = "cerrada"
+        self.campo_fecha_inicio.value = ""
+        self.campo_fecha_fin.value = ""
+        self.buscar_historial()
+    
+    def _leer_fecha(self, campo, nombre):
+        """Convierte el valor DD/MM/YYYY de un campo; retorna (ok, fecha o None)"""
+        if not campo.value:
+            return True, None
+        try:
+            return True, datetime.strptime(campo.value.strip(), "%d/%m/%Y").date()
+        except ValueError:
+            self.mostrar_alerta("Error", f"Formato de {nombre} inválido. Use DD/MM/YYYY", VoltTheme.WARNING)
+            return False, None
+    
     def cargar_historial(self):
-        """Carga el historial de cajas"""
+        """Carga la página actual del historial de cajas del empleado"""
         try:
-            # Obtener todas las cajas del empleado
-            todas_cajas = self.caja_service.obtener_historial_cajas(
+            ok_inicio, fecha_inicio = self._leer_fecha(self.campo_fecha_inicio, "fecha inicio")
+            ok_fin, fecha_fin = self._leer_fecha(self.campo_fecha_fin, "fecha fin")
+            if not (ok_inicio and ok_fin):
+                return
+            
+            resultado = self.caja_service.listar_historial(
+                estado=self.dropdown_estado_historial.value or None,
                 id_empleado=self.empleado['id_empleado'],
-                limit=100
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                limit=self.items_por_pagina,
+                despues_de=self.cursores[self.pagina_actual - 1]
             )
             
-            # Filtrar solo cerradas para el historial
-            self.historial = [c for c in todas_cajas if c['estado'] == 'cerrada']
-            
-            total = len(self.historial)
-            total_paginas = math.ceil(total / self.items_por_pagina) if total > 0 else 1
+            self.historial = resultado['cajas']
+            self.siguiente = resultado['siguiente']
             
             self.actualizar_tabla_historial()
-            self.actualizar_paginacion(total_paginas)
+            self.actualizar_paginacion()
         except Exception as e:
             print(f"Error al cargar historial: {e}")
             self.mostrar_alerta("Error", f"No se pudo cargar el historial: {str(e)}", VoltTheme.DANGER)
@@ -226,20 +309,15 @@ class CajasView:
         )
         self.tabla_historial.controls.append(header)
         
-        # Calcular índices para paginación
-        inicio = (self.pagina_actual - 1) * self.items_por_pagina
-        fin = inicio + self.items_por_pagina
-        cajas_pagina = self.historial[inicio:fin]
-        
         # Filas de datos
-        for caja in cajas_pagina:
+        for caja in self.historial:
             fila = self._crear_fila_caja(caja)
             self.tabla_historial.controls.append(fila)
         
         if not self.historial:
             mensaje_vacio = ft.Container(
                 content=ft.Text(
-                    "No hay cajas cerradas en el historial",
+                    "No hay cajas que coincidan con los filtros",
                     size=14,
                     color=VoltTheme.TEXT_SECONDARY,
                     text_align=ft.TextAlign.CENTER
@@ -287,7 +365,7 @@ class CajasView:
                 ft.Container(ft.Text(apertura_str, size=12, text_align=ft.TextAlign.CENTER), expand=2, alignment=ft.alignment.center),
                 ft.Container(ft.Text(cierre_str, size=12, text_align=ft.TextAlign.CENTER), expand=2, alignment=ft.alignment.center),
                 ft.Container(ft.Text(f"Q {caja['monto_inicial']:.2f}", size=12, text_align=ft.TextAlign.CENTER), expand=1, alignment=ft.alignment.center),
-                ft.Container(ft.Text(f"Q {caja.get('monto_final', 0):.2f}", size=12, text_align=ft.TextAlign.CENTER), expand=1, alignment=ft.alignment.center),
+                ft.Container(ft.Text(f"Q {caja.get('monto_final') or 0:.2f}", size=12, text_align=ft.TextAlign.CENTER), expand=1, alignment=ft.alignment.center),
                 ft.Container(
                     ft.Text(diff_text, size=12, weight=ft.FontWeight.BOLD, color=diff_color, text_align=ft.TextAlign.CENTER),
                     expand=1,
@@ -311,72 +389,49 @@ class CajasView:
         
         return fila
     
-    def actualizar_paginacion(self, total_paginas):
-        """Actualiza los controles de paginación"""
-        botones = []
-        
-        if total_paginas <= 1:
+    def actualizar_paginacion(self):
+        """Actualiza los controles de paginación (anterior / siguiente)"""
+        if self.pagina_actual == 1 and not self.siguiente:
             self.paginacion_container.content = ft.Row([], alignment=ft.MainAxisAlignment.CENTER)
             self.page.update()
             return
         
-        # Botón anterior
-        botones.append(
+        botones = [
             ft.IconButton(
                 icon=ft.Icons.CHEVRON_LEFT,
                 on_click=lambda _: self.cambiar_pagina(self.pagina_actual - 1),
                 disabled=self.pagina_actual == 1,
                 icon_color=VoltTheme.PRIMARY if self.pagina_actual > 1 else VoltTheme.TEXT_SECONDARY
-            )
-        )
-        
-        # Números de página (mostrar máximo 5)
-        inicio = max(1, self.pagina_actual - 2)
-        fin = min(total_paginas, inicio + 4)
-        
-        if fin - inicio < 4:
-            inicio = max(1, fin - 4)
-        
-        for i in range(inicio, fin + 1):
-            if i == self.pagina_actual:
-                botones.append(
-                    ft.Container(
-                        content=ft.Text(str(i), color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
-                        bgcolor=VoltTheme.PRIMARY,
-                        width=35,
-                        height=35,
-                        border_radius=5,
-                        alignment=ft.alignment.center
-                    )
-                )
-            else:
-                botones.append(
-                    ft.TextButton(
-                        text=str(i),
-                        on_click=lambda _, p=i: self.cambiar_pagina(p)
-                    )
-                )
-        
-        # Botón siguiente
-        botones.append(
+            ),
+            ft.Container(
+                content=ft.Text(str(self.pagina_actual), color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
+                bgcolor=VoltTheme.PRIMARY,
+                width=35,
+                height=35,
+                border_radius=5,
+                alignment=ft.alignment.center
+            ),
             ft.IconButton(
                 icon=ft.Icons.CHEVRON_RIGHT,
                 on_click=lambda _: self.cambiar_pagina(self.pagina_actual + 1),
-                disabled=self.pagina_actual == total_paginas,
-                icon_color=VoltTheme.PRIMARY if self.pagina_actual < total_paginas else VoltTheme.TEXT_SECONDARY
+                disabled=not self.siguiente,
+                icon_color=VoltTheme.PRIMARY if self.siguiente else VoltTheme.TEXT_SECONDARY
             )
-        )
+        ]
         
         self.paginacion_container.content = ft.Row(botones, alignment=ft.MainAxisAlignment.CENTER)
         self.page.update()
     
     def cambiar_pagina(self, nueva_pagina):
-        """Cambia a una página específica"""
+        """Avanza o retrocede una página"""
+        if nueva_pagina < 1:
+            return
+        if nueva_pagina > len(self.cursores):
+            if not self.siguiente:
+                return
+            self.cursores.append(self.siguiente)
         self.pagina_actual = nueva_pagina
-        self.actualizar_tabla_historial()
-        total = len(self.historial)
-        total_paginas = math.ceil(total / self.items_por_pagina) if total > 0 else 1
-        self.actualizar_paginacion(total_paginas)
+        self.cargar_historial()
     
     def abrir_modal_abrir_caja(self):
         """Abre el modal para abrir una caja"""
@@ -460,11 +515,8 @@ class CajasView:
         # Obtener resumen de la caja
         resumen = self.caja_service.obtener_resumen_caja(self.caja_actual['id_caja'])
         
-        monto_esperado = (
-            self.caja_actual['monto_inicial'] +
-            resumen.get('total_ingresos', 0) -
-            resumen.get('total_egresos', 0)
-        )
+        # total_ingresos ya incluye el monto inicial
+        monto_esperado = resumen.get('total_calculado', 0)
         
         self.campo_monto_final = ft.TextField(
             label="Monto Final Real *",
@@ -561,11 +613,17 @@ class CajasView:
             if resultado['success']:
                 diferencia = resultado.get('diferencia', 0)
                 mensaje = f"Caja cerrada exitosamente.\nDiferencia: Q {diferencia:.2f}"
+                descuadre = resultado.get('descuadre')
+                if descuadre:
+                    mensaje += (
+                        "\nLos totales registrados no cuadraban con los movimientos y se corrigieron "
+                        f"(ingresos {descuadre['ingresos']:+.2f}, egresos {descuadre['egresos']:+.2f})."
+                    )
                 self.mostrar_alerta("Éxito", mensaje, VoltTheme.SUCCESS)
                 self.cerrar_modal()
                 self.verificar_caja_actual()
                 self.actualizar_info_caja_actual()
-                self.cargar_historial()
+                self.buscar_historial()
             else:
                 self.mostrar_alerta("Error", resultado['message'], VoltTheme.DANGER)
         except ValueError:
@@ -653,6 +653,10 @@ class ClientesView:
             else:
                 fecha_primera_compra = cliente.fecha_primera_compra.strftime("%d/%m/%Y")
         
+        fecha_ultima_compra = "N/A"
+        if cliente.fecha_ultima_compra:
+            fecha_ultima_compra = cliente.fecha_ultima_compra.strftime("%d/%m/%Y")
+        
         fecha_actualizacion = "N/A"
         if cliente.fecha_actualizacion:
             if isinstance(cliente.fecha_actualizacion, str):
@@ -742,6 +746,16 @@ class ClientesView:
                         ft.Text(fecha_primera_compra, size=13),
                     ], expand=1),
                 ]),
+                ft.Row([
+                    ft.Column([
+                        ft.Text("Cantidad de Compras:", weight=ft.FontWeight.BOLD, size=13),
+                        ft.Text(str(cliente.cantidad_compras), size=13),
+                    ], expand=1),
+                    ft.Column([
+                        ft.Text("Última Compra:", weight=ft.FontWeight.BOLD, size=13),
+                        ft.Text(fecha_ultima_compra, size=13),
+                    ], expand=1),
+                ]),
                 
                 ft.Divider(color=VoltTheme.BORDER_COLOR),
                 
@@ -5,8 +5,12 @@ from repositories.compra_repository import CompraRepository
 from repositories.proveedor_repository import ProveedorRepository
 from repositories.producto_repository import ProductoRepository
 from models.compra import Compra, DetalleCompra
+from services.importacion_compra_service import ImportacionCompraService
 from utils.theme import VoltTheme
 
+# Filas que muestra la vista previa de una importación (el resto solo se resume)
+MAX_FILAS_VISTA_PREVIA = 200
+
 
 class ComprasView:
     def __init__(self, page: ft.Page, empleado):
@@ -15,6 +19,7 @@ class ComprasView:
         self.compra_repo = CompraRepository()
         self.proveedor_repo = ProveedorRepository()
         self.producto_repo = ProductoRepository()
+        self.importacion_service = ImportacionCompraService()
         
         # Estado
         self.compras = []
@@ -48,6 +53,12 @@ class ComprasView:
         self.texto_total = None
         self.campo_numero_factura = None
         self.campo_observaciones = None
+        
+        # Para importar factura
+        self.selector_archivo = None
+        self.lineas_importadas = None
+        self.nombre_archivo_importado = None
+        self.check_omitir_errores = None
     
     def build(self):
         # Header
@@ -117,6 +128,12 @@ class ComprasView:
                     icon_color=VoltTheme.PRIMARY
                 ),
                 ft.Container(expand=True),
+                ft.OutlinedButton(
+                    "Importar Factura",
+                    icon=ft.Icons.UPLOAD_FILE,
+                    tooltip="Importar una factura de proveedor desde CSV o Excel",
+                    on_click=lambda _: self.seleccionar_archivo_importacion()
+                ),
                 ft.ElevatedButton(
                     "Nueva Compra",
                     icon=ft.Icons.ADD,
@@ -854,6 +871,235 @@ class ComprasView:
             else:
                 self.mostrar_mensaje("Error", f"Error al guardar la compra: {error_msg}", "error")
     
+    # ----------------------------------------
+    # Importación de facturas (CSV / Excel)
+    # ----------------------------------------
+    def seleccionar_archivo_importacion(self):
+        """Abre el selector de archivos para importar una factura de proveedor"""
+        if self.selector_archivo is None:
+            self.selector_archivo = ft.FilePicker(on_result=self.al_seleccionar_archivo)
+            self.page.overlay.append(self.selector_archivo)
+            self.page.update()
+        
+        self.selector_archivo.pick_files(
+            dialog_title="Seleccionar factura del proveedor",
+            allowed_extensions=["csv", "xlsx"],
+            allow_multiple=False
+        )
+    
+    def al_seleccionar_archivo(self, e):
+        """Lee y valida el archivo elegido y muestra la vista previa"""
+        if not e.files:
+            return
+        
+        archivo = e.files[0]
+        if not archivo.path:
+            self.mostrar_mensaje("Error", "No se pudo acceder al archivo seleccionado", "error")
+            return
+        
+        resultado = self.importacion_service.importar(archivo.path)
+        if not resultado.get('success'):
+            self.mostrar_mensaje("Error", resultado.get('message', 'No se pudo importar el archivo'), "error")
+            return
+        
+        try:
+            self.proveedores = self.proveedor_repo.listar()
+        except Exception as ex:
+            self.mostrar_mensaje("Error", f"Error al cargar proveedores: {str(ex)}", "error")
+            return
+        
+        if not self.proveedores:
+            self.mostrar_mensaje("Error", "No hay proveedores activos. Debe crear al menos un proveedor.", "error")
+            return
+        
+        self.lineas_importadas = resultado['lineas']
+        self.nombre_archivo_importado = archivo.name
+        self.abrir_modal_importacion(resultado['vista_previa'])
+    
+    def abrir_modal_importacion(self, vista_previa):
+        """Muestra qué cambiará en stock y precios antes de registrar la compra importada"""
+        cambios = vista_previa['cambios']
+        errores = vista_previa['errores']
+        
+        self.campo_numero_factura = ft.TextField(
+            label="Número de Factura",
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY,
+            hint_text="Opcional"
+        )
+        
+        self.dropdown_proveedor = ft.Dropdown(
+            label="Proveedor *",
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY,
+            options=[
+                ft.dropdown.Option(str(p.id_proveedor), p.nombre_empresa)
+                for p in self.proveedores
+            ]
+        )
+        
+        self.check_omitir_errores = ft.Checkbox(
+            label=f"Registrar solo las líneas válidas (omitir {len(errores)} con errores)",
+            value=False,
+            visible=len(errores) > 0
+        )
+        
+        resumen = ft.Row([
+            ft.Text(f"Archivo: {self.nombre_archivo_importado}", size=13),
+            ft.Text(f"Líneas: {vista_previa['lineas']}", size=13),
+            ft.Text(f"Válidas: {vista_previa['lineas_validas']}", size=13, color=VoltTheme.SUCCESS),
+            ft.Text(f"Con errores: {len(errores)}", size=13,
+                    color=VoltTheme.DANGER if len(errores) else VoltTheme.TEXT_SECONDARY),
+            ft.Text(f"Productos: {len(cambios)}", size=13),
+        ], spacing=20, wrap=True)
+        
+        # Diferencia por producto: actual -> nuevo
+        encabezado_cambios = ft.Row([
+            ft.Container(ft.Text("Producto", size=12, weight=ft.FontWeight.BOLD), expand=3),
+            ft.Container(ft.Text("Cantidad", size=12, weight=ft.FontWeight.BOLD), expand=1),
+            ft.Container(ft.Text("Stock", size=12, weight=ft.FontWeight.BOLD), expand=2),
+            ft.Container(ft.Text("Costo", size=12, weight=ft.FontWeight.BOLD), expand=2),
+            ft.Container(ft.Text("Venta", size=12, weight=ft.FontWeight.BOLD), expand=2),
+        ])
+        filas_cambios = []
+        for c in cambios.head(MAX_FILAS_VISTA_PREVIA).itertuples(index=False):
+            variacion = c.variacion_costo
+            color_costo = VoltTheme.TEXT_PRIMARY
+            if variacion == variacion and variacion > 0:  # no NaN
+                color_costo = VoltTheme.DANGER
+            elif variacion == variacion and variacion < 0:
+                color_costo = VoltTheme.SUCCESS
+            
+            filas_cambios.append(ft.Row([
+                ft.Container(ft.Text(f"{c.codigo} - {c.nombre}", size=12), expand=3),
+                ft.Container(ft.Text(f"+{int(c.cantidad)}", size=12), expand=1),
+                ft.Container(ft.Text(f"{int(c.stock_actual)} → {int(c.stock_nuevo)}", size=12), expand=2),
+                ft.Container(ft.Text(f"Q {c.precio_costo:.2f} → Q {c.precio_costo_nuevo:.2f}",
+                                     size=12, color=color_costo), expand=2),
+                ft.Container(ft.Text(f"Q {c.precio_venta:.2f} → Q {c.precio_venta_nuevo:.2f}", size=12), expand=2),
+            ]))
+        if len(cambios) > MAX_FILAS_VISTA_PREVIA:
+            filas_cambios.append(ft.Text(
+                f"... y {len(cambios) - MAX_FILAS_VISTA_PREVIA} productos más",
+                size=12, italic=True, color=VoltTheme.TEXT_SECONDARY
+            ))
+        
+        filas_errores = [
+            ft.Text(f"Línea {e.linea}: {e.codigo or '(sin código)'} - {e.error}", size=12, color=VoltTheme.DANGER)
+            for e in errores.head(MAX_FILAS_VISTA_PREVIA).itertuples(index=False)
+        ]
+        if len(errores) > MAX_FILAS_VISTA_PREVIA:
+            filas_errores.append(ft.Text(
+                f"... y {len(errores) - MAX_FILAS_VISTA_PREVIA} líneas más con errores",
+                size=12, italic=True, color=VoltTheme.TEXT_SECONDARY
+            ))
+        
+        modal_content = ft.Container(
+            content=ft.Column([
+                ft.Text(
+                    "Importar Factura - Vista Previa",
+                    size=20,
+                    weight=ft.FontWeight.BOLD,
+                    color=VoltTheme.PRIMARY
+                ),
+                ft.Divider(color=VoltTheme.BORDER_COLOR),
+                resumen,
+                self.campo_numero_factura,
+                self.dropdown_proveedor,
+                
+                ft.Divider(color=VoltTheme.BORDER_COLOR),
+                ft.Text("Cambios en productos", size=16, weight=ft.FontWeight.BOLD),
+                encabezado_cambios,
+                ft.Container(
+                    content=ft.Column(filas_cambios, spacing=5, scroll=ft.ScrollMode.AUTO),
+                    height=220,
+                    border=ft.border.all(1, VoltTheme.BORDER_COLOR),
+                    border_radius=5,
+                    padding=10
+                ),
+                
+                ft.Text("Líneas con errores", size=16, weight=ft.FontWeight.BOLD, visible=len(errores) > 0),
+                ft.Container(
+                    content=ft.Column(filas_errores, spacing=3, scroll=ft.ScrollMode.AUTO),
+                    height=120,
+                    border=ft.border.all(1, VoltTheme.DANGER),
+                    border_radius=5,
+                    padding=10,
+                    visible=len(errores) > 0
+                ),
+                self.check_omitir_errores,
+                
+                ft.Container(
+                    content=ft.Text(f"Total: Q {vista_previa['total']:.2f}", size=20,
+                                    weight=ft.FontWeight.BOLD, color=VoltTheme.PRIMARY),
+                    alignment=ft.alignment.center_right,
+                    padding=10,
+                    bgcolor=VoltTheme.BG_PRIMARY,
+                    border_radius=5
+                ),
+            ], spacing=15, scroll=ft.ScrollMode.AUTO),
+            bgcolor=ft.Colors.WHITE,
+            padding=30,
+            width=1000,
+            height=600,
+            border_radius=10
+        )
+        
+        botones = ft.Container(
+            content=ft.Row([
+                ft.TextButton(
+                    "Cancelar",
+                    on_click=lambda _: self.cerrar_modal()
+                ),
+                ft.ElevatedButton(
+                    "Registrar Compra",
+                    bgcolor=VoltTheme.PRIMARY,
+                    color=ft.Colors.WHITE,
+                    on_click=lambda _: self.confirmar_importacion()
+                ),
+            ], alignment=ft.MainAxisAlignment.END, spacing=10),
+            bgcolor=ft.Colors.WHITE,
+            padding=ft.padding.only(left=30, right=30, bottom=20),
+            width=1000
+        )
+        
+        self.modal = ft.AlertDialog(
+            modal=True,
+            content=ft.Column([modal_content, botones], spacing=0)
+        )
+        
+        self.page.open(self.modal)
+    
+    def confirmar_importacion(self):
+        """Registra la compra importada con CompraRepository.crear"""
+        if not self.dropdown_proveedor.value:
+            self.mostrar_mensaje("Error", "Debe seleccionar un proveedor", "error")
+            return
+        
+        resultado = self.importacion_service.registrar(
+            self.lineas_importadas,
+            id_proveedor=int(self.dropdown_proveedor.value),
+            id_empleado=self.empleado['id_empleado'],
+            numero_factura=self.campo_numero_factura.value.strip() if self.campo_numero_factura.value else None,
+            observaciones=f"Importada desde {self.nombre_archivo_importado}",
+            omitir_errores=bool(self.check_omitir_errores.value)
+        )
+        
+        if resultado.get('success'):
+            self.lineas_importadas = None
+            self.cerrar_modal()
+            self.mostrar_mensaje("Éxito", "Compra importada exitosamente. Stock y precios actualizados.", "success")
+            self.cargar_compras()
+            return
+        
+        mensaje_error = resultado.get('message', 'Error al registrar la compra')
+        if 'duplicate' in mensaje_error.lower() or 'unique' in mensaje_error.lower():
+            self.mostrar_mensaje("Factura Duplicada",
+                "El número de factura ya existe. Por favor ingrese un número diferente o deje el campo vacío.",
+                "warning")
+        else:
+            self.mostrar_mensaje("Error", mensaje_error, "error")
+    
     def ver_detalle_compra(self, compra: Compra):
         """Muestra el detalle completo de una compra"""
         # Cargar compra con detalles
@@ -4,17 +4,10 @@ Incluye sidebar, header y área de contenido
 """
 import flet as ft
 from utils.theme import VoltTheme
-from views.productos_view import ProductosView
-from views.clientes_view import ClientesView
-from views.compras_view import ComprasView
-from views.proveedores_view import ProveedoresView
-from views.ventas_view import VentasView
-from views.cajas_view import CajasView
-from views.empleados_view import EmpleadosView
-from views.reportes_view import ReportesView
-from views.configuracion_view import ConfiguracionView
-from database.connection import get_db
-from datetime import date
+from database.conexion_async import backend_async_activo, get_db_async
+from repositories.dashboard_repository import DashboardRepository
+from repositories.local_repository import CatalogoLocalRepository
+from utils.metricas import TIEMPO_NAVEGACION
 import threading
 import time
 
@@ -22,11 +15,12 @@ import time
 class DashboardView:
     """Dashboard principal del sistema"""
     
-    def __init__(self, page: ft.Page, auth_service, empleado, on_logout):
+    def __init__(self, page: ft.Page, auth_service, empleado, on_logout, sin_conexion=False):
         self.page = page
         self.auth = auth_service
         self.empleado = empleado
         self.on_logout = on_logout
+        self.sin_conexion = sin_conexion  # Solo el punto de venta, con el almacén local
         self.contenido_actual = None
         self.sidebar_expanded = True
         self.contenedor_contenido = None
@@ -233,42 +227,27 @@ class DashboardView:
         """Crea el contenido inicial del dashboard"""
         
         # Obtener datos reales de forma segura
-        try:
-            db = get_db()
-            
-            # Total productos
-            result = db.execute_query("SELECT COUNT(*) as total FROM productos WHERE estado = TRUE", fetch='one')
-            total_productos = result['total'] if result else 0
-            
-            # Ventas hoy
-            hoy = date.today()
-            result = db.execute_query("""
-                SELECT COUNT(*) as total, COALESCE(SUM(total), 0) as monto 
-                FROM ventas 
-                WHERE DATE(fecha_venta) = %s
-            """, (hoy,), fetch='one')
-            ventas_hoy = result['monto'] if result else 0
-            
-            # Total clientes
-            result = db.execute_query("SELECT COUNT(*) as total FROM clientes WHERE estado = TRUE", fetch='one')
-            total_clientes = result['total'] if result else 0
-            
-            # Productos bajo stock
-            result = db.execute_query("""
-                SELECT COUNT(*) as total 
-                FROM productos 
-                WHERE stock_actual <= stock_minimo AND estado = TRUE
-            """, fetch='one')
-            stock_bajo = result['total'] if result else 0
-            
-        except Exception as e:
-            print(f"[ERROR] Error obteniendo datos dashboard: {e}")
-            import traceback
-            traceback.print_exc()
-            total_productos = 0
-            ventas_hoy = 0
-            total_clientes = 0
-            stock_bajo = 0
+        if self.sin_conexion:
+            # Copia local del catálogo y ventas guardadas en esta terminal
+            resumen = CatalogoLocalRepository().resumen()
+            total_productos = resumen['total_productos']
+            ventas_hoy = resumen['ventas_hoy']
+            total_clientes = resumen['total_clientes']
+            stock_bajo = resumen['stock_bajo']
+        else:
+            # Backend asíncrono (DB_ASYNC): las cuatro consultas en un solo viaje de red
+            if backend_async_activo():
+                try:
+                    contadores = get_db_async().ejecutar(DashboardRepository.obtener_contadores_inicio_async())
+                except Exception as e:
+                    print(f"[ERROR] Error obteniendo datos dashboard: {e}")
+                    contadores = DashboardRepository.obtener_contadores_inicio()
+            else:
+                contadores = DashboardRepository.obtener_contadores_inicio()
+            total_productos = contadores['total_productos']
+            ventas_hoy = contadores['ventas_hoy']
+            total_clientes = contadores['total_clientes']
+            stock_bajo = contadores['stock_bajo']
         
         # Tarjetas de estadísticas
         stats_cards = ft.Container(
@@ -419,53 +398,64 @@ class DashboardView:
         
         # Actualizar ruta actual
         self.ruta_actual = route
+        inicio = time.perf_counter()
         
-        # Cargar contenido según la ruta
+        # Cargar contenido según la ruta (cada vista se importa la primera
+        # vez que se abre: no demora el inicio de la aplicación)
         try:
             if route == "dashboard":
                 nuevo_contenido = self._crear_dashboard_home()
             elif route == "productos":
                 print("[DEBUG] Creando vista de productos...")
+                from views.productos_view import ProductosView
                 vista_productos = ProductosView(self.page, self.empleado)
                 nuevo_contenido = vista_productos.build()
                 print("[DEBUG] Vista de productos creada")
             elif route == "clientes":
                 print("[DEBUG] Creando vista de clientes...")
+                from views.clientes_view import ClientesView
                 vista_clientes = ClientesView(self.page, lambda: self._navegar("dashboard"))
                 nuevo_contenido = vista_clientes.build()
                 print("[DEBUG] Vista de clientes creada")
             elif route == "compras":
                 print("[DEBUG] Creando vista de compras...")
+                from views.compras_view import ComprasView
                 vista_compras = ComprasView(self.page, self.empleado)
                 nuevo_contenido = vista_compras.build()
                 print("[DEBUG] Vista de compras creada")
             elif route == "proveedores":
                 print("[DEBUG] Creando vista de proveedores...")
+                from views.proveedores_view import ProveedoresView
                 vista_proveedores = ProveedoresView(self.page, lambda: self._navegar("dashboard"))
                 nuevo_contenido = vista_proveedores.build()
                 print("[DEBUG] Vista de proveedores creada")
             elif route == "ventas":
                 print("[DEBUG] Creando vista de ventas...")
-                vista_ventas = VentasView(self.page, self.empleado)
+                from views.ventas_view import VentasView
+                vista_ventas = VentasView(self.page, self.empleado, sin_conexion=self.sin_conexion)
                 nuevo_contenido = vista_ventas.build()
                 print("[DEBUG] Vista de ventas creada")
             elif route == "cajas":
                 print("[DEBUG] Creando vista de cajas...")
+                from views.cajas_view import CajasView
                 vista_cajas = CajasView(self.page, self.empleado)
                 nuevo_contenido = vista_cajas.build()
                 print("[DEBUG] Vista de cajas creada")
             elif route == "empleados":
                 print("[DEBUG] Creando vista de empleados...")
+                from views.empleados_view import EmpleadosView
                 vista_empleados = EmpleadosView(self.page, self.empleado)
                 nuevo_contenido = vista_empleados.build()
                 print("[DEBUG] Vista de empleados creada")
             elif route == "reportes":
                 print("[DEBUG] Creando vista de reportes...")
+                from views.reportes_view import ReportesView
                 vista_reportes = ReportesView(self.page, self.empleado)
                 nuevo_contenido = vista_reportes.build()
                 print("[DEBUG] Vista de reportes creada")
             elif route == "configuracion":
                 print("[DEBUG] Creando vista de configuración...")
+                from views.configuracion_view import ConfiguracionView
                 vista_config = ConfiguracionView(self.page, self.empleado)
                 nuevo_contenido = vista_config.build()
                 print("[DEBUG] Vista de configuración creada")
@@ -506,6 +496,7 @@ class DashboardView:
                     row_principal.controls[0] = nuevo_sidebar
             
             self.page.update()
+            TIEMPO_NAVEGACION.observe(time.perf_counter() - inicio, ruta=route)
             print("[DEBUG] Navegación completada")
             
         except Exception as e:
@@ -9,6 +9,8 @@ from models.producto import Producto
 from models.categoria import Categoria
 from repositories.producto_repository import ProductoRepository
 from repositories.categoria_repository import CategoriaRepository
+from repositories.proveedor_repository import ProveedorRepository
+from services.precio_service import PrecioService
 import math
 
 
@@ -20,6 +22,8 @@ class ProductosView:
         self.empleado = empleado
         self.producto_repo = ProductoRepository()
         self.categoria_repo = CategoriaRepository()
+        self.proveedor_repo = ProveedorRepository()
+        self.precio_service = PrecioService()
         
         # Estado
         self.productos = []
@@ -82,6 +86,13 @@ class ProductosView:
                     ft.Text("Gestión de inventario de productos", size=14, color=VoltTheme.TEXT_SECONDARY)
                 ], spacing=5),
                 ft.Row([
+                    ft.ElevatedButton(
+                        "Actualizar Precios",
+                        icon="price_change",
+                        on_click=lambda e: self.mostrar_dialog_precios(),
+                        bgcolor=VoltTheme.INFO,
+                        color=ft.Colors.WHITE
+                    ),
                     ft.ElevatedButton(
                         "Gestionar Categorías",
                         icon="category",
@@ -770,6 +781,207 @@ class ProductosView:
             border_radius=5
         )
     
+    def mostrar_dialog_precios(self):
+        """Muestra el diálogo de cambio masivo de precios"""
+        try:
+            proveedores = self.proveedor_repo.listar()
+        except Exception as ex:
+            self.mostrar_mensaje(f"Error al cargar proveedores: {str(ex)}", "error")
+            return
+        
+        dropdown_categoria = ft.Dropdown(
+            label="Categoría",
+            options=[ft.dropdown.Option(key="", text="Todas las categorías")] + [
+                ft.dropdown.Option(key=str(cat.id_categoria), text=cat.nombre)
+                for cat in self.categorias if cat.estado == "activa"
+            ],
+            value=str(self.categoria_filtro) if self.categoria_filtro else "",
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        dropdown_proveedor = ft.Dropdown(
+            label="Proveedor",
+            options=[ft.dropdown.Option(key="", text="Todos los proveedores")] + [
+                ft.dropdown.Option(key=str(p.id_proveedor), text=p.nombre_empresa)
+                for p in proveedores
+            ],
+            value="",
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        campo_busqueda = ft.TextField(
+            label="Código o nombre contiene",
+            value=self.busqueda_actual,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        dropdown_modo = ft.Dropdown(
+            label="Tipo de cambio",
+            options=[
+                ft.dropdown.Option(key="porcentaje", text="Porcentaje (%)"),
+                ft.dropdown.Option(key="monto", text="Monto fijo (Q)"),
+                ft.dropdown.Option(key="margen", text="Recalcular venta según margen"),
+            ],
+            value="porcentaje",
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        dropdown_aplicar_a = ft.Dropdown(
+            label="Precio a modificar",
+            options=[
+                ft.dropdown.Option(key="venta", text="Precio de venta"),
+                ft.dropdown.Option(key="costo", text="Precio de costo"),
+                ft.dropdown.Option(key="ambos", text="Costo y venta"),
+            ],
+            value="venta",
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        campo_valor = ft.TextField(
+            label="Valor",
+            hint_text="10 = +10%, -5 = -5%",
+            keyboard_type=ft.KeyboardType.NUMBER,
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        dropdown_redondeo = ft.Dropdown(
+            label="Redondeo",
+            options=[
+                ft.dropdown.Option(key="", text="Centavos"),
+                ft.dropdown.Option(key="0.05", text="Q 0.05"),
+                ft.dropdown.Option(key="0.25", text="Q 0.25"),
+                ft.dropdown.Option(key="0.50", text="Q 0.50"),
+                ft.dropdown.Option(key="1", text="Q 1.00"),
+            ],
+            value="",
+            expand=1,
+            border_color=VoltTheme.BORDER_COLOR,
+            focused_border_color=VoltTheme.PRIMARY
+        )
+        resultado_simulacion = ft.Column([], spacing=5, scroll=ft.ScrollMode.AUTO, height=220)
+        
+        def al_cambiar_modo(e):
+            margen = dropdown_modo.value == "margen"
+            dropdown_aplicar_a.disabled = margen
+            campo_valor.hint_text = ("Vacío = margen actual de cada producto" if margen
+                                     else "10 = +10%, -5 = -5%" if dropdown_modo.value == "porcentaje"
+                                     else "5 = +Q 5.00, -2 = -Q 2.00")
+            self.page.update()
+        
+        dropdown_modo.on_change = al_cambiar_modo
+        
+        def parametros():
+            """Lee el formulario; None si el valor no es numérico"""
+            try:
+                valor = float(campo_valor.value.replace(',', '.')) if campo_valor.value and campo_valor.value.strip() else None
+            except ValueError:
+                self.mostrar_mensaje("El valor debe ser numérico", "error")
+                return None
+            return {
+                'modo': dropdown_modo.value,
+                'valor': valor,
+                'aplicar_a': 'venta' if dropdown_modo.value == 'margen' else dropdown_aplicar_a.value,
+                'redondeo': float(dropdown_redondeo.value) if dropdown_redondeo.value else None,
+                'id_categoria': int(dropdown_categoria.value) if dropdown_categoria.value else None,
+                'id_proveedor': int(dropdown_proveedor.value) if dropdown_proveedor.value else None,
+                'busqueda': campo_busqueda.value.strip() if campo_busqueda.value else None,
+            }
+        
+        def vista_previa(e):
+            criterio = parametros()
+            if criterio is None:
+                return
+            simulacion = self.precio_service.simular(**criterio)
+            if not simulacion['success']:
+                self.mostrar_mensaje(simulacion['message'], "error")
+                return
+            
+            resultado_simulacion.controls.clear()
+            resultado_simulacion.controls.append(ft.Text(
+                f"{simulacion['productos']} productos: {simulacion['a_cambiar']} cambian, "
+                f"{simulacion['sin_cambio']} sin cambio, {simulacion['invalidos']} omitidos "
+                f"(venta menor al costo o precio no válido)",
+                size=13, weight=ft.FontWeight.BOLD
+            ))
+            for fila in simulacion['muestra']:
+                resultado_simulacion.controls.append(ft.Text(
+                    f"{fila['codigo']} - {fila['nombre']}: "
+                    f"costo Q {fila['precio_costo']:.2f} → Q {fila['costo_nuevo']:.2f}, "
+                    f"venta Q {fila['precio_venta']:.2f} → Q {fila['venta_nuevo']:.2f}",
+                    size=12,
+                    color=VoltTheme.TEXT_PRIMARY if fila['valido'] else VoltTheme.DANGER
+                ))
+            if simulacion['productos'] > len(simulacion['muestra']):
+                resultado_simulacion.controls.append(ft.Text(
+                    f"... y {simulacion['productos'] - len(simulacion['muestra'])} productos más",
+                    size=12, italic=True, color=VoltTheme.TEXT_SECONDARY
+                ))
+            self.page.update()
+        
+        def aplicar(e):
+            criterio = parametros()
+            if criterio is None:
+                return
+            simulacion = self.precio_service.simular(**criterio)
+            if not simulacion['success']:
+                self.mostrar_mensaje(simulacion['message'], "error")
+                return
+            if not simulacion['a_cambiar']:
+                self.mostrar_mensaje("Ningún producto cambia de precio con estos criterios", "warning")
+                return
+            
+            def confirmar(ev):
+                self.page.close(dialog_confirmacion)
+                resultado = self.precio_service.aplicar(self.empleado['id_empleado'], **criterio)
+                if resultado['success']:
+                    self.page.close(dialog)
+                    self.cargar_productos()
+                self.mostrar_mensaje(resultado['message'], "success" if resultado['success'] else "error")
+            
+            dialog_confirmacion = ft.AlertDialog(
+                title=ft.Text("Confirmar cambio de precios"),
+                content=ft.Text(
+                    f"Se actualizará el precio de {simulacion['a_cambiar']} productos. "
+                    f"El cambio queda registrado en el historial de precios. ¿Continuar?"
+                ),
+                actions=[
+                    ft.TextButton("Cancelar", on_click=lambda ev: self.page.close(dialog_confirmacion)),
+                    ft.ElevatedButton("Aplicar", on_click=confirmar, bgcolor=VoltTheme.PRIMARY, color=ft.Colors.WHITE)
+                ]
+            )
+            self.page.open(dialog_confirmacion)
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text("Actualizar Precios"),
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Text("Productos", size=14, weight=ft.FontWeight.BOLD),
+                    ft.Row([dropdown_categoria, dropdown_proveedor], spacing=10),
+                    campo_busqueda,
+                    ft.Divider(),
+                    ft.Text("Cambio", size=14, weight=ft.FontWeight.BOLD),
+                    ft.Row([dropdown_modo, dropdown_aplicar_a], spacing=10),
+                    ft.Row([campo_valor, dropdown_redondeo], spacing=10),
+                    ft.Divider(),
+                    resultado_simulacion
+                ], spacing=10, scroll=ft.ScrollMode.AUTO),
+                width=700
+            ),
+            actions=[
+                ft.TextButton("Cerrar", on_click=lambda e: self.page.close(dialog)),
+                ft.OutlinedButton("Vista previa", icon="visibility", on_click=vista_previa),
+                ft.ElevatedButton("Aplicar", icon="check", on_click=aplicar,
+                                  bgcolor=VoltTheme.PRIMARY, color=ft.Colors.WHITE)
+            ]
+        )
+        
+        self.page.open(dialog)
+    
     def confirmar_eliminar(self, producto: Producto):
         """Muestra confirmación para eliminar producto"""
         def eliminar(e):
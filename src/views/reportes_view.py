@@ -3,8 +3,11 @@ Vista de Reportes
 Pantalla para generar y visualizar reportes del sistema
 """
 import flet as ft
+import threading
 from datetime import datetime, date
+from database.connection import TokenCancelacion
 from services.reporte_service import ReporteService
+from services.valorizacion_service import ValorizacionService
 from utils.theme import VoltTheme
 from utils.exportar_reportes import ExportadorReportes
 import os
@@ -18,11 +21,14 @@ class ReportesView:
         self.page = page
         self.empleado = empleado
         self.reporte_service = ReporteService()
+        self.valorizacion_service = ValorizacionService()
         
         # Estado
         self.reporte_actual = None
         self.datos_reporte = None
         self.tipo_reporte_actual = None  # Para saber qué reporte está mostrándose
+        self.token_reporte = None  # Reporte en curso (cancelable)
+        self.actualizando_valorizacion = False
         
         # Referencias a controles
         self.tipo_reporte = None
@@ -296,118 +302,127 @@ class ReportesView:
     
     # Métodos para generar cada tipo de reporte
     
-    def generar_cierre_diario(self):
-        """Genera reporte de cierre de caja diario"""
-        try:
-            fecha_str = self.fecha_unica.value
-            fecha = datetime.strptime(fecha_str, "%d/%m/%Y").date()
+    def ejecutar_reporte(self, tipo, generar, mostrar):
+        """
+        Genera un reporte en segundo plano: la interfaz sigue respondiendo y
+        muestra un botón para cancelarlo
+        
+        Args:
+            tipo: Tipo de reporte (para exportar)
+            generar: Función que recibe el token de cancelación y retorna el resultado del servicio
+            mostrar: Método que muestra el resultado
+        """
+        # Un reporte nuevo reemplaza (y cancela) al que estuviera en curso
+        if self.token_reporte is not None:
+            self.token_reporte.cancelar()
+        token = TokenCancelacion()
+        self.token_reporte = token
+        self.mostrar_generando(token)
+        
+        def tarea():
+            try:
+                resultado = generar(token)
+            except Exception as e:
+                resultado = {'success': False, 'message': f'Error: {str(e)}'}
             
-            resultado = self.reporte_service.generar_cierre_caja_diario(fecha)
+            if token is not self.token_reporte:
+                return
+            self.token_reporte = None
             
             if resultado['success']:
                 self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'cierre_diario'
-                self.mostrar_reporte_cierre_diario(resultado)
+                self.tipo_reporte_actual = tipo
+                mostrar(resultado)
+            elif resultado.get('cancelado'):
+                self.mostrar_cancelado()
             else:
                 self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
+        
+        threading.Thread(target=tarea, daemon=True).start()
+    
+    def cancelar_reporte(self, token):
+        """Cancela el reporte en curso: sus consultas se interrumpen en el servidor"""
+        if token is self.token_reporte:
+            self.token_reporte = None
+            token.cancelar()
+            self.mostrar_cancelado()
+    
+    def generar_cierre_diario(self):
+        """Genera reporte de cierre de caja diario"""
+        try:
+            fecha_str = self.fecha_unica.value
+            fecha = datetime.strptime(fecha_str, "%d/%m/%Y").date()
         except ValueError:
             self.mostrar_error("Formato de fecha inválido. Use DD/MM/AAAA")
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+            return
+        
+        self.ejecutar_reporte(
+            'cierre_diario',
+            lambda token: self.reporte_service.generar_cierre_caja_diario(fecha, token=token),
+            self.mostrar_reporte_cierre_diario
+        )
     
     def generar_cierre_mensual(self):
         """Genera reporte de cierre de caja mensual"""
         try:
             mes = int(self.mes_selector.value)
             año = int(self.año_selector.value)
-            
-            resultado = self.reporte_service.generar_cierre_caja_mensual(año, mes)
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'cierre_mensual'
-                self.mostrar_reporte_cierre_mensual(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
-        except ValueError:
+        except (TypeError, ValueError):
             self.mostrar_error("Valores de mes o año inválidos")
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+            return
+        
+        self.ejecutar_reporte(
+            'cierre_mensual',
+            lambda token: self.reporte_service.generar_cierre_caja_mensual(año, mes, token=token),
+            self.mostrar_reporte_cierre_mensual
+        )
     
     def generar_compras_periodo(self):
         """Genera reporte de compras por periodo"""
         try:
             fecha_inicio = datetime.strptime(self.fecha_inicio.value, "%d/%m/%Y").date()
             fecha_fin = datetime.strptime(self.fecha_fin.value, "%d/%m/%Y").date()
-            
-            resultado = self.reporte_service.generar_compras_por_periodo(fecha_inicio, fecha_fin)
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'compras_periodo'
-                self.mostrar_reporte_compras(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
         except ValueError:
             self.mostrar_error("Formato de fecha inválido. Use DD/MM/AAAA")
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+            return
+        
+        self.ejecutar_reporte(
+            'compras_periodo',
+            lambda token: self.reporte_service.generar_compras_por_periodo(fecha_inicio, fecha_fin, token=token),
+            self.mostrar_reporte_compras
+        )
     
     def generar_productos_existencias(self):
         """Genera reporte de productos y existencias"""
-        try:
-            resultado = self.reporte_service.generar_productos_y_existencias()
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'productos_existencias'
-                self.mostrar_reporte_productos(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+        self.ejecutar_reporte(
+            'productos_existencias',
+            lambda token: self.reporte_service.generar_productos_y_existencias(token=token),
+            self.mostrar_reporte_productos
+        )
     
     def generar_cartera_clientes(self):
         """Genera reporte de cartera de clientes"""
-        try:
-            resultado = self.reporte_service.generar_cartera_clientes()
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'cartera_clientes'
-                self.mostrar_reporte_clientes(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+        self.ejecutar_reporte(
+            'cartera_clientes',
+            lambda token: self.reporte_service.generar_cartera_clientes(token=token),
+            self.mostrar_reporte_clientes
+        )
     
     def generar_cartera_proveedores(self):
         """Genera reporte de cartera de proveedores"""
-        try:
-            resultado = self.reporte_service.generar_cartera_proveedores()
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'cartera_proveedores'
-                self.mostrar_reporte_proveedores(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+        self.ejecutar_reporte(
+            'cartera_proveedores',
+            lambda token: self.reporte_service.generar_cartera_proveedores(token=token),
+            self.mostrar_reporte_proveedores
+        )
     
     def generar_cartera_empleados(self):
         """Genera reporte de cartera de empleados"""
-        try:
-            resultado = self.reporte_service.generar_cartera_empleados()
-            
-            if resultado['success']:
-                self.datos_reporte = resultado
-                self.tipo_reporte_actual = 'cartera_empleados'
-                self.mostrar_reporte_empleados(resultado)
-            else:
-                self.mostrar_error(resultado.get('message', 'Error al generar reporte'))
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+        self.ejecutar_reporte(
+            'cartera_empleados',
+            lambda token: self.reporte_service.generar_cartera_empleados(token=token),
+            self.mostrar_reporte_empleados
+        )
     
     # Métodos para mostrar resultados
     
@@ -522,8 +537,25 @@ class ReportesView:
             self.crear_tarjeta_metrica("Sin Stock", str(stats.get('sin_stock', 0)), "error", VoltTheme.DANGER),
             self.crear_tarjeta_metrica("Bajo Stock", str(stats.get('bajo_stock', 0)), "warning", VoltTheme.WARNING),
             self.crear_tarjeta_metrica("Valor Inventario", f"Q{stats.get('valor_inventario', 0):,.2f}", "attach_money", VoltTheme.SUCCESS),
+            self.crear_tarjeta_metrica("Valor al Costo", f"Q{stats.get('valor_costo', 0):,.2f}", "payments", VoltTheme.INFO),
         ], spacing=15)
         
+        # Valorización por categoría (vista materializada)
+        actualizada = resultado.get('valorizacion_actualizada')
+        encabezado_valorizacion = ft.Row([
+            ft.Text("Valorización por categoría", size=16, weight=ft.FontWeight.W_600, color=VoltTheme.TEXT_PRIMARY),
+            ft.Text(f"Actualizada: {actualizada.strftime('%d/%m/%Y %H:%M')}" if actualizada else "Sin actualizar",
+                   size=12, color=VoltTheme.TEXT_SECONDARY),
+            ft.Container(expand=True),
+            ft.IconButton(
+                icon=ft.Icons.REFRESH,
+                icon_color=VoltTheme.PRIMARY,
+                tooltip="Actualizar valorización",
+                on_click=lambda _: self.actualizar_valorizacion()
+            )
+        ], spacing=10)
+        tabla_valorizacion = self.crear_tabla_valorizacion(resultado.get('valorizacion', []))
+        
         # Tabla de productos
         tabla = self.crear_tabla_productos(productos)
         
@@ -539,6 +571,9 @@ class ReportesView:
             ),
             tarjetas,
             ft.Container(height=20),
+            encabezado_valorizacion,
+            tabla_valorizacion,
+            ft.Container(height=20),
             tabla
         ], scroll=ft.ScrollMode.AUTO)
         
@@ -811,6 +846,68 @@ class ReportesView:
             horizontal_lines=ft.BorderSide(1, VoltTheme.BORDER_COLOR),
         )
     
+    def crear_tabla_valorizacion(self, categorias):
+        """Crea tabla de valorización por categoría"""
+        if not categorias:
+            return ft.Text("No hay productos activos", color=VoltTheme.TEXT_SECONDARY)
+        
+        filas = []
+        for v in categorias:
+            filas.append(
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(v.get('categoria', ''), size=13)),
+                    ft.DataCell(ft.Text(str(v.get('productos', 0)), size=13)),
+                    ft.DataCell(ft.Text(f"{v.get('unidades', 0):,}", size=13)),
+                    ft.DataCell(ft.Text(f"Q{v.get('valor_costo', 0):,.2f}", size=13)),
+                    ft.DataCell(ft.Text(f"Q{v.get('valor_venta', 0):,.2f}", size=13, weight=ft.FontWeight.W_600)),
+                ])
+            )
+        
+        return ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Categoría", weight=ft.FontWeight.BOLD)),
+                ft.DataColumn(ft.Text("Productos", weight=ft.FontWeight.BOLD)),
+                ft.DataColumn(ft.Text("Unidades", weight=ft.FontWeight.BOLD)),
+                ft.DataColumn(ft.Text("Valor Costo", weight=ft.FontWeight.BOLD)),
+                ft.DataColumn(ft.Text("Valor Venta", weight=ft.FontWeight.BOLD)),
+            ],
+            rows=filas,
+            border=ft.border.all(1, VoltTheme.BORDER_COLOR),
+            border_radius=VoltTheme.RADIUS_MD,
+            vertical_lines=ft.BorderSide(1, VoltTheme.BORDER_COLOR),
+            horizontal_lines=ft.BorderSide(1, VoltTheme.BORDER_COLOR),
+        )
+    
+    def actualizar_valorizacion(self):
+        """
+        Refresca la valorización a pedido en segundo plano (recalcula todo el
+        catálogo) y vuelve a mostrar el reporte
+        """
+        if self.actualizando_valorizacion:
+            return
+        self.actualizando_valorizacion = True
+        self.mostrar_mensaje("Actualizando valorización...", VoltTheme.INFO)
+        
+        def tarea():
+            try:
+                resultado = self.valorizacion_service.actualizar()
+            except Exception as e:
+                resultado = {'success': False, 'message': f'Error: {str(e)}'}
+            finally:
+                self.actualizando_valorizacion = False
+            
+            if not resultado['success']:
+                self.mostrar_mensaje(resultado['message'], VoltTheme.DANGER)
+                return
+            if resultado.get('omitido'):
+                self.mostrar_mensaje(resultado['message'], VoltTheme.WARNING)
+                return
+            
+            self.generar_productos_existencias()
+            self.mostrar_mensaje("Valorización actualizada", VoltTheme.SUCCESS)
+        
+        threading.Thread(target=tarea, daemon=True).start()
+    
     def crear_tabla_clientes(self, clientes):
         """Crea tabla de clientes"""
         if not clientes:
@@ -929,6 +1026,46 @@ class ReportesView:
             horizontal_lines=ft.BorderSide(1, VoltTheme.BORDER_COLOR),
         )
     
+    def mostrar_generando(self, token):
+        """Muestra el progreso del reporte con un botón para cancelarlo"""
+        self.resultado_container.content = ft.Column([
+            ft.Container(
+                content=ft.Column([
+                    ft.ProgressRing(width=50, height=50, color=VoltTheme.PRIMARY),
+                    ft.Container(height=15),
+                    ft.Text("Generando reporte...", size=16, color=VoltTheme.TEXT_SECONDARY),
+                    ft.Container(height=15),
+                    ft.OutlinedButton(
+                        "Cancelar",
+                        icon=ft.Icons.CANCEL,
+                        on_click=lambda _: self.cancelar_reporte(token)
+                    )
+                ],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER
+                ),
+                alignment=ft.alignment.center,
+                padding=60
+            )
+        ])
+        self.page.update()
+    
+    def mostrar_cancelado(self):
+        """Muestra que el reporte se canceló"""
+        self.resultado_container.content = ft.Column([
+            ft.Container(
+                content=ft.Column([
+                    ft.Icon("block", size=60, color=VoltTheme.TEXT_MUTED),
+                    ft.Container(height=10),
+                    ft.Text("Reporte cancelado", size=18, weight=ft.FontWeight.BOLD, color=VoltTheme.TEXT_SECONDARY)
+                ],
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER
+                ),
+                alignment=ft.alignment.center,
+                padding=60
+            )
+        ])
+        self.page.update()
+    
     def mostrar_error(self, mensaje):
         """Muestra un mensaje de error"""
         self.resultado_container.content = ft.Column([
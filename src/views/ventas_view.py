@@ -1,10 +1,13 @@
 import flet as ft
 from datetime import datetime
 import math
+import uuid
 from repositories.venta_repository import VentaRepository
 from repositories.cliente_repository import ClienteRepository
 from repositories.producto_repository import ProductoRepository
+from repositories.local_repository import CatalogoLocalRepository, ColaVentasRepository, numero_factura_local
 from services.caja_service import CajaService
+from services.sincronizacion_service import SincronizacionService, catalogo_local_activo, modo_local
 from models.venta import Venta, DetalleVenta
 from utils.theme import VoltTheme
 
@@ -12,19 +15,38 @@ from utils.theme import VoltTheme
 class VentasView:
     """Vista para gestión de Ventas (Punto de Venta)"""
     
-    def __init__(self, page: ft.Page, empleado):
+    def __init__(self, page: ft.Page, empleado, sin_conexion=False):
         self.page = page
         self.empleado = empleado
-        self.venta_repo = VentaRepository()
-        self.cliente_repo = ClienteRepository()
-        self.producto_repo = ProductoRepository()
-        self.caja_service = CajaService()
+        
+        # Sin conexión no se crean los repositorios del servidor
+        self.sin_conexion = sin_conexion
+        if not sin_conexion:
+            self.venta_repo = VentaRepository()
+            self.cliente_repo = ClienteRepository()
+            self.producto_repo = ProductoRepository()
+            self.caja_service = CajaService()
+        
+        # Punto de venta local (POS_MODO_LOCAL): cola de ventas en la terminal.
+        # La copia local del catálogo se usa también en modo 'no' (POS_CATALOGO_LOCAL)
+        self.modo_local = 'siempre' if sin_conexion else modo_local()
+        self.catalogo_local = None
+        self.cola_ventas = None
+        self.sincronizacion = None
+        if self.modo_local != 'no' or catalogo_local_activo():
+            self.catalogo_local = CatalogoLocalRepository()
+            if not sin_conexion:
+                self.sincronizacion = SincronizacionService()
+        if self.modo_local != 'no':
+            self.cola_ventas = ColaVentasRepository()
+        self.catalogo_ventas = None  # De dónde salieron los productos de la venta en curso
         
         # Estado
         self.ventas = []
         self.clientes = []
         self.productos = []
         self.carrito = []  # Lista de DetalleVenta
+        self.clave_venta = None  # Clave de idempotencia de la venta en curso
         self.caja_actual = None
         self.cliente_seleccionado = None
         
@@ -70,6 +92,27 @@ class VentasView:
             padding=ft.padding.only(bottom=20)
         )
         
+        # Aviso de ventas guardadas en la terminal (modo local)
+        self.texto_cola = ft.Text("", size=13, color=VoltTheme.TEXT_PRIMARY, expand=True)
+        self.boton_conflictos = ft.TextButton(
+            "Ver para revisar",
+            icon=ft.Icons.LIST_ALT,
+            visible=False,
+            on_click=lambda _: self.mostrar_conflictos()
+        )
+        self.aviso_cola = ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.Icons.CLOUD_UPLOAD, color=VoltTheme.WARNING, size=22),
+                self.texto_cola,
+                self.boton_conflictos
+            ], spacing=10),
+            padding=12,
+            bgcolor=f"{VoltTheme.WARNING}20",
+            border_radius=10,
+            margin=ft.margin.only(bottom=20),
+            visible=False
+        )
+        
         # Barra de búsqueda y filtros
         self.campo_busqueda = ft.TextField(
             hint_text="Buscar por número de factura o cliente...",
@@ -160,6 +203,7 @@ class VentasView:
         contenido = ft.Container(
             content=ft.Column([
                 header,
+                self.aviso_cola,
                 barra_busqueda,
                 tabla_container,
                 paginacion_wrapper
@@ -177,6 +221,15 @@ class VentasView:
     def cargar_ventas(self):
         """Carga las ventas desde la base de datos"""
         try:
+            self.actualizar_estado_cola()
+            
+            # Sin conexión solo se conocen las ventas guardadas en la terminal
+            if self.sin_conexion:
+                self.ventas = self.cola_ventas.listar()
+                self.actualizar_tabla_ventas()
+                self.actualizar_paginacion(1)
+                return
+            
             # Cargar ventas con paginación
             offset = (self.pagina_actual - 1) * self.items_por_pagina
             resultado = self.venta_repo.listar(
@@ -242,7 +295,10 @@ class VentasView:
     def _crear_fila_venta(self, venta):
         """Crea una fila para una venta"""
         # Estado color
-        if venta.estado == "completada":
+        if venta.id_venta is None:  # Guardada en la terminal, aún no llega al servidor
+            estado_color = VoltTheme.WARNING
+            estado_text = "Pendiente"
+        elif venta.estado == "completada":
             estado_color = VoltTheme.SUCCESS
             estado_text = "Completada"
         else:  # anulada
@@ -288,6 +344,7 @@ class VentasView:
                             icon_size=18,
                             icon_color=VoltTheme.INFO,
                             tooltip="Ver detalle",
+                            disabled=venta.id_venta is None,
                             on_click=lambda _, v=venta: self.ver_detalle_venta(v.id_venta)
                         ),
                         ft.IconButton(
@@ -295,7 +352,7 @@ class VentasView:
                             icon_size=18,
                             icon_color=VoltTheme.DANGER if venta.estado == "completada" else VoltTheme.TEXT_SECONDARY,
                             tooltip="Anular venta" if venta.estado == "completada" else "Ya anulada",
-                            disabled=venta.estado != "completada",
+                            disabled=venta.estado != "completada" or venta.id_venta is None,
                             on_click=lambda _, v=venta: self.confirmar_anular_venta(v.id_venta)
                         ),
                     ], spacing=5, alignment=ft.MainAxisAlignment.CENTER),
@@ -386,6 +443,10 @@ class VentasView:
     
     def cargar_ventas_con_filtros(self):
         """Carga las ventas aplicando filtros"""
+        if self.sin_conexion:
+            self.cargar_ventas()
+            return
+        
         try:
             from datetime import datetime
             
@@ -439,8 +500,18 @@ class VentasView:
     def abrir_modal_nueva_venta(self):
         """Abre el modal para crear una nueva venta"""
         try:
-            # Verificar que hay caja abierta
-            resultado = self.caja_service.verificar_caja_abierta(self.empleado['id_empleado'])
+            # Verificar que hay caja abierta (sin conexión, la última conocida en la terminal)
+            if self.sin_conexion:
+                caja = self.catalogo_local.obtener_caja(self.empleado['id_empleado'])
+                resultado = {'success': True, 'caja': caja} if caja else {
+                    'success': False,
+                    'message': 'No hay una caja abierta registrada en esta terminal. Abra una caja con conexión al servidor.'
+                }
+            else:
+                resultado = self.caja_service.verificar_caja_abierta(self.empleado['id_empleado'])
+                if self.catalogo_local:
+                    self.catalogo_local.guardar_caja(self.empleado['id_empleado'], resultado.get('caja'))
+            
             if not resultado['success']:
                 self.mostrar_alerta(
                     "Caja Cerrada",
@@ -451,11 +522,18 @@ class VentasView:
             
             self.caja_actual = resultado['caja']
             
-            # Cargar clientes
-            self.clientes = self.cliente_repo.listar_todos()
-            
-            # Cargar productos activos con stock > 0
-            self.productos = self.producto_repo.listar_activos_para_ventas()
+            # Cargar clientes y productos activos con stock > 0 de la copia local,
+            # puesta al día con lo que cambió en el servidor desde la última vez
+            # (si no se pudo, p. ej. hay ventas por enviar, se usa tal como está)
+            if self.sincronizacion:
+                self.sincronizacion.actualizar_catalogo()
+            if self.sin_conexion or (self.catalogo_local and self.catalogo_local.catalogo_actualizado()):
+                self.catalogo_ventas = self.catalogo_local
+                self.clientes = self.catalogo_local.listar_clientes()
+            else:
+                self.catalogo_ventas = self.producto_repo
+                self.clientes = self.cliente_repo.listar_todos()
+            self.productos = self.catalogo_ventas.listar_activos_para_ventas()
             
             if not self.productos:
                 self.mostrar_alerta(
@@ -465,9 +543,10 @@ class VentasView:
                 )
                 return
             
-            # Resetear carrito y cliente
+            # Resetear carrito y cliente; la clave acompaña todos los intentos de guardar esta venta
             self.carrito = []
             self.cliente_seleccionado = None
+            self.clave_venta = str(uuid.uuid4())
             
             # Dropdown de clientes
             opciones_clientes = [ft.dropdown.Option(key="0", text="Sin cliente (Venta rápida)")]
@@ -743,8 +822,9 @@ class VentasView:
             if not busqueda:
                 return
             
-            # Buscar producto por código exacto primero (para scanner)
-            producto = next((p for p in self.productos if p.codigo.upper() == busqueda), None)
+            # Buscar producto por código exacto primero (para scanner): consulta
+            # por índice, trae el stock vigente y encuentra productos recién creados
+            producto = self.catalogo_ventas.obtener_para_escaneo(busqueda)
             
             # Si no se encuentra por código exacto, buscar por nombre
             if not producto:
@@ -1016,8 +1096,12 @@ class VentasView:
                 self.mostrar_alerta("Error", "Seleccione un método de pago", VoltTheme.WARNING)
                 return
             
-            # Generar número de factura automático
-            numero_factura = self.generar_numero_factura()
+            # Generar número de factura automático (las ventas locales no siguen la numeración)
+            ventas_locales = self.sin_conexion or self.modo_local == 'siempre'
+            if ventas_locales:
+                numero_factura = numero_factura_local(self.clave_venta)
+            else:
+                numero_factura = self.generar_numero_factura()
             
             # Calcular totales
             subtotal = sum(d.subtotal for d in self.carrito)
@@ -1036,18 +1120,31 @@ class VentasView:
                 descuento=descuento,
                 total=total,
                 metodo_pago=self.dropdown_metodo_pago.value,
-                observaciones=self.campo_observaciones.value or None
+                observaciones=self.campo_observaciones.value or None,
+                clave_idempotencia=self.clave_venta
             )
             
             # Asignar detalles
             venta.detalles = self.carrito
             
-            # Guardar venta
-            resultado = self.venta_repo.crear(venta, self.caja_actual['id_caja'])
+            # Guardar venta (en modo local, en la terminal; el servidor la recibe después)
+            if ventas_locales:
+                resultado = self.guardar_venta_local(venta)
+            else:
+                resultado = self.venta_repo.crear(venta, self.caja_actual['id_caja'])
+                
+                # Modo respaldo: si el servidor no responde la venta queda en la
+                # terminal con el mismo número: el servidor pudo registrarla
+                # aunque la respuesta se perdiera (la cola la reenvía con la
+                # misma clave y recibe esa venta)
+                if resultado.get('reintentable') and self.cola_ventas:
+                    resultado = self.guardar_venta_local(venta)
             
             if resultado['success']:
-                # Obtener la venta completa para imprimir
-                venta_guardada = self.venta_repo.obtener_por_id(resultado['id_venta'])
+                self.clave_venta = None
+                
+                # Obtener la venta completa para imprimir (la local ya está completa)
+                venta_guardada = resultado.get('venta') or self.venta_repo.obtener_por_id(resultado['id_venta'])
                 
                 self.cerrar_modal()
                 self.cargar_ventas()
@@ -1061,6 +1158,91 @@ class VentasView:
             print(f"Error al guardar venta: {e}")
             self.mostrar_alerta("Error", f"No se pudo guardar la venta: {str(e)}", VoltTheme.DANGER)
     
+    def guardar_venta_local(self, venta):
+        """Guarda la venta en la cola de la terminal con los datos para el comprobante"""
+        cliente = self.cliente_seleccionado
+        venta.cliente_nombre = f"{cliente.persona.nombre} {cliente.persona.apellido}" if cliente else None
+        venta.empleado_nombre = f"{self.empleado['nombre']} {self.empleado['apellido']}"
+        
+        resultado = self.cola_ventas.encolar(venta, self.caja_actual['id_caja'])
+        if resultado['success']:
+            resultado['venta'] = venta
+        return resultado
+    
+    def actualizar_estado_cola(self):
+        """Muestra cuántas ventas de la terminal faltan enviar y cuántas rechazó el servidor"""
+        if not self.cola_ventas:
+            return
+        
+        resumen = self.cola_ventas.resumen()
+        partes = []
+        if self.sin_conexion:
+            partes.append("Sin conexión al servidor: las ventas se guardan en esta terminal")
+        if resumen['pendientes']:
+            partes.append(f"{resumen['pendientes']} ventas pendientes de enviar")
+        if resumen['conflictos']:
+            partes.append(f"{resumen['conflictos']} ventas para revisar")
+        
+        self.texto_cola.value = " · ".join(partes)
+        self.boton_conflictos.visible = resumen['conflictos'] > 0
+        self.aviso_cola.visible = bool(partes)
+    
+    def mostrar_conflictos(self):
+        """Lista las ventas de la terminal que el servidor rechazó o registró con otro número al sincronizar"""
+        filas = []
+        for conflicto in self.cola_ventas.conflictos():
+            fecha = datetime.fromisoformat(conflicto['creada']).strftime("%d/%m/%Y %H:%M")
+            filas.append(ft.Container(
+                content=ft.Row([
+                    ft.Column([
+                        ft.Text(conflicto['numero_factura'], size=12, weight=ft.FontWeight.BOLD),
+                        ft.Text(fecha, size=11, color=VoltTheme.TEXT_SECONDARY)
+                    ], spacing=2, width=170),
+                    ft.Text(f"Q {conflicto['total']:.2f}", size=12, width=90),
+                    ft.Text(conflicto['mensaje'] or "", size=12, expand=True),
+                    ft.TextButton(
+                        "Revisada",
+                        on_click=lambda _, clave=conflicto['clave']: self.marcar_conflicto_revisado(clave)
+                    )
+                ], spacing=10),
+                padding=8,
+                border=ft.border.only(bottom=ft.BorderSide(1, VoltTheme.BORDER_COLOR))
+            ))
+        
+        self.modal = ft.AlertDialog(
+            modal=True,
+            title=ft.Row([
+                ft.Icon(ft.Icons.WARNING, color=VoltTheme.WARNING, size=30),
+                ft.Text("Ventas de la terminal para revisar", weight=ft.FontWeight.BOLD)
+            ], spacing=10),
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Text(
+                        "Se registraron en esta terminal sin conexión, pero el servidor no las aceptó. "
+                        "Verifique el inventario o la caja y regístrelas de nuevo si corresponde.",
+                        size=13,
+                        color=VoltTheme.TEXT_SECONDARY
+                    ),
+                    *filas
+                ], spacing=5, scroll=ft.ScrollMode.AUTO),
+                width=700,
+                height=400
+            ),
+            actions=[ft.TextButton("Cerrar", on_click=lambda _: self.cerrar_modal())],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        self.page.open(self.modal)
+    
+    def marcar_conflicto_revisado(self, clave):
+        """Quita la venta de la lista de pendientes de revisión"""
+        self.cola_ventas.marcar_revisada(clave)
+        self.cerrar_modal()
+        self.actualizar_estado_cola()
+        if self.boton_conflictos.visible:
+            self.mostrar_conflictos()
+        else:
+            self.page.update()
+    
     def ver_detalle_venta(self, id_venta):
         """Muestra el detalle de una venta"""
         try:
@@ -0,0 +1,70 @@
+"""
+Valorización del inventario
+Refresca la vista materializada valorizacion_inventario, guarda la foto del
+día y muestra la tendencia de los últimos días
+
+Uso:
+    python valorizar_inventario.py                  # refrescar y guardar la foto del día
+    python valorizar_inventario.py --tendencia 30   # además, mostrar los últimos 30 días
+    python valorizar_inventario.py --solo-tendencia 90
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from services.valorizacion_service import ValorizacionService
+
+
+def imprimir_tendencia(servicio: ValorizacionService, dias: int):
+    hoy = date.today()
+    resultado = servicio.tendencia(hoy - timedelta(days=dias - 1), hoy)
+    if not resultado['success']:
+        print(f"[ERROR] {resultado['message']}")
+        sys.exit(1)
+
+    print(f"\nÚltimos {dias} días:")
+    print(f"  {'Fecha':<12}{'Unidades':>14}{'Valor costo':>18}{'Valor venta':>18}")
+    for dia in resultado['dias']:
+        print(f"  {dia['fecha'].strftime('%d/%m/%Y'):<12}{dia['unidades']:>14,}"
+              f"{dia['valor_costo']:>18,.2f}{dia['valor_venta']:>18,.2f}")
+    if not resultado['dias']:
+        print("  (sin fotos en el período)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Valorización del inventario')
+    parser.add_argument('--tendencia', type=int, metavar='DIAS', help='Mostrar la tendencia de los últimos DIAS días')
+    parser.add_argument('--solo-tendencia', type=int, metavar='DIAS', help='Mostrar la tendencia sin refrescar')
+    args = parser.parse_args()
+
+    servicio = ValorizacionService()
+
+    print("=" * 60)
+    print("VALORIZACIÓN DE INVENTARIO")
+    print("=" * 60)
+
+    if args.solo_tendencia:
+        imprimir_tendencia(servicio, args.solo_tendencia)
+        return
+
+    resultado = servicio.actualizar()
+    if not resultado['success']:
+        print(f"[ERROR] {resultado['message']}")
+        sys.exit(1)
+    if resultado['omitido']:
+        print(f"[ADVERTENCIA] {resultado['message']}")
+    else:
+        print(f"[OK] {resultado['message']} en {resultado['segundos']:.2f}s")
+        print(f"  Valor al costo:  Q{resultado['valor_costo']:,.2f}")
+        print(f"  Valor de venta:  Q{resultado['valor_venta']:,.2f}")
+
+    if args.tendencia:
+        imprimir_tendencia(servicio, args.tendencia)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,13 @@
 Script para verificar y crear usuarios de prueba
 """
 import hashlib
-from src.database import DatabaseConnection
+import os
+import sys
+
+# Los módulos de src/ se importan de forma absoluta (database, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from database import DatabaseConnection
 
 def hash_password(password: str) -> str:
     """Encripta una contraseña usando SHA256"""